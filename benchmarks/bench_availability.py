@@ -0,0 +1,98 @@
+"""Time to find the first common 30-minute slot for 8 people in the next 2 weeks, on synthetic calendars.
+
+Every attendee gets a packed first week and a lighter second one (meetings of 15 minutes to an hour
+and a half, a few all-day events). The
+availability index is compared with a scan that checks every candidate slot against every event,
+which is what reasoning over raw event lists amounts to, and both must agree.
+
+    python -m benchmarks.bench_availability
+"""
+
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from workplace.availability import AvailabilityIndex, AvailabilityTools, working_hours_blocks
+
+ATTENDEES = [f"person{i}@example.com" for i in range(8)]
+DAYS = 14
+SLOT = 30 * 60
+GRANULARITY = 15 * 60
+TZ = ZoneInfo("Europe/Berlin")
+START = datetime(2024, 3, 18, 8, 7, tzinfo=TZ)
+RUNS = 200
+
+
+def synthetic_calendar(rng, start):
+    events = []
+    for day in range(DAYS):
+        opens = start.replace(hour=8, minute=0) + timedelta(days=day)
+        if rng.random() < 0.05:
+            events.append((opens, opens + timedelta(hours=14)))
+            continue
+        # A packed first week, so the first common slot is only found in the second one
+        for _ in range(rng.randint(5, 9) if day < 8 else rng.randint(2, 5)):
+            begin = opens + timedelta(minutes=15 * rng.randint(0, 40))
+            events.append((begin, begin + timedelta(minutes=rng.choice([15, 30, 30, 30, 45, 60, 90]))))
+    return events
+
+
+def naive_first_slot(calendars, blocked, start, end):
+    events = [event for calendar in calendars for event in calendar] + blocked
+    candidate = -(-start // GRANULARITY) * GRANULARITY
+    while candidate + SLOT <= end:
+        if all(event_end <= candidate or event_start >= candidate + SLOT for event_start, event_end in events):
+            return candidate
+        candidate += GRANULARITY
+    return None
+
+
+def main():
+    rng = random.Random(7)
+    calendars = {name: synthetic_calendar(rng, START) for name in ATTENDEES}
+    epoch_calendars = {name: [(int(s.timestamp()), int(e.timestamp())) for s, e in events] for name, events in calendars.items()}
+    start = int(START.timestamp())
+    end = start + DAYS * 24 * 60 * 60
+    blocked = working_hours_blocks(start, end, TZ)
+
+    index = AvailabilityIndex()
+    began = time.perf_counter()
+    for name, events in epoch_calendars.items():
+        index.set_busy(name, events)
+    build = time.perf_counter() - began
+
+    began = time.perf_counter()
+    for _ in range(RUNS):
+        slots = index.free_slots(ATTENDEES, start, end, SLOT, blocked, GRANULARITY)
+    indexed = (time.perf_counter() - began) / RUNS
+
+    began = time.perf_counter()
+    for _ in range(RUNS // 20):
+        expected = naive_first_slot(list(epoch_calendars.values()), blocked, start, end)
+    naive = (time.perf_counter() - began) / (RUNS // 20)
+    assert slots and slots[0][0] == expected, "the index and the scan must find the same slot"
+
+    def source(attendees, window_start, window_end):
+        return {name: calendars[name] for name in attendees if name in calendars}
+
+    tools = AvailabilityTools([source], timezone="Europe/Berlin")
+    query = dict(attendees=",".join(ATTENDEES), earliest_start=START.isoformat(), days_ahead=DAYS)
+    tools.find_common_slots(**query)
+    began = time.perf_counter()
+    for _ in range(RUNS):
+        answer = json.loads(tools.find_common_slots(**query))
+    tool = (time.perf_counter() - began) / RUNS
+    assert answer["slots"][0]["start"] == datetime.fromtimestamp(expected, timezone.utc).astimezone(TZ).isoformat()
+
+    events = sum(len(events) for events in epoch_calendars.values())
+    print(f"{len(ATTENDEES)} attendees, {DAYS} days, {events} events, first common slot {answer['slots'][0]['start']}")
+    print(f"  index build:               {build * 1000:7.3f} ms")
+    print(f"  scan every candidate slot: {naive * 1000:7.3f} ms")
+    print(f"  availability index:        {indexed * 1000:7.3f} ms")
+    print(f"  find_common_slots tool:    {tool * 1000:7.3f} ms (3 options, working hours, JSON)")
+
+
+if __name__ == "__main__":
+    main()
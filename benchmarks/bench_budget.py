@@ -0,0 +1,92 @@
+"""Model calls and time of runaway requests with and without the per-request budget.
+
+Uses the offline agent tree of bench_offline (final_prototype with FakeModel and fake toolkits).
+Each scenario's plan makes the agents misbehave the way a confused model does: a leader that
+transfers the same task twice, a parallel fan-out with the same task twice, a member that keeps
+calling a tool, and a delegation deeper than the limit allows. Every scenario runs once with the
+master's budget switched off and once with it on; model calls come from the traces.
+
+    python -m benchmarks.bench_budget
+"""
+
+import argparse
+from typing import Any, Dict, List
+
+from benchmarks.bench_offline import SpanCollector, load_prototype, request_metrics
+from benchmarks.fakes import FakeModel, use_plan
+
+SCENARIOS: List[Dict[str, Any]] = [
+    {
+        "name": "repeated-transfer",
+        "message": "Summarize my unread emails",
+        "plan": {"master-agent": ["gmail-agent", "gmail-agent", "gmail-agent"], "gmail-agent": ["get_unread_emails"]},
+    },
+    {
+        "name": "repeated-parallel-task",
+        "message": "Summarize my unread emails and also post the summary on Slack",
+        "plan": {
+            "master-agent": [{"parallel": ["gmail_agent", "gmail_agent", "slack_agent"]}],
+            "gmail-agent": ["get_unread_emails"],
+            "slack-agent": ["send_message"],
+        },
+    },
+    {
+        "name": "tool-loop",
+        "message": "Post the standup reminder in #general on Slack",
+        "plan": {"slack-agent": ["list_channels"] * 80},
+    },
+    {
+        "name": "too-deep",
+        "message": "Summarize the project update in an email to john@example.com",
+        "plan": {"master-agent": ["gmail-agent"], "gmail-agent": ["email-writer", "send_email"]},
+        "limits": {"max_depth": 1},
+    },
+]
+
+
+def run_scenario(prototype: Any, tracer: Any, collector: SpanCollector, scenario: Dict[str, Any], budget: bool) -> Dict[str, Any]:
+    from workplace.budget import BudgetLimits
+
+    agent = prototype.master_agent.deep_copy(update={"session_id": f"budget-{scenario['name']}-{budget}"})
+    agent.budget = BudgetLimits(**{**vars(prototype.request_budget), **scenario.get("limits", {})}) if budget else None
+    with use_plan(scenario["plan"]), tracer.span("request", scenario["name"]) as span:
+        response = agent.run(scenario["message"])
+    return {
+        **request_metrics(collector.pop(span.trace_id)),
+        "seconds": span.duration,
+        "budget": (response.metrics or {}).get("budget", {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--model-latency", type=float, default=0.02, help="seconds per fake model call")
+    parser.add_argument("--output-tokens", type=int, default=150, help="output tokens of a fake final answer")
+    parser.add_argument("--tool-latency", type=float, default=0.01, help="seconds per fake tool call")
+    args = parser.parse_args()
+
+    prototype, _ = load_prototype(args)
+    from workplace.tracing import Tracer, instrument, uninstrument
+
+    collector = SpanCollector()
+    uninstrument()
+    tracer = instrument(Tracer(exporters=[collector]), model_classes=[FakeModel])
+
+    limits = prototype.request_budget
+    print(f"budget: {limits.max_model_calls} model calls, depth {limits.max_depth}, {limits.max_seconds:.0f}s, {limits.max_tokens} tokens")
+    for scenario in SCENARIOS:
+        off = run_scenario(prototype, tracer, collector, scenario, budget=False)
+        on = run_scenario(prototype, tracer, collector, scenario, budget=True)
+        usage = on["budget"]
+        print(f"  {scenario['name']:<24}")
+        print(f"    no budget: {off['model_calls']:3d} model calls, {off['tool_calls']:3d} tool calls, depth {off['delegation_depth']}, {off['seconds']:.2f}s")
+        print(
+            f"    budget:    {on['model_calls']:3d} model calls, {on['tool_calls']:3d} tool calls, depth {on['delegation_depth']}, {on['seconds']:.2f}s"
+            f" ({usage.get('duplicate_delegations', 0)} repeated delegations reused, {usage.get('refused_delegations', 0)} refused,"
+            f" stopped: {usage.get('exceeded') or 'no'})"
+        )
+    prototype.job_queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Measure startup time and memory with eager and lazy construction of the specialist agents.
+
+Each stub toolkit sleeps for TOOLKIT_INIT_SECONDS and allocates a schema payload, standing in for
+SlackTools/ZoomTools/GmailTools/GoogleCalendarTools client setup and ComposioToolSet.get_tools(...).
+
+    python -m benchmarks.bench_cold_start
+"""
+
+import time
+import tracemalloc
+
+from agno.agent import Agent
+from agno.tools.toolkit import Toolkit
+
+from workplace.registry import AgentRegistry
+
+TOOLKIT_INIT_SECONDS = 0.15
+SCHEMA_BYTES = 256 * 1024
+
+SPECIALISTS = [
+    "slack_agent",
+    "gmail_agent",
+    "zoom_agent",
+    "google_docs_agent",
+    "google_sheets_agent",
+    "google_calendar_agent",
+    "writer_agent",
+    "data_entry_agent",
+    "email_writer",
+]
+
+
+class StubToolkit(Toolkit):
+    def __init__(self, name: str):
+        super().__init__(name=name)
+        time.sleep(TOOLKIT_INIT_SECONDS)
+        self.schemas = bytearray(SCHEMA_BYTES)
+
+
+def make_registry() -> AgentRegistry:
+    registry = AgentRegistry()
+    for key in SPECIALISTS:
+        name = key.replace("_", "-")
+
+        def factory(key=key, name=name) -> Agent:
+            return Agent(name=name, role=key, tools=[StubToolkit(f"{key}_tools")])
+
+        registry.register(key, name=name, role=key)(factory)
+    return registry
+
+
+def start(lazy: bool):
+    tracemalloc.start()
+    begin = time.perf_counter()
+    registry = make_registry()
+    if not lazy:
+        registry.build_all()
+    team = [registry.lazy(key) for key in SPECIALISTS]
+    master = Agent(name="master-agent", team=team)
+    # The Playground lists the master's tools and copies it for the first request
+    master.get_tools()
+    master.deep_copy(update={"session_id": "first"})
+    elapsed = time.perf_counter() - begin
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return registry, team, elapsed, peak
+
+
+def main():
+    _, _, eager_time, eager_peak = start(lazy=False)
+    registry, team, lazy_time, lazy_peak = start(lazy=True)
+
+    print(f"eager startup: {eager_time:.3f}s, peak {eager_peak / 1024:.0f} KiB, {len(SPECIALISTS)} agents built")
+    print(f"lazy startup:  {lazy_time:.3f}s, peak {lazy_peak / 1024:.0f} KiB, {len(registry.built)} agents built")
+
+    begin = time.perf_counter()
+    team[0].agent
+    print(f"first delegation to {SPECIALISTS[0]} builds it in {time.perf_counter() - begin:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Startup cost of resolving the agents' Composio actions, with and without the shared schema cache.
+
+StubToolSet stands in for ComposioToolSet: every get_action_schemas call sleeps for
+REMOTE_LATENCY_SECONDS, like a round trip to the Composio API.
+
+    python -m benchmarks.bench_composio_schema_cache
+"""
+
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from agno.tools.toolkit import Toolkit
+
+from workplace.composio_cache import ToolSchemaCache
+
+REMOTE_LATENCY_SECONDS = 0.2
+
+# The action lists of writer_agent, data_entry_agent, google_sheets_agent and google_docs_agent
+AGENT_ACTIONS = [
+    ["GOOGLEDOCS_CREATE_DOCUMENT", "GOOGLEDOCS_CREATE_DOCUMENT_MARKDOWN", "GOOGLEDOCS_UPDATE_DOCUMENT_MARKDOWN"],
+    ["GOOGLESHEETS_LOOKUP_SPREADSHEET_ROW"],
+    ["GOOGLESHEETS_BATCH_GET", "GOOGLESHEETS_GET_SPREADSHEET_INFO", "GOOGLESHEETS_CREATE_GOOGLE_SHEET1", "GOOGLESHEETS_CLEAR_VALUES"],
+    [
+        "GOOGLEDOCS_CREATE_DOCUMENT",
+        "GOOGLEDOCS_CREATE_DOCUMENT_MARKDOWN",
+        "GOOGLEDOCS_UPDATE_EXISTING_DOCUMENT",
+        "GOOGLEDOCS_GET_DOCUMENT_BY_ID",
+        "GOOGLEDOCS_UPDATE_DOCUMENT_MARKDOWN",
+    ],
+]
+
+
+class StubToolSet:
+    def __init__(self):
+        self.entity_id = "default"
+        self._requested_actions: List[str] = []
+        self.remote_calls = 0
+
+    def validate_tools(self, actions: Any = None) -> None:
+        pass
+
+    def get_action_schemas(self, actions: List[str], _populate_requested: bool = False) -> List[Dict[str, Any]]:
+        self.remote_calls += 1
+        time.sleep(REMOTE_LATENCY_SECONDS)
+        if _populate_requested:
+            self._requested_actions += list(actions)
+        return [
+            {"name": action, "description": f"Stub schema for {action}", "parameters": {"properties": {}}}
+            for action in actions
+        ]
+
+    def get_tools(self, actions: List[str]) -> List[Toolkit]:
+        return [self._wrap_tool(schema) for schema in self.get_action_schemas(actions, _populate_requested=True)]
+
+    def _wrap_tool(self, schema: Dict[str, Any], entity_id: Optional[str] = None, skip_default: bool = False) -> Toolkit:
+        return Toolkit(name=schema["name"])
+
+
+def timed(label: str, toolset: StubToolSet, get_tools) -> None:
+    start = time.perf_counter()
+    for actions in AGENT_ACTIONS:
+        get_tools(actions)
+    print(f"{label:<28} {time.perf_counter() - start:.3f}s, {toolset.remote_calls} remote calls")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "composio_schemas.json")
+
+        toolset = StubToolSet()
+        timed("toolset.get_tools per agent", toolset, lambda actions: toolset.get_tools(actions=actions))
+
+        toolset = StubToolSet()
+        cache = ToolSchemaCache(toolset, path=path)
+        timed("cache, first start", toolset, lambda actions: cache.get_tools(actions=actions))
+
+        toolset = StubToolSet()
+        cache = ToolSchemaCache(toolset, path=path)
+        timed("cache, repeat start", toolset, lambda actions: cache.get_tools(actions=actions))
+        print(f"repeat start: {cache.hits} hits, {cache.misses} misses")
+
+        toolset = StubToolSet()
+        cache = ToolSchemaCache(toolset, path=path, ttl=0)
+        timed("cache, expired (ttl=0)", toolset, lambda actions: cache.get_tools(actions=actions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Google API round trips for follow-up questions, with and without the read-through cache.
+
+Runs GmailTools against a fake Gmail service and the calendar service wrapper against a fake Calendar
+service, each request costing a fixed latency. A conversation asks about the same inbox and week
+several times, then a new email arrives / an event is added and the next answer must reflect it.
+
+    python -m benchmarks.bench_google_cache
+"""
+
+import base64
+import time
+from types import SimpleNamespace
+
+from agno.tools.gmail import GmailTools
+
+from workplace.google_cache import CachedCalendarService, ReadThroughCache
+from workplace.google_tools import CachedGmailTools
+
+REQUEST_LATENCY = 0.03
+# Time between two questions of the conversation
+THINK_TIME = 0.2
+
+
+class FakeRequest:
+    def __init__(self, api, result):
+        self.api = api
+        self.result = result
+
+    def execute(self):
+        time.sleep(REQUEST_LATENCY)
+        self.api.requests += 1
+        return self.result()
+
+
+class FakeGmailService:
+    """The slice of the Gmail API used by GmailTools, backed by an in-memory mailbox."""
+
+    def __init__(self, messages: int = 20):
+        self.requests = 0
+        self.history_id = 1
+        self.mailbox = []
+        for _ in range(messages):
+            self.receive("Status update", "Weekly numbers attached.")
+
+    def receive(self, subject, body):
+        self.mailbox.insert(0, {"id": f"m{len(self.mailbox)}", "subject": subject, "body": body})
+        self.history_id += 1
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def getProfile(self, userId):
+        return FakeRequest(self, lambda: {"historyId": str(self.history_id)})
+
+    def list(self, userId, maxResults=10, q=None):
+        return FakeRequest(self, lambda: {"messages": [{"id": m["id"]} for m in self.mailbox[:maxResults]]})
+
+    def get(self, userId, id, format="full"):
+        message = next(m for m in self.mailbox if m["id"] == id)
+        payload = {
+            "headers": [{"name": "Subject", "value": message["subject"]}, {"name": "From", "value": "a@b.c"}, {"name": "Date", "value": "today"}],
+            "body": {"data": base64.urlsafe_b64encode(message["body"].encode()).decode()},
+        }
+        return FakeRequest(self, lambda: {"id": id, "payload": payload})
+
+
+class FakeCalendarService:
+    def __init__(self):
+        self.requests = 0
+        self.events_list = [{"id": f"e{i}", "summary": f"Meeting {i}"} for i in range(10)]
+        self.changed = []
+
+    def events(self):
+        return self
+
+    def list(self, calendarId, syncToken=None, **kwargs):
+        def result():
+            if syncToken is None:
+                items = list(self.events_list)
+            else:
+                items, self.changed = self.changed, []
+            return {"items": items, "nextSyncToken": f"token-{len(self.events_list)}"}
+
+        return FakeRequest(self, result)
+
+    def insert(self, calendarId, body):
+        def result():
+            event = dict(body, id=f"e{len(self.events_list)}")
+            self.events_list.append(event)
+            self.changed.append(event)
+            return event
+
+        return FakeRequest(self, result)
+
+    def add_elsewhere(self, summary):
+        # A change made outside this process, e.g. in the Calendar web UI
+        event = {"id": f"e{len(self.events_list)}", "summary": summary}
+        self.events_list.append(event)
+        self.changed.append(event)
+
+
+def gmail_conversation(tools, service):
+    timings = []
+    for question in range(6):
+        time.sleep(THINK_TIME)
+        if question == 4:
+            service.receive("Urgent: contract", "Please sign today.")
+        start = time.perf_counter()
+        answer = tools.get_latest_emails(5)
+        timings.append(time.perf_counter() - start)
+        if question >= 4:
+            assert "Urgent: contract" in answer, "a new email must show up in the next answer"
+    return timings
+
+
+def main():
+    creds = SimpleNamespace(valid=True)
+
+    plain_service = FakeGmailService()
+    plain = GmailTools(creds=creds)
+    plain.service = plain_service
+    plain_timings = gmail_conversation(plain, plain_service)
+
+    # Probe at most once per answer, so every question sees the mailbox as it is when asked
+    cache = ReadThroughCache(check_interval=THINK_TIME / 2)
+    cached_service = FakeGmailService()
+    cached = CachedGmailTools(cache=cache, creds=creds)
+    cached.service = cached_service
+    cached_timings = gmail_conversation(cached, cached_service)
+
+    print("gmail, 6 x get_latest_emails(5), new email before question 5")
+    print(f"  GmailTools:        {plain_service.requests:3d} API requests, follow-up {plain_timings[1] * 1000:6.1f} ms")
+    print(f"  CachedGmailTools:  {cached_service.requests:3d} API requests, follow-up {cached_timings[1] * 1000:6.1f} ms (history ID check every answer)")
+
+    cache = ReadThroughCache(check_interval=30.0)
+    interval_service = FakeGmailService()
+    tools = CachedGmailTools(cache=cache, creds=creds)
+    tools.service = interval_service
+    tools.get_latest_emails(5)
+    before = interval_service.requests
+    start = time.perf_counter()
+    tools.get_latest_emails(5)
+    print(f"  within check_interval: {interval_service.requests - before} API requests, {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    calendar = FakeCalendarService()
+    calendar_cache = ReadThroughCache(check_interval=0.0)
+    service = CachedCalendarService(calendar, calendar_cache, probes={})
+    week = {"calendarId": "primary", "timeMin": "2024-01-01T00:00:00Z", "maxResults": 50, "singleEvents": True, "orderBy": "startTime"}
+    first = service.events().list(**week).execute()
+    service.events().list(**week).execute()
+    calendar.add_elsewhere("Board review")
+    after_change = service.events().list(**week).execute()
+    service.events().insert(calendarId="primary", body={"summary": "1:1"}).execute()
+    after_insert = service.events().list(**week).execute()
+    assert len(after_change["items"]) == len(first["items"]) + 1 and len(after_insert["items"]) == len(first["items"]) + 2
+    print(f"calendar: {calendar.requests} API requests for 4 listings, an external change and an insert; cache {calendar_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Per-turn storage cost of one long-running session, with and without the history window cache.
+
+Every turn does what an agent with add_history_to_messages=True does around a model call: a fresh
+agent copy loads the session from storage, appends one run and its messages, and writes it back.
+The last two runs write synchronously, so the turn includes the write, once with the full history
+stored and once with the stored history capped at STORED_RUNS runs.
+
+    python -m benchmarks.bench_history_window
+"""
+
+import os
+import tempfile
+import time
+from statistics import mean
+from uuid import uuid4
+
+from agno.agent import Agent
+from agno.memory.agent import AgentRun
+from agno.models.message import Message
+from agno.run.response import RunResponse
+
+from workplace.history import SessionHistoryCache
+from workplace.storage import PooledSqliteAgentStorage
+
+TURNS = 400
+STORED_RUNS = 100
+REPLY = "All done. " * 100
+
+
+def run_session(storage) -> list:
+    timings = []
+    for turn in range(TURNS):
+        start = time.perf_counter()
+        agent = Agent(name="bench-agent", session_id="long-session", storage=storage, num_history_responses=10)
+        agent.initialize_agent()
+        agent.read_from_storage()
+        user_message = Message(role="user", content=f"request {turn}")
+        reply = Message(role="assistant", content=REPLY)
+        agent.memory.add_messages([user_message, reply])
+        agent.memory.add_run(
+            AgentRun(message=user_message, response=RunResponse(run_id=str(uuid4()), content=REPLY, messages=[user_message, reply]))
+        )
+        agent.memory.get_messages_from_last_n_runs(last_n=agent.num_history_responses)
+        agent.write_to_storage()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list) -> None:
+    first, last = mean(timings[:50]) * 1000, mean(timings[-50:]) * 1000
+    print(f"{label:<24} first 50 turns {first:6.2f} ms/turn, last 50 turns {last:6.2f} ms/turn")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = PooledSqliteAgentStorage(table_name="bench", db_file=os.path.join(tmp, "plain.db"))
+        report("full history reload", run_session(plain))
+        plain.close()
+
+        history = SessionHistoryCache(num_runs=10)
+        windowed = PooledSqliteAgentStorage(table_name="bench", db_file=os.path.join(tmp, "windowed.db"), history_cache=history)
+        report("history window cache", run_session(windowed))
+        windowed.close()
+
+        stored = windowed.get_all_sessions()[0]
+        assert len(stored.memory["runs"]) == TURNS, "the full history must still be stored"
+        print(f"stored runs: {len(stored.memory['runs'])}, cache: {history.stats()}")
+
+        uncapped = PooledSqliteAgentStorage(
+            table_name="bench", db_file=os.path.join(tmp, "uncapped.db"), write_behind=False, history_cache=SessionHistoryCache(num_runs=10)
+        )
+        report("window, full history", run_session(uncapped))
+        capped = PooledSqliteAgentStorage(
+            table_name="bench",
+            db_file=os.path.join(tmp, "capped.db"),
+            write_behind=False,
+            history_cache=SessionHistoryCache(num_runs=10),
+            max_stored_runs=STORED_RUNS,
+            max_stored_messages=4 * STORED_RUNS,
+        )
+        report(f"window, {STORED_RUNS} runs stored", run_session(capped))
+        stored = capped.get_all_sessions()[0]
+        assert len(stored.memory["runs"]) == STORED_RUNS, "the stored history must be capped"
+        print(f"stored runs: {len(stored.memory['runs'])}, messages: {len(stored.memory['messages'])}")
+
+
+if __name__ == "__main__":
+    main()
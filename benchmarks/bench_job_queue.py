@@ -0,0 +1,96 @@
+"""Request handling time with the agent run inside the HTTP request vs. submitted to the job queue.
+
+A stub agent streams its answer over AGENT_SECONDS. Requests are sent through FastAPI's test client
+to an endpoint that runs the agent inline (like the Playground) and to POST /v1/jobs, whose jobs
+then run on the worker pool with their state in a temporary SQLite file.
+
+    python -m benchmarks.bench_job_queue
+"""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from agno.storage.workflow.sqlite import SqliteWorkflowStorage
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from workplace.jobs import COMPLETED, FINISHED, JobQueue, get_jobs_router
+
+REQUESTS = 16
+WORKERS = 4
+AGENT_SECONDS = 0.25
+CHUNKS = 5
+
+
+class StubChunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubAgent:
+    def __init__(self, session_id=None):
+        self.session_id = session_id or "session"
+        self.run_id = None
+
+    def deep_copy(self, update=None):
+        return StubAgent(**(update or {}))
+
+    def run(self, message, stream=False):
+        self.run_id = f"run-{message}"
+        for i in range(CHUNKS):
+            time.sleep(AGENT_SECONDS / CHUNKS)
+            yield StubChunk(f"{message}:{i} ")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = str(Path(tmp) / "jobs.db")
+        jobs = JobQueue({"master": StubAgent()}, SqliteWorkflowStorage(table_name="agent_jobs", db_file=db_file), workers=WORKERS)
+        app = FastAPI()
+        app.include_router(get_jobs_router(jobs))
+
+        @app.post("/v1/inline")
+        def inline(body: dict):
+            return {"content": "".join(chunk.content for chunk in StubAgent().run(body["message"], stream=True))}
+
+        client = TestClient(app)
+
+        start = time.perf_counter()
+        for i in range(REQUESTS):
+            client.post("/v1/inline", json={"message": f"q{i}"})
+        inline_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        job_ids = [client.post("/v1/jobs", json={"message": f"q{i}"}).json()["job_id"] for i in range(REQUESTS)]
+        submit_seconds = time.perf_counter() - start
+        streamed = [json.loads(line) for line in client.get(f"/v1/jobs/{job_ids[-1]}/stream").iter_lines() if line]
+        while any(jobs.get(job_id).status not in FINISHED for job_id in job_ids):
+            time.sleep(0.01)
+        done_seconds = time.perf_counter() - start
+
+        assert all(jobs.get(job_id).status == COMPLETED for job_id in job_ids)
+        assert "".join(event.get("content", "") for event in streamed) == jobs.get(job_ids[-1]).content
+        assert streamed[-1]["status"] == COMPLETED
+
+        cancelled = client.post("/v1/jobs", json={"message": "long"}).json()["job_id"]
+        client.post(f"/v1/jobs/{cancelled}/cancel")
+        while jobs.get(cancelled).status not in FINISHED:
+            time.sleep(0.01)
+        jobs.close()
+
+        # A new queue on the same file sees every job and its result
+        reopened = JobQueue({"master": StubAgent()}, SqliteWorkflowStorage(table_name="agent_jobs", db_file=db_file), workers=1)
+        assert reopened.get(job_ids[0]).content == jobs.get(job_ids[0]).content
+        assert reopened.get(cancelled).status == "cancelled"
+        reopened.close()
+
+        print(f"{REQUESTS} requests, agent takes {AGENT_SECONDS * 1000:.0f} ms, {WORKERS} workers")
+        print(f"  agent run inside the request: {inline_seconds / REQUESTS * 1000:7.1f} ms per request, {inline_seconds:.2f}s for all")
+        print(f"  POST /v1/jobs:                {submit_seconds / REQUESTS * 1000:7.1f} ms per request, all done after {done_seconds:.2f}s")
+        print(f"  streamed {len(streamed) - 1} chunks of the last job, then {streamed[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""End-to-end benchmark of the final_prototype agent tree without any credentials or network access.
+
+The agents are built by final_prototype's own factories, with FakeModel in place of Gemini and fake
+Slack, Zoom, Gmail, Calendar and Composio toolkits (see benchmarks/fakes.py); routing, delegation,
+parallel delegation, the session store, history windows and the availability index are the real
+ones. Each corpus request carries the tool calls a model would make for it, and the fake models
+replay them with a fixed latency and token count. The corpus is replayed by CONCURRENCY clients,
+each continuing its own sessions, and every request is traced: latency, delegation depth, model
+and tool calls, storage reads/writes and tokens come from its spans.
+
+Results are written as JSON. With --baseline, they are compared with an earlier run and the exit
+status is 1 if any metric got worse by more than the tolerance (counts) or latency tolerance (times).
+
+    python -m benchmarks.bench_offline
+    python -m benchmarks.bench_offline --output tmp/bench_offline.json --baseline tmp/bench_offline_main.json
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fakes import (
+    FakeCalendarTools,
+    FakeComposioToolSet,
+    FakeModel,
+    fake_gmail_tools,
+    fake_slack_tools,
+    fake_zoom_tools,
+    use_plan,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Each request with the steps every agent's model takes for it (see benchmarks/fakes.py). The master's
+# steps only run when the fast-path router does not send the request straight to a member.
+CORPUS: List[Dict[str, Any]] = [
+    {
+        "name": "slack-post",
+        "message": "Post a message in the #project Slack channel saying the release is out",
+        "plan": {"master-agent": ["slack-agent"], "slack-agent": ["send_message"]},
+    },
+    {
+        "name": "send-email",
+        "message": "Send an email to john@example.com about the project update",
+        "plan": {"master-agent": ["gmail-agent"], "gmail-agent": ["email-writer", "send_email"], "email-writer": []},
+    },
+    {
+        "name": "reply-email",
+        "message": "Draft a reply to the latest email from sarah@example.com",
+        "plan": {"master-agent": ["gmail-agent"], "gmail-agent": ["get_emails_from_user", "email-writer", "create_draft_email"]},
+    },
+    {
+        "name": "unread-summary",
+        "message": "Summarize my unread emails",
+        "plan": {"master-agent": ["gmail-agent"], "gmail-agent": ["get_unread_emails"]},
+    },
+    {
+        "name": "schedule-meeting",
+        "message": "Schedule a team meeting for tomorrow at 3pm",
+        "plan": {
+            "master-agent": ["meeting-scheduler"],
+            "meeting-scheduler": [{"tool": "find_common_slots", "args": {"attendees": "me"}}, "schedule_meeting"],
+        },
+    },
+    {
+        "name": "calendar-today",
+        "message": "What is on my calendar today?",
+        "plan": {"master-agent": ["google-calendar-agent"], "google-calendar-agent": ["list_events"]},
+    },
+    {
+        "name": "calendar-free-slot",
+        "message": "Find a free 30 minute slot with alice@example.com next week and put it on my calendar",
+        "plan": {
+            "master-agent": ["google-calendar-agent"],
+            "google-calendar-agent": [{"tool": "find_common_slots", "args": {"attendees": "me, alice@example.com"}}, "create_event"],
+        },
+    },
+    {
+        "name": "create-doc",
+        "message": "Create a document summarizing our quarterly results",
+        "plan": {"master-agent": ["google-docs-agent"], "google-docs-agent": ["writer-agent", "GOOGLEDOCS_CREATE_DOCUMENT_MARKDOWN"]},
+    },
+    {
+        "name": "create-sheet",
+        "message": "Make a spreadsheet to track project expenses",
+        "plan": {
+            "master-agent": ["google-sheets-agent"],
+            "google-sheets-agent": ["GOOGLESHEETS_CREATE_GOOGLE_SHEET1", "data-entry-agent"],
+            "data-entry-agent": [{"tool": "append_rows", "args": {"rows": '[["Date", "Item", "Amount"]]'}}, "flush_rows"],
+        },
+    },
+    {
+        "name": "blog-post",
+        "message": "Write a blog post about our new product launch",
+        "plan": {"master-agent": ["writer-agent"]},
+    },
+    {
+        "name": "multi-service",
+        "message": "Email john@example.com the meeting notes, post them in #project on Slack and book a Zoom call for Friday",
+        "plan": {
+            "master-agent": [{"parallel": ["gmail_agent", "slack_agent", "zoom_agent"]}],
+            "gmail-agent": ["email-writer", "send_email"],
+            "slack-agent": ["send_message"],
+            "meeting-scheduler": ["schedule_meeting"],
+        },
+    },
+]
+
+# Metrics compared with --baseline, and whether a higher value is worse
+COMPARED_METRICS = {
+    "throughput_rps": False,
+    "latency_p50_ms": True,
+    "latency_p99_ms": True,
+    "errors": True,
+    "model_calls_per_request": True,
+    "tool_calls_per_request": True,
+    "agent_runs_per_request": True,
+    "max_delegation_depth": True,
+    "storage_reads_per_request": True,
+    "storage_writes_per_request": True,
+    "input_tokens_per_request": True,
+    "output_tokens_per_request": True,
+}
+TIMING_METRICS = {"throughput_rps", "latency_p50_ms", "latency_p99_ms"}
+
+
+class SpanCollector:
+    """Span exporter that keeps finished spans in memory, grouped by trace."""
+
+    def __init__(self):
+        self.traces: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def export(self, span: Any) -> None:
+        with self._lock:
+            self.traces.setdefault(span.trace_id, []).append(span.to_dict())
+
+    def pop(self, trace_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self.traces.pop(trace_id, [])
+
+    def clear(self) -> None:
+        with self._lock:
+            self.traces.clear()
+
+
+def percentile(values: List[float], percentile: float) -> float:
+    # Nearest-rank, like Tracer.summary()
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percentile / 100 * len(ordered)) - 1, 0)] if ordered else 0.0
+
+
+def request_metrics(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Counts for one request from the spans of its trace."""
+    by_id = {span["span_id"]: span for span in spans}
+
+    def agent_ancestors(span: Dict[str, Any]) -> int:
+        count, parent = 0, by_id.get(span["parent_id"])
+        while parent is not None:
+            count += parent["kind"] == "agent"
+            parent = by_id.get(parent["parent_id"])
+        return count
+
+    agents = [span for span in spans if span["kind"] == "agent"]
+    models = [span for span in spans if span["kind"] == "model"]
+    return {
+        "agent_runs": len(agents),
+        "delegation_depth": max((agent_ancestors(span) for span in agents), default=0),
+        "model_calls": len(models),
+        "tool_calls": sum(span["kind"] == "tool" for span in spans),
+        "storage_reads": sum(span["kind"] == "storage" and span["name"] == "read" for span in spans),
+        "storage_writes": sum(span["kind"] == "storage" and span["name"] == "write" for span in spans),
+        "input_tokens": sum(span["attributes"].get("input_tokens", 0) for span in models),
+        "output_tokens": sum(span["attributes"].get("output_tokens", 0) for span in models),
+    }
+
+
+def load_prototype(args: argparse.Namespace):
+    """Import final_prototype in a scratch directory and swap in the fake model and toolkits."""
+    # Before the import: no trace file, and the response cache only if asked for
+    os.environ["TRACE_FILE"] = ""
+    os.environ.setdefault("RESPONSE_CACHE", "0")
+    os.environ.pop("OTEL_EXPORTER_OTLP_ENDPOINT", None)
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    # Its SQLite files, schema cache and job table go to tmp/ under the working directory
+    os.chdir(tempfile.mkdtemp(prefix="bench_offline_"))
+    import final_prototype as prototype
+
+    fake_model = FakeModel(latency=args.model_latency, output_tokens=args.output_tokens)
+    slack, zoom, gmail = fake_slack_tools(args.tool_latency), fake_zoom_tools(args.tool_latency), fake_gmail_tools(args.tool_latency)
+    calendar, composio = FakeCalendarTools(args.tool_latency), FakeComposioToolSet(args.tool_latency)
+    # The factories look these module globals up when the agents are built
+    prototype.model = fake_model
+    prototype.get_slack_tools = lambda: slack
+    prototype.get_zoom_tools = lambda: zoom
+    prototype.get_gmail_tools = lambda: gmail
+    prototype.get_google_calendar_tools = lambda: calendar
+    prototype.get_composio_toolset = lambda: composio
+    prototype.registry.build_all()
+    for key in prototype.registry.keys:
+        agent = prototype.registry.get(key)
+        agent.model = fake_model.for_agent(agent.name)
+    prototype.master_agent.model = fake_model.for_agent(prototype.master_agent.name)
+    return prototype, fake_model
+
+
+def run_client(prototype: Any, tracer: Any, client: int, requests: List[Dict[str, Any]], turns: int, stream: bool, results: List[Dict[str, Any]]) -> None:
+    for n, entry in enumerate(requests):
+        session_id = f"bench-{client}-{n // turns}"
+        error: Optional[str] = None
+        with use_plan(entry["plan"]), tracer.span("request", entry["name"], client=client) as span:
+            try:
+                # A copy per request, like the Playground
+                agent = prototype.master_agent.deep_copy(update={"session_id": session_id})
+                if stream:
+                    for _ in agent.run(entry["message"], stream=True):
+                        pass
+                else:
+                    agent.run(entry["message"])
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        results.append({"name": entry["name"], "trace_id": span.trace_id, "seconds": span.duration, "error": error})
+
+
+def replay(prototype: Any, tracer: Any, corpus: List[Dict[str, Any]], count: int, concurrency: int, turns: int, stream: bool) -> Dict[str, Any]:
+    requests = [corpus[i % len(corpus)] for i in range(count)]
+    results: List[Dict[str, Any]] = []
+    threads = [
+        threading.Thread(target=run_client, args=(prototype, tracer, client, requests[client::concurrency], turns, stream, results))
+        for client in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"wall_seconds": time.perf_counter() - start, "results": results}
+
+
+def summarize(run: Dict[str, Any], collector: SpanCollector) -> Dict[str, Any]:
+    rows = []
+    for result in run["results"]:
+        rows.append({**result, **request_metrics(collector.pop(result["trace_id"]))})
+    count = len(rows)
+
+    def mean(key: str, of: List[Dict[str, Any]]) -> float:
+        return round(sum(row[key] for row in of) / len(of), 3) if of else 0.0
+
+    latencies = [row["seconds"] * 1000 for row in rows]
+    summary = {
+        "requests": count,
+        "errors": sum(row["error"] is not None for row in rows),
+        "wall_seconds": round(run["wall_seconds"], 3),
+        "throughput_rps": round(count / run["wall_seconds"], 3),
+        "latency_p50_ms": round(percentile(latencies, 50), 3),
+        "latency_p90_ms": round(percentile(latencies, 90), 3),
+        "latency_p99_ms": round(percentile(latencies, 99), 3),
+        "latency_max_ms": round(max(latencies, default=0.0), 3),
+        "max_delegation_depth": max((row["delegation_depth"] for row in rows), default=0),
+        "mean_delegation_depth": mean("delegation_depth", rows),
+        "agent_runs_per_request": mean("agent_runs", rows),
+        "model_calls_per_request": mean("model_calls", rows),
+        "tool_calls_per_request": mean("tool_calls", rows),
+        "storage_reads_per_request": mean("storage_reads", rows),
+        "storage_writes_per_request": mean("storage_writes", rows),
+        "input_tokens_per_request": mean("input_tokens", rows),
+        "output_tokens_per_request": mean("output_tokens", rows),
+    }
+    per_request: Dict[str, Dict[str, Any]] = {}
+    for name in dict.fromkeys(row["name"] for row in rows):
+        of = [row for row in rows if row["name"] == name]
+        per_request[name] = {
+            "count": len(of),
+            "errors": sorted({row["error"] for row in of if row["error"] is not None}),
+            "latency_p50_ms": round(percentile([row["seconds"] * 1000 for row in of], 50), 3),
+            "delegation_depth": max(row["delegation_depth"] for row in of),
+            **{key: mean(key, of) for key in ("agent_runs", "model_calls", "tool_calls", "storage_reads", "storage_writes", "input_tokens", "output_tokens")},
+        }
+    return {"summary": summary, "requests": per_request}
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, latency_tolerance: float) -> List[str]:
+    """Metrics of `report` that are worse than in `baseline` by more than the tolerance, as messages."""
+    regressions = []
+    for key, higher_is_worse in COMPARED_METRICS.items():
+        if key not in baseline.get("summary", {}):
+            continue
+        old, new = baseline["summary"][key], report["summary"][key]
+        allowed = latency_tolerance if key in TIMING_METRICS else tolerance
+        change = (new - old) if higher_is_worse else (old - new)
+        if change > abs(old) * allowed:
+            regressions.append(f"{key}: {old} -> {new}")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--requests", type=int, default=110, help="requests to replay, cycling through the corpus")
+    parser.add_argument("--concurrency", type=int, default=4, help="clients sending requests at the same time")
+    parser.add_argument("--turns", type=int, default=5, help="requests per session before a client starts a new one")
+    parser.add_argument("--stream", action="store_true", help="run the requests with stream=True, like the Playground")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="seconds per fake model call")
+    parser.add_argument("--output-tokens", type=int, default=150, help="output tokens of a fake final answer")
+    parser.add_argument("--tool-latency", type=float, default=0.02, help="seconds per fake tool call")
+    parser.add_argument("--corpus", help="JSON file with a list of {name, message, plan} requests instead of the built-in corpus")
+    parser.add_argument("--output", default="tmp/bench_offline.json", help="where to write the results")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="allowed relative increase of counts and tokens")
+    parser.add_argument("--latency-tolerance", type=float, default=0.25, help="allowed relative change of latency and throughput")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    # Paths are relative to where the benchmark was started, not the scratch directory
+    output, baseline_path = Path(args.output).resolve(), Path(args.baseline).resolve() if args.baseline else None
+    corpus = json.loads(Path(args.corpus).read_text(encoding="utf-8")) if args.corpus else CORPUS
+
+    prototype, _ = load_prototype(args)
+    from workplace.tracing import Tracer, instrument, uninstrument
+
+    collector = SpanCollector()
+    uninstrument()
+    tracer = instrument(Tracer(exporters=[collector]), model_classes=[FakeModel])
+
+    # One pass to warm up imports and caches, not counted
+    replay(prototype, tracer, corpus, len(corpus), 1, len(corpus), args.stream)
+    collector.clear()
+    run = replay(prototype, tracer, corpus, args.requests, args.concurrency, args.turns, args.stream)
+    report = {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "turns": args.turns,
+            "stream": args.stream,
+            "model_latency": args.model_latency,
+            "output_tokens": args.output_tokens,
+            "tool_latency": args.tool_latency,
+            "corpus": args.corpus or "built-in",
+            "fast_path_router": prototype.master_agent.router is not None,
+            "response_cache": prototype.response_cache is not None,
+        },
+        **summarize(run, collector),
+    }
+    storage_buffer = getattr(prototype.agent_storage, "buffer", None)
+    if storage_buffer is not None:
+        prototype.agent_storage.flush()
+        # Physical writes of the write-behind buffer, over the warm-up and the run
+        report["summary"]["sqlite_batches_written"] = storage_buffer.batches_written
+        report["summary"]["sqlite_sessions_written"] = storage_buffer.sessions_written
+    prototype.job_queue.close()
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    summary = report["summary"]
+    print(f"{summary['requests']} requests ({len(corpus)} kinds), {args.concurrency} clients, model {args.model_latency * 1000:.0f} ms, tools {args.tool_latency * 1000:.0f} ms")
+    print(f"  throughput {summary['throughput_rps']:.1f} req/s, latency p50 {summary['latency_p50_ms']:.0f} ms, p99 {summary['latency_p99_ms']:.0f} ms, {summary['errors']} errors")
+    print(
+        f"  per request: {summary['model_calls_per_request']} model calls, {summary['tool_calls_per_request']} tool calls, "
+        f"{summary['agent_runs_per_request']} agent runs (max depth {summary['max_delegation_depth']}), "
+        f"{summary['storage_reads_per_request']} storage reads, {summary['storage_writes_per_request']} writes, "
+        f"{summary['input_tokens_per_request']:.0f} input tokens"
+    )
+    for name, row in report["requests"].items():
+        print(f"  {name:<20} {row['latency_p50_ms']:7.0f} ms  {row['model_calls']:4.1f} model  {row['tool_calls']:4.1f} tool  depth {row['delegation_depth']}")
+    print(f"Results written to {output}")
+
+    if baseline_path is None:
+        return 0
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("config") != report["config"]:
+        print(f"Note: the baseline was run with a different configuration: {baseline.get('config')}")
+    regressions = compare(report, baseline, args.tolerance, args.latency_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions against {baseline_path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Compare sequential and parallel delegation with stubbed sub-agents.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parallel_delegation
+"""
+
+import time
+
+from agno.run.response import RunResponse
+
+from workplace.delegation import ParallelDelegationTools
+
+# Simulated round trip of each sub-agent (model call + tool call), in seconds
+LATENCIES = {
+    "slack_agent": 0.30,
+    "gmail_agent": 0.50,
+    "zoom_agent": 0.40,
+    "google_calendar_agent": 0.20,
+}
+
+
+class StubAgent:
+    def __init__(self, name: str, latency: float):
+        self.name = name
+        self.latency = latency
+
+    def run(self, message: str, stream: bool = False) -> RunResponse:
+        time.sleep(self.latency)
+        return RunResponse(content=f"{self.name} done")
+
+
+def main():
+    agents = {name: StubAgent(name, latency) for name, latency in LATENCIES.items()}
+    tools = ParallelDelegationTools(agents=agents)
+    tasks = [{"agent": name, "task_description": "do it", "expected_output": "done"} for name in agents]
+
+    start = time.perf_counter()
+    sequential = [agents[task["agent"]].run(task["task_description"]).content for task in tasks]
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = [result["content"] for result in tools.delegate(tasks)]
+    parallel_time = time.perf_counter() - start
+
+    assert sequential == parallel, "results must come back in task order"
+    print(f"tasks:                 {len(tasks)}")
+    print(f"sum of branches:       {sum(LATENCIES.values()):.2f}s")
+    print(f"slowest branch:        {max(LATENCIES.values()):.2f}s")
+    print(f"sequential delegation: {sequential_time:.2f}s")
+    print(f"parallel delegation:   {parallel_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
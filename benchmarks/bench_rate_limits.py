@@ -0,0 +1,244 @@
+"""Agents calling a throttling Gemini and Google API, with per-agent retries only and with the shared RetryScheduler.
+
+A local server stands in for both upstreams: Gemini's generateContent and a Google API, each with
+its own quota (a token bucket of --gemini-quota and --google-quota requests per second). Requests
+over quota get a 429 (RESOURCE_EXHAUSTED), and the Google API answers 503 to everything during an
+outage window. Worker threads play agents: each step is one CachedPrefixGemini call (google-genai
+pointed at the server) and one Google API call through HttpTransport, and a step that fails is
+retried like agno's Agent(retries=3) does, after one second. Interactive threads stand for Playground
+requests, background threads for jobs.
+
+"before" is the model and transport as they were, so every agent retries on its own. "scheduler"
+routes both through one RetryScheduler, configured with rates above the real quotas (--configured-rate),
+so it has to adapt to the 429s. Reported: steps that failed after all retries, step latency per
+priority, requests the upstreams received and rejected, and the scheduler's peak queue depth,
+throttle events and circuit breaker openings.
+
+    python -m benchmarks.bench_rate_limits
+    python -m benchmarks.bench_rate_limits --interactive 24 --background 8 --steps 10
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google import genai
+from google.genai.types import HttpOptions
+
+from agno.models.message import Message
+from agno.utils.log import logger
+
+from benchmarks.bench_offline import percentile
+from workplace.gemini import CachedPrefixGemini
+from workplace.ratelimit import BACKGROUND, INTERACTIVE, RateLimit, RetryScheduler, priority
+from workplace.transport import HttpTransport
+
+GEMINI_RESPONSE = {
+    "candidates": [{"content": {"role": "model", "parts": [{"text": "Done."}]}, "finishReason": "STOP"}],
+    "usageMetadata": {"promptTokenCount": 12, "candidatesTokenCount": 2, "totalTokenCount": 14},
+}
+ERRORS = {
+    429: {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).", "status": "RESOURCE_EXHAUSTED"}},
+    503: {"error": {"code": 503, "message": "The service is currently unavailable.", "status": "UNAVAILABLE"}},
+}
+
+
+class FakeUpstream(ThreadingHTTPServer):
+    """Gemini and a Google API with a token-bucket quota each; 429 over quota, 503 during an outage."""
+
+    daemon_threads = True
+
+    def __init__(self, quotas: Dict[str, float], outages: Dict[str, Tuple[float, float]], latency: float):
+        super().__init__(("127.0.0.1", 0), FakeUpstreamHandler)
+        self.quotas = quotas
+        self.outages = outages
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.reset()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset(self) -> None:
+        with self.lock:
+            self.started = time.monotonic()
+            # A quota allows a burst of one second's worth of requests
+            self.buckets = {api: [quota, self.started] for api, quota in self.quotas.items()}
+            self.counts = {api: {"requests": 0, "ok": 0, "429": 0, "503": 0} for api in self.quotas}
+
+    def admit(self, api: str) -> int:
+        with self.lock:
+            now = time.monotonic()
+            counts = self.counts[api]
+            counts["requests"] += 1
+            start, end = self.outages.get(api, (0.0, 0.0))
+            if start <= now - self.started < end:
+                counts["503"] += 1
+                return 503
+            bucket = self.buckets[api]
+            bucket[0] = min(bucket[0] + (now - bucket[1]) * self.quotas[api], self.quotas[api])
+            bucket[1] = now
+            if bucket[0] < 1:
+                counts["429"] += 1
+                return 429
+            bucket[0] -= 1
+            counts["ok"] += 1
+            return 200
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._answer()
+
+    def do_POST(self):
+        self._answer()
+
+    def _answer(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        api = "gemini" if ":generateContent" in self.path else "google"
+        status = self.server.admit(api)
+        if status == 200:
+            time.sleep(self.server.latency)
+            body = GEMINI_RESPONSE if api == "gemini" else {"kind": "calendar#events", "items": []}
+        else:
+            body = ERRORS[status]
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def with_agent_retries(step: Callable[[], None], retries: int = 3, delay: float = 1.0) -> bool:
+    """Run `step` like Agent.run with `retries`: again after `delay` seconds whenever it raises."""
+    for attempt in range(retries + 1):
+        try:
+            step()
+            return True
+        except Exception:
+            if attempt < retries:
+                time.sleep(delay)
+    return False
+
+
+def run(upstream: FakeUpstream, scheduler: Optional[RetryScheduler], args: argparse.Namespace) -> Dict[str, Any]:
+    upstream.reset()
+    model = CachedPrefixGemini(id="gemini-2.0-flash", scheduler=scheduler)
+    model.client = genai.Client(api_key="bench", http_options=HttpOptions(base_url=upstream.url, api_version="v1beta"))
+    transport = HttpTransport(scheduler=scheduler)
+    messages = [Message(role="user", content="Summarize my calendar for today")]
+
+    def step() -> None:
+        model.invoke(messages)
+        response = transport.request("GET", f"{upstream.url}/calendar/v3/calendars/primary/events")
+        if response.status_code != 200:
+            raise RuntimeError(f"Google API answered {response.status_code}")
+
+    results: Dict[int, List[Tuple[bool, float]]] = {INTERACTIVE: [], BACKGROUND: []}
+    barrier = threading.Barrier(args.interactive + args.background)
+
+    def agent(level: int) -> None:
+        barrier.wait()
+        with priority(level):
+            for _ in range(args.steps):
+                start = time.perf_counter()
+                ok = with_agent_retries(step)
+                results[level].append((ok, time.perf_counter() - start))
+
+    peak_queue = 0
+    done = threading.Event()
+
+    def sample() -> None:
+        nonlocal peak_queue
+        while not done.wait(0.02):
+            peak_queue = max(peak_queue, scheduler.stats()["queue_depth"])
+
+    threads = [threading.Thread(target=agent, args=(INTERACTIVE,)) for _ in range(args.interactive)]
+    threads += [threading.Thread(target=agent, args=(BACKGROUND,)) for _ in range(args.background)]
+    if scheduler is not None:
+        threading.Thread(target=sample, daemon=True).start()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    done.set()
+    transport.close()
+
+    def latency(level: int, p: float) -> float:
+        return percentile([seconds for _, seconds in results[level]], p)
+
+    return {
+        "seconds": seconds,
+        "failed": {level: sum(not ok for ok, _ in steps) for level, steps in results.items()},
+        "steps": {level: len(steps) for level, steps in results.items()},
+        "p50": {level: latency(level, 50) for level in results},
+        "p99": {level: latency(level, 99) for level in results},
+        "upstream": upstream.counts,
+        "scheduler": scheduler.stats() if scheduler is not None else None,
+        "peak_queue": peak_queue,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--interactive", type=int, default=12, help="threads making interactive calls")
+    parser.add_argument("--background", type=int, default=4, help="threads making background (job) calls")
+    parser.add_argument("--steps", type=int, default=8, help="steps (one Gemini and one Google API call) per thread")
+    parser.add_argument("--gemini-quota", type=float, default=8.0, help="Gemini requests per second the fake upstream accepts")
+    parser.add_argument("--google-quota", type=float, default=15.0, help="Google API requests per second the fake upstream accepts")
+    parser.add_argument("--configured-rate", type=float, default=20.0, help="rate limit the scheduler starts from, per upstream")
+    parser.add_argument("--outage", type=float, nargs=2, default=[2.0, 4.0], metavar=("START", "END"), help="seconds into the run during which the Google API answers 503")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the upstream takes per accepted request")
+    parser.add_argument("--reset-timeout", type=float, default=1.0, help="seconds an open circuit stays open")
+    args = parser.parse_args()
+    # The failed attempts are the point here; agno logs each of them as an error
+    logger.setLevel(logging.CRITICAL)
+
+    upstream = FakeUpstream({"gemini": args.gemini_quota, "google": args.google_quota}, {"google": tuple(args.outage)}, args.latency)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    before = run(upstream, None, args)
+    limit = RateLimit(rate=args.configured_rate, reset_timeout=args.reset_timeout)
+    scheduler = RetryScheduler({"gemini": limit, "google": limit}, hosts={"127.0.0.1": "google"})
+    after = run(upstream, scheduler, args)
+    upstream.shutdown()
+
+    print(
+        f"{args.interactive} interactive + {args.background} background threads x {args.steps} steps; quotas: Gemini {args.gemini_quota:.0f}/s, "
+        f"Google API {args.google_quota:.0f}/s (503 from {args.outage[0]:.0f}s to {args.outage[1]:.0f}s); scheduler starts at {args.configured_rate:.0f}/s"
+    )
+    for label, result in (("before", before), ("scheduler", after)):
+        counts = result["upstream"]
+        print(
+            f"  {label:<10} {result['seconds']:5.1f}s, failed steps: {result['failed'][INTERACTIVE]}/{result['steps'][INTERACTIVE]} interactive, "
+            f"{result['failed'][BACKGROUND]}/{result['steps'][BACKGROUND]} background; step p50/p99 interactive "
+            f"{result['p50'][INTERACTIVE]:.2f}/{result['p99'][INTERACTIVE]:.2f}s, background {result['p50'][BACKGROUND]:.2f}/{result['p99'][BACKGROUND]:.2f}s"
+        )
+        print(
+            "  " + " " * 10 + " upstream: "
+            + ", ".join(f"{api} {c['requests']} requests ({c['429']} x 429, {c['503']} x 503)" for api, c in counts.items())
+        )
+    stats = after["scheduler"]
+    for name, state in stats["upstreams"].items():
+        print(
+            f"  scheduler {name}: rate now {state['rate']}/s, {state['throttled']} throttle events, {state['unavailable']} unavailable, "
+            f"{state['retries']} retries, {state['circuit_opens']} circuit openings, {state['rejected']} calls failed fast, "
+            f"{state['timeouts']} queue timeouts"
+        )
+    print(f"  scheduler peak queue depth: {after['peak_queue']}")
+
+
+if __name__ == "__main__":
+    main()
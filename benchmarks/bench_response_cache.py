@@ -0,0 +1,97 @@
+"""Model calls and tokens for a stream of recurring writing requests, with and without the response cache.
+
+The writer's model call is simulated (fixed latency and token count). Requests are drawn from a few
+recurring tasks, each phrased several ways, mixed with one-off requests that differ from a recurring
+task in one detail (another team, another period), which must never be served from the cache.
+
+    python -m benchmarks.bench_response_cache
+"""
+
+import random
+import time
+from typing import Any
+
+from agno.agent import Agent
+from agno.run.response import RunResponse
+
+from workplace.response_cache import CachedResponseAgent, ResponseCache
+
+REQUESTS = 300
+MODEL_LATENCY = 0.02
+TOKENS_PER_CALL = 1800
+
+RECURRING = {
+    "weekly-status": [
+        "Draft the weekly status email for the team",
+        "Can you draft the weekly status email for the team?",
+        "please draft the weekly status e-mail for the team.",
+    ],
+    "calendar-summary": [
+        "Summarize today's calendar",
+        "summarize today's calendar please",
+        "Could you summarize today's calendar?",
+    ],
+    "standup-notes": [
+        "Write the standup notes template for the project",
+        "write the stand-up notes template for the project",
+        "Write the standup notes template for the project, thanks",
+    ],
+}
+ONE_OFF = {
+    "weekly-status-sales": "Draft the weekly status email for the Sales team",
+    "monthly-status": "Draft the monthly status email for the team",
+    "calendar-summary-tomorrow": "Summarize tomorrow's calendar",
+    "standup-notes-q3": "Write the standup notes template for the Q3 project",
+}
+INTENTS = {prompt: intent for intent, prompts in RECURRING.items() for prompt in prompts}
+INTENTS.update({prompt: intent for intent, prompt in ONE_OFF.items()})
+
+
+class SimulatedModelRun(Agent):
+    def run(self, message: Any = None, *, stream: bool = False, **kwargs: Any):
+        time.sleep(MODEL_LATENCY)
+        self.model_calls = getattr(self, "model_calls", 0) + 1
+        self.run_response = RunResponse(content=f"[{INTENTS[message]}] generated text", metrics={"total_tokens": [TOKENS_PER_CALL]})
+        return self.run_response
+
+
+class SimulatedWriter(CachedResponseAgent, SimulatedModelRun):
+    pass
+
+
+def workload():
+    rng = random.Random(3)
+    recurring = [prompt for prompts in RECURRING.values() for prompt in prompts]
+    return [rng.choice(recurring) if rng.random() < 0.85 else rng.choice(list(ONE_OFF.values())) for _ in range(REQUESTS)]
+
+
+def run(agent, requests):
+    start = time.perf_counter()
+    for prompt in requests:
+        content = agent.run(prompt).content
+        assert content.startswith(f"[{INTENTS[prompt]}]"), f"{prompt!r} was answered with {content!r}"
+    return time.perf_counter() - start
+
+
+def main():
+    requests = workload()
+
+    plain = SimulatedWriter(name="writer-agent")
+    plain_seconds = run(plain, requests)
+
+    cache = ResponseCache(threshold=0.9)
+    cached = SimulatedWriter(name="writer-agent", response_cache=cache, response_cache_ttl=3600)
+    cached_seconds = run(cached, requests)
+
+    stats = cache.stats()
+    print(f"{REQUESTS} requests, {len(RECURRING)} recurring tasks x 3 phrasings, 15% near-miss one-offs")
+    print(f"  no cache:       {plain.model_calls:4d} model calls, {plain.model_calls * TOKENS_PER_CALL:7d} tokens, {plain_seconds:.2f}s")
+    print(f"  response cache: {cached.model_calls:4d} model calls, {cached.model_calls * TOKENS_PER_CALL:7d} tokens, {cached_seconds:.2f}s")
+    print(
+        f"  hit rate {stats['hit_rate']:.0%} ({stats['exact_hits']} exact, {stats['semantic_hits']} semantic), "
+        f"{stats['saved_tokens']} tokens saved, no wrong answers"
+    )
+
+
+if __name__ == "__main__":
+    main()
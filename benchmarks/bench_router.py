@@ -0,0 +1,96 @@
+"""Per-request latency with and without the fast-path router in front of the master agent.
+
+The master's model is simulated: without the router every request costs one model call to pick a
+member, the member's run, and one more model call to write the answer, as agno's transfer flow does.
+
+    python -m benchmarks.bench_router
+"""
+
+import time
+from statistics import mean
+
+from agno.run.response import RunResponse
+
+from workplace.router import KeywordRouter, RoutedAgent
+
+# Simulated Gemini round trip of the master, and of a member's full run (model + tool call), in seconds
+MODEL_LATENCY = 0.08
+MEMBER_LATENCY = 0.12
+
+RULES = {
+    "slack-agent": [r"\bslack\b", r"(^|\s)#[\w-]+"],
+    "gmail-agent": [r"\b(e-?mails?|gmail|inbox)\b"],
+    "meeting-scheduler": [r"\bzoom\b"],
+    "google-calendar-agent": [r"\bcalendar\b", r"\b(events?|appointments?)\b"],
+    "google-docs-agent": [r"\bdoc(ument)?s?\b"],
+    "google-sheets-agent": [r"\b(spread)?sheets?\b"],
+}
+
+REQUESTS = [
+    "Schedule a team meeting for tomorrow at 3pm",
+    "Send an email to john@example.com about the project update",
+    "Create a document summarizing our quarterly results",
+    "Make a spreadsheet to track project expenses",
+    "Post a message in the #project Slack channel",
+    "Set up a Zoom call with the design team on Friday",
+    "What events do I have on my calendar next week?",
+    "Read my inbox and list anything urgent",
+    "Email the spreadsheet link to the finance team",
+    "Post the notes from the previous meeting in #general",
+    "Write a blog post about our launch and then share it on Slack",
+    "Add a row for March to the expenses sheet",
+]
+
+
+class StubMember:
+    def __init__(self, name: str):
+        self.name = name
+        self.is_streamable = True
+
+    def run(self, message: str, stream: bool = False) -> RunResponse:
+        time.sleep(MEMBER_LATENCY)
+        return RunResponse(content=f"{self.name} done")
+
+
+class SimulatedMaster(RoutedAgent):
+    def _run_master(self, message, *, stream: bool, **kwargs):
+        time.sleep(MODEL_LATENCY)
+        self.team[0].run(message)
+        time.sleep(MODEL_LATENCY)
+        return RunResponse(content="master done")
+
+
+def timed_requests(agent) -> list:
+    timings = []
+    for message in REQUESTS:
+        start = time.perf_counter()
+        agent.run(message)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    team = [StubMember(name) for name in RULES]
+    router = KeywordRouter(RULES)
+
+    baseline = timed_requests(SimulatedMaster(name="master-agent", team=team))
+    routed = timed_requests(SimulatedMaster(name="master-agent", team=team, router=router))
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        for message in REQUESTS:
+            router.route(message)
+    overhead = (time.perf_counter() - start) / (1000 * len(REQUESTS))
+
+    for message in REQUESTS:
+        print(f"  {router.route(message) or '-> master':<22} {message}")
+    stats = router.metrics.stats()
+    print(f"hit rate:                {stats['hit_rate']:.0%} ({stats['routed']}/{stats['requests']})")
+    print(f"routing decision:        {overhead * 1e6:.1f} us/request")
+    print(f"without router:          {mean(baseline) * 1000:6.1f} ms/request")
+    print(f"with router:             {mean(routed) * 1000:6.1f} ms/request")
+    print(f"latency saved (metrics): {stats['latency_saved_seconds']:.2f}s over {stats['requests']} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Throughput of the Playground app served by 1, 2, 4, ... PreforkServer worker processes, with stubbed models.
+
+The server is final_prototype with the fake model and toolkits of bench_offline, preloaded once and
+forked into the workers, with the session storage in shared mode. The fake models answer without
+waiting (--model-latency 0), so a request costs what the server process spends on it: routing,
+building prompts, (de)serializing messages and sessions, running and parsing tool calls. That work
+holds the GIL, so one process cannot spread it over cores. Clients replay the bench_offline corpus
+over HTTP (POST /v1/playground/agents/master-agent/runs) on a new connection per request, each
+continuing its own sessions, so the turns of one session land on different workers; the plan of each request travels in a header that
+the benchmark's middleware applies. At the end every session is read back to check that no turn
+was lost between workers.
+
+Scaling is throughput relative to one worker; it can only get close to the number of workers up to
+the number of cores, which is printed.
+
+    python -m benchmarks.bench_serving
+    python -m benchmarks.bench_serving --workers 1 2 4 8 --requests 400
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.bench_offline import CORPUS, REPO_ROOT, load_prototype, percentile
+from benchmarks.fakes import use_plan
+
+PLAN_HEADER = b"x-bench-plan"
+
+
+class PlanMiddleware:
+    """Runs each request under the fake-model plan sent in its x-bench-plan header."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        plan = dict(scope.get("headers") or []).get(PLAN_HEADER) if scope["type"] == "http" else None
+        if plan is None:
+            return await self.app(scope, receive, send)
+        with use_plan(json.loads(plan)):
+            return await self.app(scope, receive, send)
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Server side: build the app once and serve it from `--serve` worker processes."""
+    # Shared session storage in every run, so only the number of processes changes
+    os.environ["WEB_WORKERS"] = str(max(args.serve, 2))
+    prototype, _ = load_prototype(args)
+    from workplace.serving import PreforkServer
+
+    PreforkServer(
+        PlanMiddleware(prototype.app),
+        workers=args.serve,
+        host="127.0.0.1",
+        port=args.port,
+        graceful_timeout=5,
+        log_level="warning",
+    ).run()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args: argparse.Namespace, workers: int) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    command = [
+        sys.executable, "-m", "benchmarks.bench_serving",
+        "--serve", str(workers),
+        "--port", str(port),
+        "--model-latency", str(args.model_latency),
+        "--output-tokens", str(args.output_tokens),
+        "--tool-latency", str(args.tool_latency),
+    ]
+    server = subprocess.Popen(command, cwd=REPO_ROOT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"The server exited with status {server.returncode}")
+        try:
+            if httpx.get(f"{url}/v1/playground/status", timeout=1).status_code == 200:
+                return server, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("The server did not start")
+
+
+def run_client(url: str, prefix: str, client: int, requests: List[Dict[str, Any]], turns: int, results: List[Dict[str, Any]]) -> None:
+    # A new connection per request, like a load balancer without session affinity
+    with httpx.Client(base_url=url, timeout=120, limits=httpx.Limits(max_keepalive_connections=0)) as http:
+        for n, entry in enumerate(requests):
+            session_id = f"{prefix}-{client}-{n // turns}"
+            start = time.perf_counter()
+            error = None
+            try:
+                response = http.post(
+                    "/v1/playground/agents/master-agent/runs",
+                    data={"message": entry["message"], "stream": "false", "session_id": session_id, "user_id": f"user-{client}"},
+                    headers={PLAN_HEADER.decode(): json.dumps(entry["plan"])},
+                )
+                if response.status_code != 200:
+                    error = f"HTTP {response.status_code}: {response.text[:200]}"
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+            results.append({"session_id": session_id, "user_id": f"user-{client}", "seconds": time.perf_counter() - start, "error": error})
+
+
+def replay(url: str, prefix: str, count: int, concurrency: int, turns: int) -> Dict[str, Any]:
+    requests = [CORPUS[i % len(CORPUS)] for i in range(count)]
+    results: List[Dict[str, Any]] = []
+    threads = [
+        threading.Thread(target=run_client, args=(url, prefix, client, requests[client::concurrency], turns, results))
+        for client in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"wall_seconds": time.perf_counter() - start, "results": results}
+
+
+def lost_turns(url: str, results: List[Dict[str, Any]]) -> int:
+    """Turns answered without an error that are missing from the stored session."""
+    expected: Dict[Tuple[str, str], int] = {}
+    for result in results:
+        if result["error"] is None:
+            key = (result["session_id"], result["user_id"])
+            expected[key] = expected.get(key, 0) + 1
+    lost = 0
+    with httpx.Client(base_url=url, timeout=30, limits=httpx.Limits(max_keepalive_connections=0)) as http:
+        for (session_id, user_id), turns in expected.items():
+            response = http.get(f"/v1/playground/agents/master-agent/sessions/{session_id}", params={"user_id": user_id})
+            runs = len(((response.json() or {}).get("memory") or {}).get("runs") or []) if response.status_code == 200 else 0
+            lost += max(turns - runs, 0)
+    return lost
+
+
+def measure(args: argparse.Namespace, workers: int) -> Dict[str, Any]:
+    server, url = start_server(args, workers)
+    try:
+        # Every worker serves a few requests first (lazy imports, first session reads), not counted
+        replay(url, "warmup", len(CORPUS), max(workers, 2), len(CORPUS))
+        run = replay(url, "serve", args.requests, args.concurrency, args.turns)
+        results = run["results"]
+        latencies = [result["seconds"] * 1000 for result in results]
+        return {
+            "workers": workers,
+            "throughput_rps": len(results) / run["wall_seconds"],
+            "latency_p50_ms": percentile(latencies, 50),
+            "latency_p99_ms": percentile(latencies, 99),
+            "errors": [result["error"] for result in results if result["error"] is not None],
+            "lost_turns": lost_turns(url, results),
+        }
+    finally:
+        # Drains the workers, like a deployment stopping the service
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker process counts to measure")
+    parser.add_argument("--requests", type=int, default=200, help="requests per measurement, cycling through the corpus")
+    parser.add_argument("--concurrency", type=int, default=16, help="clients sending requests at the same time")
+    parser.add_argument("--turns", type=int, default=5, help="requests per session before a client starts a new one")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="seconds per fake model call")
+    parser.add_argument("--output-tokens", type=int, default=150, help="output tokens of a fake final answer")
+    parser.add_argument("--tool-latency", type=float, default=0.0, help="seconds per fake tool call")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args)
+        return
+
+    print(f"{args.requests} requests, {args.concurrency} clients, {os.cpu_count()} cores, model {args.model_latency * 1000:.0f} ms, tools {args.tool_latency * 1000:.0f} ms")
+    baseline = None
+    for workers in args.workers:
+        result = measure(args, workers)
+        baseline = baseline or result["throughput_rps"]
+        print(
+            f"  {workers:2d} workers: {result['throughput_rps']:6.1f} req/s ({result['throughput_rps'] / baseline:4.2f}x), "
+            f"p50 {result['latency_p50_ms']:6.0f} ms, p99 {result['latency_p99_ms']:6.0f} ms, "
+            f"{len(result['errors'])} errors, {result['lost_turns']} turns missing from shared sessions"
+        )
+        for error in result["errors"][:3]:
+            print(f"    error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Load test of the agent session store with many simulated concurrent sessions.
+
+Each session is a thread that, for every turn, reads its stored session (as agno does with
+add_history_to_messages=True) and writes it back with one more run appended.
+
+    python -m benchmarks.bench_session_store
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from agno.storage.agent.session import AgentSession
+from agno.storage.agent.sqlite import SqliteAgentStorage
+
+from workplace.storage import PooledSqliteAgentStorage
+
+SESSIONS = 32
+TURNS = 20
+RUN_PAYLOAD = "x" * 2000
+
+
+def drive(storage, sessions: int = SESSIONS, turns: int = TURNS) -> float:
+    def session_worker(index: int):
+        session_id = f"session-{index}"
+        for turn in range(turns):
+            stored = storage.read(session_id=session_id)
+            runs = list(stored.memory["runs"]) if stored is not None and stored.memory else []
+            runs.append({"turn": turn, "content": RUN_PAYLOAD})
+            storage.upsert(AgentSession(session_id=session_id, agent_id="bench-agent", memory={"runs": runs}))
+
+    threads = [threading.Thread(target=session_worker, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if hasattr(storage, "flush"):
+        storage.flush()
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        turns = SESSIONS * TURNS
+        baseline = SqliteAgentStorage(table_name="bench", db_file=os.path.join(tmp, "baseline.db"))
+        baseline.create()
+        baseline_time = drive(baseline)
+        print(f"SqliteAgentStorage:        {turns / baseline_time:8.0f} turns/s ({baseline_time:.2f}s)")
+
+        wal_only = PooledSqliteAgentStorage(table_name="bench", db_file=os.path.join(tmp, "wal.db"), write_behind=False)
+        wal_time = drive(wal_only)
+        print(f"  WAL + pool, no batching: {turns / wal_time:8.0f} turns/s ({wal_time:.2f}s)")
+
+        pooled = PooledSqliteAgentStorage(table_name="bench", db_file=os.path.join(tmp, "pooled.db"))
+        pooled_time = drive(pooled)
+        print(
+            f"PooledSqliteAgentStorage:  {turns / pooled_time:8.0f} turns/s ({pooled_time:.2f}s), "
+            f"{pooled.buffer.sessions_written} rows in {pooled.buffer.batches_written} batches"
+        )
+        pooled.close()
+
+        for session_id in ("session-0", f"session-{SESSIONS - 1}"):
+            assert len(pooled.read(session_id).memory["runs"]) == TURNS, "every turn must be persisted"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""API calls and wall time per 1k rows written to Google Sheets, with and without the write buffer.
+
+The backend is a local fake of GOOGLESHEETS_BATCH_UPDATE with a fixed latency per request. Without
+the buffer every tool call the agent makes is one update; with it, the agent's small writes are
+coalesced into batched updates. Between two tool calls the agent waits MODEL_LATENCY, standing in
+for the model round trip, and SESSIONS agents write at the same time, each to its own spreadsheet
+and each checking that flush_rows reports its own rows only. The buffer's idle flush window is the
+production default scaled down like the model latency (30s against a model round trip of seconds).
+
+    python -m benchmarks.bench_sheets_writes
+"""
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from workplace.sheets import SheetsWriteBuffer, SheetsWriteTools, parse_cell
+
+ROWS = 300
+SESSIONS = 2
+# Rows per tool call, roughly what a model puts in one call
+ROWS_PER_CALL = 10
+REQUEST_LATENCY = 0.02
+MODEL_LATENCY = 0.05
+FLUSH_SECONDS = 1.0
+
+
+class FakeSheetsBackend:
+    def __init__(self):
+        self.calls = 0
+        self.cells = {}
+        self.next_row = {}
+        self._lock = threading.Lock()
+
+    def batch_update(self, spreadsheet_id, sheet_name, values, first_cell_location=None):
+        time.sleep(REQUEST_LATENCY)
+        with self._lock:
+            self.calls += 1
+            key = (spreadsheet_id, sheet_name)
+            row = parse_cell(first_cell_location)[1] if first_cell_location else self.next_row.get(key, 1)
+            for offset, values_row in enumerate(values):
+                self.cells[(key, row + offset)] = list(values_row)
+            self.next_row[key] = max(self.next_row.get(key, 1), row + len(values))
+        return {"successful": True}
+
+
+def expense_rows():
+    return [[f"2024-01-{day % 28 + 1:02d}", f"expense {day}", round(day * 1.5, 2)] for day in range(ROWS)]
+
+
+def unbuffered(backend, spreadsheet_id, rows, results):
+    for start in range(0, len(rows), ROWS_PER_CALL):
+        time.sleep(MODEL_LATENCY)
+        backend.batch_update(spreadsheet_id, "Sheet1", rows[start : start + ROWS_PER_CALL])
+
+
+def buffered(tools, spreadsheet_id, rows, results):
+    agent = SimpleNamespace(session_id=f"session-{spreadsheet_id}")
+    for start in range(0, len(rows), ROWS_PER_CALL):
+        time.sleep(MODEL_LATENCY)
+        tools.append_rows(agent, spreadsheet_id, "Sheet1", json.dumps(rows[start : start + ROWS_PER_CALL]))
+    time.sleep(MODEL_LATENCY)
+    results[spreadsheet_id] = json.loads(tools.flush_rows(agent))
+
+
+def run_sessions(write, target, rows):
+    results = {}
+    threads = [threading.Thread(target=write, args=(target, f"expenses-{n}", rows, results)) for n in range(SESSIONS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, results
+
+
+def main():
+    rows = expense_rows()
+    per_1k = 1000 / (ROWS * SESSIONS)
+
+    direct = FakeSheetsBackend()
+    direct_time, _ = run_sessions(unbuffered, direct, rows)
+
+    coalesced = FakeSheetsBackend()
+    buffer = SheetsWriteBuffer(coalesced, max_rows=500, flush_interval=FLUSH_SECONDS)
+    coalesced_time, results = run_sessions(buffered, SheetsWriteTools(buffer), rows)
+    buffer.close()
+
+    assert direct.cells == coalesced.cells, "both paths must leave the sheets in the same state"
+    for spreadsheet_id, result in results.items():
+        assert list(result["results"]) == [spreadsheet_id], "flush_rows must only report the session's own spreadsheet"
+        assert result["results"][spreadsheet_id]["rows_written"] == ROWS
+    print(
+        f"{SESSIONS} sessions x {ROWS} rows, {ROWS_PER_CALL} rows per tool call, {MODEL_LATENCY * 1000:.0f} ms per model round trip, "
+        f"{REQUEST_LATENCY * 1000:.0f} ms per Sheets request"
+    )
+    print(f"one update per tool call: {direct.calls * per_1k:5.0f} API calls, {direct_time * per_1k:.2f}s per 1k rows")
+    print(f"write buffer:             {coalesced.calls * per_1k:5.0f} API calls, {coalesced_time * per_1k:.2f}s per 1k rows")
+
+
+if __name__ == "__main__":
+    main()
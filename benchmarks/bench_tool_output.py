@@ -0,0 +1,255 @@
+"""Prompt size of each agent with and without tool output compaction, on requests that read large payloads.
+
+The agent tree is bench_offline's (final_prototype with the fake model and toolkits), once with
+TOOL_OUTPUT_COMPACTION=0 and once with it on, each in its own process. The fake Docs, Sheets and
+Gmail reads return payloads shaped like the real ones: a Docs API document of DOC_PARAGRAPHS
+paragraphs (GOOGLEDOCS_GET_DOCUMENT_BY_ID), a range of SHEET_ROWS rows (GOOGLESHEETS_BATCH_GET) and
+EMAILS emails with their bodies (get_unread_emails, get_emails_from_user). Each client replays the
+corpus in one session of the master agent. Within an agent's run every model call after a tool call
+sends its result again, so a result that is read and then acted on (reply-email) is paid for several
+times. The follow-up question about the document reads it again; with compaction the agent then
+searches the saved output for the section it needs.
+
+Prompt size is the input tokens of every model call (the fake model counts four characters per
+token over the messages and tool schemas it is sent), per agent and per request.
+
+    python -m benchmarks.bench_tool_output
+    python -m benchmarks.bench_tool_output --max-tokens 1000 --rounds 3
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.bench_offline import REPO_ROOT, SpanCollector, load_prototype
+from benchmarks.fakes import FakeModel, FakeToolkit, use_plan
+
+DOC_PARAGRAPHS = 600
+SHEET_ROWS = 1000
+EMAILS = 25
+WORDS = "project budget review release customer quarter launch design report meeting team deadline update risk plan".split()
+
+
+def docs_document(paragraphs: int, rng: random.Random) -> str:
+    """A GOOGLEDOCS_GET_DOCUMENT_BY_ID result: the Docs API document, with its styles, in Composio's envelope."""
+    content = []
+    index = 1
+    for n in range(paragraphs):
+        heading = n % 25 == 0
+        text = (f"Section {n // 25 + 1}: Risks and milestones" if heading else " ".join(rng.choice(WORDS) for _ in range(40)) + ".") + "\n"
+        content.append({
+            "startIndex": index,
+            "endIndex": index + len(text),
+            "paragraph": {
+                "elements": [{
+                    "startIndex": index,
+                    "endIndex": index + len(text),
+                    "textRun": {"content": text, "textStyle": {"bold": heading, "fontSize": {"magnitude": 14 if heading else 11, "unit": "PT"}}},
+                }],
+                "paragraphStyle": {"namedStyleType": "HEADING_2" if heading else "NORMAL_TEXT", "direction": "LEFT_TO_RIGHT", "lineSpacing": 115},
+            },
+        })
+        index += len(text)
+    document = {"documentId": "1AbCdEf", "title": "Quarterly plan", "revisionId": "r42", "body": {"content": content}}
+    return json.dumps({"data": {"response_data": document}, "error": None, "successful": True})
+
+
+def sheet_values(rows: int, rng: random.Random) -> str:
+    """A GOOGLESHEETS_BATCH_GET result: one range with a header row."""
+    values = [["Date", "Item", "Category", "Amount", "Owner"]]
+    for n in range(rows):
+        values.append([
+            f"2024-{n % 12 + 1:02d}-{n % 28 + 1:02d}",
+            f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}",
+            rng.choice(["Hardware", "Travel", "Software", "Office"]),
+            f"${rng.randint(5, 5000)}.{rng.randint(0, 99):02d}",
+            f"person{n % 9}@example.com",
+        ])
+    data = {"spreadsheetId": "1SheetId", "valueRanges": [{"range": f"Expenses!A1:E{rows + 1}", "majorDimension": "ROWS", "values": values}]}
+    return json.dumps({"data": data, "error": None, "successful": True})
+
+
+def email_listing(count: int, rng: random.Random) -> str:
+    """What the Gmail tools return for a list of emails: headers and the full body of each."""
+    emails = []
+    for n in range(count):
+        body = " ".join(rng.choice(WORDS) for _ in range(220))
+        emails.append(
+            f"From: sender{n}@example.com\nSubject: Re: {rng.choice(WORDS)} {rng.choice(WORDS)}\n"
+            f"Date: 2024-05-{n % 28 + 1:02d}\nBody: {body}\n----------------------------------------"
+        )
+    return "\n".join(emails)
+
+
+def payloads(seed: int = 7) -> Dict[str, str]:
+    rng = random.Random(seed)
+    emails = email_listing(EMAILS, rng)
+    return {
+        "GOOGLEDOCS_GET_DOCUMENT_BY_ID": docs_document(DOC_PARAGRAPHS, rng),
+        "GOOGLESHEETS_BATCH_GET": sheet_values(SHEET_ROWS, rng),
+        "get_unread_emails": emails,
+        "get_emails_from_user": emails,
+    }
+
+
+def corpus(document_handle: Optional[str]) -> List[Dict[str, Any]]:
+    # With compaction the section is not in the compacted document, so the agent looks it up by handle
+    follow_up = ["GOOGLEDOCS_GET_DOCUMENT_BY_ID"]
+    if document_handle:
+        follow_up.append({"tool": "search_tool_output", "args": {"handle": document_handle, "query": "Section 3"}})
+    return [
+        {
+            "name": "read-doc",
+            "message": "Open the quarterly plan document 1AbCdEf and tell me what it covers",
+            "plan": {"master-agent": ["google-docs-agent"], "google-docs-agent": ["GOOGLEDOCS_GET_DOCUMENT_BY_ID"]},
+        },
+        {
+            "name": "doc-follow-up",
+            "message": "In that document, what does section 3 say about risks?",
+            "plan": {"master-agent": ["google-docs-agent"], "google-docs-agent": follow_up},
+        },
+        {
+            "name": "sheet-summary",
+            "message": "Summarize the expenses in spreadsheet 1SheetId by category",
+            "plan": {"master-agent": ["google-sheets-agent"], "google-sheets-agent": ["GOOGLESHEETS_BATCH_GET"]},
+        },
+        {
+            "name": "unread-summary",
+            "message": "Summarize my unread emails",
+            "plan": {"master-agent": ["gmail-agent"], "gmail-agent": ["get_unread_emails"]},
+        },
+        {
+            "name": "reply-email",
+            "message": "Draft a reply to the latest email from sender3@example.com",
+            "plan": {"master-agent": ["gmail-agent"], "gmail-agent": ["get_emails_from_user", "email-writer", "create_draft_email"], "email-writer": []},
+        },
+        {
+            "name": "slack-post",
+            "message": "Post a message in the #project Slack channel saying the plan is ready",
+            "plan": {"master-agent": ["slack-agent"], "slack-agent": ["send_message"]},
+        },
+    ]
+
+
+def model_spans_by_agent(spans: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Input tokens of each model call in `spans`, under the agent that made it."""
+    by_id = {span["span_id"]: span for span in spans}
+    calls: Dict[str, List[int]] = {}
+    for span in spans:
+        if span["kind"] != "model":
+            continue
+        parent = by_id.get(span["parent_id"])
+        while parent is not None and parent["kind"] != "agent":
+            parent = by_id.get(parent["parent_id"])
+        agent = parent["name"] if parent is not None else "?"
+        calls.setdefault(agent, []).append(span["attributes"].get("input_tokens", 0))
+    return calls
+
+
+def measure(args: argparse.Namespace) -> Dict[str, Any]:
+    """One side of the comparison, in this process: the compaction setting comes from the environment."""
+    prototype, _ = load_prototype(args)
+    from workplace.tracing import Tracer, instrument, uninstrument
+
+    results = payloads()
+    for key in prototype.registry.keys:
+        for toolkit in prototype.registry.get(key).tools or []:
+            if isinstance(toolkit, FakeToolkit):
+                toolkit.results.update(results)
+    compaction = bool(prototype.tool_output_tools)
+    handle = prototype.tool_output_compactor.save(results["GOOGLEDOCS_GET_DOCUMENT_BY_ID"]) if compaction else None
+    requests = corpus(handle)
+
+    collector = SpanCollector()
+    uninstrument()
+    tracer = instrument(Tracer(exporters=[collector]), model_classes=[FakeModel])
+    per_agent: Dict[str, List[int]] = {}
+    per_request: Dict[str, List[int]] = {}
+    errors = []
+    for client in range(args.clients):
+        # The whole corpus, `rounds` times, in one session
+        session_id = f"compaction-{client}"
+        for _ in range(args.rounds):
+            for entry in requests:
+                with use_plan(entry["plan"]), tracer.span("request", entry["name"]) as span:
+                    try:
+                        prototype.master_agent.deep_copy(update={"session_id": session_id}).run(entry["message"])
+                    except Exception as e:
+                        errors.append(f"{entry['name']}: {type(e).__name__}: {e}")
+                calls = model_spans_by_agent(collector.pop(span.trace_id))
+                for agent, tokens in calls.items():
+                    per_agent.setdefault(agent, []).extend(tokens)
+                per_request.setdefault(entry["name"], []).append(sum(sum(tokens) for tokens in calls.values()))
+    prototype.job_queue.close()
+    return {
+        "compaction": compaction,
+        "per_agent": {agent: {"model_calls": len(tokens), "mean_input_tokens": sum(tokens) / len(tokens), "max_input_tokens": max(tokens)} for agent, tokens in per_agent.items()},
+        "per_request": {name: sum(tokens) / len(tokens) for name, tokens in per_request.items()},
+        "compactor": prototype.tool_output_compactor.stats(),
+        "errors": errors,
+    }
+
+
+def run_side(args: argparse.Namespace, compaction: bool) -> Dict[str, Any]:
+    output = Path(tempfile.mkdtemp(prefix="bench_tool_output_")) / "result.json"
+    env = {**os.environ, "TOOL_OUTPUT_COMPACTION": "1" if compaction else "0", "TOOL_OUTPUT_MAX_TOKENS": str(args.max_tokens)}
+    command = [
+        sys.executable, "-m", "benchmarks.bench_tool_output",
+        "--side", str(output),
+        "--clients", str(args.clients),
+        "--rounds", str(args.rounds),
+        "--output-tokens", str(args.output_tokens),
+    ]
+    subprocess.run(command, cwd=REPO_ROOT, env=env, check=True)
+    return json.loads(output.read_text(encoding="utf-8"))
+
+
+def reduction(before: float, after: float) -> str:
+    return f"{(1 - after / before) * 100:5.1f}%" if before else "    -"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--clients", type=int, default=2, help="sessions, each replaying the corpus")
+    parser.add_argument("--rounds", type=int, default=2, help="times each session replays the corpus")
+    parser.add_argument("--max-tokens", type=int, default=2000, help="TOOL_OUTPUT_MAX_TOKENS of the compacted run")
+    parser.add_argument("--output-tokens", type=int, default=150, help="output tokens of a fake final answer")
+    parser.add_argument("--side", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    # Requests run one after another; latency plays no part in prompt size
+    args.model_latency, args.tool_latency = 0.0, 0.0
+    if args.side:
+        Path(args.side).write_text(json.dumps(measure(args)), encoding="utf-8")
+        return
+
+    before, after = run_side(args, compaction=False), run_side(args, compaction=True)
+    print(f"{args.clients} sessions x {args.rounds} rounds of {len(corpus(None))} requests, compaction above {args.max_tokens} tokens")
+    print(f"  {'agent':<24} {'calls':>5} {'mean input tokens':>28} {'max input tokens':>28}")
+    for agent in sorted(set(before["per_agent"]) | set(after["per_agent"])):
+        old, new = before["per_agent"].get(agent), after["per_agent"].get(agent)
+        if old is None or new is None:
+            continue
+        print(
+            f"  {agent:<24} {new['model_calls']:5d} {old['mean_input_tokens']:8.0f} -> {new['mean_input_tokens']:7.0f} ({reduction(old['mean_input_tokens'], new['mean_input_tokens'])})"
+            f" {old['max_input_tokens']:8.0f} -> {new['max_input_tokens']:7.0f} ({reduction(old['max_input_tokens'], new['max_input_tokens'])})"
+        )
+    print(f"  {'request':<24} {'input tokens per request':>34}")
+    for name, old in before["per_request"].items():
+        new = after["per_request"][name]
+        print(f"  {name:<24} {old:14.0f} -> {new:7.0f} ({reduction(old, new)})")
+    total_old, total_new = sum(before["per_request"].values()), sum(after["per_request"].values())
+    print(f"  {'all requests':<24} {total_old:14.0f} -> {total_new:7.0f} ({reduction(total_old, total_new)})")
+    stats = after["compactor"]
+    print(f"  compactor: {stats['compacted']} outputs compacted, {stats['tokens_before']} -> {stats['tokens_after']} tokens, {stats['searches']} searches, {stats['pages_read']} pages read")
+    for error in (before["errors"] + after["errors"])[:5]:
+        print(f"  error: {error}")
+
+
+if __name__ == "__main__":
+    main()
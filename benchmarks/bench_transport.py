@@ -0,0 +1,263 @@
+"""Requests per second and connection handshakes of the toolkits' HTTP calls, with and without the shared transport.
+
+A local HTTPS server (self-signed certificate, HTTP/1.1 keep-alive) stands in for Slack, Zoom and
+Google: every new connection costs HANDSHAKE_LATENCY on top of the TLS handshake, like the round trips
+to a remote API, and every request REQUEST_LATENCY. Worker threads make the calls the agents make:
+Slack chat.postMessage through slack_sdk, Zoom list_meetings through agno's ZoomTools and Calendar
+event listings through googleapiclient. "before" uses the clients as agno builds them (urllib per
+Slack call, requests per Zoom call, a new Calendar client per call, an unlocked Zoom token);
+"after" sends everything through one HttpTransport.
+
+    python -m benchmarks.bench_transport
+"""
+
+import argparse
+import datetime
+import ipaddress
+import json
+import logging
+import os
+import ssl
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+import httplib2
+import requests
+from googleapiclient.discovery import build
+from slack_sdk import WebClient
+
+import agno.tools.zoom as agno_zoom
+from agno.tools.zoom import ZoomTools
+from agno.utils.log import logger
+
+import workplace.pooled_tools as pooled_tools
+from workplace.pooled_tools import PooledWebClient, PooledZoomTools
+from workplace.transport import HttpTransport, RequestsAdapter
+
+HANDSHAKE_LATENCY = 0.03
+REQUEST_LATENCY = 0.005
+
+
+class MockApiServer(ThreadingHTTPServer):
+    """Answers the Slack, Zoom and Calendar endpoints the benchmark calls and counts connections."""
+
+    daemon_threads = True
+
+    def __init__(self, context: ssl.SSLContext, handshake_latency: float, request_latency: float):
+        super().__init__(("127.0.0.1", 0), MockApiHandler)
+        self.context = context
+        self.handshake_latency = handshake_latency
+        self.request_latency = request_latency
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.token_requests = 0
+
+    @property
+    def url(self) -> str:
+        return f"https://127.0.0.1:{self.server_address[1]}"
+
+    def finish_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        # The round trips of a new TCP + TLS connection to a remote host
+        time.sleep(self.handshake_latency)
+        request = self.context.wrap_socket(request, server_side=True)
+        super().finish_request(request, client_address)
+
+    def reset(self) -> None:
+        with self.lock:
+            self.connections = self.requests = self.token_requests = 0
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._answer()
+
+    def do_POST(self):
+        self._answer()
+
+    def _answer(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.token_requests += self.path.startswith("/oauth/token")
+        time.sleep(server.request_latency)
+        if self.path.startswith("/oauth/token"):
+            body = {"access_token": "token", "expires_in": 3600}
+        elif self.path.startswith("/api/"):
+            body = {"ok": True, "channel": "C1", "ts": "1.0"}
+        elif self.path.startswith("/v2/"):
+            body = {"meetings": [], "total_records": 0}
+        else:
+            body = {"kind": "calendar#events", "items": []}
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def self_signed_certificate(directory: str) -> str:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    path = os.path.join(directory, "mock.pem")
+    with open(path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    return path
+
+
+class _ToMockServer:
+    """Stands in for the `requests` module of agno.tools.zoom, sending Zoom's URLs to the mock server."""
+
+    def __init__(self, target: Any, url: str):
+        self.target = target
+        self.url = url
+        self.RequestException = requests.RequestException
+
+    def __getattr__(self, method: str) -> Callable[..., Any]:
+        send = getattr(self.target, method)
+        return lambda url, **kwargs: send(url.replace("https://api.zoom.us", self.url).replace("https://zoom.us", self.url), **kwargs)
+
+
+class _MockServerAdapter(RequestsAdapter):
+    """Sends a pooled Session's Zoom requests to the mock server, through the transport."""
+
+    def __init__(self, transport: HttpTransport, url: str):
+        super().__init__(transport)
+        self.url = url
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        request.url = request.url.replace("https://api.zoom.us", self.url)
+        return super().send(request, **kwargs)
+
+
+def calendar_events(http: Any, url: str) -> None:
+    service = build("calendar", "v3", http=http, client_options={"api_endpoint": url + "/"})
+    service.events().list(calendarId="primary", maxResults=10).execute()
+
+
+def before_calls(server: MockApiServer, cert: str) -> List[Callable[[], None]]:
+    context = ssl.create_default_context(cafile=cert)
+    slack = WebClient(token="xoxb-bench", base_url=server.url + "/api/", ssl=context)
+    agno_zoom.requests = _ToMockServer(requests, server.url)
+    zoom = ZoomTools(account_id="account", client_id="client", client_secret="secret")
+    return [
+        lambda: slack.chat_postMessage(channel="#general", text="Standup in 5"),
+        lambda: zoom.list_meetings(),
+        # agno's calendar toolkit builds a new client, with a new connection, for every call
+        lambda: calendar_events(httplib2.Http(ca_certs=cert), server.url),
+    ]
+
+
+def after_calls(server: MockApiServer, transport: HttpTransport) -> List[Callable[[], None]]:
+    slack = PooledWebClient(transport, token="xoxb-bench", base_url=server.url + "/api/")
+    zoom = PooledZoomTools(transport, account_id="account", client_id="client", client_secret="secret")
+    zoom.session.mount("https://api.zoom.us", _MockServerAdapter(transport, server.url))
+    pooled_tools.ZOOM_TOKEN_URL = server.url + "/oauth/token"
+    calendar = build("calendar", "v3", http=transport.httplib2(), client_options={"api_endpoint": server.url + "/"})
+    return [
+        lambda: slack.chat_postMessage(channel="#general", text="Standup in 5"),
+        lambda: zoom.list_meetings(),
+        lambda: calendar.events().list(calendarId="primary", maxResults=10).execute(),
+    ]
+
+
+def run(server: MockApiServer, calls: List[Callable[[], None]], workers: int, per_worker: int) -> Dict[str, Any]:
+    server.reset()
+    # Every worker makes its first call at the same moment, like a burst of tool calls
+    barrier = threading.Barrier(workers)
+    errors: List[str] = []
+
+    def worker(offset: int) -> None:
+        barrier.wait()
+        for n in range(per_worker):
+            try:
+                calls[(offset + n) % len(calls)]()
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    return {
+        "calls": workers * per_worker,
+        "seconds": seconds,
+        "rps": workers * per_worker / seconds,
+        "connections": server.connections,
+        "token_requests": server.token_requests,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--workers", type=int, default=8, help="threads making tool calls at the same time")
+    parser.add_argument("--calls", type=int, default=30, help="calls per thread, cycling through Slack, Zoom and Calendar")
+    parser.add_argument("--handshake-latency", type=float, default=HANDSHAKE_LATENCY, help="seconds added to every new connection")
+    parser.add_argument("--request-latency", type=float, default=REQUEST_LATENCY, help="seconds the server takes per request")
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    directory = tempfile.mkdtemp(prefix="bench_transport_")
+    cert = self_signed_certificate(directory)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert)
+    server = MockApiServer(context, args.handshake_latency, args.request_latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # For the requests calls of agno's ZoomTools
+    os.environ["REQUESTS_CA_BUNDLE"] = cert
+
+    before = run(server, before_calls(server, cert), args.workers, args.calls)
+    transport = HttpTransport(verify=ssl.create_default_context(cafile=cert))
+    after = run(server, after_calls(server, transport), args.workers, args.calls)
+    stats = transport.stats()
+    server.shutdown()
+    transport.close()
+
+    print(f"{args.workers} threads x {args.calls} calls (Slack, Zoom, Calendar), {args.handshake_latency * 1000:.0f} ms per new connection, {args.request_latency * 1000:.0f} ms per request")
+    for label, result in (("before", before), ("shared transport", after)):
+        print(
+            f"  {label:<17} {result['rps']:7.1f} req/s, {result['connections']:4d} TLS handshakes, "
+            f"{result['token_requests']:2d} Zoom token requests, {len(result['errors'])} errors"
+        )
+    print(f"  transport: {stats['requests_per_connection']:.1f} requests per connection, HTTP/2 {'on' if transport.http2 else 'off (h2 not installed)'}, tokens {stats['tokens']}")
+    for error in (before["errors"] + after["errors"])[:5]:
+        print(f"  error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Offline stand-ins for Gemini and the Slack, Zoom, Gmail, Calendar and Composio toolkits.
+
+FakeModel follows a per-request script instead of generating text: `use_plan` sets, for each agent
+name, the tool calls that agent's model makes (one per model call, in order) before it answers.
+A plan step is a function name ("send_message"), a member agent's name ("gmail-agent", emitted as
+its transfer_task_to_ call), {"parallel": [registry keys]} for run_tasks_in_parallel, or
+{"tool": name, "args": {...}} to pass arguments explicitly. Other arguments are filled in from the
+function's JSON schema. Latency and token counts are fixed, so runs are comparable.
+"""
+
+import inspect
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from agno.models.base import Model
+from agno.models.message import Message
+from agno.models.response import ModelResponse
+from agno.tools.toolkit import Toolkit
+from agno.utils.log import logger
+
+_plan: ContextVar[Dict[str, List[Any]]] = ContextVar("fake_model_plan", default={})
+
+# Parameters that carry the request itself; anything else gets a placeholder of its type
+TEXT_PARAMETERS = {"task_description", "text", "body", "query", "topic", "title", "description", "markdown_text", "new_markdown_text"}
+ARGUMENT_DEFAULTS = {"expected_output": "A short confirmation of what was done", "additional_information": ""}
+
+
+@contextmanager
+def use_plan(plan: Dict[str, List[Any]]) -> Iterator[None]:
+    """Script the fake models for the requests run inside the block (and the threads it hands work to)."""
+    token = _plan.set(plan)
+    try:
+        yield
+    finally:
+        _plan.reset(token)
+
+
+class FakeResponse:
+    """Shaped like a Gemini response, so the tracer records its token counts."""
+
+    def __init__(self, content: Optional[str], tool_calls: List[Dict[str, Any]], input_tokens: int, output_tokens: int):
+        self.content = content
+        self.tool_calls = tool_calls
+        self.usage_metadata = SimpleNamespace(prompt_token_count=input_tokens, candidates_token_count=output_tokens, cached_content_token_count=0)
+
+
+@dataclass
+class FakeModel(Model):
+    id: str = "fake-model"
+    name: str = "FakeModel"
+    provider: str = "Fake"
+
+    # The agent this copy answers for; its steps are looked up under this name in the current plan
+    agent_name: Optional[str] = None
+    # Seconds per model call, spread over the chunks when streaming
+    latency: float = 0.05
+    # Output tokens of a final answer; tool calls cost the size of their arguments
+    output_tokens: int = 150
+    chars_per_token: int = 4
+    stream_chunks: int = 5
+
+    def for_agent(self, agent_name: str) -> "FakeModel":
+        return replace(self, agent_name=agent_name)
+
+    def invoke(self, messages: List[Message]) -> FakeResponse:
+        response = self._respond(messages)
+        time.sleep(self.latency)
+        return response
+
+    async def ainvoke(self, messages: List[Message]) -> FakeResponse:
+        import asyncio
+
+        response = self._respond(messages)
+        await asyncio.sleep(self.latency)
+        return response
+
+    def invoke_stream(self, messages: List[Message]) -> Iterator[FakeResponse]:
+        response = self._respond(messages)
+        chunks = self._chunks(response)
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield chunk
+
+    async def ainvoke_stream(self, messages: List[Message]) -> AsyncIterator[FakeResponse]:
+        import asyncio
+
+        response = self._respond(messages)
+        chunks = self._chunks(response)
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield chunk
+
+    def parse_provider_response(self, response: FakeResponse) -> ModelResponse:
+        usage = response.usage_metadata
+        return ModelResponse(
+            role="assistant",
+            content=response.content,
+            tool_calls=response.tool_calls,
+            response_usage=SimpleNamespace(input_tokens=usage.prompt_token_count, output_tokens=usage.candidates_token_count),
+        )
+
+    def parse_provider_response_delta(self, response: FakeResponse) -> ModelResponse:
+        return self.parse_provider_response(response)
+
+    def _respond(self, messages: List[Message]) -> FakeResponse:
+        input_chars = sum(len(str(message.content or "")) for message in messages)
+        input_chars += sum(len(json.dumps(function.to_dict())) for function in (self._functions or {}).values())
+        input_tokens = input_chars // self.chars_per_token
+
+        request = self._request(messages)
+        done = self._calls_since_request(messages)
+        steps = _plan.get().get(self.agent_name or "", [])
+        tool_calls = [call for call in (self._tool_call(step, request, index) for index, step in enumerate(steps)) if call is not None]
+        if done < len(tool_calls):
+            arguments = tool_calls[done]["function"]["arguments"]
+            return FakeResponse(None, [tool_calls[done]], input_tokens, len(arguments) // self.chars_per_token + 10)
+        answer = f"[{self.agent_name}] Done: {request[:80]}"
+        answer = (answer + " ") * max(self.output_tokens * self.chars_per_token // (len(answer) + 1), 1)
+        return FakeResponse(answer.strip(), [], input_tokens, self.output_tokens)
+
+    def _chunks(self, response: FakeResponse) -> List[FakeResponse]:
+        if response.tool_calls or not response.content:
+            return [response]
+        size = -(-len(response.content) // self.stream_chunks)
+        parts = [response.content[i : i + size] for i in range(0, len(response.content), size)]
+        usage = response.usage_metadata
+        # Token counts arrive with the last chunk, like a provider's running totals
+        return [FakeResponse(part, [], 0, 0) for part in parts[:-1]] + [
+            FakeResponse(parts[-1], [], usage.prompt_token_count, usage.candidates_token_count)
+        ]
+
+    @staticmethod
+    def _request(messages: List[Message]) -> str:
+        for message in reversed(messages):
+            if message.role == "user":
+                return str(message.content or "").split("\n\n<expected_output>")[0].strip()
+        return ""
+
+    @staticmethod
+    def _calls_since_request(messages: List[Message]) -> int:
+        calls = 0
+        for message in reversed(messages):
+            if message.role == "user":
+                break
+            if message.role == "assistant" and message.tool_calls:
+                calls += 1
+        return calls
+
+    def _tool_call(self, step: Any, request: str, index: int) -> Optional[Dict[str, Any]]:
+        arguments: Dict[str, Any] = {}
+        if isinstance(step, dict) and "parallel" in step:
+            name = "run_tasks_in_parallel"
+            tasks = [{"agent": agent, "task_description": request, **ARGUMENT_DEFAULTS} for agent in step["parallel"]]
+            arguments = {"tasks": json.dumps(tasks)}
+        elif isinstance(step, dict):
+            name, arguments = step["tool"], dict(step.get("args", {}))
+        else:
+            name = str(step)
+        functions = self._functions or {}
+        if name not in functions and f"transfer_task_to_{name}" in functions:
+            name = f"transfer_task_to_{name}"
+        if name not in functions:
+            logger.warning(f"{self.agent_name}: plan step {name} is not one of its tools, skipped")
+            return None
+        parameters = functions[name].parameters or {}
+        for parameter in parameters.get("required", []):
+            if parameter not in arguments:
+                arguments[parameter] = _placeholder(parameter, parameters.get("properties", {}).get(parameter, {}), request)
+        return {"id": f"call_{self.agent_name}_{index}", "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+
+def _placeholder(name: str, schema: Dict[str, Any], request: str) -> Any:
+    if name in ARGUMENT_DEFAULTS:
+        return ARGUMENT_DEFAULTS[name]
+    if name in TEXT_PARAMETERS:
+        return request
+    types = schema.get("type") or [option.get("type") for option in schema.get("anyOf", [])]
+    types = types if isinstance(types, list) else [types]
+    if "integer" in types or "number" in types:
+        return 1
+    if "boolean" in types:
+        return False
+    return f"fake-{name}"
+
+
+class FakeToolkit(Toolkit):
+    """A toolkit with the given function names and string parameters, each returning `result` after `latency` seconds."""
+
+    def __init__(self, name: str, functions: Dict[str, List[str]], latency: float = 0.02, results: Optional[Dict[str, str]] = None):
+        super().__init__(name=name)
+        self.latency: float = latency
+        self.results: Dict[str, str] = results or {}
+        # The booking toolkits (Zoom, Calendar) report their bookings here; the fakes book nothing
+        self.booking_listeners: List[Any] = []
+        for function_name, parameters in functions.items():
+            function = self._fake_function(function_name, parameters)
+            # Also callable directly, like the methods of a real toolkit (ZoomMeetingsSource calls list_meetings)
+            setattr(self, function_name, function)
+            self.register(function)
+
+    def call(self, function_name: str, **kwargs: Any) -> str:
+        time.sleep(self.latency)
+        return self.results.get(function_name, json.dumps({"status": "ok", "function": function_name}))
+
+    def _fake_function(self, function_name: str, parameters: List[str]):
+        def function(**kwargs: Any) -> str:
+            return self.call(function_name, **kwargs)
+
+        function.__name__ = function_name
+        function.__doc__ = f"Fake {function_name.replace('_', ' ')}.\n\nArgs:\n" + "".join(
+            f"    {parameter} (str): The {parameter.replace('_', ' ')}.\n" for parameter in parameters
+        )
+        function.__signature__ = inspect.Signature(
+            [inspect.Parameter(parameter, inspect.Parameter.KEYWORD_ONLY, annotation=str) for parameter in parameters],
+            return_annotation=str,
+        )
+        function.__annotations__ = {**{parameter: str for parameter in parameters}, "return": str}
+        return function
+
+
+# Function names and parameters of the agno toolkits used by final_prototype
+SLACK_FUNCTIONS = {"send_message": ["channel", "text"], "list_channels": [], "get_channel_history": ["channel"]}
+ZOOM_FUNCTIONS = {
+    "schedule_meeting": ["topic", "start_time", "duration"],
+    "get_upcoming_meetings": [],
+    "list_meetings": ["type"],
+    "get_meeting": ["meeting_id"],
+    "get_meeting_recordings": ["meeting_id"],
+    "delete_meeting": ["meeting_id"],
+}
+GMAIL_FUNCTIONS = {
+    "get_latest_emails": ["count"],
+    "get_unread_emails": ["count"],
+    "get_emails_from_user": ["user", "count"],
+    "search_emails": ["query", "count"],
+    "create_draft_email": ["to", "subject", "body"],
+    "send_email": ["to", "subject", "body"],
+}
+CALENDAR_FUNCTIONS = {"list_events": ["limit", "date_from"], "create_event": ["start_datetime", "end_datetime", "title", "description"]}
+COMPOSIO_ACTIONS = {
+    "GOOGLEDOCS_CREATE_DOCUMENT": ["title", "text"],
+    "GOOGLEDOCS_CREATE_DOCUMENT_MARKDOWN": ["title", "markdown_text"],
+    "GOOGLEDOCS_UPDATE_DOCUMENT_MARKDOWN": ["document_id", "new_markdown_text"],
+    "GOOGLEDOCS_UPDATE_EXISTING_DOCUMENT": ["document_id", "editDocs"],
+    "GOOGLEDOCS_GET_DOCUMENT_BY_ID": ["id"],
+    "GOOGLESHEETS_BATCH_UPDATE": ["spreadsheet_id", "sheet_name", "values"],
+    "GOOGLESHEETS_SHEET_FROM_JSON": ["title", "sheet_name", "sheet_json"],
+    "GOOGLESHEETS_LOOKUP_SPREADSHEET_ROW": ["spreadsheet_id", "query"],
+    "GOOGLESHEETS_BATCH_GET": ["spreadsheet_id", "ranges"],
+    "GOOGLESHEETS_GET_SPREADSHEET_INFO": ["spreadsheet_id"],
+    "GOOGLESHEETS_CREATE_GOOGLE_SHEET1": ["title"],
+    "GOOGLESHEETS_CLEAR_VALUES": ["spreadsheet_id", "range"],
+}
+
+
+def fake_slack_tools(latency: float = 0.02) -> FakeToolkit:
+    return FakeToolkit("slack", SLACK_FUNCTIONS, latency)
+
+
+def fake_zoom_tools(latency: float = 0.02) -> FakeToolkit:
+    # ZoomMeetingsSource reads list_meetings for the availability index
+    return FakeToolkit("zoom_tool", ZOOM_FUNCTIONS, latency, results={"list_meetings": json.dumps({"meetings": []})})
+
+
+def fake_gmail_tools(latency: float = 0.02) -> FakeToolkit:
+    return FakeToolkit("gmail_tools", GMAIL_FUNCTIONS, latency)
+
+
+class FakeCalendarTools(FakeToolkit):
+    def __init__(self, latency: float = 0.02):
+        super().__init__("google_calendar_tools", CALENDAR_FUNCTIONS, latency)
+
+    def free_busy(self, attendees: List[str], start: Any, end: Any) -> Dict[str, List[Any]]:
+        """Busy source for AvailabilityTools: everyone is free."""
+        time.sleep(self.latency)
+        return {attendee: [] for attendee in attendees}
+
+
+class FakeComposioToolSet:
+    """The parts of ComposioToolSet used by ToolSchemaCache and ComposioSheetsBackend, without the network."""
+
+    def __init__(self, latency: float = 0.02):
+        self.entity_id = "default"
+        self.latency: float = latency
+        self._requested_actions: List[str] = []
+
+    def validate_tools(self, actions: Any = None) -> None:
+        pass
+
+    def get_action_schemas(self, actions: List[Any], _populate_requested: bool = False) -> List[Dict[str, Any]]:
+        from workplace.composio_cache import action_key
+
+        keys = [action_key(action) for action in actions]
+        if _populate_requested:
+            self._requested_actions.extend(keys)
+        return [{"name": key, "description": f"Fake {key}", "parameters": COMPOSIO_ACTIONS.get(key, ["input"])} for key in keys]
+
+    def _wrap_tool(self, schema: Dict[str, Any], entity_id: Optional[str] = None, skip_default: bool = False) -> Toolkit:
+        return FakeToolkit(schema["name"], {schema["name"]: schema["parameters"]}, self.latency)
+
+    def execute_action(self, action: Any, params: Dict[str, Any], entity_id: Optional[str] = None) -> Dict[str, Any]:
+        time.sleep(self.latency)
+        return {"successful": True, "data": {"updatedRange": params.get("sheet_name", "Sheet1")}}
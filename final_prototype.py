@@ -1,54 +1,215 @@
 import os
-import datetime
+from functools import lru_cache
 from typing import Optional, Iterator, Dict, Any
-from tzlocal import get_localzone_name
 from pydantic import BaseModel, Field, AnyUrl, root_validator
 
 from agno.agent import Agent, AgentMemory
-from agno.models.google import Gemini
 from agno.playground.serve import serve_playground_app
 from agno.playground import Playground
 from agno.storage.workflow.sqlite import SqliteWorkflowStorage
 from agno.utils.pprint import pprint_run_response
 from agno.utils.log import logger
 
-from agno.tools.googlecalendar import GoogleCalendarTools
-from agno.tools.gmail import GmailTools
 from agno.tools.googlesheets import GoogleSheetsTools
-from agno.tools.zoom import ZoomTools
-from agno.tools.slack import SlackTools
 from agno.memory.db.sqlite import SqliteMemoryDb
-from composio_agno import Action, ComposioToolSet
-from agno.storage.agent.sqlite import SqliteAgentStorage
+from composio_agno import Action
+
+from workplace.availability import AvailabilityTools, ZoomMeetingsSource
+from workplace.budget import BudgetLimits
+from workplace.compaction import ToolOutputCompactor, ToolOutputStore, ToolOutputTools
+from workplace.composio_cache import ToolSchemaCache
+from workplace.delegation import ParallelDelegationTools
+from workplace.gemini import CachedPrefixGemini, PrefixCacheStore
+from workplace.google_cache import ReadThroughCache
+from workplace.google_tools import CachedGmailTools, CachedGoogleCalendarTools
+from workplace.history import SessionHistoryCache
+from workplace.jobs import JobQueue, get_jobs_router
+from workplace.pooled_tools import PooledComposioToolSet, PooledSlackTools, PooledZoomTools
+from workplace.prompts import with_current_datetime
+from workplace.ratelimit import RateLimit, RetryScheduler
+from workplace.registry import AgentRegistry
+from workplace.response_cache import CachedResponseAgent, ResponseCache
+from workplace.router import KeywordRouter, RoutedAgent
+from workplace.serving import PreforkServer
+from workplace.sheets import ComposioSheetsBackend, SheetsWriteBuffer, SheetsWriteTools
+from workplace.streaming import StreamingTeamAgent
+from workplace.storage import PooledSqliteAgentStorage
+from workplace.tracing import JsonlSpanExporter, OtlpHttpSpanExporter, Tracer, instrument
+from workplace.transport import HttpTransport
 
 from dotenv import load_dotenv
 load_dotenv()
 
+# Spans for every agent run, model call, tool call and storage read/write. instrument() patches
+# agno's Agent, FunctionCall and Gemini classes for the whole process.
+# Written to TRACE_FILE if set (e.g. tmp/traces.jsonl; rotated at TRACE_FILE_MAX_MB) and, if
+# configured, an OpenTelemetry collector.
+span_exporters = []
+if os.getenv("TRACE_FILE"):
+    span_exporters.append(JsonlSpanExporter(os.getenv("TRACE_FILE"), max_bytes=int(os.getenv("TRACE_FILE_MAX_MB", "100")) * 1024 * 1024))
+if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+    span_exporters.append(OtlpHttpSpanExporter(os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")))
+tracer = instrument(Tracer(exporters=span_exporters))
+
+web_workers = int(os.getenv("WEB_WORKERS", "1"))
+
+# Gemini and the Google, Slack, Zoom and Composio APIs each get one rate limit (calls per second,
+# split between the web workers) shared by every agent. A 429 slows all callers down together with
+# a shared, jittered backoff instead of each agent retrying on its own; repeated 5xx open a circuit
+# breaker so calls fail fast. Background jobs wait behind interactive requests, and an interactive
+# call never waits more than RATE_LIMIT_MAX_WAIT seconds. RATE_LIMITS=0 turns it off.
+# The agents are built with retries=0: retrying is the scheduler's job, and an agent re-running
+# its whole turn on top of it would multiply the calls an upstream that is already throttling gets.
+def rate_limit(variable: str, default: str) -> RateLimit:
+    return RateLimit(
+        rate=float(os.getenv(variable, default)) / web_workers,
+        max_wait=float(os.getenv("RATE_LIMIT_MAX_WAIT", "30")),
+    )
+
+rate_limits = RetryScheduler({
+    "gemini": rate_limit("GEMINI_RATE_LIMIT", "10"),
+    "google": rate_limit("GOOGLE_API_RATE_LIMIT", "10"),
+    "slack": rate_limit("SLACK_RATE_LIMIT", "1"),
+    "zoom": rate_limit("ZOOM_RATE_LIMIT", "10"),
+    "composio": rate_limit("COMPOSIO_RATE_LIMIT", "10"),
+}) if os.getenv("RATE_LIMITS", "1") == "1" else None
+
 # Define common model and storage for all agents
-model = Gemini(id='gemini-2.0-flash')
-agent_storage = SqliteAgentStorage(table_name="proto_testing", db_file="tmp/proto_testing.db")
-
-# Initialize all tools
-slack_tools = SlackTools()
-zoom_tools = ZoomTools(
-    account_id="ACCOUNT_ID",
-    client_id="CLIENT_ID",
-    client_secret="CLIENT_SECRET"
+# The static part of every system message is sent through Gemini context caching;
+# only the current date is rendered per request (see workplace/prompts.py)
+model = CachedPrefixGemini(id='gemini-2.0-flash', prefix_cache=PrefixCacheStore(), scheduler=rate_limits)
+# WAL + pooled connections, session writes are batched in the background.
+# Turns read history from an in-memory window of the last 10 runs (the largest num_history_responses below).
+# With several web workers (WEB_WORKERS > 1) every process serves every session: writes reach SQLite
+# before the turn ends and cached windows are checked against the stored version.
+# SQLite keeps the last SESSION_MAX_STORED_RUNS runs of a session, so writing it back does not get
+# slower as the session grows.
+agent_storage = PooledSqliteAgentStorage(
+    table_name="proto_testing",
+    db_file="tmp/proto_testing.db",
+    history_cache=SessionHistoryCache(num_runs=10, max_sessions=1000),
+    shared=web_workers > 1,
+    max_stored_runs=int(os.getenv("SESSION_MAX_STORED_RUNS", "100")),
+    max_stored_messages=int(os.getenv("SESSION_MAX_STORED_MESSAGES", "400")),
+)
+
+# Opt-in (RESPONSE_CACHE=1): the generative email_writer answers repeated or near-duplicate requests
+# from a local cache. Runs that call tools and follow-ups within a session are never cached; the
+# writer_agent is not wrapped, since its Docs tools create documents.
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000")),
+    threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.9")),
+) if os.getenv("RESPONSE_CACHE", "0") == "1" else None
+
+# Slack, Zoom, Google and Composio calls share one keep-alive connection pool (HTTP/2 with servers
+# that support it), and their access tokens are refreshed once for all concurrent callers
+http_transport = HttpTransport(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+    timeout=float(os.getenv("HTTP_TIMEOUT_SECONDS", "30")),
+    http2=os.getenv("HTTP2", "1") == "1",
+    scheduler=rate_limits,
+)
+
+# Toolkits are built on first use and shared by every agent that needs them
+@lru_cache(maxsize=None)
+def get_slack_tools() -> PooledSlackTools:
+    return PooledSlackTools(http_transport)
+
+@lru_cache(maxsize=None)
+def get_zoom_tools() -> PooledZoomTools:
+    return PooledZoomTools(
+        http_transport,
+        account_id="ACCOUNT_ID",
+        client_id="CLIENT_ID",
+        client_secret="CLIENT_SECRET"
+    )
+
+# Inbox listings, messages and calendar events are answered locally until the mailbox history ID
+# or the calendar sync token reports a change (checked at most every GOOGLE_CACHE_CHECK_SECONDS)
+google_api_cache = ReadThroughCache(
+    max_entries=int(os.getenv("GOOGLE_CACHE_MAX_ENTRIES", "512")),
+    check_interval=float(os.getenv("GOOGLE_CACHE_CHECK_SECONDS", "30")),
+)
+
+# Tool results larger than TOOL_OUTPUT_MAX_TOKENS (a Docs document, a Sheets range, a page of emails)
+# reach the model compacted: tables as column statistics, long text cut. The full output is saved in
+# tmp/tool_outputs under a handle the agent pages through with read_tool_output / search_tool_output.
+# The agents given these tools get compaction; TOOL_OUTPUT_COMPACTION=0 turns it off.
+tool_output_compactor = ToolOutputCompactor(
+    ToolOutputStore("tmp/tool_outputs"),
+    max_tokens=int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "2000")),
+    page_tokens=int(os.getenv("TOOL_OUTPUT_PAGE_TOKENS", "1500")),
 )
-gmail_tools = GmailTools(credentials_path='credentials.json')
-google_calendar_tools = GoogleCalendarTools(credentials_path='credentials.json',token_path='calender.json')
-toolset = ComposioToolSet(api_key="API_KEY_HERE")
+tool_output_tools = [ToolOutputTools(tool_output_compactor)] if os.getenv("TOOL_OUTPUT_COMPACTION", "1") == "1" else []
+
+@lru_cache(maxsize=None)
+def get_gmail_tools() -> CachedGmailTools:
+    return CachedGmailTools(cache=google_api_cache, transport=http_transport, credentials_path='credentials.json')
+
+@lru_cache(maxsize=None)
+def get_google_calendar_tools() -> CachedGoogleCalendarTools:
+    return CachedGoogleCalendarTools(cache=google_api_cache, transport=http_transport, credentials_path='credentials.json',token_path='calender.json')
+
+# Free/busy questions are answered from a local interval index fed by the Calendar free/busy API and
+# the Zoom meeting list, shared by the calendar and meeting agents. Events and meetings booked through
+# those agents are added to it right away.
+@lru_cache(maxsize=None)
+def get_availability_tools() -> AvailabilityTools:
+    availability_tools = AvailabilityTools(
+        sources=[get_google_calendar_tools().free_busy, ZoomMeetingsSource(get_zoom_tools())],
+        refresh_interval=float(os.getenv("AVAILABILITY_REFRESH_SECONDS", "300")),
+        timezone=os.getenv("WORKDAY_TIMEZONE", "UTC"),
+        workday_start=os.getenv("WORKDAY_START", "09:00"),
+        workday_end=os.getenv("WORKDAY_END", "17:00"),
+    )
+    get_google_calendar_tools().booking_listeners.append(availability_tools.add_booking)
+    get_zoom_tools().booking_listeners.append(availability_tools.add_booking)
+    return availability_tools
+
+@lru_cache(maxsize=None)
+def get_composio_toolset() -> PooledComposioToolSet:
+    return PooledComposioToolSet(api_key="API_KEY_HERE", transport=http_transport)
+
+# Composio action schemas are fetched once per action and reused across agents and restarts
+@lru_cache(maxsize=None)
+def get_composio_schema_cache() -> ToolSchemaCache:
+    return ToolSchemaCache(
+        get_composio_toolset(),
+        path="tmp/composio_schemas.json",
+        ttl=float(os.getenv("COMPOSIO_SCHEMA_CACHE_TTL", 24 * 60 * 60)),
+    )
+
+# Row writes from the data entry agent are coalesced into batched GOOGLESHEETS_BATCH_UPDATE calls,
+# per session. The agent writes its rows with flush_rows at the end of its task; rows of a sheet that
+# got no new rows for SHEETS_BUFFER_FLUSH_SECONDS are written anyway.
+@lru_cache(maxsize=None)
+def get_sheets_write_tools() -> SheetsWriteTools:
+    return SheetsWriteTools(
+        SheetsWriteBuffer(
+            ComposioSheetsBackend(get_composio_toolset()),
+            max_rows=int(os.getenv("SHEETS_BUFFER_MAX_ROWS", "500")),
+            flush_interval=float(os.getenv("SHEETS_BUFFER_FLUSH_SECONDS", "30")),
+        )
+    )
+
+# Specialist agents are registered here and built the first time a task is delegated to them.
+# Agents with a team are StreamingTeamAgents: while a streamed request is delegated down the tree,
+# each member's output reaches the Playground as it is generated.
+registry = AgentRegistry()
 
 #---------- COMMUNICATION AGENTS ----------#
 
-slack_agent = Agent(
-    name="slack-agent",
-    description="This agent is a slack app bot",
-    role="slack-app-bot",
-    model=model,
-    tools=[slack_tools],
-    retries=3,
-    system_message=f"""You are a specialized Slack assistant capable of interacting with Slack channels and users.
+@registry.register("slack_agent", name="slack-agent", role="slack-app-bot")
+def build_slack_agent() -> Agent:
+    return Agent(
+        name="slack-agent",
+        description="This agent is a slack app bot",
+        role="slack-app-bot",
+        model=model,
+        tools=[get_slack_tools()],
+        retries=0,
+        system_message=with_current_datetime("""You are a specialized Slack assistant capable of interacting with Slack channels and users.
     
     Your capabilities include:
     1. Message Management:
@@ -66,20 +227,22 @@ slack_agent = Agent(
        - Format messages appropriately for Slack
        - Follow organizational communication protocols
     
-    Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')} and timezone is {get_localzone_name()}
-    """,
-    add_datetime_to_instructions=True,
-    add_history_to_messages=True,
-    num_history_responses=3,
-    storage=agent_storage,
-    show_tool_calls=True
-)
+    """),
+        add_history_to_messages=True,
+        num_history_responses=3,
+        storage=agent_storage,
+        show_tool_calls=True
+    )
 
-zoom_agent = Agent(
-    name='meeting-scheduler',
-    description='This agent is a meeting scheduler',
-    role='meeting-scheduler',
-    system_message=f"""
+slack_agent = registry.lazy("slack_agent")
+
+@registry.register("zoom_agent", name="meeting-scheduler", role="meeting-scheduler")
+def build_zoom_agent() -> Agent:
+    return Agent(
+        name='meeting-scheduler',
+        description='This agent is a meeting scheduler',
+        role='meeting-scheduler',
+        system_message=with_current_datetime("""
     You are a specialized meeting scheduler with comprehensive Zoom meeting management capabilities.
     
     Your capabilities include:
@@ -103,27 +266,34 @@ zoom_agent = Agent(
        - Send reminders to participants
        - Provide meeting summaries and follow-ups
     
-    Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')} and timezone is {get_localzone_name()}
-    """,
-    model=model,
-    tools=[zoom_tools],
-    add_datetime_to_instructions=True,
-    add_history_to_messages=True,
-    num_history_responses=3,
-    storage=agent_storage,
-    show_tool_calls=True,
-    instructions=["You are a online meeting application manager can schedule and do other meeting works"],
-)
+    5. Choosing Meeting Times:
+       - Pick meeting times with find_common_slots instead of comparing event lists yourself
+       - Confirm the time with check_availability before scheduling
+    
+    """),
+        model=model,
+        tools=[get_zoom_tools(), get_availability_tools()],
+        add_history_to_messages=True,
+        num_history_responses=3,
+        storage=agent_storage,
+        show_tool_calls=True,
+    )
+
+zoom_agent = registry.lazy("zoom_agent")
 
 #---------- GOOGLE WORKSPACE AGENTS ----------#
 
-email_writer = Agent(
-    name="email-writer",
-    description="This agent is a specialized email writer that generates professional and effective emails",
-    role="email-writer",
-    model=model,
-    retries=3,
-    system_message=f"""
+@registry.register("email_writer", name="email-writer", role="email-writer")
+def build_email_writer() -> Agent:
+    return CachedResponseAgent(
+        response_cache=response_cache,
+        response_cache_ttl=float(os.getenv("EMAIL_WRITER_CACHE_TTL", 60 * 60)),
+        name="email-writer",
+        description="This agent is a specialized email writer that generates professional and effective emails",
+        role="email-writer",
+        model=model,
+        retries=0,
+        system_message=with_current_datetime("""
     You are an expert email writer with a deep understanding of professional communication standards.
     Your role is to generate high-quality, effective emails based on given contexts and requirements.
     
@@ -151,24 +321,26 @@ email_writer = Agent(
         - Maintain consistent formatting
         - Always include sender's name: Gokula Prasath S
     
-    Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')} and timezone is {get_localzone_name()}
-    """,
-    add_datetime_to_instructions=True,
-    add_history_to_messages=True,
-    storage=agent_storage,
-    num_history_responses=10,
-    show_tool_calls=True,
-)
+    """),
+        add_history_to_messages=True,
+        storage=agent_storage,
+        num_history_responses=10,
+        show_tool_calls=True,
+    )
 
-gmail_agent = Agent(
-    name="gmail-agent",
-    description="This agent is a gmail app bot",
-    role="gmail-app-bot",
-    model=model,
-    team=[email_writer],
-    tools=[gmail_tools],
-    retries=3,
-    system_message=f"""
+email_writer = registry.lazy("email_writer")
+
+@registry.register("gmail_agent", name="gmail-agent", role="gmail-app-bot")
+def build_gmail_agent() -> Agent:
+    return StreamingTeamAgent(
+        name="gmail-agent",
+        description="This agent is a gmail app bot",
+        role="gmail-app-bot",
+        model=model,
+        team=[email_writer],
+        tools=[get_gmail_tools()] + tool_output_tools,
+        retries=0,
+        system_message=with_current_datetime("""
     You are an advanced Gmail assistant that can read, compose, and send emails efficiently.
     
     IMPORTANT WORKFLOW INSTRUCTIONS:
@@ -197,27 +369,29 @@ gmail_agent = Agent(
        - For complex requests: Break down into clear components for email_writer
        - For follow-ups: Reference previous communications
     
-    Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')} and timezone is {get_localzone_name()}
-    """,
-    add_datetime_to_instructions=True,
-    add_history_to_messages=True,
-    storage=agent_storage,
-    num_history_responses=10,
-    show_tool_calls=True
-)
+    """),
+        add_history_to_messages=True,
+        storage=agent_storage,
+        num_history_responses=10,
+        show_tool_calls=True
+    )
 
-writer_agent = Agent(
-    name="writer-agent",
-    description="This agent is a specialized creative writer that generates high-quality content based on given topics",
-    role="creative-writer",
-    model=model,
-    tools=toolset.get_tools(actions=[
-        Action.GOOGLEDOCS_CREATE_DOCUMENT,
-        Action.GOOGLEDOCS_CREATE_DOCUMENT_MARKDOWN,
-        Action.GOOGLEDOCS_UPDATE_DOCUMENT_MARKDOWN,
-    ]),
-    retries=3,
-    system_message=f"""
+gmail_agent = registry.lazy("gmail_agent")
+
+@registry.register("writer_agent", name="writer-agent", role="creative-writer")
+def build_writer_agent() -> Agent:
+    return Agent(
+        name="writer-agent",
+        description="This agent is a specialized creative writer that generates high-quality content based on given topics",
+        role="creative-writer",
+        model=model,
+        tools=get_composio_schema_cache().get_tools(actions=[
+            Action.GOOGLEDOCS_CREATE_DOCUMENT,
+            Action.GOOGLEDOCS_CREATE_DOCUMENT_MARKDOWN,
+            Action.GOOGLEDOCS_UPDATE_DOCUMENT_MARKDOWN,
+        ]),
+        retries=0,
+        system_message=with_current_datetime("""
     You are an expert creative writer with a deep understanding of various writing styles and formats.
     Ensure markdown format.
     Your role is to generate high-quality, engaging content based on given topics.
@@ -243,27 +417,28 @@ writer_agent = Agent(
         - Use varied sentence structures
         - Incorporate relevant examples and evidence
     
-    Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')} and timezone is {get_localzone_name()}
-    """,
-    add_datetime_to_instructions=True,
-    add_history_to_messages=True,
-    storage=agent_storage,
-    num_history_responses=3,
-    show_tool_calls=True,
-)
+    """),
+        add_history_to_messages=True,
+        storage=agent_storage,
+        num_history_responses=3,
+        show_tool_calls=True,
+    )
 
-data_entry_agent = Agent(
-    name="data-entry-agent",
-    description="This agent specializes in data entry operations for Google Sheets",
-    role="data-entry-specialist",
-    model=model,
-    tools=toolset.get_tools(actions=[
-        Action.GOOGLESHEETS_BATCH_UPDATE,
-        Action.GOOGLESHEETS_SHEET_FROM_JSON,
-        Action.GOOGLESHEETS_LOOKUP_SPREADSHEET_ROW
-    ]),
-    retries=3,
-    system_message=f"""
+writer_agent = registry.lazy("writer_agent")
+
+@registry.register("data_entry_agent", name="data-entry-agent", role="data-entry-specialist")
+def build_data_entry_agent() -> Agent:
+    return Agent(
+        name="data-entry-agent",
+        description="This agent specializes in data entry operations for Google Sheets",
+        role="data-entry-specialist",
+        model=model,
+        # Row writes go through the write buffer only (append_rows, write_json_rows, flush_rows)
+        tools=get_composio_schema_cache().get_tools(actions=[
+            Action.GOOGLESHEETS_LOOKUP_SPREADSHEET_ROW
+        ]) + [get_sheets_write_tools()] + tool_output_tools,
+        retries=0,
+        system_message=with_current_datetime("""
     You are a specialized data entry agent for Google Sheets with expertise in:
     
     1. Data Formatting and Validation:
@@ -286,29 +461,35 @@ data_entry_agent = Agent(
        - Extract data based on search criteria
        - Perform lookups across multiple sheets
     
-    Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')} and timezone is {get_localzone_name()}
-    """,
-    add_datetime_to_instructions=True,
-    add_history_to_messages=True,
-    storage=agent_storage,
-    num_history_responses=10,
-    show_tool_calls=True,
-)
+    5. Writing Rows:
+       - Queue rows with append_rows or write_json_rows, as many calls as needed
+       - When all rows are queued, call flush_rows once and report its result
+    
+    """),
+        add_history_to_messages=True,
+        storage=agent_storage,
+        num_history_responses=10,
+        show_tool_calls=True,
+    )
 
-google_sheets_agent = Agent(
-    name="google-sheets-agent",
-    description="This agent manages Google Sheets operations and collaborates with the data entry agent",
-    role="sheets-management-bot",
-    model=model,
-    team=[data_entry_agent],
-    tools=toolset.get_tools(actions=[
-        Action.GOOGLESHEETS_BATCH_GET,
-        Action.GOOGLESHEETS_GET_SPREADSHEET_INFO,
-        Action.GOOGLESHEETS_CREATE_GOOGLE_SHEET1,
-        Action.GOOGLESHEETS_CLEAR_VALUES
-    ]),
-    retries=3,
-    system_message=f"""
+data_entry_agent = registry.lazy("data_entry_agent")
+
+@registry.register("google_sheets_agent", name="google-sheets-agent", role="sheets-management-bot")
+def build_google_sheets_agent() -> Agent:
+    return StreamingTeamAgent(
+        name="google-sheets-agent",
+        description="This agent manages Google Sheets operations and collaborates with the data entry agent",
+        role="sheets-management-bot",
+        model=model,
+        team=[data_entry_agent],
+        tools=get_composio_schema_cache().get_tools(actions=[
+            Action.GOOGLESHEETS_BATCH_GET,
+            Action.GOOGLESHEETS_GET_SPREADSHEET_INFO,
+            Action.GOOGLESHEETS_CREATE_GOOGLE_SHEET1,
+            Action.GOOGLESHEETS_CLEAR_VALUES
+        ]) + tool_output_tools,
+        retries=0,
+        system_message=with_current_datetime("""
     You are a specialized Google Sheets management agent that works in tandem with a data entry agent.
     Your primary responsibilities include:
     
@@ -332,30 +513,32 @@ google_sheets_agent = Agent(
        - Ensure data consistency across sheets
        - Maintain proper data relationships
     
-    Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')} and timezone is {get_localzone_name()}
-    """,
-    add_datetime_to_instructions=True,
-    add_history_to_messages=True,
-    storage=agent_storage,
-    num_history_responses=10,
-    show_tool_calls=True,
-)
+    """),
+        add_history_to_messages=True,
+        storage=agent_storage,
+        num_history_responses=10,
+        show_tool_calls=True,
+    )
 
-google_docs_agent = Agent(
-    name="google-docs-agent",
-    description="This agent manages Google Docs operations and collaborates with the writer agent",
-    role="google-docs-app-bot",
-    model=model,
-    team=[writer_agent],
-    tools=toolset.get_tools(actions=[
-        Action.GOOGLEDOCS_CREATE_DOCUMENT,
-        Action.GOOGLEDOCS_CREATE_DOCUMENT_MARKDOWN,
-        Action.GOOGLEDOCS_UPDATE_EXISTING_DOCUMENT,
-        Action.GOOGLEDOCS_GET_DOCUMENT_BY_ID,
-        Action.GOOGLEDOCS_UPDATE_DOCUMENT_MARKDOWN,
-    ]),
-    retries=3,
-    system_message=f"""
+google_sheets_agent = registry.lazy("google_sheets_agent")
+
+@registry.register("google_docs_agent", name="google-docs-agent", role="google-docs-app-bot")
+def build_google_docs_agent() -> Agent:
+    return StreamingTeamAgent(
+        name="google-docs-agent",
+        description="This agent manages Google Docs operations and collaborates with the writer agent",
+        role="google-docs-app-bot",
+        model=model,
+        team=[writer_agent],
+        tools=get_composio_schema_cache().get_tools(actions=[
+            Action.GOOGLEDOCS_CREATE_DOCUMENT,
+            Action.GOOGLEDOCS_CREATE_DOCUMENT_MARKDOWN,
+            Action.GOOGLEDOCS_UPDATE_EXISTING_DOCUMENT,
+            Action.GOOGLEDOCS_GET_DOCUMENT_BY_ID,
+            Action.GOOGLEDOCS_UPDATE_DOCUMENT_MARKDOWN,
+        ]) + tool_output_tools,
+        retries=0,
+        system_message=with_current_datetime("""
     You are a specialized Google Docs management agent that works in tandem with a writer agent.
     Your primary responsibilities include:
     
@@ -374,23 +557,25 @@ google_docs_agent = Agent(
        - Maintain document organization
        - Ensure proper rendering of markdown and special formatting - use writer agent
     
-    Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')} and timezone is {get_localzone_name()}
-    """,
-    add_datetime_to_instructions=True,
-    add_history_to_messages=True,
-    storage=agent_storage,
-    num_history_responses=3,
-    show_tool_calls=True,
-)
+    """),
+        add_history_to_messages=True,
+        storage=agent_storage,
+        num_history_responses=3,
+        show_tool_calls=True,
+    )
 
-google_calendar_agent = Agent(
-    name="google-calendar-agent",
-    description="This agent manages Google Calendar operations",
-    role="calendar-scheduling-assistant",
-    model=model,
-    tools=[google_calendar_tools],
-    retries=3,
-    system_message=f"""
+google_docs_agent = registry.lazy("google_docs_agent")
+
+@registry.register("google_calendar_agent", name="google-calendar-agent", role="calendar-scheduling-assistant")
+def build_google_calendar_agent() -> Agent:
+    return Agent(
+        name="google-calendar-agent",
+        description="This agent manages Google Calendar operations",
+        role="calendar-scheduling-assistant",
+        model=model,
+        tools=[get_google_calendar_tools(), get_availability_tools()],
+        retries=0,
+        system_message=with_current_datetime("""
     You are a specialized Google Calendar scheduling assistant with comprehensive calendar management capabilities.
     
     Your capabilities include:
@@ -414,23 +599,68 @@ google_calendar_agent = Agent(
        - Avoid scheduling conflicts
        - Provide calendar availability summaries
     
-    Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')} and timezone is {get_localzone_name()}
-    """,
-    add_datetime_to_instructions=True,
-    add_history_to_messages=True,
-    storage=agent_storage,
-    num_history_responses=10,
-    show_tool_calls=True,
-)
+    5. Checking Availability:
+       - Find free time with find_common_slots instead of comparing event lists yourself
+       - Check for conflicts with check_availability before creating an event
+    
+    """),
+        add_history_to_messages=True,
+        storage=agent_storage,
+        num_history_responses=10,
+        show_tool_calls=True,
+    )
+
+google_calendar_agent = registry.lazy("google_calendar_agent")
 
 #---------- MANAGER AGENT ----------#
 
+# Lets the master fan independent subtasks out to several agents in one tool call
+parallel_delegation_tools = ParallelDelegationTools(
+    agents={
+        "slack_agent": slack_agent,
+        "gmail_agent": gmail_agent,
+        "zoom_agent": zoom_agent,
+        "google_docs_agent": google_docs_agent,
+        "google_sheets_agent": google_sheets_agent,
+        "google_calendar_agent": google_calendar_agent,
+        "writer_agent": writer_agent,
+        "data_entry_agent": data_entry_agent,
+        "email_writer": email_writer,
+    },
+    max_workers=int(os.getenv("DELEGATION_MAX_WORKERS", "8")),
+)
+
+# Single-service requests matching exactly one of these rules skip the master's model call
+# and go straight to that member; anything else is planned by the master as usual
+ROUTING_RULES = {
+    "slack-agent": [r"\bslack\b", r"(^|\s)#[\w-]+"],
+    "gmail-agent": [r"\b(e-?mails?|gmail|inbox)\b"],
+    "meeting-scheduler": [r"\bzoom\b"],
+    "google-calendar-agent": [r"\bcalendar\b", r"\b(events?|appointments?)\b"],
+    "google-docs-agent": [r"\bdoc(ument)?s?\b"],
+    "google-sheets-agent": [r"\b(spread)?sheets?\b"],
+}
+router = KeywordRouter(ROUTING_RULES)
+
+# Caps what a single request may spend across the whole agent tree (model calls, delegation depth,
+# wall time, tokens); repeated delegations of the same task reuse the first result
+request_budget = BudgetLimits(
+    max_model_calls=int(os.getenv("REQUEST_MAX_MODEL_CALLS", "40")),
+    max_depth=int(os.getenv("REQUEST_MAX_DEPTH", "3")),
+    max_seconds=float(os.getenv("REQUEST_MAX_SECONDS", "300")),
+    max_tokens=int(os.getenv("REQUEST_MAX_TOKENS", "400000")),
+) if os.getenv("REQUEST_BUDGET", "1") == "1" else None
+
 # Modifying master_agent to directly manage all specialized agents
-master_agent = Agent(
+master_agent = RoutedAgent(
+    router=router if os.getenv("FAST_PATH_ROUTER", "1") == "1" else None,
+    budget=request_budget,
     model=model,
     name="master-agent",
+    # Fixed, so the Playground and stored sessions see the same agent in every worker process and after restarts
+    agent_id="master-agent",
     description="This agent is the master controller for all communication and productivity tools",
-    system_message=f"""
+    system_message=with_current_datetime("""
     You are an advanced digital workplace assistant that directly manages all communication and productivity tools.
     
     Your capabilities include:
@@ -468,8 +698,11 @@ master_agent = Agent(
        - Confirm successful completion of tasks across all platforms
        - Present unified responses across multiple platforms
     
-    Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')} and timezone is {get_localzone_name()}
-    """,
+    6. Parallel Delegation:
+       - When a request has independent subtasks for different agents (e.g. email John, post in Slack and book a Zoom call), send them together with run_tasks_in_parallel instead of transferring them one by one
+       - Transfer tasks one at a time only when a task needs the output of another
+    
+    """),
     role="Master digital workplace assistant",
     # Directly manage all specialized agents
     team=[
@@ -486,6 +719,7 @@ master_agent = Agent(
         data_entry_agent,
         email_writer
     ],
+    tools=[parallel_delegation_tools],
     storage=agent_storage,
     add_history_to_messages=True,
     num_history_responses=5,
@@ -505,5 +739,66 @@ master_agent = Agent(
 
 app = Playground(agents=[master_agent]).get_app()
 
+# Long-running workflows (docs generation, bulk email) can be submitted as jobs: POST /v1/jobs returns
+# a job ID right away and the agent runs on a worker pool, with job state kept in the same SQLite DB.
+# Jobs go to the master agent unless an agent_id of a specialist (e.g. "gmail_agent") is given.
+# Job workers start with the app, in each web worker process. Finished jobs are deleted after
+# JOB_RETENTION_DAYS.
+job_queue = JobQueue(
+    {"master": master_agent, **{key: registry.lazy(key) for key in registry.keys}},
+    storage=SqliteWorkflowStorage(table_name="agent_jobs", db_file="tmp/proto_testing.db"),
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    recovery_lock="tmp/agent_jobs.lock",
+    start=False,
+    retention=float(os.getenv("JOB_RETENTION_DAYS", "30")) * 24 * 60 * 60,
+)
+app.include_router(get_jobs_router(job_queue))
+
+@app.get("/v1/router/stats")
+def router_stats() -> Dict[str, Any]:
+    return router.metrics.stats()
+
+@app.get("/v1/google/cache/stats")
+def google_cache_stats() -> Dict[str, Any]:
+    return google_api_cache.stats()
+
+@app.get("/v1/response_cache/stats")
+def response_cache_stats() -> Dict[str, Any]:
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+@app.get("/v1/tool_outputs/stats")
+def tool_output_stats() -> Dict[str, Any]:
+    return {"enabled": bool(tool_output_tools), **tool_output_compactor.stats()}
+
+@app.get("/v1/rate_limits/stats")
+def rate_limit_stats() -> Dict[str, Any]:
+    # Queue depth, current rate, throttle events and circuit state per API
+    if rate_limits is None:
+        return {"enabled": False}
+    return {"enabled": True, **rate_limits.stats()}
+
+@app.get("/v1/traces/summary")
+def trace_summary() -> Dict[str, Any]:
+    # p50/p95/p99 latency of recent spans per agent, model, tool and storage operation, in the
+    # worker process that serves this request only (use the OTLP exporter for all workers)
+    return tracer.summary()
+
 if __name__ == "__main__":
-    serve_playground_app("final_prototype:app", reload=True)
+    if web_workers > 1:
+        # Production: WEB_WORKERS processes on one port. With WEB_PRELOAD=1 every agent is built once,
+        # here, and the workers are forked from this process; SIGHUP restarts them one at a time and
+        # SIGTERM drains them (requests in flight get WEB_GRACEFUL_TIMEOUT seconds).
+        preload = os.getenv("WEB_PRELOAD", "1") == "1"
+        if preload:
+            registry.build_all()
+        PreforkServer(
+            app if preload else "final_prototype:app",
+            workers=web_workers,
+            host=os.getenv("WEB_HOST", "localhost"),
+            port=int(os.getenv("WEB_PORT", "7777")),
+            graceful_timeout=float(os.getenv("WEB_GRACEFUL_TIMEOUT", "30")),
+        ).run()
+    else:
+        serve_playground_app("final_prototype:app", reload=True)
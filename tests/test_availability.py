@@ -0,0 +1,58 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from workplace.availability import AvailabilityTools, notify_bookings, parse_time
+
+MONDAY = datetime(2024, 1, 8, 9, tzinfo=timezone.utc)
+
+
+class StubSource:
+    def __init__(self, busy=None, fail=False):
+        self.busy = busy or {}
+        self.fail = fail
+        self.calls = 0
+
+    def __call__(self, attendees, start, end):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("upstream unavailable")
+        return {name: self.busy.get(name, []) for name in attendees}
+
+
+class StubZoom:
+    def __init__(self):
+        self.booking_listeners = []
+
+    @notify_bookings(lambda meeting: (["me"], parse_time(meeting["start_time"]), parse_time(meeting["start_time"]) + timedelta(minutes=meeting["duration"])))
+    def schedule_meeting(self, topic: str, start_time: str, duration: int) -> str:
+        return json.dumps({"meeting_id": 1, "topic": topic, "start_time": start_time, "duration": duration})
+
+
+def check(tools, start, minutes=30):
+    return json.loads(tools.check_availability("me", start.isoformat(), (start + timedelta(minutes=minutes)).isoformat()))
+
+
+def test_a_booked_meeting_is_busy_before_the_next_refresh():
+    source = StubSource()
+    tools = AvailabilityTools([source], refresh_interval=300.0)
+    zoom = StubZoom()
+    zoom.booking_listeners.append(tools.add_booking)
+
+    assert check(tools, MONDAY)["available"]
+    zoom.schedule_meeting("Planning", MONDAY.isoformat(), 30)
+
+    assert not check(tools, MONDAY)["available"]
+    assert source.calls == 1
+
+
+def test_an_attendee_is_not_covered_when_a_source_failed():
+    calendar = StubSource({"me": [(MONDAY, MONDAY + timedelta(hours=1))]})
+    zoom = StubSource(fail=True)
+    tools = AvailabilityTools([calendar, zoom], refresh_interval=300.0)
+
+    assert not check(tools, MONDAY)["available"]
+    zoom.fail = False
+    check(tools, MONDAY)
+    assert (calendar.calls, zoom.calls) == (2, 2)
+    check(tools, MONDAY)
+    assert (calendar.calls, zoom.calls) == (2, 2)
@@ -0,0 +1,62 @@
+import time
+from types import SimpleNamespace
+
+from agno.run.response import RunResponse
+
+from workplace.budget import BudgetLimits, RequestBudget, guard_delegation, run_with_budget
+
+MASTER = SimpleNamespace(name="master", run_id="run", agent_id="master", session_id="session")
+
+
+def chunks_under_budget(member, run):
+    chunks = []
+
+    def request():
+        chunks.extend(guard_delegation(member, "Draft the weekly status email", run))
+        return RunResponse(content="".join(chunks))
+
+    run_with_budget(RequestBudget(BudgetLimits(), root="master"), MASTER, request)
+    return chunks
+
+
+def test_a_refused_delegation_is_one_chunk():
+    chunks = chunks_under_budget("master", lambda: iter(["never run"]))
+
+    assert len(chunks) == 1
+    assert chunks[0].startswith("Not delegated to master")
+
+
+def test_a_text_result_is_not_split_into_characters():
+    assert chunks_under_budget("email-writer", lambda: "The whole answer") == ["The whole answer"]
+    assert list(guard_delegation("email-writer", "task", lambda: "The whole answer")) == ["The whole answer"]
+
+
+def test_a_delegation_thrown_away_unstarted_does_not_hold_up_the_same_task():
+    budget = RequestBudget(BudgetLimits(max_seconds=5), root="master")
+    ran = []
+
+    def request():
+        guard_delegation("email-writer", "Draft the weekly status email", lambda: iter(["never run"]))
+        started = time.monotonic()
+        chunks = list(guard_delegation("email-writer", "Draft the weekly status email.", lambda: ran.append(1) or iter(["Drafted"])))
+        return RunResponse(content="".join(chunks), metrics={"waited": time.monotonic() - started})
+
+    response = run_with_budget(budget, MASTER, request)
+
+    assert response.content == "Drafted"
+    assert response.metrics["waited"] < 1
+    assert ran == [1]
+    assert budget.usage()["duplicate_delegations"] == 0
+
+
+def test_a_delegation_closed_midway_can_be_run_again():
+    budget = RequestBudget(BudgetLimits(max_seconds=5), root="master")
+
+    def request():
+        first = guard_delegation("email-writer", "Draft the weekly status email", lambda: iter(["Half", " done"]))
+        next(first)
+        first.close()
+        return RunResponse(content="".join(guard_delegation("email-writer", "Draft the weekly status email", lambda: iter(["Drafted"]))))
+
+    assert run_with_budget(budget, MASTER, request).content == "Drafted"
+    assert budget.usage()["delegations"] == 2
@@ -0,0 +1,99 @@
+import json
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from agno.tools.toolkit import Toolkit
+
+from workplace.composio_cache import ToolSchemaCache
+
+
+class StubToolSet:
+    """The ComposioToolSet calls ToolSchemaCache makes, recording every schema fetch."""
+
+    def __init__(self, renames: Dict[str, str] = None):
+        self.entity_id = "default"
+        self.renames = renames or {}
+        self.fetched: List[List[str]] = []
+        self.live: List[List[str]] = []
+        self._requested_actions: List[str] = []
+
+    def validate_tools(self, actions: Any = None) -> None:
+        pass
+
+    def get_action_schemas(self, actions: List[Any], _populate_requested: bool = False) -> List[Dict[str, Any]]:
+        slugs = [getattr(action, "slug", action) for action in actions]
+        self.fetched.append(slugs)
+        schemas = [{"name": self.renames.get(slug, slug), "description": slug, "parameters": {}} for slug in slugs]
+        if _populate_requested:
+            self._requested_actions.extend(schema["name"] for schema in schemas)
+        return schemas
+
+    def _wrap_tool(self, schema: Dict[str, Any], entity_id: str = None, skip_default: bool = False) -> Toolkit:
+        return Toolkit(name=schema["name"])
+
+    def get_tools(self, actions: List[Any], skip_default: bool = False) -> List[Toolkit]:
+        self.live.append([getattr(action, "slug", action) for action in actions])
+        return [Toolkit(name=f"live:{getattr(action, 'slug', action)}") for action in actions]
+
+
+def test_overlapping_actions_are_fetched_once(tmp_path):
+    toolset = StubToolSet()
+    cache = ToolSchemaCache(toolset, path=str(tmp_path / "schemas.json"))
+
+    docs = cache.get_tools(actions=["GOOGLEDOCS_CREATE_DOCUMENT", "GOOGLEDOCS_GET_DOCUMENT_BY_ID"])
+    writer = cache.get_tools(actions=[SimpleNamespace(slug="GOOGLEDOCS_CREATE_DOCUMENT")])
+
+    assert toolset.fetched == [["GOOGLEDOCS_CREATE_DOCUMENT", "GOOGLEDOCS_GET_DOCUMENT_BY_ID"]]
+    assert writer[0] is docs[0]
+    assert (cache.hits, cache.misses, cache.fetches) == (1, 2, 1)
+
+
+def test_schemas_persist_across_restarts(tmp_path):
+    path = str(tmp_path / "schemas.json")
+    ToolSchemaCache(StubToolSet(), path=path).get_tools(actions=["SLACK_SEND_MESSAGE"])
+
+    toolset = StubToolSet()
+    tools = ToolSchemaCache(toolset, path=path).get_tools(actions=["SLACK_SEND_MESSAGE"])
+
+    assert toolset.fetched == []
+    assert tools[0].name == "SLACK_SEND_MESSAGE"
+    # Wrapped tools only execute actions the toolset has seen requested
+    assert toolset._requested_actions == ["SLACK_SEND_MESSAGE"]
+
+
+def test_expired_and_other_version_schemas_are_refetched(tmp_path):
+    path = str(tmp_path / "schemas.json")
+    ToolSchemaCache(StubToolSet(), path=path, version="1").get_tools(actions=["SLACK_SEND_MESSAGE"])
+
+    other_version = StubToolSet()
+    ToolSchemaCache(other_version, path=path, version="2").get_tools(actions=["SLACK_SEND_MESSAGE"])
+    expired = StubToolSet()
+    ToolSchemaCache(expired, path=path, version="2", ttl=0).get_tools(actions=["SLACK_SEND_MESSAGE"])
+
+    assert other_version.fetched == [["SLACK_SEND_MESSAGE"]]
+    assert expired.fetched == [["SLACK_SEND_MESSAGE"]]
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["version"] == "2"
+
+
+def test_schema_under_another_name_falls_back_to_a_live_fetch(tmp_path):
+    toolset = StubToolSet(renames={"GOOGLESHEETS_CREATE_GOOGLE_SHEET1": "GOOGLESHEETS_CREATE_GOOGLE_SHEET"})
+    cache = ToolSchemaCache(toolset, path=str(tmp_path / "schemas.json"))
+
+    tools = cache.get_tools(actions=["GOOGLESHEETS_BATCH_GET", "GOOGLESHEETS_CREATE_GOOGLE_SHEET1"])
+
+    assert [tool.name for tool in tools] == ["GOOGLESHEETS_BATCH_GET", "live:GOOGLESHEETS_CREATE_GOOGLE_SHEET1"]
+    assert toolset.live == [["GOOGLESHEETS_CREATE_GOOGLE_SHEET1"]]
+    assert cache.fallbacks == 1
+
+
+def test_toolset_without_the_internals_is_served_live(tmp_path):
+    toolset = StubToolSet()
+    del toolset._requested_actions
+    cache = ToolSchemaCache(toolset, path=str(tmp_path / "schemas.json"))
+
+    tools = cache.get_tools(actions=["SLACK_SEND_MESSAGE"])
+
+    assert not cache.enabled
+    assert [tool.name for tool in tools] == ["live:SLACK_SEND_MESSAGE"]
+    assert toolset.fetched == []
@@ -0,0 +1,138 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from workplace.google_cache import CachedCalendarService, CachedGmailService, ReadThroughCache
+
+
+class FakeRequest:
+    def __init__(self, api: Any, result: Callable[[], Any]):
+        self.api = api
+        self.result = result
+
+    def execute(self) -> Any:
+        self.api.requests += 1
+        return self.result()
+
+
+class FakeGmail:
+    """users().messages() and getProfile of the Gmail API, over a mailbox of labelled messages."""
+
+    def __init__(self):
+        self.requests = 0
+        self.history_id = 1
+        self.labels: Dict[str, List[str]] = {"m1": ["INBOX", "UNREAD"]}
+        self.profile_calls = 0
+        self.profile_gate: Any = None
+
+    def users(self) -> "FakeGmail":
+        return self
+
+    def messages(self) -> "FakeGmail":
+        return self
+
+    def getProfile(self, userId: str) -> FakeRequest:
+        def result() -> Dict[str, str]:
+            self.profile_calls += 1
+            if self.profile_gate is not None:
+                self.profile_gate.wait(5)
+            return {"historyId": str(self.history_id)}
+
+        return FakeRequest(self, result)
+
+    def get(self, userId: str, id: str, format: str = "full") -> FakeRequest:
+        return FakeRequest(self, lambda: {"id": id, "labelIds": list(self.labels[id])})
+
+    def modify(self, userId: str, id: str, body: Dict[str, Any]) -> FakeRequest:
+        def result() -> Dict[str, Any]:
+            self.labels[id] = [label for label in self.labels[id] if label not in body.get("removeLabelIds", [])]
+            self.history_id += 1
+            return {"id": id}
+
+        return FakeRequest(self, result)
+
+    def mark_read_elsewhere(self, id: str) -> None:
+        self.labels[id].remove("UNREAD")
+        self.history_id += 1
+
+
+class FakeCalendar:
+    def __init__(self):
+        self.requests = 0
+        self.list_calls: List[Dict[str, Any]] = []
+
+    def events(self) -> "FakeCalendar":
+        return self
+
+    def list(self, **kwargs: Any) -> FakeRequest:
+        self.list_calls.append(kwargs)
+        return FakeRequest(self, lambda: {"items": [], "nextSyncToken": "sync-1"})
+
+
+def test_message_labels_follow_the_history_id():
+    gmail = FakeGmail()
+    service = CachedGmailService(gmail, ReadThroughCache(check_interval=0.0))
+
+    def labels() -> List[str]:
+        return service.users().messages().get(userId="me", id="m1").execute()["labelIds"]
+
+    assert "UNREAD" in labels()
+    assert "UNREAD" in labels()
+    gmail.mark_read_elsewhere("m1")
+    assert "UNREAD" not in labels()
+
+    service.users().messages().modify(userId="me", id="m1", body={"removeLabelIds": ["INBOX"]}).execute()
+    assert labels() == []
+
+
+def test_probe_runs_outside_the_cache_lock_and_once_per_scope():
+    slow = FakeGmail()
+    slow.profile_gate = threading.Event()
+    cache = ReadThroughCache(check_interval=30.0)
+    slow_service = CachedGmailService(slow, cache, user_id="slow")
+    fast_service = CachedGmailService(FakeGmail(), cache, user_id="fast")
+
+    readers = [threading.Thread(target=lambda: slow_service.users().messages().get(userId="slow", id="m1").execute()) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    deadline = time.monotonic() + 5
+    while slow.profile_calls == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # The slow mailbox's probe is in flight; another mailbox is still served
+    assert fast_service.users().messages().get(userId="fast", id="m1").execute()["id"] == "m1"
+    slow.profile_gate.set()
+    for reader in readers:
+        reader.join(5)
+
+    assert slow.profile_calls == 1
+    assert cache.stats()["probes"] == 2
+
+
+def test_invalidation_during_a_probe_discards_its_token():
+    gmail = FakeGmail()
+    cache = ReadThroughCache(check_interval=30.0)
+    service = CachedGmailService(gmail, cache)
+
+    def probe() -> str:
+        token = str(gmail.history_id)
+        # A write lands after the history ID was read but before the probe returns
+        cache.invalidate(service.scope)
+        return token
+
+    cache.set_probe(service.scope, probe)
+    cache.get_or_load("key", lambda: "value", service.scope)
+    cache.set_probe(service.scope, lambda: str(gmail.history_id))
+    assert service.scope not in cache._tokens
+
+
+def test_calendar_probe_starts_from_a_bounded_window():
+    calendar = FakeCalendar()
+    service = CachedCalendarService(calendar, ReadThroughCache(check_interval=0.0), probes={})
+
+    service.events().list(calendarId="primary", maxResults=10).execute()
+    service.events().list(calendarId="primary", maxResults=10).execute()
+
+    syncs = [call for call in calendar.list_calls if "fields" in call]
+    assert "timeMin" in syncs[0] and "syncToken" not in syncs[0]
+    assert syncs[1]["syncToken"] == "sync-1" and "timeMin" not in syncs[1]
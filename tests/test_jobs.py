@@ -0,0 +1,48 @@
+import time
+
+from agno.storage.workflow.sqlite import SqliteWorkflowStorage
+
+from workplace.jobs import COMPLETED, QUEUED, Job, JobQueue
+
+
+class StubAgent:
+    pass
+
+
+def stored_queue(tmp_path, jobs, retention=None):
+    storage = SqliteWorkflowStorage(table_name="agent_jobs", db_file=str(tmp_path / "jobs.db"))
+    queue = JobQueue({"master": StubAgent()}, storage, start=False, retention=retention)
+    for job in jobs:
+        queue._save(job)
+    return queue
+
+
+def test_list_pages_newest_first_without_content(tmp_path):
+    now = time.time()
+    queue = stored_queue(
+        tmp_path,
+        [Job(f"job-{i}", "master", f"q{i}", status=COMPLETED if i % 2 else QUEUED, content="x" * 1000, created_at=now + i) for i in range(10)],
+    )
+
+    first, second = queue.list(limit=4), queue.list(limit=4, offset=4)
+    assert [job.job_id for job in first + second] == [f"job-{i}" for i in range(9, 1, -1)]
+    assert all(job.content == "" for job in first)
+    assert [job.job_id for job in queue.list(status=QUEUED, limit=2)] == ["job-8", "job-6"]
+    assert "content" not in first[0].summary() and first[0].summary()["message"] == "q9"
+
+
+def test_purge_deletes_only_jobs_finished_before_the_retention(tmp_path):
+    now = time.time()
+    queue = stored_queue(
+        tmp_path,
+        [
+            Job("old", "master", "q", status=COMPLETED, finished_at=now - 7200),
+            Job("recent", "master", "q", status=COMPLETED, finished_at=now - 60),
+            Job("queued", "master", "q", created_at=now - 7200),
+        ],
+        retention=3600,
+    )
+
+    assert queue.purge() == 1
+    assert queue.get("old") is None
+    assert sorted(job.job_id for job in queue.list()) == ["queued", "recent"]
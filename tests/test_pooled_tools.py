@@ -0,0 +1,44 @@
+import json
+
+import requests
+from requests.adapters import BaseAdapter
+
+import agno.tools.zoom as agno_zoom
+from workplace.pooled_tools import PooledZoomTools
+from workplace.transport import HttpTransport
+
+
+class StubZoomApi(BaseAdapter):
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+
+    def send(self, request, **kwargs):
+        self.urls.append(request.url)
+        response = requests.Response()
+        response.status_code = 200
+        if "oauth" in request.url:
+            body = {"access_token": "token", "expires_in": 3600}
+        else:
+            body = {"id": 1, "topic": "Planning", "start_time": "2024-01-08T10:00:00Z", "duration": 30, "join_url": "https://zoom.us/j/1"}
+        response._content = json.dumps(body).encode()
+        return response
+
+    def close(self):
+        pass
+
+
+def test_each_instance_calls_zoom_on_its_own_session():
+    module_requests = agno_zoom.requests
+    zoom = PooledZoomTools(HttpTransport(), account_id="account", client_id="client", client_secret="secret")
+    api = StubZoomApi()
+    zoom.session.mount("https://", api)
+    bookings = []
+    zoom.booking_listeners.append(lambda attendees, start, end: bookings.append((attendees, (end - start).seconds)))
+
+    result = json.loads(zoom.functions["schedule_meeting"].entrypoint(topic="Planning", start_time="2024-01-08T10:00:00Z", duration=30))
+
+    assert agno_zoom.requests is module_requests
+    assert result["meeting_id"] == 1
+    assert api.urls == ["https://zoom.us/oauth/token", "https://api.zoom.us/v2/users/me/meetings"]
+    assert bookings == [(["me"], 1800)]
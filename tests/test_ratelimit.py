@@ -0,0 +1,159 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from workplace.ratelimit import BACKGROUND, CLOSED, HALF_OPEN, OPEN, CircuitOpen, RateLimit, RetryScheduler, priority
+from workplace.transport import HttpTransport
+
+
+class FakeUpstream(ThreadingHTTPServer):
+    """Answers each request with the next (status, Retry-After) of `script`, then 200s."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeUpstreamHandler)
+        self.script = []
+        self.paths = []
+        self.lock = threading.Lock()
+
+    def url(self, path="/"):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        with self.server.lock:
+            self.server.paths.append(self.path)
+            status, retry_after = self.server.script.pop(0) if self.server.script else (200, None)
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", retry_after)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_POST = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = FakeUpstream()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def transport_with(limit):
+    scheduler = RetryScheduler({"127.0.0.1": limit})
+    return HttpTransport(scheduler=scheduler), scheduler
+
+
+def test_token_bucket_spreads_calls_past_the_burst(upstream):
+    transport, scheduler = transport_with(RateLimit(rate=20, burst=2))
+
+    started = time.monotonic()
+    for _ in range(6):
+        assert transport.request("GET", upstream.url()).status_code == 200
+    elapsed = time.monotonic() - started
+
+    # Two calls go out at once, the other four wait 1/20s each for a token
+    assert elapsed >= 4 / 20 - 0.02
+    assert scheduler.stats()["upstreams"]["127.0.0.1"]["calls"] == 6
+
+
+def test_429_backs_off_for_retry_after_and_halves_the_rate(upstream):
+    transport, scheduler = transport_with(RateLimit(rate=20, increase=1, base_delay=0.01))
+    upstream.script = [(429, "0.2"), (429, "0.2")]
+
+    started = time.monotonic()
+    response = transport.request("GET", upstream.url())
+    elapsed = time.monotonic() - started
+
+    assert response.status_code == 200
+    assert elapsed >= 0.4
+    stats = scheduler.stats()["upstreams"]["127.0.0.1"]
+    assert (stats["throttled"], stats["retries"], stats["calls"]) == (2, 2, 3)
+    # Halved twice, then raised by `increase` for the call that got through
+    assert stats["rate"] == 20 / 4 + 1
+
+
+def test_503_backs_off_exponentially_with_jitter(upstream):
+    transport, scheduler = transport_with(RateLimit(rate=100, base_delay=0.1))
+    upstream.script = [(503, None), (503, None), (503, None)]
+
+    started = time.monotonic()
+    response = transport.request("GET", upstream.url())
+    elapsed = time.monotonic() - started
+
+    assert response.status_code == 200
+    # Equal jitter waits between half and all of 0.1s, 0.2s and 0.4s
+    assert 0.35 <= elapsed < 0.7 + 0.2
+    assert scheduler.stats()["upstreams"]["127.0.0.1"]["retries"] == 3
+
+
+def test_non_idempotent_calls_are_not_retried_on_503(upstream):
+    transport, scheduler = transport_with(RateLimit(rate=100, base_delay=0.01))
+    upstream.script = [(503, None)]
+
+    assert transport.request("POST", upstream.url()).status_code == 503
+    assert upstream.paths == ["/"]
+    assert scheduler.stats()["upstreams"]["127.0.0.1"]["retries"] == 0
+
+
+def test_interactive_calls_go_ahead_of_background_calls(upstream):
+    transport, scheduler = transport_with(RateLimit(rate=5, burst=1))
+    transport.request("GET", upstream.url("/first"))
+
+    def background():
+        with priority(BACKGROUND):
+            transport.request("GET", upstream.url("/background"))
+
+    waiting = threading.Thread(target=background)
+    waiting.start()
+    time.sleep(0.05)
+    # Queued after the background call, while both wait for the next token
+    interactive = threading.Thread(target=transport.request, args=("GET", upstream.url("/interactive")))
+    interactive.start()
+    waiting.join()
+    interactive.join()
+
+    assert upstream.paths == ["/first", "/interactive", "/background"]
+
+
+def test_circuit_opens_fails_fast_and_closes_after_a_probe(upstream):
+    transport, scheduler = transport_with(RateLimit(rate=100, base_delay=0.01, failure_threshold=2, reset_timeout=0.2))
+    upstream.script = [(503, None), (503, None)]
+
+    # The retry of the first call is the second failure in a row
+    assert transport.request("GET", upstream.url()).status_code == 503
+    assert scheduler.stats()["upstreams"]["127.0.0.1"]["circuit"] == OPEN
+    with pytest.raises(CircuitOpen):
+        transport.request("GET", upstream.url())
+    assert len(upstream.paths) == 2
+
+    time.sleep(0.25)
+    assert transport.request("GET", upstream.url()).status_code == 200
+    stats = scheduler.stats()["upstreams"]["127.0.0.1"]
+    assert (stats["circuit"], stats["circuit_opens"], stats["rejected"]) == (CLOSED, 1, 1)
+
+
+def test_failed_probe_reopens_the_circuit(upstream):
+    transport, scheduler = transport_with(RateLimit(rate=100, base_delay=0.01, failure_threshold=1, reset_timeout=0.2))
+    upstream.script = [(503, None), (503, None)]
+
+    transport.request("GET", upstream.url())
+    time.sleep(0.25)
+    # The probe is let through half open, fails, and the circuit opens again without a retry
+    assert transport.request("GET", upstream.url()).status_code == 503
+    stats = scheduler.stats()["upstreams"]["127.0.0.1"]
+    assert (stats["circuit"], stats["circuit_opens"]) == (OPEN, 2)
+    with pytest.raises(CircuitOpen):
+        transport.request("GET", upstream.url())
+    assert len(upstream.paths) == 2
@@ -0,0 +1,47 @@
+from agno.storage.agent.sqlite import SqliteAgentStorage
+
+from benchmarks.fakes import FakeModel
+from workplace.response_cache import CachedResponseAgent, ResponseCache
+
+PROMPT = "Draft the weekly status email for the team"
+
+
+def writer(storage, cache, session_id):
+    return CachedResponseAgent(
+        name="email-writer",
+        model=FakeModel(latency=0.0, output_tokens=20, agent_name="email-writer"),
+        response_cache=cache,
+        storage=storage,
+        session_id=session_id,
+        add_history_to_messages=True,
+    )
+
+
+def cached(response):
+    return bool((response.metrics or {}).get("cached"))
+
+
+def test_a_hit_is_saved_to_the_session_history(tmp_path):
+    storage = SqliteAgentStorage(table_name="agent_sessions", db_file=str(tmp_path / "agents.db"))
+    cache = ResponseCache()
+
+    first = writer(storage, cache, "s1").run(PROMPT)
+    second = writer(storage, cache, "s2").run(PROMPT)
+
+    assert not cached(first) and cached(second)
+    assert second.content == first.content
+    runs = storage.read("s2").memory["runs"]
+    assert len(runs) == 1 and runs[0]["message"]["content"] == PROMPT
+    assert runs[0]["response"]["content"] == first.content
+
+
+def test_follow_ups_in_a_session_go_to_the_model(tmp_path):
+    storage = SqliteAgentStorage(table_name="agent_sessions", db_file=str(tmp_path / "agents.db"))
+    cache = ResponseCache()
+    writer(storage, cache, "s1").run(PROMPT)
+
+    follow_up = writer(storage, cache, "s1").run(PROMPT)
+
+    assert not cached(follow_up)
+    assert cache.stats()["follow_ups"] == 1
+    assert len(storage.read("s1").memory["runs"]) == 2
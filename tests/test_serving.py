@@ -0,0 +1,27 @@
+import pytest
+import uvicorn
+
+from workplace.serving import PreforkServer
+
+
+def app(scope, receive, send):
+    pass
+
+
+def test_worker_config_accepts_the_options_prefork_server_passes():
+    server = PreforkServer(app, workers=2, graceful_timeout=5, log_level="warning")
+
+    config = uvicorn.Config(server.app, timeout_graceful_shutdown=int(server.graceful_timeout), **server.uvicorn_options)
+
+    assert config.timeout_graceful_shutdown == 5
+
+
+def test_uvicorn_without_graceful_shutdown_fails_early(monkeypatch):
+    class OldConfig:
+        def __init__(self, app, host="127.0.0.1", port=8000):
+            pass
+
+    monkeypatch.setattr(uvicorn, "Config", OldConfig)
+
+    with pytest.raises(RuntimeError, match="uvicorn>=0.22.0"):
+        PreforkServer(app, workers=2)
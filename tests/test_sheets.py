@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from workplace.sheets import SheetsWriteBuffer, SheetsWriteTools
+
+
+class FakeSheets:
+    """Records every batch update; the next `failures` updates raise instead."""
+
+    def __init__(self, failures=0):
+        self.updates = []
+        self.failures = failures
+        self.lock = threading.Lock()
+
+    def batch_update(self, spreadsheet_id, sheet_name, values, first_cell_location=None):
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("503 backendError")
+            self.updates.append((spreadsheet_id, sheet_name, first_cell_location, values))
+        return {"successful": True}
+
+
+def session(session_id):
+    return SimpleNamespace(session_id=session_id, agent_id="data-entry")
+
+
+def buffered_tools(backend, **options):
+    buffer = SheetsWriteBuffer(backend, **options)
+    return buffer, SheetsWriteTools(buffer)
+
+
+def test_flush_rows_reports_only_its_own_session():
+    backend = FakeSheets()
+    buffer, tools = buffered_tools(backend)
+    alice, bob = session("alice"), session("bob")
+    tools.append_rows(alice, "budget", "Sheet1", json.dumps([["a1"], ["a2"]]), "A1")
+    tools.append_rows(alice, "budget", "Sheet1", json.dumps([["a3"]]), "A3")
+    tools.append_rows(bob, "budget", "Sheet1", json.dumps([["b1"]]))
+
+    result = json.loads(tools.flush_rows(alice))
+
+    assert result["pending_rows"] == 0
+    report = result["results"]["budget"]
+    assert (report["rows_written"], report["api_calls"], report["errors"]) == (3, 1, [])
+    assert report["updates"] == [{"sheet_name": "Sheet1", "start": "A1", "rows": 3}]
+    # Bob's row is neither written nor reported by Alice's flush
+    assert backend.updates == [("budget", "Sheet1", "A1", [["a1"], ["a2"], ["a3"]])]
+    assert buffer.pending_rows(scope="bob") == 1
+    assert json.loads(tools.flush_rows(bob))["results"]["budget"]["updates"] == [{"sheet_name": "Sheet1", "start": "append", "rows": 1}]
+    buffer.close()
+
+
+def test_rows_of_two_sessions_are_not_merged():
+    backend = FakeSheets()
+    buffer, tools = buffered_tools(backend)
+    # Bob's rows continue Alice's block cell for cell, but belong to another session
+    tools.append_rows(session("alice"), "budget", "Sheet1", json.dumps([["a1"], ["a2"]]), "A1")
+    tools.append_rows(session("bob"), "budget", "Sheet1", json.dumps([["b3"]]), "A3")
+
+    buffer.flush()
+
+    assert sorted(backend.updates) == [
+        ("budget", "Sheet1", "A1", [["a1"], ["a2"]]),
+        ("budget", "Sheet1", "A3", [["b3"]]),
+    ]
+    assert buffer.report("budget", scope="alice")["budget"]["rows_written"] == 2
+    assert buffer.report("budget", scope="bob")["budget"]["rows_written"] == 1
+    buffer.close()
+
+
+def test_idle_rows_are_flushed_without_flush_rows():
+    backend = FakeSheets()
+    buffer, tools = buffered_tools(backend, flush_interval=0.2)
+    alice = session("alice")
+    tools.append_rows(alice, "budget", "Sheet1", json.dumps([["a1"], ["a2"]]), "A1")
+
+    deadline = time.monotonic() + 3
+    while not backend.updates and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert backend.updates == [("budget", "Sheet1", "A1", [["a1"], ["a2"]])]
+    # The agent still gets the result of the write the thread made when it flushes
+    result = json.loads(tools.flush_rows(alice))
+    assert (result["results"]["budget"]["rows_written"], result["pending_rows"]) == (2, 0)
+    buffer.close()
+
+
+def test_a_failed_write_is_retried_on_the_next_flush():
+    backend = FakeSheets(failures=1)
+    buffer, tools = buffered_tools(backend)
+    alice = session("alice")
+    tools.append_rows(alice, "budget", "Sheet1", json.dumps([["a1"], ["a2"]]), "B5")
+
+    first = json.loads(tools.flush_rows(alice))
+    # Nothing written, nothing lost: the rows are still pending
+    assert (first["pending_rows"], first["results"]) == (2, {})
+    assert backend.updates == []
+
+    second = json.loads(tools.flush_rows(alice))
+    assert second["pending_rows"] == 0
+    assert second["results"]["budget"]["rows_written"] == 2
+    assert backend.updates == [("budget", "Sheet1", "B5", [["a1"], ["a2"]])]
+    buffer.close()
+
+
+def test_a_write_that_keeps_failing_is_reported():
+    backend = FakeSheets(failures=10)
+    buffer, tools = buffered_tools(backend, max_attempts=2)
+    alice = session("alice")
+    tools.append_rows(alice, "budget", "Sheet1", json.dumps([["a1"]]), "A1")
+    tools.append_rows(alice, "budget", "Sheet2", json.dumps([["appended"]]))
+
+    first = json.loads(tools.flush_rows(alice))
+    second = json.loads(tools.flush_rows(alice))
+
+    # Appends are not idempotent, so they are reported on the first failure instead of retried
+    assert [(error["sheet_name"], error["rows"]) for error in first["results"]["budget"]["errors"]] == [("Sheet2", 1)]
+    assert first["pending_rows"] == 1
+    assert [(error["sheet_name"], error["rows"]) for error in second["results"]["budget"]["errors"]] == [("Sheet1", 1)]
+    assert second["pending_rows"] == 0
+    buffer.close()
@@ -0,0 +1,95 @@
+from agno.storage.agent.session import AgentSession
+from agno.storage.agent.sqlite import SqliteAgentStorage
+
+from workplace.history import SessionHistoryCache
+from workplace.storage import PooledSqliteAgentStorage
+
+
+def memory(first, last):
+    """Runs first..last of a session, each a user and an assistant message, after the system message."""
+    messages = [{"role": "system", "content": "You are the master agent."}]
+    runs = []
+    for i in range(first, last + 1):
+        messages += [{"role": "user", "content": f"q{i}", "created_at": i}, {"role": "assistant", "content": f"a{i}", "created_at": i}]
+        runs.append({"message": {"role": "user", "content": f"q{i}"}, "response": {"run_id": f"run-{i}", "content": f"a{i}"}})
+    return {"runs": runs, "messages": messages}
+
+
+def session(runs, session_id="s1"):
+    return AgentSession(session_id=session_id, agent_id="master", user_id="u1", memory=memory(1, runs))
+
+
+def stored(db_file, session_id="s1"):
+    """The session as SQLite has it, read without any buffer or cache."""
+    return SqliteAgentStorage(table_name="sessions", db_file=str(db_file)).read(session_id)
+
+
+def run_ids(session):
+    return [run["response"]["run_id"] for run in session.memory["runs"]]
+
+
+def test_writes_reach_sqlite_on_flush_and_close(tmp_path):
+    db_file = tmp_path / "agents.db"
+    storage = PooledSqliteAgentStorage(table_name="sessions", db_file=str(db_file), flush_interval=60)
+
+    storage.upsert(session(1))
+    assert storage.read("s1").memory == memory(1, 1)
+    storage.flush()
+    assert stored(db_file).memory == memory(1, 1)
+
+    storage.upsert(session(2, session_id="s2"))
+    storage.close()
+    assert stored(db_file, "s2").memory == memory(1, 2)
+
+
+def test_caps_keep_the_newest_runs_and_messages(tmp_path):
+    db_file = tmp_path / "agents.db"
+    storage = PooledSqliteAgentStorage(
+        table_name="sessions",
+        db_file=str(db_file),
+        flush_interval=60,
+        history_cache=SessionHistoryCache(num_runs=2, num_messages=4),
+        max_stored_runs=3,
+        max_stored_messages=4,
+    )
+
+    # Each turn writes the whole session back, but only a window of it reaches the storage's cache
+    for turns in range(1, 6):
+        storage.upsert(session(turns))
+        storage.flush()
+
+    capped = stored(db_file).memory
+    assert run_ids(stored(db_file)) == ["run-3", "run-4", "run-5"]
+    assert [message["content"] for message in capped["messages"]] == ["You are the master agent.", "q4", "a4", "q5", "a5"]
+    storage.close()
+
+
+def test_caps_without_a_history_cache(tmp_path):
+    db_file = tmp_path / "agents.db"
+    storage = PooledSqliteAgentStorage(table_name="sessions", db_file=str(db_file), max_stored_runs=2, max_stored_messages=2)
+
+    storage.upsert(session(4))
+    storage.close()
+
+    assert run_ids(stored(db_file)) == ["run-3", "run-4"]
+    assert [message["content"] for message in stored(db_file).memory["messages"]] == ["You are the master agent.", "q4", "a4"]
+
+
+def test_storages_sharing_a_file_see_each_others_writes(tmp_path):
+    db_file = str(tmp_path / "agents.db")
+    first, second = (
+        PooledSqliteAgentStorage(table_name="sessions", db_file=db_file, shared=True, history_cache=SessionHistoryCache(num_runs=10))
+        for _ in range(2)
+    )
+
+    first.upsert(session(1))
+    assert run_ids(second.read("s1")) == ["run-1"]
+
+    # Each has the session cached now; a write through one must not leave the other on its cached copy
+    second.upsert(session(2))
+    assert run_ids(first.read("s1")) == ["run-1", "run-2"]
+    first.upsert(session(3))
+    assert run_ids(second.read("s1")) == ["run-1", "run-2", "run-3"]
+    assert sorted(second.get_all_session_ids()) == ["s1"]
+    first.close()
+    second.close()
@@ -0,0 +1,72 @@
+"""Runtime helpers for the multi-agent workflow in final_prototype.py."""
+
+from workplace.availability import AvailabilityIndex, AvailabilityTools, ZoomMeetingsSource
+from workplace.budget import BudgetExceeded, BudgetLimits, RequestBudget
+from workplace.compaction import ToolOutputCompactor, ToolOutputStore, ToolOutputTools
+from workplace.composio_cache import ToolSchemaCache
+from workplace.delegation import ParallelDelegationTools
+from workplace.gemini import CachedPrefixGemini, PrefixCacheStore
+from workplace.google_cache import CachedCalendarService, CachedGmailService, ReadThroughCache
+from workplace.history import SessionHistoryCache
+from workplace.jobs import Job, JobQueue, get_jobs_router
+from workplace.prefork import register_fork_hooks
+from workplace.prompts import with_current_datetime
+from workplace.ratelimit import CircuitOpen, QueueTimeout, RateLimit, RetryScheduler, priority
+from workplace.registry import AgentRegistry, LazyAgent
+from workplace.response_cache import CachedResponseAgent, ResponseCache
+from workplace.router import KeywordRouter, RoutedAgent, Router
+from workplace.serving import PreforkServer
+from workplace.sheets import ComposioSheetsBackend, SheetsWriteBuffer, SheetsWriteTools
+from workplace.storage import PooledSqliteAgentStorage
+from workplace.streaming import StreamingTeamAgent
+from workplace.tracing import JsonlSpanExporter, OtlpHttpSpanExporter, Tracer, instrument
+from workplace.transport import HttpTransport, TokenCache
+
+__all__ = [
+    "AgentRegistry",
+    "AvailabilityIndex",
+    "AvailabilityTools",
+    "BudgetExceeded",
+    "BudgetLimits",
+    "CachedCalendarService",
+    "CachedGmailService",
+    "CachedPrefixGemini",
+    "CachedResponseAgent",
+    "CircuitOpen",
+    "ComposioSheetsBackend",
+    "HttpTransport",
+    "Job",
+    "JobQueue",
+    "JsonlSpanExporter",
+    "KeywordRouter",
+    "LazyAgent",
+    "OtlpHttpSpanExporter",
+    "ParallelDelegationTools",
+    "PooledSqliteAgentStorage",
+    "PrefixCacheStore",
+    "PreforkServer",
+    "QueueTimeout",
+    "RateLimit",
+    "ReadThroughCache",
+    "RequestBudget",
+    "ResponseCache",
+    "RetryScheduler",
+    "RoutedAgent",
+    "Router",
+    "SessionHistoryCache",
+    "SheetsWriteBuffer",
+    "SheetsWriteTools",
+    "StreamingTeamAgent",
+    "TokenCache",
+    "ToolOutputCompactor",
+    "ToolOutputStore",
+    "ToolOutputTools",
+    "ToolSchemaCache",
+    "Tracer",
+    "ZoomMeetingsSource",
+    "get_jobs_router",
+    "instrument",
+    "priority",
+    "register_fork_hooks",
+    "with_current_datetime",
+]
@@ -0,0 +1,385 @@
+import heapq
+import json
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from agno.tools.toolkit import Toolkit
+from agno.utils.log import logger
+
+# (start, end) in epoch seconds, end exclusive
+Interval = Tuple[int, int]
+# attendees, window start, window end -> busy intervals per attendee it knows about
+BusySource = Callable[[List[str], datetime, datetime], Dict[str, List[Tuple[datetime, datetime]]]]
+# attendees, start, end of a meeting that was just booked
+Booking = Tuple[List[str], datetime, datetime]
+
+
+def parse_time(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp as returned by Google or Zoom ("...Z" included) into an aware datetime."""
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def notify_bookings(parse: Callable[[Dict[str, Any]], Optional[Booking]]) -> Callable[[Callable[..., str]], Callable[..., str]]:
+    """Decorate a toolkit method that books a meeting, so the toolkit's `booking_listeners` hear about every booking it makes.
+
+    `parse` turns the method's JSON result into a Booking, or None when nothing was booked.
+    """
+
+    def decorator(func: Callable[..., str]) -> Callable[..., str]:
+        @wraps(func)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> str:
+            result = func(self, *args, **kwargs)
+            try:
+                booking = parse(json.loads(result))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Could not read the booking made by {func.__name__}: {e}")
+                booking = None
+            if booking is not None:
+                for listener in self.booking_listeners:
+                    listener(*booking)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def working_hours_blocks(
+    start: int, end: int, tz: ZoneInfo, day_start: str = "09:00", day_end: str = "17:00", weekdays: Sequence[int] = range(5)
+) -> List[Interval]:
+    """The parts of [start, end) outside working hours (`day_start`-`day_end` on `weekdays`, local to `tz`)."""
+    open_hour, open_minute = (int(part) for part in day_start.split(":"))
+    close_hour, close_minute = (int(part) for part in day_end.split(":"))
+    first = datetime.fromtimestamp(start, tz).date() - timedelta(days=1)
+    last = datetime.fromtimestamp(end, tz).date() + timedelta(days=1)
+    blocks: List[Interval] = []
+    cursor = start
+    day = first
+    while day <= last:
+        if day.weekday() in weekdays:
+            opens = _local_epoch(day, open_hour, open_minute, tz)
+            closes = _local_epoch(day, close_hour, close_minute, tz)
+            if closes > cursor and opens < end:
+                if opens > cursor:
+                    blocks.append((cursor, opens))
+                cursor = max(cursor, closes)
+        day += timedelta(days=1)
+    if cursor < end:
+        blocks.append((cursor, end))
+    return blocks
+
+
+def _local_epoch(day: date, hour: int, minute: int, tz: ZoneInfo) -> int:
+    return int(datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz).timestamp())
+
+
+class AvailabilityIndex:
+    """Busy intervals per attendee, kept merged and sorted so free/busy questions are answered without the model.
+
+    Each attendee's busy time is a sorted list of disjoint intervals. A query bisects every attendee's
+    list to the requested window, k-way merges them with the off-hours blocks and sweeps the result
+    once for gaps, so finding a common slot costs O(n log k) in the number of busy intervals inside
+    the window, whatever its length or the slot granularity.
+    """
+
+    def __init__(self):
+        self._busy: Dict[str, List[Interval]] = {}
+        # Start of every interval in _busy, for bisecting
+        self._starts: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def set_busy(self, attendee: str, intervals: Iterable[Interval], start: Optional[int] = None, end: Optional[int] = None) -> None:
+        """Replace the attendee's busy time, only within [start, end) if given."""
+        new = list(intervals)
+        with self._lock:
+            if start is not None and end is not None:
+                # Keep what lies outside the window, clipping intervals that straddle its edges
+                for busy_start, busy_end in self._busy.get(attendee, []):
+                    if busy_start < start:
+                        new.append((busy_start, min(busy_end, start)))
+                    if busy_end > end:
+                        new.append((max(busy_start, end), busy_end))
+            self._store(attendee, merge_intervals(new))
+
+    def add_busy(self, attendee: str, start: int, end: int) -> None:
+        with self._lock:
+            self._store(attendee, merge_intervals(self._busy.get(attendee, []) + [(start, end)]))
+
+    def attendees(self) -> List[str]:
+        with self._lock:
+            return list(self._busy)
+
+    def busy(self, attendee: str, start: int, end: int) -> List[Interval]:
+        """The attendee's busy intervals overlapping [start, end), clipped to it."""
+        with self._lock:
+            intervals = self._busy.get(attendee, [])
+            starts = self._starts.get(attendee, [])
+            # The interval before the first one starting in the window may still overlap it
+            first = max(bisect_right(starts, start) - 1, 0)
+            last = bisect_left(starts, end)
+            return [(max(s, start), min(e, end)) for s, e in intervals[first:last] if e > start]
+
+    def conflicts(self, attendees: Sequence[str], start: int, end: int) -> Dict[str, List[Interval]]:
+        """Busy intervals overlapping [start, end), for each attendee that has any."""
+        result = {attendee: self.busy(attendee, start, end) for attendee in attendees}
+        return {attendee: intervals for attendee, intervals in result.items() if intervals}
+
+    def free_slots(
+        self,
+        attendees: Sequence[str],
+        start: int,
+        end: int,
+        duration: int,
+        blocked: Sequence[Interval] = (),
+        granularity: int = 15 * 60,
+        limit: int = 1,
+    ) -> List[Interval]:
+        """Return up to `limit` slots of `duration` seconds in [start, end) where every attendee is free.
+
+        Slots start on a multiple of `granularity` seconds, and at most one slot is taken from each gap
+        between busy intervals, so the options are spread out instead of back to back.
+        """
+        busy = heapq.merge(*(self.busy(attendee, start, end) for attendee in attendees), blocked)
+        slots: List[Interval] = []
+        cursor = _align(start, granularity)
+        for busy_start, busy_end in busy:
+            if busy_start - cursor >= duration:
+                slots.append((cursor, cursor + duration))
+                if len(slots) >= limit:
+                    return slots
+            cursor = max(cursor, _align(busy_end, granularity))
+        if end - cursor >= duration and len(slots) < limit:
+            slots.append((cursor, cursor + duration))
+        return slots
+
+    def _store(self, attendee: str, intervals: List[Interval]) -> None:
+        self._busy[attendee] = intervals
+        self._starts[attendee] = [interval[0] for interval in intervals]
+
+
+def _align(moment: int, granularity: int) -> int:
+    return -(-moment // granularity) * granularity
+
+
+class ZoomMeetingsSource:
+    """Busy time of the Zoom account's own meetings, from ZoomTools.list_meetings.
+
+    Zoom only knows the host's meetings, so they are reported for the `attendee` alias ("me").
+    """
+
+    def __init__(self, zoom_tools: Any, attendee: str = "me"):
+        self.zoom_tools = zoom_tools
+        self.attendee: str = attendee
+
+    def __call__(self, attendees: List[str], start: datetime, end: datetime) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        if self.attendee not in attendees:
+            return {}
+        response = json.loads(self.zoom_tools.list_meetings(type="upcoming"))
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        busy = []
+        for meeting in response.get("meetings", []):
+            if not meeting.get("start_time"):
+                continue
+            meeting_start = parse_time(meeting["start_time"])
+            meeting_end = meeting_start + timedelta(minutes=int(meeting.get("duration") or 0))
+            if meeting_end > start and meeting_start < end:
+                busy.append((meeting_start, meeting_end))
+        return {self.attendee: busy}
+
+
+class AvailabilityTools(Toolkit):
+    """Free/busy tools for scheduling agents, answered from an AvailabilityIndex instead of raw event lists.
+
+    Busy time comes from `sources` (e.g. the Google Calendar free/busy API and the Zoom meeting list)
+    and is refetched for an attendee when the requested window is not covered yet or the data is older
+    than `refresh_interval` seconds. Meetings booked in between reach the index through `add_booking`,
+    a listener for the booking toolkits (see `notify_bookings`).
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[BusySource],
+        index: Optional[AvailabilityIndex] = None,
+        refresh_interval: float = 300.0,
+        timezone: str = "UTC",
+        workday_start: str = "09:00",
+        workday_end: str = "17:00",
+        granularity_minutes: int = 15,
+        max_days: int = 62,
+    ):
+        super().__init__(name="availability_tools")
+        self.sources: List[BusySource] = list(sources)
+        self.index: AvailabilityIndex = index if index is not None else AvailabilityIndex()
+        self.refresh_interval: float = refresh_interval
+        self.timezone: str = timezone
+        self.workday_start: str = workday_start
+        self.workday_end: str = workday_end
+        self.granularity_minutes: int = granularity_minutes
+        self.max_days: int = max_days
+        # attendee -> (window start, window end, fetched at) of the last successful fetch
+        self._coverage: Dict[str, Tuple[int, int, float]] = {}
+        self._lock = threading.Lock()
+        self.register(self.find_common_slots)
+        self.register(self.check_availability)
+
+    def find_common_slots(
+        self,
+        attendees: str,
+        duration_minutes: int = 30,
+        days_ahead: int = 14,
+        earliest_start: Optional[str] = None,
+        count: int = 3,
+        timezone: Optional[str] = None,
+        include_weekends: bool = False,
+    ) -> str:
+        """
+        Find the earliest times when all attendees are free for a meeting, within working hours.
+        Use this instead of reading event lists to pick a meeting time.
+
+        Args:
+            attendees (str): Comma separated email addresses. Use "me" for the user's own calendar.
+            duration_minutes (int): Length of the meeting in minutes.
+            days_ahead (int): How many days ahead to search, starting from earliest_start.
+            earliest_start (Optional[str]): ISO 8601 time to start searching from. Defaults to now.
+            count (int): How many options to return.
+            timezone (Optional[str]): IANA time zone for working hours and the returned times, e.g. "Asia/Kolkata".
+            include_weekends (bool): Also consider Saturdays and Sundays.
+
+        Returns:
+            str: JSON with the free slots (start and end in ISO 8601) and any attendee whose calendar could not be read.
+        """
+        try:
+            tz = ZoneInfo(timezone or self.timezone)
+            start = parse_time(earliest_start) if earliest_start else datetime.now(tz)
+        except (ValueError, KeyError) as e:
+            return json.dumps({"error": str(e)})
+        names = _split_attendees(attendees)
+        if not names:
+            return json.dumps({"error": "attendees must list at least one email address"})
+        window_start = int(start.timestamp())
+        window_end = window_start + min(max(days_ahead, 1), self.max_days) * 24 * 60 * 60
+        unknown = self._ensure_loaded(names, window_start, window_end)
+        blocked = working_hours_blocks(
+            window_start, window_end, tz, self.workday_start, self.workday_end, range(7) if include_weekends else range(5)
+        )
+        slots = self.index.free_slots(
+            [name for name in names if name not in unknown],
+            window_start,
+            window_end,
+            duration_minutes * 60,
+            blocked,
+            self.granularity_minutes * 60,
+            max(count, 1),
+        )
+        return json.dumps(
+            {
+                "slots": [{"start": _format(slot_start, tz), "end": _format(slot_end, tz)} for slot_start, slot_end in slots],
+                "unknown_attendees": unknown,
+            }
+        )
+
+    def check_availability(self, attendees: str, start_time: str, end_time: str) -> str:
+        """
+        Check whether all attendees are free between two times, e.g. before scheduling a meeting.
+
+        Args:
+            attendees (str): Comma separated email addresses. Use "me" for the user's own calendar.
+            start_time (str): Start of the meeting in ISO 8601, including the UTC offset.
+            end_time (str): End of the meeting in ISO 8601, including the UTC offset.
+
+        Returns:
+            str: JSON with "available" and, for each busy attendee, the conflicting busy periods.
+        """
+        try:
+            start, end = parse_time(start_time), parse_time(end_time)
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
+        names = _split_attendees(attendees)
+        window_start, window_end = int(start.timestamp()), int(end.timestamp())
+        unknown = self._ensure_loaded(names, window_start, window_end)
+        tz = start.tzinfo
+        conflicts = self.index.conflicts([name for name in names if name not in unknown], window_start, window_end)
+        return json.dumps(
+            {
+                "available": not conflicts and not unknown,
+                "conflicts": {
+                    name: [{"start": _format(s, tz), "end": _format(e, tz)} for s, e in intervals] for name, intervals in conflicts.items()
+                },
+                "unknown_attendees": unknown,
+            }
+        )
+
+    def add_booking(self, attendees: List[str], start: datetime, end: datetime) -> None:
+        """Mark a meeting that was just booked as busy time of its attendees, before the sources report it."""
+        for name in attendees:
+            self.index.add_busy(name, int(start.timestamp()), int(end.timestamp()))
+
+    def _ensure_loaded(self, attendees: List[str], start: int, end: int) -> List[str]:
+        """Fetch busy time for the attendees whose data does not cover [start, end) and return those no source knows."""
+        now = time.monotonic()
+        with self._lock:
+            stale = [
+                name
+                for name in attendees
+                if name not in self._coverage
+                or self._coverage[name][0] > start
+                or self._coverage[name][1] < end
+                or now - self._coverage[name][2] > self.refresh_interval
+            ]
+        if not stale:
+            return []
+        window = (datetime.fromtimestamp(start, timezone.utc), datetime.fromtimestamp(end, timezone.utc))
+        found: Dict[str, List[Interval]] = {}
+        complete = True
+        for source in self.sources:
+            try:
+                busy = source(stale, *window)
+            except Exception as e:
+                logger.warning(f"Free/busy source {source} failed: {e}")
+                complete = False
+                continue
+            for name, intervals in busy.items():
+                found.setdefault(name, []).extend((int(s.timestamp()), int(e.timestamp())) for s, e in intervals)
+        for name, intervals in found.items():
+            if not complete:
+                # A failed source may know busy time of this attendee: keep what the index had and add to it
+                intervals = intervals + self.index.busy(name, start, end)
+            self.index.set_busy(name, intervals, start, end)
+        if complete:
+            # Otherwise the attendees are fetched again on the next query
+            with self._lock:
+                for name in found:
+                    self._coverage[name] = (start, end, now)
+        return [name for name in stale if name not in found]
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "AvailabilityTools":
+        # Agent copies share the index and its coverage
+        return self
+
+
+def _split_attendees(attendees: str) -> List[str]:
+    return list(dict.fromkeys(name.strip() for name in attendees.split(",") if name.strip()))
+
+
+def _format(moment: int, tz: Any) -> str:
+    return datetime.fromtimestamp(moment, tz).isoformat()
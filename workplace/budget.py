@@ -0,0 +1,384 @@
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Tuple, Union
+
+from agno.run.response import RunResponse
+from agno.utils.log import logger
+
+from workplace.prompts import normalize_prompt
+
+_budget: ContextVar[Optional["RequestBudget"]] = ContextVar("request_budget", default=None)
+# Names of the agents the current task was delegated through, starting with the one that opened the budget
+_chain: ContextVar[Tuple[str, ...]] = ContextVar("delegation_chain", default=())
+
+
+class BudgetExceeded(Exception):
+    """Raised instead of a model call once the request has used up its budget."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request budget exceeded: {reason}")
+        self.reason = reason
+
+
+class BudgetLimits:
+    """Per-request limits on model calls, delegation depth, wall time and tokens, shared by every copy of an agent."""
+
+    def __init__(self, max_model_calls: int = 40, max_depth: int = 3, max_seconds: float = 300.0, max_tokens: int = 400_000):
+        if max_model_calls < 1 or max_depth < 0:
+            raise ValueError("max_model_calls must be at least 1 and max_depth at least 0")
+        self.max_model_calls: int = max_model_calls
+        self.max_depth: int = max_depth
+        self.max_seconds: float = max_seconds
+        self.max_tokens: int = max_tokens
+
+    def __copy__(self) -> "BudgetLimits":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "BudgetLimits":
+        return self
+
+
+class _Delegation:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+
+
+class RequestBudget:
+    """What one request has used of its BudgetLimits, across every agent it reaches.
+
+    Every model call made while the budget is active (including in delegated agents and parallel
+    tasks) is counted with its tokens, and raises BudgetExceeded once a limit is reached. Delegations
+    are checked before the member runs: a task that would go deeper than `max_depth`, back to an agent
+    already in the chain, or past what is left of the budget is refused with a message for the leader,
+    and a task identical to one already given to the same member gets the earlier result instead of
+    running again (agno retries repeat a leader's whole run, transfers included).
+    """
+
+    def __init__(self, limits: BudgetLimits, root: Optional[str] = None):
+        self.limits: BudgetLimits = limits
+        self.root: str = root or "agent"
+        self.started: float = time.monotonic()
+        self.model_calls: int = 0
+        self.tokens: int = 0
+        self.delegations: int = 0
+        self.duplicate_delegations: int = 0
+        self.refused_delegations: int = 0
+        self.depth: int = 0
+        self.exceeded: Optional[str] = None
+        self._delegated: Dict[Tuple[str, str], _Delegation] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def charge_model_call(self) -> None:
+        with self._lock:
+            reason = self._over_limit(reserve=1)
+            if reason is not None:
+                self.exceeded = self.exceeded or reason
+                raise BudgetExceeded(reason)
+            self.model_calls += 1
+
+    def add_tokens(self, tokens: int) -> None:
+        with self._lock:
+            self.tokens += tokens
+
+    def delegate(self, member: str, task: str, run: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Run `member` on `task`: the text chunks from `run`, or the answer for the leader as the only chunk.
+
+        The delegation is checked, and becomes the one an identical task waits for, only once the
+        iterator is started; it stops being in flight when the iterator finishes or is closed. An
+        iterator that is thrown away unstarted holds nothing up.
+        """
+        return self._run_delegation(member, task, _chain.get() or (self.root,), run)
+
+    def _admit(self, key: Tuple[str, str], member: str, chain: Tuple[str, ...]) -> Tuple[Optional[str], Optional[_Delegation]]:
+        """The delegation to run `member` under, or the text to hand the leader instead of running it."""
+        with self._lock:
+            delegation = self._delegated.get(key)
+            if delegation is not None and not delegation.done.is_set() and member in chain:
+                # Waiting for itself would never end
+                delegation = None
+            if delegation is not None:
+                self.duplicate_delegations += 1
+            else:
+                reason = self._refusal(member, chain)
+                if reason is not None:
+                    self.refused_delegations += 1
+                    logger.warning(f"Not delegating to {member}: {reason}")
+                    return f"Not delegated to {member}: {reason}. Finish the task with the information you already have.", None
+                delegation = self._delegated[key] = _Delegation()
+                self.delegations += 1
+                self.depth = max(self.depth, len(chain))
+                return None, delegation
+        # The same task was already given to this member, maybe by another branch still running it
+        logger.debug(f"{member} already has this task, reusing its result")
+        delegation.done.wait(timeout=max(self.limits.max_seconds - self.elapsed, 0))
+        if delegation.result is None:
+            return f"{member} was already given this task in this request and did not finish it. Do not delegate it again.", None
+        return delegation.result, None
+
+    def _run_delegation(self, member: str, task: str, chain: Tuple[str, ...], run: Callable[[], Iterator[str]]) -> Iterator[str]:
+        key = (member, normalize_prompt(task))
+        # Admitted here rather than when the iterator is created, so only a started delegation needs the finally below
+        answer, delegation = self._admit(key, member, chain)
+        if delegation is None:
+            yield answer
+            return
+        # `member` is in the chain while it runs
+        chain += (member,)
+        chunks = None
+        text = ""
+        finished = False
+        try:
+            while True:
+                token = _chain.set(chain)
+                try:
+                    if chunks is None:
+                        chunks = _chunks(run())
+                    chunk = next(chunks)
+                except StopIteration:
+                    finished = True
+                    break
+                finally:
+                    _chain.reset(token)
+                text += chunk if isinstance(chunk, str) else ""
+                yield chunk
+        finally:
+            with self._lock:
+                # Only a delegation that ran to the end is reused; one that failed may be tried again
+                if finished and text:
+                    delegation.result = text
+                elif self._delegated.get(key) is delegation:
+                    del self._delegated[key]
+            delegation.done.set()
+
+    def usage(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "model_calls": self.model_calls,
+                "max_model_calls": self.limits.max_model_calls,
+                "tokens": self.tokens,
+                "max_tokens": self.limits.max_tokens,
+                "seconds": round(self.elapsed, 3),
+                "max_seconds": self.limits.max_seconds,
+                "delegations": self.delegations,
+                "depth": self.depth,
+                "max_depth": self.limits.max_depth,
+                "duplicate_delegations": self.duplicate_delegations,
+                "refused_delegations": self.refused_delegations,
+                "exceeded": self.exceeded,
+            }
+
+    def _refusal(self, member: str, chain: Tuple[str, ...]) -> Optional[str]:
+        # Called with self._lock held
+        if member in chain:
+            return f"{member} is already working on a task that led to this one"
+        if len(chain) > self.limits.max_depth:
+            return f"the delegation depth limit of {self.limits.max_depth} is reached"
+        # Leave one model call for every agent in the chain to answer, plus one for the member
+        return self._over_limit(reserve=len(chain) + 1)
+
+    def _over_limit(self, reserve: int) -> Optional[str]:
+        # Called with self._lock held
+        if self.model_calls + reserve > self.limits.max_model_calls:
+            return f"{self.model_calls} of {self.limits.max_model_calls} model calls used"
+        if self.tokens >= self.limits.max_tokens:
+            return f"{self.tokens} of {self.limits.max_tokens} tokens used"
+        if self.elapsed >= self.limits.max_seconds:
+            return f"the {self.limits.max_seconds:.0f}s time limit is reached"
+        return None
+
+
+def current_budget() -> Optional[RequestBudget]:
+    return _budget.get()
+
+
+def guard_delegation(member: str, task: str, run: Callable[[], Iterator[str]]) -> Iterator[str]:
+    """Run `member` on `task` (the text chunks from `run`) under the current request budget, if any.
+
+    When the delegation is refused or was already done in this request, the answer for the leader is
+    the only chunk.
+    """
+    budget = _budget.get()
+    if budget is None:
+        return _chunks(run())
+    return budget.delegate(member, task, run)
+
+
+def _chunks(result: Union[str, Iterator[str]]) -> Iterator[str]:
+    # A text result is one chunk, not one per character
+    return iter([result]) if isinstance(result, str) else iter(result)
+
+
+def run_with_budget(budget: RequestBudget, agent: Any, run: Callable[[], RunResponse]) -> RunResponse:
+    """Run a request under `budget` and add its usage to the response metrics."""
+    _install_model_call_guard()
+    token = _budget.set(budget)
+    try:
+        response = run()
+    except BudgetExceeded as e:
+        response = _stopped_response(agent, e)
+    finally:
+        _budget.reset(token)
+    return _with_usage(response, budget)
+
+
+def stream_with_budget(budget: RequestBudget, agent: Any, run: Callable[[], Iterator[RunResponse]]) -> Iterator[RunResponse]:
+    """Stream a request under `budget`; the last chunk carries the usage in its metrics."""
+    _install_model_call_guard()
+    chunks = None
+    last: Optional[RunResponse] = None
+    while True:
+        token = _budget.set(budget)
+        try:
+            if chunks is None:
+                chunks = iter(run())
+            chunk = next(chunks)
+        except StopIteration:
+            break
+        except BudgetExceeded as e:
+            chunk = _stopped_response(agent, e)
+            chunks = iter([])
+        finally:
+            _budget.reset(token)
+        # One chunk behind, so the last one can be annotated
+        if last is not None:
+            yield last
+        last = chunk
+    if getattr(agent, "run_response", None) is not None:
+        _with_usage(agent.run_response, budget)
+    if last is not None:
+        yield _with_usage(last, budget)
+
+
+async def arun_with_budget(budget: RequestBudget, agent: Any, run: Callable[[], Awaitable[RunResponse]]) -> RunResponse:
+    _install_model_call_guard()
+    token = _budget.set(budget)
+    try:
+        response = await run()
+    except BudgetExceeded as e:
+        response = _stopped_response(agent, e)
+    finally:
+        _budget.reset(token)
+    return _with_usage(response, budget)
+
+
+async def astream_with_budget(budget: RequestBudget, agent: Any, run: Callable[[], Awaitable[AsyncIterator[RunResponse]]]):
+    _install_model_call_guard()
+    chunks = None
+    last: Optional[RunResponse] = None
+    while True:
+        token = _budget.set(budget)
+        try:
+            if chunks is None:
+                chunks = (await run()).__aiter__()
+            chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            break
+        except BudgetExceeded as e:
+            chunk = _stopped_response(agent, e)
+            chunks = _no_chunks()
+        finally:
+            _budget.reset(token)
+        if last is not None:
+            yield last
+        last = chunk
+    if getattr(agent, "run_response", None) is not None:
+        _with_usage(agent.run_response, budget)
+    if last is not None:
+        yield _with_usage(last, budget)
+
+
+async def _no_chunks():
+    return
+    yield
+
+
+def _stopped_response(agent: Any, error: BudgetExceeded) -> RunResponse:
+    logger.warning(f"{agent.name}: {error}")
+    return RunResponse(
+        content=f"I had to stop before finishing this request: {error.reason}.",
+        run_id=agent.run_id,
+        agent_id=agent.agent_id,
+        session_id=agent.session_id,
+    )
+
+
+def _with_usage(response: RunResponse, budget: RequestBudget) -> RunResponse:
+    response.metrics = {**(response.metrics or {}), "budget": budget.usage()}
+    return response
+
+
+_guard_installed = False
+_install_lock = threading.Lock()
+
+
+def _message_tokens(message: Any) -> int:
+    metrics = getattr(message, "metrics", None)
+    if metrics is None:
+        return 0
+    return metrics.total_tokens or (metrics.input_tokens or 0) + (metrics.output_tokens or 0)
+
+
+def _install_model_call_guard() -> None:
+    """Charge every agno model call to the budget of the request it is made for.
+
+    agno has no hook around a single model call, so the Model methods that make one are wrapped
+    (once, on the base class; outside a budget they behave as before).
+    """
+    global _guard_installed
+    with _install_lock:
+        if _guard_installed:
+            return
+        from agno.models.base import Model
+
+        process = Model._process_model_response
+        aprocess = Model._aprocess_model_response
+        process_stream = Model.process_response_stream
+        aprocess_stream = Model.aprocess_response_stream
+
+        def _process_model_response(self, *args, **kwargs):
+            budget = _budget.get()
+            if budget is None:
+                return process(self, *args, **kwargs)
+            budget.charge_model_call()
+            assistant_message, has_tool_calls = process(self, *args, **kwargs)
+            budget.add_tokens(_message_tokens(assistant_message))
+            return assistant_message, has_tool_calls
+
+        async def _aprocess_model_response(self, *args, **kwargs):
+            budget = _budget.get()
+            if budget is None:
+                return await aprocess(self, *args, **kwargs)
+            budget.charge_model_call()
+            assistant_message, has_tool_calls = await aprocess(self, *args, **kwargs)
+            budget.add_tokens(_message_tokens(assistant_message))
+            return assistant_message, has_tool_calls
+
+        def process_response_stream(self, messages, assistant_message, stream_data):
+            budget = _budget.get()
+            if budget is not None:
+                budget.charge_model_call()
+            yield from process_stream(self, messages, assistant_message, stream_data)
+            if budget is not None:
+                budget.add_tokens(_message_tokens(assistant_message))
+
+        async def aprocess_response_stream(self, messages, assistant_message, stream_data):
+            budget = _budget.get()
+            if budget is not None:
+                budget.charge_model_call()
+            async for response in aprocess_stream(self, messages, assistant_message, stream_data):
+                yield response
+            if budget is not None:
+                budget.add_tokens(_message_tokens(assistant_message))
+
+        Model._process_model_response = functools.wraps(process)(_process_model_response)
+        Model._aprocess_model_response = functools.wraps(aprocess)(_aprocess_model_response)
+        Model.process_response_stream = functools.wraps(process_stream)(process_response_stream)
+        Model.aprocess_response_stream = functools.wraps(aprocess_stream)(aprocess_response_stream)
+        _guard_installed = True
@@ -0,0 +1,475 @@
+import functools
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+import weakref
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from agno.tools.toolkit import Toolkit
+from agno.utils.log import logger
+
+PAGER_FUNCTIONS = ("read_tool_output", "search_tool_output")
+# Delegation tools return another agent's answer, which the leader passes on as it is
+UNCOMPACTED_PREFIXES = ("transfer_task_to_", "run_tasks_in_parallel")
+HANDLE_PATTERN = re.compile(r"^out_[0-9a-f]{16}$")
+NUMBER_PATTERN = re.compile(r"^[-+]?[$€£]?\s*[-+]?(\d{1,3}(,\d{3})+|\d+)?(\.\d+)?\s*%?$")
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Approximate token count of `text`: Gemini averages about four characters of English per token."""
+    return math.ceil(len(text) / chars_per_token)
+
+
+class ToolOutputStore:
+    """Full tool outputs kept on disk under content-addressed handles, so any worker process can read them back.
+
+    Files not written or read for `max_age` seconds are removed (checked at most once a minute, on write).
+    """
+
+    def __init__(self, directory: str = "tmp/tool_outputs", max_age: float = 24 * 60 * 60):
+        self.directory: Path = Path(directory)
+        self.max_age: float = max_age
+        self._last_prune: float = 0.0
+        self._lock = threading.Lock()
+
+    def __copy__(self) -> "ToolOutputStore":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ToolOutputStore":
+        return self
+
+    def put(self, text: str) -> str:
+        handle = "out_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        path = self._path(handle)
+        if path.exists():
+            os.utime(path)
+        else:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Written under a temporary name, so a reader never sees half a file
+            partial = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            partial.write_text(text, encoding="utf-8")
+            os.replace(partial, path)
+        self._prune()
+        return handle
+
+    def get(self, handle: str) -> Optional[str]:
+        if not HANDLE_PATTERN.match(handle):
+            return None
+        path = self._path(handle)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return text
+
+    def _path(self, handle: str) -> Path:
+        return self.directory / f"{handle}.txt"
+
+    def _prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < 60:
+                return
+            self._last_prune = now
+        for path in self.directory.glob("out_*.txt"):
+            try:
+                if now - path.stat().st_mtime > self.max_age:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ToolOutputCompactor:
+    """Shrinks tool outputs larger than `max_tokens` before they are added to an agent's messages.
+
+    The full output is saved in the store and the model gets a compact view of it, followed by the
+    handle and page count to read the rest with ToolOutputTools. JSON outputs keep their structure:
+    Google Docs documents are reduced to their text, tables of at least `table_min_rows` rows (lists
+    of rows or of flat objects, e.g. Sheets values) become per-column statistics with a few sample
+    rows when `table_stats` is on, and then long strings and lists are cut until the view fits. Other
+    text keeps its beginning and end. Since agno stores the messages of a run as they were sent, the
+    compact view is also what later turns get through the session history.
+
+    `tools` limits compaction to the named tools; the pager's own functions and delegation tools are
+    never compacted. `count_tokens` replaces the character-based estimate with a real tokenizer.
+    """
+
+    def __init__(
+        self,
+        store: Optional[ToolOutputStore] = None,
+        max_tokens: int = 2000,
+        page_tokens: int = 1500,
+        table_stats: bool = True,
+        table_min_rows: int = 20,
+        sample_rows: int = 5,
+        tools: Optional[Iterable[str]] = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        chars_per_token: float = 4.0,
+    ):
+        if max_tokens < 100 or page_tokens < 100:
+            raise ValueError("max_tokens and page_tokens must be at least 100")
+        self.store: ToolOutputStore = store or ToolOutputStore()
+        self.max_tokens: int = max_tokens
+        self.page_tokens: int = page_tokens
+        self.table_stats: bool = table_stats
+        self.table_min_rows: int = table_min_rows
+        self.sample_rows: int = sample_rows
+        self.tools: Optional[set] = set(tools) if tools is not None else None
+        self.chars_per_token: float = chars_per_token
+        self.count_tokens: Callable[[str], int] = count_tokens or functools.partial(estimate_tokens, chars_per_token=chars_per_token)
+        self.compacted: int = 0
+        self.tokens_before: int = 0
+        self.tokens_after: int = 0
+        self.pages_read: int = 0
+        self.searches: int = 0
+        self._lock = threading.Lock()
+
+    def __copy__(self) -> "ToolOutputCompactor":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ToolOutputCompactor":
+        return self
+
+    def applies_to(self, tool_name: str) -> bool:
+        if tool_name in PAGER_FUNCTIONS or tool_name.startswith(UNCOMPACTED_PREFIXES):
+            return False
+        return self.tools is None or tool_name in self.tools
+
+    def compact(self, tool_name: str, output: str) -> str:
+        """`output` as the model should see it: unchanged if small enough, else a compact view and a handle."""
+        if not self.applies_to(tool_name):
+            return output
+        before = self.count_tokens(output)
+        if before <= self.max_tokens:
+            return output
+        data = _parse_json(output)
+        full = _stored_form(output, data)
+        handle = self.store.put(full)
+        note = (
+            f"[Output of {tool_name} compacted from about {before} tokens. The full output is saved as {handle} "
+            f"({self.page_count(full)} pages): call read_tool_output with this handle and a page number to read it, "
+            f"or search_tool_output to find the lines that mention something.]"
+        )
+        budget = max(self.max_tokens - self.count_tokens(note) - 1, 50)
+        view = self._head_tail(output, budget) if data is None else self._compact_json(data, budget)
+        compacted = f"{view}\n{note}"
+        after = self.count_tokens(compacted)
+        with self._lock:
+            self.compacted += 1
+            self.tokens_before += before
+            self.tokens_after += after
+        logger.debug(f"Compacted {tool_name} output from {before} to {after} tokens ({handle})")
+        return compacted
+
+    def save(self, output: str) -> str:
+        """Save `output` as compact() would and return its handle."""
+        return self.store.put(_stored_form(output, _parse_json(output)))
+
+    def page_count(self, text: str) -> int:
+        return max(math.ceil(len(text) / self._page_chars), 1)
+
+    def page(self, handle: str, page: int = 1) -> str:
+        text = self.store.get(handle)
+        if text is None:
+            return f"No saved output with handle {handle!r}; it may have expired. Call the tool again."
+        pages = self.page_count(text)
+        if not 1 <= page <= pages:
+            return f"{handle} has pages 1 to {pages}."
+        with self._lock:
+            self.pages_read += 1
+        start = (page - 1) * self._page_chars
+        return f"[{handle}, page {page} of {pages}]\n{text[start:start + self._page_chars]}"
+
+    def search(self, handle: str, query: str, max_lines: int = 40) -> str:
+        text = self.store.get(handle)
+        if text is None:
+            return f"No saved output with handle {handle!r}; it may have expired. Call the tool again."
+        with self._lock:
+            self.searches += 1
+        needle = query.lower()
+        matches = []
+        offset = 0
+        for line in text.splitlines(keepends=True):
+            if needle in line.lower():
+                matches.append(f"page {offset // self._page_chars + 1}: {line.strip()[:500]}")
+            offset += len(line)
+        if not matches:
+            return f"No line of {handle} mentions {query!r}."
+        shown = "\n".join(matches[:max_lines])
+        more = f"\n... and {len(matches) - max_lines} more lines" if len(matches) > max_lines else ""
+        return f"[{len(matches)} lines of {handle} mention {query!r}]\n{shown}{more}"
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "compacted": self.compacted,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "saved_tokens": self.tokens_before - self.tokens_after,
+                "pages_read": self.pages_read,
+                "searches": self.searches,
+            }
+
+    @property
+    def _page_chars(self) -> int:
+        return int(self.page_tokens * self.chars_per_token)
+
+    def _compact_json(self, data: Any, budget: int) -> str:
+        data = _document_text(data)
+        if self.table_stats:
+            data = _summarize_tables(data, self.table_min_rows, self.sample_rows)
+        string_limit, item_limit = 4000, 50
+        text = ""
+        for _ in range(10):
+            text = json.dumps(_shrink(data, string_limit, item_limit), ensure_ascii=False, default=str)
+            if self.count_tokens(text) <= budget:
+                return text
+            string_limit, item_limit = max(string_limit // 2, 40), max(item_limit // 2, 3)
+        return self._head_tail(text, budget)
+
+    def _head_tail(self, text: str, budget: int) -> str:
+        """The beginning and end of `text`, about `budget` tokens in all."""
+        keep = int(len(text) * budget / max(self.count_tokens(text), 1)) - 60
+        if keep >= len(text):
+            return text
+        head, tail = text[: keep * 2 // 3], text[len(text) - keep // 3:]
+        # Cut at line ends when there is one close by
+        if head.rfind("\n") > len(head) * 0.8:
+            head = head[: head.rfind("\n")]
+        if -1 < tail.find("\n") < len(tail) * 0.2:
+            tail = tail[tail.find("\n") + 1:]
+        return f"{head}\n[... {len(text) - len(head) - len(tail)} characters omitted ...]\n{tail}"
+
+
+class ToolOutputTools(Toolkit):
+    """read_tool_output and search_tool_output for the outputs a ToolOutputCompactor saved.
+
+    Giving an agent this toolkit is what turns compaction on for it: every tool result of a model
+    whose tools include it goes through the toolkit's compactor.
+    """
+
+    def __init__(self, compactor: ToolOutputCompactor):
+        super().__init__(name="tool_outputs")
+        self.compactor: ToolOutputCompactor = compactor
+        self.register(self.read_tool_output)
+        self.register(self.search_tool_output)
+        with _toolkits_lock:
+            _toolkits[id(self.functions["read_tool_output"])] = self
+        _install_compaction_hook()
+
+    def __copy__(self) -> "ToolOutputTools":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ToolOutputTools":
+        return self
+
+    def read_tool_output(self, handle: str, page: int = 1) -> str:
+        """
+        Read one page of a tool output that was too large to show in full.
+
+        Args:
+            handle (str): The handle given with the compacted output, e.g. "out_3f2a9c1b7d4e5f60".
+            page (int): The page to read, starting at 1.
+
+        Returns:
+            str: The text of the page.
+        """
+        return self.compactor.page(handle, page)
+
+    def search_tool_output(self, handle: str, query: str) -> str:
+        """
+        Find the lines of a compacted tool output that contain some text, with the page each is on.
+
+        Args:
+            handle (str): The handle given with the compacted output.
+            query (str): The text to look for (not case sensitive), e.g. a name, an ID or a column value.
+
+        Returns:
+            str: The matching lines.
+        """
+        return self.compactor.search(handle, query)
+
+
+# The ToolOutputTools each pager Function belongs to; a model's functions are those of its agent's toolkits
+_toolkits: "weakref.WeakValueDictionary[int, ToolOutputTools]" = weakref.WeakValueDictionary()
+_toolkits_lock = threading.Lock()
+_hook_installed = False
+_install_lock = threading.Lock()
+
+
+def _toolkit_for(model: Any) -> Optional[ToolOutputTools]:
+    function = (model._functions or {}).get("read_tool_output")
+    if function is None:
+        return None
+    with _toolkits_lock:
+        return _toolkits.get(id(function))
+
+
+def _install_compaction_hook() -> None:
+    """Compact tool results where agno turns them into tool messages, for every model whose agent has ToolOutputTools.
+
+    Model._create_function_call_result builds the message of every tool call, sync or async, so it
+    is wrapped once on the base class; models without the toolkit are not affected.
+    """
+    global _hook_installed
+    with _install_lock:
+        if _hook_installed:
+            return
+        from agno.models.base import Model
+
+        create = Model._create_function_call_result
+
+        def _create_function_call_result(self, fc, success, output, timer):
+            message = create(self, fc, success, output, timer)
+            toolkit = _toolkit_for(self) if success else None
+            if toolkit is None:
+                return message
+            content = message.content
+            if isinstance(content, (dict, list)):
+                content = json.dumps(content, ensure_ascii=False, default=str)
+            if isinstance(content, str):
+                message.content = toolkit.compactor.compact(fc.function.name, content)
+            return message
+
+        Model._create_function_call_result = functools.wraps(create)(_create_function_call_result)
+        _hook_installed = True
+
+
+def _parse_json(text: str) -> Any:
+    stripped = text.strip()
+    if not stripped.startswith(("{", "[")):
+        return None
+    try:
+        return json.loads(stripped)
+    except ValueError:
+        return None
+
+
+def _stored_form(output: str, data: Any) -> str:
+    # JSON is saved indented, so pages and search results fall on whole fields
+    return output if data is None else json.dumps(data, indent=1, ensure_ascii=False, default=str)
+
+
+def _shrink(value: Any, string_limit: int, item_limit: int) -> Any:
+    if isinstance(value, str) and len(value) > string_limit:
+        return f"{value[:string_limit]}... [{len(value) - string_limit} more characters]"
+    if isinstance(value, list):
+        items = [_shrink(item, string_limit, item_limit) for item in value[:item_limit]]
+        if len(value) > item_limit:
+            items.append(f"... {len(value) - item_limit} more items")
+        return items
+    if isinstance(value, dict):
+        return {key: _shrink(item, string_limit, item_limit) for key, item in value.items()}
+    return value
+
+
+def _document_text(value: Any) -> Any:
+    """`value` with every Google Docs document (a dict with body.content) replaced by its ID, title and plain text."""
+    if isinstance(value, dict):
+        body = value.get("body")
+        if isinstance(body, dict) and isinstance(body.get("content"), list):
+            document = {key: value[key] for key in ("documentId", "title", "revisionId") if key in value}
+            document["text"] = _elements_text(body["content"])
+            return document
+        return {key: _document_text(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_document_text(item) for item in value]
+    return value
+
+
+def _elements_text(elements: List[Any]) -> str:
+    parts = []
+    for element in elements:
+        if not isinstance(element, dict):
+            continue
+        if "paragraph" in element:
+            runs = element["paragraph"].get("elements") or []
+            parts.append("".join((run.get("textRun") or {}).get("content", "") for run in runs if isinstance(run, dict)))
+        elif "table" in element:
+            for row in element["table"].get("tableRows") or []:
+                cells = [_elements_text(cell.get("content") or []).strip() for cell in row.get("tableCells") or []]
+                parts.append(" | ".join(cells) + "\n")
+        elif "tableOfContents" in element:
+            parts.append(_elements_text(element["tableOfContents"].get("content") or []))
+    return "".join(parts)
+
+
+def _summarize_tables(value: Any, min_rows: int, sample_rows: int) -> Any:
+    if isinstance(value, list):
+        summary = _table_summary(value, min_rows, sample_rows)
+        if summary is not None:
+            return summary
+        return [_summarize_tables(item, min_rows, sample_rows) for item in value]
+    if isinstance(value, dict):
+        return {key: _summarize_tables(item, min_rows, sample_rows) for key, item in value.items()}
+    return value
+
+
+def _is_scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _table_summary(rows: List[Any], min_rows: int, sample_rows: int) -> Optional[Dict[str, Any]]:
+    """Column statistics of `rows` if it is a table (lists of cells, or flat objects) of at least `min_rows` rows."""
+    if len(rows) < min_rows:
+        return None
+    if all(isinstance(row, list) and all(_is_scalar(cell) for cell in row) for row in rows):
+        # Sheets ranges start with their header row
+        has_header = all(isinstance(cell, str) and cell for cell in rows[0])
+        header = [str(cell) for cell in rows[0]] if has_header else []
+        data = rows[1:] if has_header else rows
+        width = max(len(row) for row in rows)
+        header += [f"column {n + 1}" for n in range(len(header), width)]
+        columns = {name: [row[n] if n < len(row) else None for row in data] for n, name in enumerate(header)}
+    elif all(isinstance(row, dict) and all(_is_scalar(cell) for cell in row.values()) for row in rows):
+        data = rows
+        names: List[str] = []
+        for row in rows:
+            names.extend(key for key in row if key not in names)
+        columns = {name: [row.get(name) for row in rows] for name in names}
+    else:
+        return None
+    return {
+        "table": f"{len(data)} rows x {len(columns)} columns, summarized per column; the rows are in the full output",
+        "columns": [_column_stats(name, values) for name, values in columns.items()],
+        "first_rows": data[:sample_rows],
+        "last_rows": data[-2:] if len(data) > sample_rows + 2 else [],
+    }
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and value.strip() and NUMBER_PATTERN.match(value.strip()):
+        try:
+            return float(re.sub(r"[^\d.+-]", "", value))
+        except ValueError:
+            return None
+    return None
+
+
+def _column_stats(name: str, values: List[Any]) -> Dict[str, Any]:
+    present = [value for value in values if value not in (None, "")]
+    stats: Dict[str, Any] = {"name": name, "values": len(present), "empty": len(values) - len(present)}
+    numbers = [number for number in map(_number, present) if number is not None]
+    if present and len(numbers) >= 0.8 * len(present):
+        stats.update(
+            type="number",
+            min=min(numbers),
+            max=max(numbers),
+            mean=round(sum(numbers) / len(numbers), 4),
+            sum=round(sum(numbers), 4),
+        )
+        return stats
+    counts = Counter(str(value) for value in present)
+    stats.update(type="text", distinct=len(counts), top=[[value[:80], count] for value, count in counts.most_common(3)])
+    return stats
@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+from importlib.metadata import PackageNotFoundError, version as package_version
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from agno.tools.toolkit import Toolkit
+from agno.utils.log import logger
+
+# Bump when the layout of the cache file changes
+SCHEMA_CACHE_VERSION = 2
+
+
+def default_cache_version() -> str:
+    """Cache version tied to the installed composio packages, so an upgrade refetches every schema."""
+    versions = [str(SCHEMA_CACHE_VERSION)]
+    for package in ("composio_core", "composio_agno"):
+        try:
+            versions.append(package_version(package))
+        except PackageNotFoundError:
+            versions.append("none")
+    return ":".join(versions)
+
+
+def action_key(action: Any) -> str:
+    """Cache key of a composio Action (or action name): the upper-case slug, which schema names are matched against."""
+    return str(getattr(action, "slug", None) or action).upper()
+
+
+class ToolSchemaCache:
+    """Composio action schemas shared by all agents and persisted to a local JSON file.
+
+    `get_tools` is a drop-in replacement for `ComposioToolSet.get_tools(actions=[...])`. Schemas are
+    keyed by action name, so an action requested by several agents is fetched once, and schemas read
+    from the file are reused across restarts until they are older than `ttl` seconds or were written
+    by a different cache version. Only the missing actions are sent to Composio, in a single request.
+
+    Wrapping a cached schema relies on ComposioToolSet internals (`_wrap_tool`, `_requested_actions` and
+    the `_populate_requested` flag of `get_action_schemas`) as of composio-core 0.7.21 / composio-agno
+    0.7.20, the versions pinned in requirements.txt. A toolset without them, or an action whose schema
+    comes back under a name that does not match its slug, is served by a live `toolset.get_tools` call.
+    """
+
+    def __init__(
+        self,
+        toolset: Any,
+        path: Optional[str] = "tmp/composio_schemas.json",
+        ttl: float = 24 * 60 * 60,
+        version: Optional[str] = None,
+    ):
+        """
+        Args:
+            toolset: A ComposioToolSet, or any object with the same get_action_schemas/_wrap_tool interface.
+            path: JSON file the schemas are persisted to. None keeps the cache in memory only.
+            ttl: Seconds after which a cached schema is fetched again.
+            version: Schemas written with another version are ignored. Defaults to the composio package versions.
+        """
+        self.toolset = toolset
+        self.path: Optional[str] = path
+        self.ttl: float = ttl
+        self.version: str = version or default_cache_version()
+        self._schemas: Dict[str, Dict[str, Any]] = {}
+        self._toolkits: Dict[Tuple[str, bool], Toolkit] = {}
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.fetches: int = 0
+        self.fallbacks: int = 0
+        self.enabled: bool = all(hasattr(toolset, name) for name in ("_wrap_tool", "_requested_actions"))
+        if not self.enabled:
+            logger.warning("The composio toolset does not support schema caching; tools are fetched live")
+        self._load()
+
+    def get_tools(self, actions: Sequence[Any], skip_default: bool = False) -> List[Toolkit]:
+        """Return the actions wrapped as agno Toolkits, in the order requested."""
+        if not self.enabled:
+            return self.toolset.get_tools(actions=list(actions), skip_default=skip_default)
+        keys = [action_key(action) for action in actions]
+        with self._lock:
+            self._ensure_schemas(actions, keys)
+            # Wrapped tools check that their action was requested from this toolset before executing
+            requested = self.toolset._requested_actions
+            for key in keys:
+                name = self._schemas[key]["schema"]["name"] if key in self._schemas else None
+                if name is not None and name not in requested:
+                    requested.append(name)
+            tools: List[Toolkit] = []
+            for action, key in zip(actions, keys):
+                if key in self._schemas:
+                    tools.append(self._get_toolkit(key, skip_default))
+                else:
+                    tools.extend(self._fetch_live(action, skip_default))
+            return tools
+
+    def get_schemas(self, actions: Sequence[Any]) -> List[Dict[str, Any]]:
+        """Return the raw action schemas, fetching the missing or expired ones."""
+        keys = [action_key(action) for action in actions]
+        with self._lock:
+            self._ensure_schemas(actions, keys)
+            schemas = []
+            for action, key in zip(actions, keys):
+                if key in self._schemas:
+                    schemas.append(self._schemas[key]["schema"])
+                else:
+                    self.fallbacks += 1
+                    schemas.extend(self._dump(schema) for schema in self.toolset.get_action_schemas(actions=[action]))
+            return schemas
+
+    def invalidate(self, actions: Optional[Sequence[Any]] = None) -> None:
+        """Drop the given actions (or every action) from memory and from the cache file."""
+        with self._lock:
+            if actions is None:
+                self._schemas.clear()
+                self._toolkits.clear()
+            else:
+                for key in map(action_key, actions):
+                    self._schemas.pop(key, None)
+                    self._toolkits = {k: v for k, v in self._toolkits.items() if k[0] != key}
+            self._save()
+
+    def _is_fresh(self, key: str) -> bool:
+        entry = self._schemas.get(key)
+        return entry is not None and time.time() - entry["fetched_at"] < self.ttl
+
+    def _ensure_schemas(self, actions: Sequence[Any], keys: List[str]) -> None:
+        missing = [action for action, key in zip(actions, keys) if not self._is_fresh(key)]
+        self.hits += len(keys) - len(missing)
+        if not missing:
+            return
+        self.misses += len(missing)
+        self.fetches += 1
+        logger.debug(f"Fetching {len(missing)} composio action schemas")
+        self.toolset.validate_tools(actions=missing)
+        fetched_at = time.time()
+        missing_keys = {action_key(action) for action in missing}
+        for schema in self.toolset.get_action_schemas(actions=missing, _populate_requested=True):
+            schema_dict = self._dump(schema)
+            # Stored under the same key the lookups use; a schema named differently is not cached
+            key = action_key(schema_dict["name"])
+            if key not in missing_keys:
+                logger.warning(f"Not caching composio schema {schema_dict['name']}: it matches none of the requested actions")
+                continue
+            self._schemas[key] = {"fetched_at": fetched_at, "schema": schema_dict}
+            self._toolkits = {k: v for k, v in self._toolkits.items() if k[0] != key}
+        self._save()
+
+    def _fetch_live(self, action: Any, skip_default: bool) -> List[Toolkit]:
+        """Fetch and wrap an action that could not be served from the cache."""
+        self.fallbacks += 1
+        logger.debug(f"Fetching composio action {action_key(action)} without the schema cache")
+        return self.toolset.get_tools(actions=[action], skip_default=skip_default)
+
+    @staticmethod
+    def _dump(schema: Any) -> Dict[str, Any]:
+        return schema.model_dump(exclude_none=True) if hasattr(schema, "model_dump") else dict(schema)
+
+    def _get_toolkit(self, key: str, skip_default: bool) -> Toolkit:
+        toolkit = self._toolkits.get((key, skip_default))
+        if toolkit is None:
+            toolkit = self.toolset._wrap_tool(
+                schema=self._schemas[key]["schema"],
+                entity_id=self.toolset.entity_id,
+                skip_default=skip_default,
+            )
+            self._toolkits[(key, skip_default)] = toolkit
+        return toolkit
+
+    def _load(self) -> None:
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable composio schema cache {self.path}: {e}")
+            return
+        if data.get("version") != self.version:
+            logger.debug(f"Ignoring composio schema cache written by version {data.get('version')}")
+            return
+        self._schemas = {key: entry for key, entry in data.get("schemas", {}).items() if "schema" in entry}
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "schemas": self._schemas}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write composio schema cache {self.path}: {e}")
@@ -0,0 +1,140 @@
+import contextvars
+import copy
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from agno.agent import Agent
+from agno.tools.toolkit import Toolkit
+from agno.utils.log import logger
+
+from workplace.budget import BudgetExceeded, guard_delegation
+
+
+def response_to_text(content: Any) -> str:
+    """Convert the content of a member agent's RunResponse to text, the same way agno's transfer function does."""
+    if content is None:
+        return "No response from the member agent."
+    if isinstance(content, str):
+        return content
+    if isinstance(content, BaseModel):
+        return content.model_dump_json(indent=2)
+    try:
+        return json.dumps(content, indent=2)
+    except (TypeError, ValueError) as e:
+        return str(e)
+
+
+class ParallelDelegationTools(Toolkit):
+    """Fan independent tasks out to several team members at once.
+
+    agno runs the transfer functions of a team one after the other, so a request that touches
+    several services costs the sum of every sub-agent round trip. This toolkit lets the leader
+    hand over a list of independent tasks in a single tool call; the tasks run on a bounded thread
+    pool and the results come back in the order they were given, so latency tracks the slowest branch.
+    """
+
+    def __init__(
+        self,
+        agents: Dict[str, Agent],
+        max_workers: int = 8,
+        max_concurrency_per_agent: int = 4,
+    ):
+        """
+        Args:
+            agents: Team members keyed by the name the leader uses for them (e.g. "slack_agent").
+            max_workers: Upper bound on the number of tasks of one tool call running at the same time.
+            max_concurrency_per_agent: Upper bound on tasks running at the same time for one agent, across
+                all tool calls and requests (every copy of the toolkit shares it). Independently of it,
+                tasks for the same agent instance run in order, since an agno Agent keeps per-run state
+                on the instance.
+        """
+        super().__init__(name="parallel_delegation")
+        if max_workers < 1 or max_concurrency_per_agent < 1:
+            raise ValueError("max_workers and max_concurrency_per_agent must be at least 1")
+        self.agents: Dict[str, Agent] = agents
+        self.max_workers: int = max_workers
+        self.max_concurrency_per_agent: int = max_concurrency_per_agent
+        # One semaphore per agent for the life of the toolkit and its copies, so the cap holds across
+        # tool calls and requests
+        self._limits: Dict[str, threading.Semaphore] = {
+            name: threading.Semaphore(max_concurrency_per_agent) for name in agents
+        }
+        self._instance_locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in agents}
+        self.register(self.run_tasks_in_parallel)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ParallelDelegationTools":
+        # The Playground deep-copies the leader per request: the copy runs its own copies of the
+        # agents, so requests do not share run state, but it shares the per-agent limits
+        copied = ParallelDelegationTools(
+            copy.deepcopy(self.agents, memo), max_workers=self.max_workers, max_concurrency_per_agent=self.max_concurrency_per_agent
+        )
+        copied._limits = self._limits
+        return copied
+
+    def run_tasks_in_parallel(self, tasks: str) -> str:
+        """
+        Run independent tasks on several team members at the same time.
+        Use this instead of transferring tasks one by one when no task needs the output of another.
+
+        Args:
+            tasks (str): A JSON list of objects with the keys "agent", "task_description" and "expected_output",
+                and optionally "additional_information". "agent" is the name of the team member, e.g. "slack_agent".
+
+        Returns:
+            str: A JSON list with one {"agent", "status", "content"} object per task, in the same order as the tasks.
+        """
+        try:
+            parsed = json.loads(tasks)
+        except json.JSONDecodeError as e:
+            return json.dumps({"error": f"tasks must be a JSON list: {e}"})
+        if not isinstance(parsed, list) or not all(isinstance(task, dict) for task in parsed):
+            return json.dumps({"error": "tasks must be a JSON list of objects"})
+        return json.dumps(self.delegate(parsed))
+
+    def delegate(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run the tasks concurrently and return their results in the order of the tasks."""
+        if not tasks:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as executor:
+            # Each task runs in a copy of the caller's context, so context variables (the current trace
+            # span, a response cache bypass) carry over to the member agents
+            futures = [executor.submit(contextvars.copy_context().run, self._run_task, task) for task in tasks]
+            return [future.result() for future in futures]
+
+    def _run_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        name = str(task.get("agent", ""))
+        agent = self.agents.get(name)
+        if agent is None:
+            return {"agent": name, "status": "error", "content": f"Unknown agent. Choose from: {', '.join(self.agents)}"}
+
+        message = self.get_member_task(
+            task_description=str(task.get("task_description", "")),
+            expected_output=str(task.get("expected_output", "")),
+            additional_information=task.get("additional_information"),
+        )
+
+        def run() -> Iterator[str]:
+            with self._instance_locks[name], self._limits[name]:
+                yield response_to_text(agent.run(message, stream=False).content)
+
+        try:
+            # Counted against the request budget like a transfer to the same member
+            content = "".join(guard_delegation(agent.name or name, message, run))
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Parallel task for {name} failed: {e}")
+            return {"agent": name, "status": "error", "content": str(e)}
+        return {"agent": name, "status": "ok", "content": content}
+
+    @staticmethod
+    def get_member_task(task_description: str, expected_output: str, additional_information: Optional[str] = None) -> str:
+        """Build the member's message in the same format as agno's transfer_task_to_<agent> functions."""
+        message = f"{task_description}\n\n<expected_output>\n{expected_output}\n</expected_output>"
+        if additional_information is not None and str(additional_information).strip() != "":
+            message += f"\n\n<additional_information>\n{additional_information}\n</additional_information>"
+        return message
@@ -0,0 +1,272 @@
+import hashlib
+import itertools
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import httpx
+
+from agno.exceptions import ModelProviderError
+from agno.models.google import Gemini
+from agno.models.google.gemini import _format_function_definitions
+from agno.models.message import Message
+from agno.utils.log import logger
+
+from google.genai.types import Content, CountTokensConfig, CreateCachedContentConfig, GenerateContentConfig, Part
+
+from workplace.prompts import split_system_message
+from workplace.ratelimit import FAILED, OK, THROTTLED, UNAVAILABLE, RetryScheduler, UpstreamError
+
+
+# Smallest cached content each model family accepts, in tokens, per the Gemini context caching docs.
+# Matched by model ID prefix; models not listed get DEFAULT_MIN_CACHE_TOKENS.
+MIN_CACHE_TOKENS = {
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-pro": 4096,
+}
+DEFAULT_MIN_CACHE_TOKENS = 4096
+
+
+def min_cache_tokens_for(model_id: str) -> int:
+    for prefix, tokens in MIN_CACHE_TOKENS.items():
+        if model_id.startswith(prefix):
+            return tokens
+    return DEFAULT_MIN_CACHE_TOKENS
+
+
+class CachedPrefix(str):
+    """Returned by CachedPrefixGemini._format_messages in place of the system message: the name of the
+    Gemini cached content holding the static system prefix and the tools."""
+
+
+class PrefixCacheStore:
+    """Gemini cached contents keyed by (model, static system prefix, tools), shared by every copy of a model.
+
+    Creating a cached content is a network call, so concurrent runs wanting the same prefix wait for a
+    single creation. Before creating one, the prefix is counted with `count_tokens`; a prefix below the
+    model's minimum is remembered and never counted or created again. A prefix the API refuses to cache
+    for another reason is not retried for `retry_after` seconds. Either way runs fall back to sending
+    the full system message.
+    """
+
+    def __init__(self, ttl_seconds: int = 3600, refresh_margin: int = 60, retry_after: int = 600):
+        self.ttl_seconds: int = ttl_seconds
+        self.refresh_margin: int = refresh_margin
+        self.retry_after: int = retry_after
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._failed: Dict[str, float] = {}
+        self._too_small: Set[str] = set()
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.created: int = 0
+        self.failures: int = 0
+        self.too_small: int = 0
+
+    def get_or_create(
+        self,
+        key: str,
+        create: Callable[[int], Any],
+        count_tokens: Optional[Callable[[], int]] = None,
+        min_tokens: int = 0,
+    ) -> Optional[str]:
+        """Return the name of the cached content for `key`, calling `create(ttl_seconds)` when there is none.
+
+        With `count_tokens`, a prefix that counts fewer than `min_tokens` tokens is not created.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            if key in self._too_small or self._failed.get(key, 0) > now:
+                return None
+            try:
+                if count_tokens is not None and entry is None:
+                    tokens = count_tokens()
+                    if tokens < min_tokens:
+                        logger.debug(f"Not caching a {tokens} token prefix, the minimum is {min_tokens}")
+                        self.too_small += 1
+                        self._too_small.add(key)
+                        return None
+                cached_content = create(self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Could not create a Gemini context cache, sending the full prompt instead: {e}")
+                self.failures += 1
+                self._failed[key] = now + self.retry_after
+                return None
+            self.created += 1
+            # Refresh a little before the server-side expiry so a request never references an expired cache
+            self._entries[key] = (cached_content.name, now + self.ttl_seconds - self.refresh_margin)
+            return cached_content.name
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "created": self.created,
+            "failures": self.failures,
+            "too_small": self.too_small,
+        }
+
+    def __deepcopy__(self, memo):
+        # agno deep-copies the model for every agent copy; the cache must stay shared
+        return self
+
+
+@dataclass
+class CachedPrefixGemini(Gemini):
+    """Gemini model that sends the static part of the system message through Gemini context caching.
+
+    The system message is split at the dynamic context tag (see workplace.prompts): the static prefix
+    and the tool declarations go into a cached content created once per prefix, and only the
+    dynamic part (today's date) is sent with each request, as the first user turn. Prefixes shorter
+    than `min_cache_tokens` (by default the model's documented minimum, see MIN_CACHE_TOKENS; Gemini
+    refuses to cache anything smaller) are sent in full as usual. They are counted with the API once.
+
+    With a `scheduler`, every model call waits for a slot of the `upstream` rate limit, and calls
+    that Gemini throttles (429) or fails (5xx) are retried there, shared with every other agent,
+    before agno's own run retries see the error. Streams are retried only until their first chunk.
+    """
+
+    prefix_cache: Optional[PrefixCacheStore] = None
+    # Smallest prefix worth caching, in tokens; None uses the model's minimum from MIN_CACHE_TOKENS
+    min_cache_tokens: Optional[int] = None
+    scheduler: Optional[RetryScheduler] = None
+    upstream: str = "gemini"
+
+    def invoke(self, messages: List[Message]):
+        if self.scheduler is None:
+            return super().invoke(messages)
+        invoke = super().invoke
+        return self._scheduled(lambda: invoke(messages))
+
+    def invoke_stream(self, messages: List[Message]):
+        if self.scheduler is None:
+            yield from super().invoke_stream(messages)
+            return
+        invoke_stream = super().invoke_stream
+        yield from self._scheduled(lambda: _started(invoke_stream(messages)))
+
+    async def ainvoke(self, messages: List[Message]):
+        if self.scheduler is None:
+            return await super().ainvoke(messages)
+        ainvoke = super().ainvoke
+        return await self._ascheduled(lambda: ainvoke(messages))
+
+    async def ainvoke_stream(self, messages: List[Message]):
+        if self.scheduler is None:
+            async for chunk in super().ainvoke_stream(messages):
+                yield chunk
+            return
+        ainvoke_stream = super().ainvoke_stream
+        chunks = await self._ascheduled(lambda: _astarted(ainvoke_stream(messages)))
+        async for chunk in chunks:
+            yield chunk
+
+    def _scheduled(self, send: Callable[[], Any]) -> Any:
+        try:
+            return self.scheduler.call(self.upstream, send, _classify_model_error)
+        except UpstreamError as e:
+            raise ModelProviderError(e, self.name, self.id) from e
+
+    async def _ascheduled(self, send: Callable[[], Any]) -> Any:
+        try:
+            return await self.scheduler.acall(self.upstream, send, _classify_model_error)
+        except UpstreamError as e:
+            raise ModelProviderError(e, self.name, self.id) from e
+
+    def _format_messages(self, messages: List[Message]):
+        formatted_messages, system_message = super()._format_messages(messages)
+        if self.prefix_cache is None or not system_message or not isinstance(system_message, str):
+            return formatted_messages, system_message
+
+        static_prefix, dynamic_suffix = split_system_message(system_message)
+        cache_name = self._get_prefix_cache_name(static_prefix)
+        if cache_name is None:
+            return formatted_messages, system_message
+        if dynamic_suffix:
+            formatted_messages.insert(0, Content(role="user", parts=[Part(text=dynamic_suffix)]))
+        return formatted_messages, CachedPrefix(cache_name)
+
+    def _get_request_kwargs(self, system_message: Optional[str] = None) -> Dict[str, Any]:
+        if not isinstance(system_message, CachedPrefix):
+            return super()._get_request_kwargs(system_message)
+        request_kwargs = super()._get_request_kwargs(None)
+        config = request_kwargs.get("config") or GenerateContentConfig()
+        # The system instruction and the tools live in the cached content and must not be sent again
+        config.tools = None
+        config.cached_content = str(system_message)
+        request_kwargs["config"] = config
+        return request_kwargs
+
+    def _get_prefix_cache_name(self, static_prefix: str) -> Optional[str]:
+        tools_json = json.dumps(self._tools, sort_keys=True, default=str) if self._tools else ""
+        min_tokens = self.min_cache_tokens if self.min_cache_tokens is not None else min_cache_tokens_for(self.id)
+        # A token is at least one character, so a shorter prefix is too small without counting it
+        if len(static_prefix) + len(tools_json) < min_tokens:
+            return None
+        key = hashlib.sha256(f"{self.id}\n{static_prefix}\n{tools_json}".encode()).hexdigest()
+        tools = _format_function_definitions(self._tools) if self._tools else None
+
+        def count_tokens() -> int:
+            response = self.get_client().models.count_tokens(
+                model=self.id,
+                contents=[Content(role="user", parts=[Part(text=".")])],
+                config=CountTokensConfig(system_instruction=static_prefix, tools=[tools] if tools is not None else None),
+            )
+            return response.total_tokens or 0
+
+        def create(ttl_seconds: int):
+            return self.get_client().caches.create(
+                model=self.id,
+                config=CreateCachedContentConfig(
+                    system_instruction=static_prefix,
+                    tools=[tools] if tools is not None else None,
+                    ttl=f"{ttl_seconds}s",
+                    display_name=f"agent-prefix-{key[:16]}",
+                ),
+            )
+
+        return self.prefix_cache.get_or_create(key, create, count_tokens=count_tokens, min_tokens=min_tokens)
+
+
+def _classify_model_error(response: Any, error: Optional[BaseException]) -> Tuple[str, Optional[float]]:
+    if error is None:
+        return OK, None
+    # agno wraps the google-genai APIError, whose code is the HTTP status
+    cause = error.__cause__ if isinstance(error, ModelProviderError) and error.__cause__ is not None else error
+    code = getattr(cause, "code", None)
+    if code == 429:
+        return THROTTLED, None
+    if code in (500, 502, 503, 504) or isinstance(cause, (httpx.TransportError, ConnectionError)):
+        return UNAVAILABLE, None
+    return FAILED, None
+
+
+def _started(chunks: Iterator[Any]) -> Iterator[Any]:
+    """`chunks` after its first chunk has arrived, so errors before it are raised here."""
+    chunks = iter(chunks)
+    try:
+        first = next(chunks)
+    except StopIteration:
+        return iter(())
+    return itertools.chain((first,), chunks)
+
+
+async def _astarted(chunks: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = None
+    return _prepend(first, chunks)
+
+
+async def _prepend(first: Any, chunks: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    if first is None:
+        return
+    yield first
+    async for chunk in chunks:
+        yield chunk
@@ -0,0 +1,342 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from agno.utils.log import logger
+
+
+class ReadThroughCache:
+    """LRU cache of Google API responses, invalidated by change tokens.
+
+    Every entry belongs to a scope (a mailbox, a calendar) that may have a change probe: a callable
+    returning a token that changes whenever something in the scope changes (a Gmail history ID, a
+    calendar sync generation). An entry is valid while the scope's token is the one it was loaded
+    under. The probe runs at most once every `check_interval` seconds per scope, so follow-up reads
+    within that interval cost no network round trip at all. Probes run outside the cache lock, one at
+    a time per scope: concurrent readers of that scope wait for the running probe's token, readers of
+    other scopes are not held up. Scopes without a probe (or whose probe fails) fall back to expiring
+    entries after `ttl` seconds. Writes through the cached services invalidate their scope immediately.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 60.0, check_interval: float = 30.0, max_age: float = 3600.0):
+        self.max_entries: int = max_entries
+        self.ttl: float = ttl
+        self.check_interval: float = check_interval
+        # Upper bound on the age of any entry, whatever its scope's token says
+        self.max_age: float = max_age
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[str], Optional[str], float]]" = OrderedDict()
+        self._probes: Dict[str, Callable[[], str]] = {}
+        # scope -> (token, checked_at); token None when the last probe failed
+        self._tokens: Dict[str, Tuple[Optional[str], float]] = {}
+        # scope -> lock held while that scope's probe runs
+        self._probe_locks: Dict[str, threading.Lock] = {}
+        # scope -> number of invalidations, so a probe that raced a write does not store its token
+        self._epochs: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.invalidations: int = 0
+        self.probes: int = 0
+
+    def set_probe(self, scope: str, probe: Callable[[], str]) -> None:
+        with self._lock:
+            self._probes[scope] = probe
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any], scope: Optional[str] = None) -> Any:
+        """Return the cached value of `key` if it is still valid, otherwise `load()` it and cache the result."""
+        token = self._token(scope) if scope is not None else None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_valid(entry, scope, token):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = load()
+        with self._lock:
+            # Tag the value with the token seen before loading, so a change during the load invalidates it
+            self._entries[key] = (value, scope, token, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, scope: str) -> None:
+        """Drop every entry of `scope` and force a fresh probe on the next read."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[1] == scope]:
+                del self._entries[key]
+                self.invalidations += 1
+            self._tokens.pop(scope, None)
+            self._epochs[scope] = self._epochs.get(scope, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "probes": self.probes,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _is_valid(self, entry: Tuple[Any, Optional[str], Optional[str], float], scope: Optional[str], token: Optional[str]) -> bool:
+        age = time.monotonic() - entry[3]
+        if age > self.max_age:
+            return False
+        if scope is None:
+            return True
+        if token is None or entry[2] is None:
+            return age <= self.ttl
+        return entry[2] == token
+
+    def _token(self, scope: str) -> Optional[str]:
+        with self._lock:
+            probe = self._probes.get(scope)
+            if probe is None:
+                return None
+            if self._is_checked(scope):
+                return self._tokens[scope][0]
+            probe_lock = self._probe_locks.setdefault(scope, threading.Lock())
+        with probe_lock:
+            with self._lock:
+                # Another reader may have probed while this one waited
+                if self._is_checked(scope):
+                    return self._tokens[scope][0]
+                self.probes += 1
+                epoch = self._epochs.get(scope, 0)
+            now = time.monotonic()
+            try:
+                token: Optional[str] = str(probe())
+            except Exception as e:
+                logger.warning(f"Change probe for {scope} failed, using the {self.ttl:.0f}s TTL instead: {e}")
+                token = None
+            with self._lock:
+                if self._epochs.get(scope, 0) == epoch:
+                    self._tokens[scope] = (token, now)
+            return token
+
+    def _is_checked(self, scope: str) -> bool:
+        return scope in self._tokens and time.monotonic() - self._tokens[scope][1] < self.check_interval
+
+
+def _request_key(*parts: Any, **kwargs: Any) -> str:
+    return json.dumps([parts, kwargs], sort_keys=True, default=str)
+
+
+class _Passthrough:
+    """Forwards everything it does not define to the wrapped googleapiclient resource."""
+
+    def __init__(self, target: Any):
+        self._target = target
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target, name)
+
+
+class _CachedRequest:
+    def __init__(self, cache: ReadThroughCache, key: str, scope: Optional[str], request: Any):
+        self._cache = cache
+        self._key = key
+        self._scope = scope
+        self._request = request
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return self._cache.get_or_load(self._key, lambda: self._request.execute(*args, **kwargs), self._scope)
+
+
+class _InvalidatingRequest:
+    def __init__(self, cache: ReadThroughCache, scope: str, request: Any):
+        self._cache = cache
+        self._scope = scope
+        self._request = request
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return self._request.execute(*args, **kwargs)
+        finally:
+            self._cache.invalidate(self._scope)
+
+
+class _InvalidatingResource(_Passthrough):
+    """A resource whose every request (send, insert, modify, ...) invalidates the scope once executed."""
+
+    def __init__(self, target: Any, cache: ReadThroughCache, scope: str):
+        super().__init__(target)
+        self._cache = cache
+        self._scope = scope
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._target, name)
+        if not callable(method):
+            return method
+
+        def request(*args: Any, **kwargs: Any) -> Any:
+            return _InvalidatingRequest(self._cache, self._scope, method(*args, **kwargs))
+
+        return request
+
+
+class CachedGmailService(_Passthrough):
+    """Wraps a Gmail API service (`build("gmail", "v1")` or a fake with the same shape).
+
+    `users().messages().list()` and `users().messages().get()` are cached per query and invalidated
+    when the mailbox history ID changes. A message's content never changes but its labels (UNREAD,
+    STARRED, ...) do, and every change to them moves the history ID. Sending, drafting or modifying
+    messages invalidates the mailbox.
+    """
+
+    def __init__(self, service: Any, cache: ReadThroughCache, user_id: str = "me"):
+        super().__init__(service)
+        self._cache = cache
+        self.scope = f"gmail:{user_id}"
+        cache.set_probe(self.scope, lambda: service.users().getProfile(userId=user_id).execute()["historyId"])
+
+    def users(self) -> "_GmailUsers":
+        return _GmailUsers(self._target.users(), self)
+
+
+class _GmailUsers(_Passthrough):
+    def __init__(self, target: Any, service: CachedGmailService):
+        super().__init__(target)
+        self._service = service
+
+    def messages(self) -> "_GmailMessages":
+        return _GmailMessages(self._target.messages(), self._service)
+
+    def drafts(self) -> _InvalidatingResource:
+        return _InvalidatingResource(self._target.drafts(), self._service._cache, self._service.scope)
+
+
+class _GmailMessages(_InvalidatingResource):
+    def __init__(self, target: Any, service: CachedGmailService):
+        super().__init__(target, service._cache, service.scope)
+
+    def list(self, **kwargs: Any) -> _CachedRequest:
+        key = _request_key(self._scope, "messages.list", **kwargs)
+        return _CachedRequest(self._cache, key, self._scope, self._target.list(**kwargs))
+
+    def get(self, **kwargs: Any) -> _CachedRequest:
+        key = _request_key(self._scope, "messages.get", **kwargs)
+        return _CachedRequest(self._cache, key, self._scope, self._target.get(**kwargs))
+
+
+class CalendarChangeProbe:
+    """Change token of a calendar, driven by Google Calendar sync tokens.
+
+    The first call lists the events from `lookback` seconds ago onwards to get a sync token, so it does
+    not page through the calendar's whole history. Later calls ask for the events changed since that
+    token (at any date) and return a new token only if there were any.
+    """
+
+    def __init__(self, calendar_id: str, lookback: float = 86400.0):
+        self.calendar_id = calendar_id
+        self.lookback: float = lookback
+        self.service: Any = None
+        self._sync_token: Optional[str] = None
+        self._generation: int = 0
+
+    def __call__(self) -> str:
+        events = self.service.events()
+        if self._sync_token is None:
+            self._full_sync(events)
+            return str(self._generation)
+        try:
+            changed = self._sync(events, syncToken=self._sync_token)
+        except Exception as e:
+            # 410 Gone: the sync token expired, so changes since then are unknown
+            if getattr(getattr(e, "resp", None), "status", None) != 410:
+                raise
+            self._full_sync(events)
+            changed = True
+        if changed:
+            self._generation += 1
+        return str(self._generation)
+
+    def _full_sync(self, events: Any) -> None:
+        time_min = datetime.now(timezone.utc) - timedelta(seconds=self.lookback)
+        self._sync(events, timeMin=time_min.isoformat().replace("+00:00", "Z"))
+        if self._sync_token is None:
+            raise RuntimeError(f"events.list returned no sync token for {self.calendar_id}")
+
+    def _sync(self, events: Any, **kwargs: Any) -> bool:
+        """List the events (changed since `syncToken`, if given), store the next sync token and return whether there were any."""
+        page_token = None
+        changed = False
+        while True:
+            response = events.list(
+                calendarId=self.calendar_id,
+                showDeleted=True,
+                pageToken=page_token,
+                fields="items(id),nextPageToken,nextSyncToken",
+                **kwargs,
+            ).execute()
+            changed = changed or bool(response.get("items"))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                self._sync_token = response.get("nextSyncToken")
+                return changed
+
+
+class CachedCalendarService(_Passthrough):
+    """Wraps a Google Calendar API service (`build("calendar", "v3")` or a fake with the same shape).
+
+    `events().list()` is cached per calendar and query, and invalidated by the calendar's sync token
+    (see CalendarChangeProbe). Inserting, updating or deleting events invalidates the calendar.
+    """
+
+    def __init__(self, service: Any, cache: ReadThroughCache, probes: Dict[str, CalendarChangeProbe]):
+        super().__init__(service)
+        self._cache = cache
+        self._probes = probes
+
+    def scope(self, calendar_id: str) -> str:
+        scope = f"calendar:{calendar_id}"
+        probe = self._probes.get(calendar_id)
+        if probe is None:
+            probe = self._probes[calendar_id] = CalendarChangeProbe(calendar_id)
+            self._cache.set_probe(scope, probe)
+        # The calendar toolkit builds a new service for every call; probe with the latest one
+        probe.service = self._target
+        return scope
+
+    def events(self) -> "_CalendarEvents":
+        return _CalendarEvents(self._target.events(), self)
+
+
+class _CalendarEvents(_Passthrough):
+    def __init__(self, target: Any, service: CachedCalendarService):
+        super().__init__(target)
+        self._service = service
+
+    def list(self, **kwargs: Any) -> _CachedRequest:
+        scope = self._service.scope(kwargs.get("calendarId", "primary"))
+        key = _request_key(scope, "events.list", **kwargs)
+        return _CachedRequest(self._service._cache, key, scope, self._target.list(**kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._target, name)
+        if not callable(method):
+            return method
+
+        def request(*args: Any, **kwargs: Any) -> Any:
+            scope = self._service.scope(kwargs.get("calendarId", "primary"))
+            return _InvalidatingRequest(self._service._cache, scope, method(*args, **kwargs))
+
+        return request
@@ -0,0 +1,178 @@
+"""Gmail and Google Calendar toolkits that read through a ReadThroughCache.
+
+Importing this module needs the Google client libraries, like the agno toolkits it extends.
+"""
+
+import os
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+
+from agno.tools.gmail import GmailTools
+from agno.tools.googlecalendar import SCOPES as CALENDAR_SCOPES, GoogleCalendarTools
+from agno.utils.log import logger
+
+from workplace.availability import Booking, notify_bookings, parse_time
+from workplace.google_cache import CachedCalendarService, CachedGmailService, CalendarChangeProbe, ReadThroughCache
+from workplace.transport import HttpTransport, TokenCache
+
+# google-auth treats credentials this close to expiry as expired and refreshes them on the next request
+REFRESH_THRESHOLD_SECONDS = 300
+
+
+def google_service(api: str, version: str, creds: Credentials, transport: Optional[HttpTransport] = None) -> Any:
+    """A Google API client for `creds`, on the transport's connection pool when there is one."""
+    if transport is None:
+        return build(api, version, credentials=creds)
+    return build(api, version, http=AuthorizedHttp(creds, http=transport.httplib2()))
+
+
+def credentials_lifetime(creds: Credentials) -> Optional[float]:
+    """Seconds until google-auth would refresh `creds`, for TokenCache."""
+    if creds.expiry is None:
+        return None
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return max((creds.expiry - now).total_seconds() - REFRESH_THRESHOLD_SECONDS, 0.0)
+
+
+class CachedGmailTools(GmailTools):
+    """GmailTools whose message listings and fetches are served from `cache` while the mailbox is unchanged.
+
+    With a `transport`, the API client sends through its connection pool, and the credentials are
+    kept in its TokenCache, so concurrent calls at expiry share one refresh.
+    """
+
+    def __init__(self, cache: Optional[ReadThroughCache] = None, transport: Optional[HttpTransport] = None, **kwargs: Any):
+        self.cache: ReadThroughCache = cache if cache is not None else ReadThroughCache()
+        self.transport: Optional[HttpTransport] = transport
+        self.tokens: TokenCache = transport.tokens if transport is not None else TokenCache()
+        self._service: Optional[CachedGmailService] = None
+        super().__init__(**kwargs)
+
+    def _auth(self) -> None:
+        self.creds = self.tokens.get(("google", os.path.abspath(self.token_path or "token.json")), self._fetch_credentials)
+        self.service = google_service("gmail", "v1", self.creds, self.transport)
+
+    def _fetch_credentials(self) -> Tuple[Credentials, Optional[float]]:
+        super()._auth()
+        return self.creds, credentials_lifetime(self.creds)
+
+    @property
+    def service(self) -> Optional[CachedGmailService]:
+        return self._service
+
+    @service.setter
+    def service(self, service: Any) -> None:
+        # GmailTools builds the service on first use; wrap whatever it assigns
+        if service is not None and not isinstance(service, CachedGmailService):
+            service = CachedGmailService(service, self.cache)
+        self._service = service
+
+
+def booked_event(event: Dict[str, Any]) -> Optional[Booking]:
+    """The Booking of an event created in the user's calendar, from the Calendar API's event resource."""
+    if "id" not in event:
+        return None
+    attendees = ["me"] + [attendee["email"] for attendee in event.get("attendees", []) if not attendee.get("self")]
+    return attendees, _event_time(event["start"]), _event_time(event["end"])
+
+
+def _event_time(value: Dict[str, str]) -> datetime:
+    moment = datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=ZoneInfo(value.get("timeZone") or "UTC"))
+    return moment
+
+
+def authorized(func):
+    """Like agno's `authenticated`, but the credentials and the API client are reused until the token expires."""
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        self._authorize()
+        return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+class CachedGoogleCalendarTools(GoogleCalendarTools):
+    """GoogleCalendarTools whose event listings are served from `cache` until the calendar's sync token reports a change.
+
+    agno's toolkit reads the token file and builds a new API client (and connection) before every
+    call; here both are kept until the token expires, in the TokenCache of `transport` when given,
+    whose connection pool the client then uses. Events created with `create_event` are passed to
+    `booking_listeners`.
+    """
+
+    def __init__(self, cache: Optional[ReadThroughCache] = None, transport: Optional[HttpTransport] = None, **kwargs: Any):
+        self.cache: ReadThroughCache = cache if cache is not None else ReadThroughCache()
+        self.transport: Optional[HttpTransport] = transport
+        self.tokens: TokenCache = transport.tokens if transport is not None else TokenCache()
+        self._probes: Dict[str, CalendarChangeProbe] = {}
+        self._service: Optional[CachedCalendarService] = None
+        self.booking_listeners: List[Callable[..., None]] = []
+        super().__init__(**kwargs)
+
+    list_events = authorized(GoogleCalendarTools.list_events.__wrapped__)
+    create_event = authorized(notify_bookings(booked_event)(GoogleCalendarTools.create_event.__wrapped__))
+
+    @property
+    def service(self) -> Optional[CachedCalendarService]:
+        return self._service
+
+    @service.setter
+    def service(self, service: Any) -> None:
+        # GoogleCalendarTools rebuilds the service before every call; the cache and sync state outlive it
+        if service is not None and not isinstance(service, CachedCalendarService):
+            service = CachedCalendarService(service, self.cache, self._probes)
+        self._service = service
+
+    @authorized
+    def free_busy(self, attendees: List[str], start: datetime, end: datetime) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        """Busy periods of each attendee's calendar from the free/busy API, a BusySource for AvailabilityTools.
+
+        "me" is the user's primary calendar. Attendees whose calendar is not shared are left out.
+        """
+        calendar_ids = {("primary" if name == "me" else name): name for name in attendees}
+        busy: Dict[str, List[Tuple[datetime, datetime]]] = {}
+        ids = list(calendar_ids)
+        # The API takes at most 50 calendars per query
+        for offset in range(0, len(ids), 50):
+            body = {"timeMin": start.isoformat(), "timeMax": end.isoformat(), "items": [{"id": calendar_id} for calendar_id in ids[offset : offset + 50]]}
+            response = self.service.freebusy().query(body=body).execute()
+            for calendar_id, calendar in response.get("calendars", {}).items():
+                if calendar.get("errors"):
+                    logger.warning(f"Free/busy of {calendar_id} unavailable: {calendar['errors']}")
+                    continue
+                busy[calendar_ids.get(calendar_id, calendar_id)] = [
+                    (parse_time(period["start"]), parse_time(period["end"])) for period in calendar.get("busy", [])
+                ]
+        return busy
+
+    def _authorize(self) -> None:
+        creds = self.tokens.get(("google", os.path.abspath(self.token_path)), self._fetch_credentials)
+        if creds is not self.creds or self.service is None:
+            self.creds = creds
+            self.service = google_service("calendar", "v3", creds, self.transport)
+
+    def _fetch_credentials(self) -> Tuple[Credentials, Optional[float]]:
+        # The same steps as agno's `authenticated`
+        creds = None
+        if os.path.exists(self.token_path):
+            creds = Credentials.from_authorized_user_file(self.token_path, CALENDAR_SCOPES)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request(session=self.transport.session()) if self.transport is not None else Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(self.creds_path, CALENDAR_SCOPES)
+                creds = flow.run_local_server(port=0)
+            with open(self.token_path, "w") as token:
+                token.write(creds.to_json())
+        return creds, credentials_lifetime(creds)
@@ -0,0 +1,178 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agno.storage.agent.session import AgentSession
+
+
+def _run_key(run: Dict[str, Any]) -> Any:
+    response = run.get("response") or {}
+    return response.get("run_id") or json.dumps(run, sort_keys=True, default=str)
+
+
+def _message_key(message: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (message.get("role"), message.get("created_at"), json.dumps(message.get("content"), default=str))
+
+
+def _after_stored(update: List[Dict[str, Any]], stored: List[Dict[str, Any]], key: Callable[[Dict[str, Any]], Any]) -> List[Dict[str, Any]]:
+    """The items of `update` after the latest stored one it contains (all of them when it contains none)."""
+    if stored:
+        last = key(stored[-1])
+        for index in range(len(update) - 1, -1, -1):
+            if key(update[index]) == last:
+                return update[index + 1 :]
+    return update
+
+
+def window_memory(memory: Optional[Dict[str, Any]], num_runs: int, num_messages: int) -> Optional[Dict[str, Any]]:
+    """Return a copy of an AgentMemory dict with only the last `num_runs` runs and `num_messages` messages.
+
+    A leading system message is always kept.
+    """
+    if not memory:
+        return memory
+    windowed = dict(memory)
+    runs = memory.get("runs")
+    if runs and len(runs) > num_runs:
+        windowed["runs"] = runs[-num_runs:]
+    messages = memory.get("messages")
+    if messages and len(messages) > num_messages:
+        head = [messages[0]] if messages[0].get("role") == "system" else []
+        windowed["messages"] = head + messages[-num_messages:]
+    return windowed
+
+
+def merge_memory(stored: Optional[Dict[str, Any]], update: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Merge a (possibly windowed) AgentMemory dict into the stored one.
+
+    Runs and messages in `update` that are not in `stored` are appended, so nothing that fell out of
+    a window is lost. Only those after the latest stored one count: older ones were already stored,
+    and may have been dropped from it since. Every other key (summary, memories, ...) comes from `update`.
+    """
+    if not stored:
+        return update
+    if update is None:
+        return stored
+    merged = dict(update)
+
+    stored_runs = stored.get("runs") or []
+    run_keys = {_run_key(run) for run in stored_runs}
+    update_runs = _after_stored(update.get("runs") or [], stored_runs, _run_key)
+    merged["runs"] = stored_runs + [run for run in update_runs if _run_key(run) not in run_keys]
+
+    stored_messages = stored.get("messages") or []
+    update_messages = update.get("messages") or []
+    # The system message is replaced in place when it changes
+    if update_messages and update_messages[0].get("role") == "system":
+        if stored_messages and stored_messages[0].get("role") == "system":
+            stored_messages = [update_messages[0]] + stored_messages[1:]
+        else:
+            stored_messages = [update_messages[0]] + stored_messages
+        update_messages = update_messages[1:]
+    update_messages = _after_stored(update_messages, stored_messages, _message_key)
+    message_keys = {_message_key(message) for message in stored_messages}
+    merged["messages"] = stored_messages + [m for m in update_messages if _message_key(m) not in message_keys]
+    return merged
+
+
+def windowed_session(session: AgentSession, memory: Optional[Dict[str, Any]]) -> AgentSession:
+    return AgentSession(
+        session_id=session.session_id,
+        agent_id=session.agent_id,
+        user_id=session.user_id,
+        memory=memory,
+        agent_data=session.agent_data,
+        session_data=session.session_data,
+        extra_data=session.extra_data,
+        created_at=session.created_at,
+        updated_at=session.updated_at,
+    )
+
+
+class SessionHistoryCache:
+    """The most recent runs of each session, kept in memory so a turn never re-reads the full history.
+
+    Each cached session holds the last `num_runs` runs (use the largest `num_history_responses` of the
+    agents sharing the storage) and the last `num_messages` messages. Sessions are evicted least recently
+    used first once there are more than `max_sessions` of them or they take more than `max_bytes`
+    (measured as the size of their JSON encoding). An entry can carry the version of the stored
+    session it was read or written as, for storages shared between processes.
+    """
+
+    def __init__(self, num_runs: int = 10, num_messages: int = 40, max_sessions: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.num_runs: int = num_runs
+        self.num_messages: int = num_messages
+        self.max_sessions: int = max_sessions
+        self.max_bytes: int = max_bytes
+        # session_id -> (window, size in bytes, stored version)
+        self._entries: "OrderedDict[str, Tuple[AgentSession, int, Optional[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, session_id: str) -> Optional[AgentSession]:
+        """Return a copy of the cached window of the session, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            session = entry[0]
+        # agno merges extra_data into the loaded session in place, so hand out copies of the dicts
+        copied = windowed_session(session, dict(session.memory) if session.memory is not None else None)
+        if copied.extra_data is not None:
+            copied.extra_data = dict(copied.extra_data)
+        return copied
+
+    def put(self, session: AgentSession, version: Optional[int] = None) -> AgentSession:
+        """Cache the window of `session` and return it."""
+        windowed = windowed_session(session, window_memory(session.memory, self.num_runs, self.num_messages))
+        size = len(json.dumps(windowed.memory, default=str)) if windowed.memory else 0
+        with self._lock:
+            previous = self._entries.pop(session.session_id, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[session.session_id] = (windowed, size, version)
+            self.bytes += size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_sessions or self.bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+        return windowed
+
+    def version(self, session_id: str) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            return entry[2] if entry is not None else None
+
+    def set_version(self, session_id: str, version: int) -> None:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries[session_id] = (entry[0], entry[1], version)
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self.bytes -= entry[1]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,539 @@
+import asyncio
+import atexit
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.sql.expression import select
+
+from agno.agent import Agent
+from agno.storage.workflow.base import WorkflowStorage
+from agno.storage.workflow.session import WorkflowSession
+from agno.utils.log import logger
+
+from workplace.delegation import response_to_text
+from workplace.prefork import register_fork_hooks
+from workplace.ratelimit import BACKGROUND, priority
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process, nothing to serialize
+    fcntl = None
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+# Was running when the process stopped; not rerun, since the agent may already have sent emails or written docs
+INTERRUPTED = "interrupted"
+FINISHED = (COMPLETED, FAILED, CANCELLED, INTERRUPTED)
+# Most jobs returned by one JobQueue.list call
+MAX_LIST_LIMIT = 500
+
+
+def worker_name() -> str:
+    """Identifies the process a job is queued or running in."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _worker_alive(worker: Optional[str]) -> bool:
+    """Whether another process of this host that owns jobs is still running."""
+    if not worker or worker == worker_name():
+        return False
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Job:
+    """One agent request submitted to a JobQueue, stored as a WorkflowSession keyed by the job ID."""
+
+    def __init__(
+        self,
+        job_id: str,
+        agent_id: str,
+        message: str,
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        status: str = QUEUED,
+        content: str = "",
+        error: Optional[str] = None,
+        run_id: Optional[str] = None,
+        created_at: Optional[float] = None,
+        started_at: Optional[float] = None,
+        finished_at: Optional[float] = None,
+        worker: Optional[str] = None,
+    ):
+        self.job_id = job_id
+        self.agent_id = agent_id
+        self.message = message
+        self.user_id = user_id
+        self.session_id = session_id
+        self.status = status
+        # Response text so far; streaming clients resume from a character offset into it
+        self.content = content
+        self.error = error
+        self.run_id = run_id
+        self.created_at: float = created_at if created_at is not None else time.time()
+        self.started_at = started_at
+        self.finished_at = finished_at
+        # The process that queued or runs the job (see worker_name)
+        self.worker = worker
+        self.cancel_requested: bool = False
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def summary(self) -> Dict[str, Any]:
+        """to_dict without the response text."""
+        data = self.to_dict()
+        data.pop("content")
+        return data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "agent_id": self.agent_id,
+            "message": self.message,
+            "user_id": self.user_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "content": self.content,
+            "error": self.error,
+            "run_id": self.run_id,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "worker": self.worker,
+        }
+
+    @classmethod
+    def from_summary(cls, job_id: str, data: Dict[str, Any]) -> "Job":
+        return cls(job_id=job_id, **{key: value for key, value in data.items() if key in SUMMARY_FIELDS})
+
+    @classmethod
+    def from_session(cls, session: WorkflowSession) -> "Job":
+        data = dict(session.session_data or {})
+        data.pop("job_id", None)
+        return cls(job_id=session.session_id, **data)
+
+
+# Stored fields of a job listed without its content
+SUMMARY_FIELDS = tuple(key for key in Job("", "", "").to_dict() if key not in ("job_id", "content"))
+
+
+class JobQueue:
+    """Runs agent requests on a pool of worker threads, outside the HTTP request that submitted them.
+
+    Jobs are persisted in a WorkflowStorage table (one WorkflowSession per job), so their status and
+    result survive restarts and dropped connections. The response text is checkpointed every
+    `checkpoint_interval` seconds while the agent streams it. On startup, queued jobs are picked up
+    again and jobs that were running are marked interrupted. Cancelling a running job stops it at
+    the next streamed chunk; a model or tool call already in flight is not aborted. Jobs run at
+    background priority: when a RetryScheduler rate limits an API, interactive requests go first.
+
+    Several processes can share the storage (the workers of a PreforkServer). Each job belongs to the
+    process that queued it; the others serve its status and stream from its checkpoints, and pass a
+    cancel request on through the storage, which the owner checks at every checkpoint. Startup only
+    recovers the jobs of processes that are gone, one process at a time if `recovery_lock` (a lock
+    file path) is given. With `start=False`, workers and recovery wait for `start()`, which
+    get_jobs_router calls when the app starts serving, so a preloaded app does not run jobs in the
+    process that forks the workers.
+
+    Finished jobs are deleted `retention` seconds after they finish, on startup and then at most once
+    every `purge_interval` seconds as jobs complete. On a SQL storage, `list` pages through the table
+    and reads every job but its content; other storages load all the jobs to list them.
+    """
+
+    def __init__(
+        self,
+        agents: Dict[str, Agent],
+        storage: WorkflowStorage,
+        workers: int = 4,
+        checkpoint_interval: float = 1.0,
+        workflow_id: str = "agent-jobs",
+        default_agent_id: Optional[str] = None,
+        recovery_lock: Optional[str] = None,
+        start: bool = True,
+        retention: Optional[float] = None,
+        purge_interval: float = 3600.0,
+    ):
+        if not agents:
+            raise ValueError("JobQueue needs at least one agent")
+        self.agents: Dict[str, Agent] = agents
+        self.storage: WorkflowStorage = storage
+        self.workers: int = workers
+        self.checkpoint_interval: float = checkpoint_interval
+        self.workflow_id: str = workflow_id
+        self.default_agent_id: str = default_agent_id or next(iter(agents))
+        self.recovery_lock: Optional[str] = recovery_lock
+        self.retention: Optional[float] = retention
+        self.purge_interval: float = purge_interval
+        self._purged_at: float = 0.0
+        # Jobs that are queued or running in this process; finished jobs are only in storage
+        self._live: Dict[str, Job] = {}
+        self._changed = threading.Condition()
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        register_fork_hooks(self)
+        if start:
+            self.start()
+
+    def start(self) -> None:
+        """Recover the jobs left by stopped processes and start the worker threads (once)."""
+        with self._changed:
+            if self._threads:
+                return
+            self._threads = [threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True) for i in range(self.workers)]
+        self.purge()
+        self._recover()
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.close)
+
+    def submit(self, message: str, agent_id: Optional[str] = None, user_id: Optional[str] = None, session_id: Optional[str] = None) -> Job:
+        agent_id = agent_id or self.default_agent_id
+        if agent_id not in self.agents:
+            raise ValueError(f"Unknown agent: {agent_id}")
+        job = Job(job_id=str(uuid.uuid4()), agent_id=agent_id, message=message, user_id=user_id, session_id=session_id, worker=worker_name())
+        self.start()
+        self._save(job)
+        with self._changed:
+            self._live[job.job_id] = job
+        self._queue.put(job.job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._changed:
+            job = self._live.get(job_id)
+            if job is not None:
+                return job
+        session = self.storage.read(job_id)
+        if session is None or session.workflow_id != self.workflow_id:
+            return None
+        return Job.from_session(session)
+
+    def list(self, status: Optional[str] = None, user_id: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Job]:
+        """Most recent jobs first, without their content (see `get`)."""
+        limit, offset = min(max(limit, 0), MAX_LIST_LIMIT), max(offset, 0)
+        table = getattr(self.storage, "table", None)
+        if table is None:
+            jobs = [Job.from_summary(session.session_id, session.session_data or {}) for session in self.storage.get_all_sessions(user_id=user_id, workflow_id=self.workflow_id)]
+            matching = [job for job in jobs if status is None or job.status == status]
+            return sorted(matching, key=lambda job: job.created_at, reverse=True)[offset : offset + limit]
+        # Every status change is saved, so the table is current for everything but the content
+        data = table.c.session_data
+        stmt = select(table.c.session_id, *(data[key] for key in SUMMARY_FIELDS)).where(table.c.workflow_id == self.workflow_id)
+        if user_id:
+            stmt = stmt.where(table.c.user_id == user_id)
+        if status is not None:
+            stmt = stmt.where(data["status"].as_string() == status)
+        stmt = stmt.order_by(data["created_at"].as_float().desc()).limit(limit).offset(offset)
+        with self.storage.Session() as sess:
+            rows = sess.execute(stmt).all()
+        return [Job.from_summary(row[0], dict(zip(SUMMARY_FIELDS, row[1:]))) for row in rows]
+
+    def purge(self) -> int:
+        """Delete the jobs that finished more than `retention` seconds ago and return how many there were."""
+        self._purged_at = time.monotonic()
+        if self.retention is None:
+            return 0
+        cutoff = time.time() - self.retention
+        table = getattr(self.storage, "table", None)
+        if table is None:
+            expired = [
+                session.session_id
+                for session in self.storage.get_all_sessions(workflow_id=self.workflow_id)
+                if (session.session_data or {}).get("finished_at") is not None and session.session_data["finished_at"] < cutoff
+            ]
+            for job_id in expired:
+                self.storage.delete_session(job_id)
+            purged = len(expired)
+        else:
+            # Unfinished jobs have no finished_at and never match
+            stmt = table.delete().where(table.c.workflow_id == self.workflow_id, table.c.session_data["finished_at"].as_float() < cutoff)
+            with self.storage.Session() as sess, sess.begin():
+                purged = sess.execute(stmt).rowcount
+        if purged:
+            logger.info(f"Deleted {purged} jobs finished more than {self.retention:.0f}s ago")
+        return purged
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        with self._changed:
+            job = self._live.get(job_id)
+            if job is None:
+                job = self.get(job_id)
+                if job is not None and not job.finished:
+                    # Queued or running in another process, which picks the request up at its next checkpoint
+                    self.storage.upsert(WorkflowSession(session_id=self._cancel_id(job_id), workflow_id=self._cancel_workflow_id))
+                return job
+            job.cancel_requested = True
+            if job.status != QUEUED:
+                return job
+            # Not picked up yet: the worker will skip it
+            self._finish(job, CANCELLED)
+        self._save(job)
+        with self._changed:
+            self._live.pop(job_id, None)
+        return job
+
+    def wait(self, job_id: str, offset: int = 0, timeout: float = 15.0) -> Optional[Job]:
+        """Block until the job's content is longer than `offset`, it finishes, or `timeout` seconds pass."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._live.get(job_id)
+                if job is None:
+                    break
+                remaining = deadline - time.monotonic()
+                if len(job.content) > offset or job.finished or remaining <= 0:
+                    return job
+                self._changed.wait(remaining)
+        # Finished, or live in another process: follow its checkpoints
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or len(job.content) > offset or job.finished or remaining <= 0:
+                return job
+            time.sleep(min(self.checkpoint_interval, remaining))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._changed:
+            live = list(self._live.values())
+        return {
+            "workers": self.workers,
+            "queued": sum(job.status == QUEUED for job in live),
+            "running": sum(job.status == RUNNING for job in live),
+        }
+
+    def close(self, timeout: float = 5.0) -> None:
+        if not any(thread.is_alive() for thread in self._threads):
+            return
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=timeout / len(self._threads))
+
+    def _recover(self) -> None:
+        lock_file = None
+        if self.recovery_lock is not None and fcntl is not None:
+            lock_file = open(self.recovery_lock, "a")
+            # Held until the claimed jobs are saved, so two processes starting together never take the same job
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            resumed = []
+            for session in self.storage.get_all_sessions(workflow_id=self.workflow_id):
+                job = Job.from_session(session)
+                if job.finished or _worker_alive(job.worker):
+                    continue
+                if job.status == RUNNING:
+                    job.status, job.error, job.finished_at = INTERRUPTED, "The server stopped while the job was running", time.time()
+                    self._save(job)
+                elif job.status == QUEUED:
+                    job.worker = worker_name()
+                    self._save(job)
+                    resumed.append(job)
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+        # Oldest first, in submission order
+        with self._changed:
+            for job in sorted(resumed, key=lambda job: job.created_at):
+                self._live[job.job_id] = job
+                self._queue.put(job.job_id)
+        if resumed:
+            logger.info(f"Resuming {len(resumed)} queued jobs")
+
+    def _work(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            with self._changed:
+                job = self._live.get(job_id)
+                if job is None or job.status != QUEUED:
+                    continue
+            if self._cancel_requested(job):
+                with self._changed:
+                    self._finish(job, CANCELLED)
+                self._save(job)
+                self._forget(job)
+                continue
+            with self._changed:
+                job.status, job.started_at = RUNNING, time.time()
+            self._save(job)
+            try:
+                # Requests from the Playground get the rate limited APIs first
+                with priority(BACKGROUND):
+                    self._run(job)
+            except Exception as e:
+                logger.error(f"Job {job.job_id} failed: {e}")
+                with self._changed:
+                    job.error = str(e)
+                    self._finish(job, FAILED)
+            self._save(job)
+            self._forget(job)
+            if time.monotonic() - self._purged_at >= self.purge_interval:
+                self.purge()
+
+    def _forget(self, job: Job) -> None:
+        with self._changed:
+            self._live.pop(job.job_id, None)
+        if job.cancel_requested:
+            self.storage.delete_session(self._cancel_id(job.job_id))
+
+    def _run(self, job: Job) -> None:
+        update: Dict[str, Any] = {}
+        if job.session_id is not None:
+            update["session_id"] = job.session_id
+        if job.user_id is not None:
+            update["user_id"] = job.user_id
+        agent = self.agents[job.agent_id].deep_copy(update=update)
+        checkpointed = time.monotonic()
+        stream = agent.run(job.message, stream=True)
+        try:
+            for chunk in stream:
+                if job.cancel_requested:
+                    break
+                content = getattr(chunk, "content", None)
+                if content is None:
+                    continue
+                with self._changed:
+                    job.content += response_to_text(content)
+                    self._changed.notify_all()
+                if time.monotonic() - checkpointed >= self.checkpoint_interval:
+                    self._save(job)
+                    self._cancel_requested(job)
+                    checkpointed = time.monotonic()
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        with self._changed:
+            job.run_id = agent.run_id
+            job.session_id = agent.session_id
+            self._finish(job, CANCELLED if job.cancel_requested else COMPLETED)
+
+    @property
+    def _cancel_workflow_id(self) -> str:
+        return f"{self.workflow_id}-cancel"
+
+    @staticmethod
+    def _cancel_id(job_id: str) -> str:
+        return f"{job_id}:cancel"
+
+    def _cancel_requested(self, job: Job) -> bool:
+        """Whether the job was cancelled here or, through the storage, by another process."""
+        if not job.cancel_requested and self.storage.read(self._cancel_id(job.job_id)) is not None:
+            job.cancel_requested = True
+        return job.cancel_requested
+
+    def _finish(self, job: Job, status: str) -> None:
+        # Called with self._changed held
+        job.status, job.finished_at = status, time.time()
+        self._changed.notify_all()
+
+    def _save(self, job: Job) -> None:
+        with self._changed:
+            data = job.to_dict()
+        data.pop("job_id")
+        session = WorkflowSession(session_id=job.job_id, workflow_id=self.workflow_id, user_id=job.user_id, session_data=data)
+        if self.storage.upsert(session) is None:
+            logger.warning(f"Could not persist job {job.job_id}")
+
+    def _after_fork_child(self) -> None:
+        # Jobs of the parent stay with the parent; the worker recovers and runs its own once started
+        engine = getattr(self.storage, "db_engine", None)
+        if engine is not None:
+            engine.dispose(close=False)
+        self._live = {}
+        self._changed = threading.Condition()
+        self._queue = queue.Queue()
+        self._threads = []
+
+
+class JobRequest(BaseModel):
+    message: str
+    agent_id: Optional[str] = None
+    user_id: Optional[str] = None
+    session_id: Optional[str] = None
+
+
+def get_jobs_router(jobs: JobQueue) -> APIRouter:
+    """Endpoints to submit agent requests as background jobs, poll or stream them, and cancel them."""
+    router = APIRouter(prefix="/v1/jobs", tags=["Jobs"])
+    # In every worker process, once it serves requests
+    router.add_event_handler("startup", jobs.start)
+
+    @router.post("", status_code=202)
+    def submit_job(body: JobRequest) -> Dict[str, Any]:
+        try:
+            job = jobs.submit(body.message, agent_id=body.agent_id, user_id=body.user_id, session_id=body.session_id)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        return {"job_id": job.job_id, "status": job.status}
+
+    @router.get("")
+    def list_jobs(status: Optional[str] = None, user_id: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """Most recent jobs first, `limit` (at most MAX_LIST_LIMIT) from `offset`. GET /v1/jobs/{job_id} returns a job's content."""
+        return [job.summary() for job in jobs.list(status=status, user_id=user_id, limit=limit, offset=offset)]
+
+    @router.get("/stats")
+    def job_stats() -> Dict[str, Any]:
+        return jobs.stats()
+
+    @router.get("/{job_id}")
+    def get_job(job_id: str) -> Dict[str, Any]:
+        job = jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job.to_dict()
+
+    @router.get("/{job_id}/stream")
+    async def stream_job(job_id: str, offset: int = 0) -> StreamingResponse:
+        """Newline-delimited JSON: the response text as it is produced, then the final status.
+
+        Pass the last `offset` received to resume after a dropped connection.
+        """
+        if jobs.get(job_id) is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        async def events(offset: int) -> AsyncIterator[str]:
+            while True:
+                job = await asyncio.to_thread(jobs.wait, job_id, offset)
+                if job is None:
+                    return
+                if len(job.content) > offset:
+                    delta, offset = job.content[offset:], len(job.content)
+                    yield json.dumps({"content": delta, "offset": offset}) + "\n"
+                if job.finished:
+                    yield json.dumps({"status": job.status, "error": job.error, "offset": offset}) + "\n"
+                    return
+
+        return StreamingResponse(events(offset), media_type="application/x-ndjson")
+
+    @router.post("/{job_id}/cancel")
+    def cancel_job(job_id: str) -> Dict[str, Any]:
+        job = jobs.cancel(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return {"job_id": job.job_id, "status": job.status}
+
+    return router
@@ -0,0 +1,147 @@
+"""Slack, Zoom and Composio clients that send their HTTP requests through a shared HttpTransport.
+
+Importing this module needs slack_sdk and composio, like the toolkits it extends.
+"""
+
+import functools
+import io
+import types
+from datetime import timedelta
+from http.client import responses
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.request import Request
+
+import requests
+
+from agno.tools.slack import SlackTools
+from agno.tools.zoom import ZoomTools
+from agno.utils.log import logger
+from composio_agno import ComposioToolSet
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackRequestError
+
+from workplace.availability import Booking, notify_bookings, parse_time
+from workplace.transport import HttpTransport
+
+ZOOM_TOKEN_URL = "https://zoom.us/oauth/token"
+# The ZoomTools methods that call the Zoom API through the module-level `requests` functions
+ZOOM_API_METHODS = ("schedule_meeting", "get_upcoming_meetings", "list_meetings", "get_meeting_recordings", "delete_meeting", "get_meeting")
+
+
+class PooledWebClient(WebClient):
+    """slack_sdk WebClient that sends through `transport` instead of opening a urllib connection per call.
+
+    Retries, rate limit handling and response parsing are slack_sdk's own; the `proxy` option is not
+    supported, configure proxies on the transport.
+    """
+
+    def __init__(self, transport: HttpTransport, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.transport: HttpTransport = transport
+
+    def _perform_urllib_http_request_internal(self, url: str, req: Request) -> Dict[str, Any]:
+        if not url.lower().startswith("http"):
+            raise SlackRequestError(f"Invalid URL detected: {url}")
+        status, headers, body = self.transport.send_urllib(req, timeout=self.timeout)
+        if status >= 400:
+            # What urlopen raises, so slack_sdk's retry handlers see the same errors
+            raise HTTPError(url, status, responses.get(status, ""), headers, io.BytesIO(body))
+        if headers.get_content_type() == "application/gzip":
+            return {"status": status, "headers": headers, "body": body}
+        return {"status": status, "headers": headers, "body": body.decode(headers.get_content_charset() or "utf-8")}
+
+
+class PooledSlackTools(SlackTools):
+    """SlackTools on a PooledWebClient."""
+
+    def __init__(self, transport: HttpTransport, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.transport: HttpTransport = transport
+        self.client = PooledWebClient(transport, token=self.token)
+
+
+def _with_requests(function: types.FunctionType, requests_module: Any) -> types.FunctionType:
+    """A copy of `function` that finds `requests_module` under the global name `requests`."""
+    copy = types.FunctionType(function.__code__, {**function.__globals__, "requests": requests_module}, function.__name__, function.__defaults__, function.__closure__)
+    copy.__kwdefaults__ = function.__kwdefaults__
+    return functools.update_wrapper(copy, function)
+
+
+class _SessionRequests:
+    """The module-level requests functions ZoomTools calls, on a pooled Session."""
+
+    RequestException = requests.RequestException
+
+    def __init__(self, session: requests.Session):
+        self.get = session.get
+        self.post = session.post
+        self.put = session.put
+        self.patch = session.patch
+        self.delete = session.delete
+
+
+def booked_meeting(meeting: Dict[str, Any]) -> Optional[Booking]:
+    """The Booking of a meeting scheduled on the user's Zoom account, from ZoomTools.schedule_meeting's result."""
+    if "meeting_id" not in meeting:
+        return None
+    start = parse_time(meeting["start_time"])
+    return ["me"], start, start + timedelta(minutes=int(meeting["duration"]))
+
+
+class PooledZoomTools(ZoomTools):
+    """ZoomTools whose API calls reuse the transport's connections and whose access token is shared.
+
+    The server-to-server OAuth token is kept in the transport's TokenCache under the account and client
+    ID, so every instance (and every concurrent call at expiry) shares one token and one refresh.
+    ZoomTools calls the module-level `requests` functions; each instance gets its own copies of those
+    methods, which call them on its pooled Session, and other ZoomTools are left as they are. Meetings
+    scheduled with `schedule_meeting` are passed to `booking_listeners`.
+    """
+
+    def __init__(self, transport: HttpTransport, **kwargs: Any):
+        self.booking_listeners: List[Callable[..., None]] = []
+        self.transport: HttpTransport = transport
+        self.session: requests.Session = transport.session()
+        session_requests = _SessionRequests(self.session)
+        methods = {name: _with_requests(getattr(ZoomTools, name), session_requests) for name in ZOOM_API_METHODS}
+        methods["schedule_meeting"] = notify_bookings(booked_meeting)(methods["schedule_meeting"])
+        # Bound before ZoomTools.__init__ registers the tools, so the registered functions are these
+        for name, method in methods.items():
+            setattr(self, name, types.MethodType(method, self))
+        super().__init__(**kwargs)
+
+    def get_access_token(self) -> str:
+        try:
+            return self.transport.tokens.get(("zoom", self.account_id, self.client_id), self._fetch_access_token)
+        except requests.RequestException as e:
+            logger.error(f"Failed to generate Zoom access token: {e}")
+            return ""
+
+    def _fetch_access_token(self) -> Tuple[str, Optional[float]]:
+        response = self.session.post(
+            ZOOM_TOKEN_URL,
+            auth=(self.client_id or "", self.client_secret or ""),
+            data={"grant_type": "account_credentials", "account_id": self.account_id},
+        )
+        response.raise_for_status()
+        token = response.json()
+        logger.debug("Generated a new Zoom access token")
+        return token["access_token"], float(token["expires_in"])
+
+
+class PooledComposioToolSet(ComposioToolSet, runtime="agno", description_char_limit=1024):
+    """ComposioToolSet whose API sessions are mounted on the transport."""
+
+    def __init__(self, *args: Any, transport: HttpTransport, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.transport: HttpTransport = transport
+
+    def _init_client(self):
+        client = super()._init_client()
+        if not getattr(client, "_pooled", False):
+            # Creating the sessions checks the API key, as Composio's first request would
+            self.transport.mount(client.http)
+            self.transport.mount(client.long_timeout_http)
+            client._pooled = True
+        return client
@@ -0,0 +1,59 @@
+import os
+import threading
+import weakref
+from typing import Any, Dict
+
+from agno.utils.log import logger
+
+# Objects whose threads, locks or connections need attention when the process forks, by id
+_objects: "weakref.WeakValueDictionary[int, Any]" = weakref.WeakValueDictionary()
+_lock = threading.Lock()
+
+
+def register_fork_hooks(obj: Any) -> None:
+    """Make `obj` safe to use in worker processes forked from this one (see PreforkServer).
+
+    Before every fork, the parent calls `obj._before_fork()` (e.g. to flush buffered writes and hold
+    the lock its background thread takes, so the child does not inherit it mid-operation) and
+    afterwards `obj._after_fork_parent()`. The child calls `obj._after_fork_child()`: only the thread
+    that forked survives in it, so the object recreates its locks, restarts its background thread
+    and drops connections it shares with the parent. Any of the three methods may be missing.
+    """
+    with _lock:
+        _objects[id(obj)] = obj
+
+
+def _registered() -> Dict[int, Any]:
+    with _lock:
+        return dict(_objects)
+
+
+def _before_fork() -> None:
+    for obj in _registered().values():
+        _call(obj, "_before_fork")
+
+
+def _after_fork_parent() -> None:
+    for obj in reversed(list(_registered().values())):
+        _call(obj, "_after_fork_parent")
+
+
+def _after_fork_child() -> None:
+    global _lock
+    _lock = threading.Lock()
+    for obj in _registered().values():
+        _call(obj, "_after_fork_child")
+
+
+def _call(obj: Any, name: str) -> None:
+    hook = getattr(obj, name, None)
+    if hook is None:
+        return
+    try:
+        hook()
+    except Exception as e:
+        logger.error(f"{type(obj).__name__}.{name} failed: {e}")
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_before_fork, after_in_parent=_after_fork_parent, after_in_child=_after_fork_child)
@@ -0,0 +1,43 @@
+import datetime
+from typing import Any, Callable, Optional, Tuple
+
+from tzlocal import get_localzone_name
+
+# Everything from this tag on is rendered for every run; everything before it is static per agent
+DYNAMIC_CONTEXT_TAG = "<current_datetime>"
+
+
+def current_datetime_context() -> str:
+    """The part of a system message that changes over time, rendered at call time."""
+    return (
+        f"{DYNAMIC_CONTEXT_TAG}\n"
+        f"Today's date is {datetime.datetime.now().strftime('%Y-%m-%d')} and timezone is {get_localzone_name()}\n"
+        "</current_datetime>"
+    )
+
+
+def with_current_datetime(static_message: str) -> Callable[..., str]:
+    """Build a system_message callable: the static text, followed by today's date and timezone.
+
+    agno calls the callable for every run, so the date stays correct in a long-running server,
+    while the static text is a single string object that prefix caches can key on.
+    """
+    static_message = static_message.rstrip() + "\n\n"
+
+    def system_message(agent: Optional[Any] = None) -> str:
+        return static_message + current_datetime_context()
+
+    return system_message
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation, so trivially different prompts compare equal."""
+    return " ".join(prompt.lower().split()).rstrip(" .!?")
+
+
+def split_system_message(system_message: str) -> Tuple[str, str]:
+    """Split a system message into its static prefix and its dynamic suffix (which may be empty)."""
+    index = system_message.find(DYNAMIC_CONTEXT_TAG)
+    if index == -1:
+        return system_message, ""
+    return system_message[:index], system_message[index:]
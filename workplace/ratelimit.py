@@ -0,0 +1,405 @@
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from agno.utils.log import logger
+
+from workplace.prefork import register_fork_hooks
+
+T = TypeVar("T")
+
+INTERACTIVE, BACKGROUND = 0, 1
+# What a call's outcome means for the upstream: classify functions return one of these
+OK, THROTTLED, UNAVAILABLE, FAILED = "ok", "throttled", "unavailable", "failed"
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Host suffixes of the APIs the toolkits call, and the upstream their quota belongs to
+UPSTREAM_HOSTS = {
+    "slack.com": "slack",
+    "zoom.us": "zoom",
+    "googleapis.com": "google",
+    "composio.dev": "composio",
+}
+
+_priority: ContextVar[int] = ContextVar("call_priority", default=INTERACTIVE)
+
+Classify = Callable[[Any, Optional[BaseException]], Tuple[str, Optional[float]]]
+
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    """Make the upstream calls of the block (and of the threads it hands work to) wait at `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamError(Exception):
+    """Raised instead of calling an upstream the scheduler is holding calls back from."""
+
+    def __init__(self, upstream: str, message: str):
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+
+
+class CircuitOpen(UpstreamError):
+    """The upstream failed repeatedly and calls to it fail fast until it is probed again."""
+
+
+class QueueTimeout(UpstreamError):
+    """The call would have waited for a slot longer than its priority allows."""
+
+
+class RateLimit:
+    """Quota and retry policy of one upstream service.
+
+    `rate` calls per second are allowed, in bursts of up to `burst`. A throttled response halves the
+    rate (down to `min_rate`) and each successful call raises it by `increase` again, up to `rate`.
+    Throttled and unavailable calls are retried up to `max_retries` times after an exponential backoff
+    from `base_delay` to `max_delay` seconds, with jitter, or after the upstream's Retry-After.
+    `failure_threshold` unavailable responses or connection errors in a row open the circuit for
+    `reset_timeout` seconds. Interactive calls give up after waiting `max_wait` seconds for a slot,
+    background calls after `background_max_wait`.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: Optional[int] = None,
+        min_rate: Optional[float] = None,
+        increase: Optional[float] = None,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_wait: float = 30.0,
+        background_max_wait: float = 300.0,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate: float = rate
+        self.burst: int = burst if burst is not None else max(int(rate), 1)
+        self.min_rate: float = min_rate if min_rate is not None else rate / 20
+        self.increase: float = increase if increase is not None else rate / 20
+        self.max_retries: int = max_retries
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.max_wait: float = max_wait
+        self.background_max_wait: float = background_max_wait
+
+    def __copy__(self) -> "RateLimit":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "RateLimit":
+        return self
+
+
+class _Upstream:
+    """Token bucket, shared backoff, circuit breaker, waiting calls and counters of one upstream."""
+
+    def __init__(self, name: str, limit: RateLimit):
+        self.name: str = name
+        self.limit: RateLimit = limit
+        self.rate: float = limit.rate
+        self.tokens: float = float(limit.burst)
+        self.refilled: float = time.monotonic()
+        # No call starts before this (monotonic) time: the backoff every caller shares
+        self.blocked_until: float = 0.0
+        self.streak: int = 0
+        self.circuit: str = CLOSED
+        self.failures: int = 0
+        self.opened_at: float = 0.0
+        self.probing: bool = False
+        # (priority, arrival) of the calls waiting for a slot; the smallest goes first
+        self.waiters: List[Tuple[int, int]] = []
+        self.calls: int = 0
+        self.throttled: int = 0
+        self.unavailable: int = 0
+        self.retries: int = 0
+        self.rejected: int = 0
+        self.timeouts: int = 0
+        self.circuit_opens: int = 0
+        self.wait_seconds: float = 0.0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.tokens + (now - self.refilled) * self.rate, float(self.limit.burst))
+        self.refilled = now
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "tokens": round(self.tokens, 3),
+            "queue_depth": len(self.waiters),
+            "queue_depth_background": sum(level == BACKGROUND for level, _ in self.waiters),
+            "backoff_seconds": round(max(self.blocked_until - now, 0.0), 3),
+            "circuit": self.circuit,
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "unavailable": self.unavailable,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "circuit_opens": self.circuit_opens,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+class RetryScheduler:
+    """One rate limiter and retry policy per upstream service, shared by every agent, toolkit and worker thread.
+
+    Calls go through `call` (or `acall`) with the upstream's name ("gemini", "google", "slack", ...;
+    `upstream_for` maps API hosts to them). A call first waits for a slot: a token of the upstream's
+    bucket, the end of any backoff the upstream is in, and its turn, with interactive calls ahead of
+    background ones (jobs run under `priority(BACKGROUND)`). The outcome, as `classify` reads it from
+    the result or exception, feeds back into the upstream's state: a 429 halves its rate and makes
+    every caller back off (Retry-After or exponential, with jitter) instead of each retrying on its
+    own, and repeated 5xx or connection errors open its circuit breaker, so calls fail fast with
+    CircuitOpen until a probe call gets through. A call that would wait longer than its priority
+    allows raises QueueTimeout right away. `stats` reports queue depth, rates, throttle events and
+    breaker state per upstream.
+
+    Limits are per process; with several worker processes, give each a share of the quota.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, RateLimit]] = None, default: Optional[RateLimit] = None, hosts: Optional[Dict[str, str]] = None):
+        self.limits: Dict[str, RateLimit] = dict(limits or {})
+        self.default: RateLimit = default or RateLimit()
+        self.hosts: Dict[str, str] = dict(UPSTREAM_HOSTS if hosts is None else hosts)
+        self._upstreams: Dict[str, _Upstream] = {}
+        self._arrivals = itertools.count()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        register_fork_hooks(self)
+
+    def __copy__(self) -> "RetryScheduler":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "RetryScheduler":
+        return self
+
+    def upstream_for(self, host: str) -> str:
+        for suffix, name in self.hosts.items():
+            if host == suffix or host.endswith("." + suffix):
+                return name
+        return host
+
+    def call(self, upstream: str, send: Callable[[], T], classify: Classify, retry_unavailable: bool = True) -> T:
+        """Run `send` in a slot of `upstream`, retrying while `classify` reports it throttled or unavailable.
+
+        When the retries run out, or a retry could not get a slot in time, the last result is
+        returned (or its exception raised), as if `send` had been called directly. With
+        `retry_unavailable` off (calls that must not be sent twice), only throttled calls are retried.
+        """
+        state = self._state(upstream)
+        error: Optional[BaseException] = None
+        result: Any = None
+        for attempt in itertools.count():
+            try:
+                self.acquire(upstream)
+            except UpstreamError:
+                if attempt == 0:
+                    raise
+                break
+            error, result = None, None
+            try:
+                result = send()
+            except Exception as e:
+                error = e
+            if not self._record(state, *classify(result, error), attempt, retry_unavailable):
+                break
+        if error is not None:
+            raise error
+        return result
+
+    async def acall(self, upstream: str, send: Callable[[], Awaitable[T]], classify: Classify, retry_unavailable: bool = True) -> T:
+        """`call` for coroutines: waits for a slot without blocking the event loop."""
+        state = self._state(upstream)
+        error: Optional[BaseException] = None
+        result: Any = None
+        for attempt in itertools.count():
+            try:
+                await self.aacquire(upstream)
+            except UpstreamError:
+                if attempt == 0:
+                    raise
+                break
+            error, result = None, None
+            try:
+                result = await send()
+            except Exception as e:
+                error = e
+            if not self._record(state, *classify(result, error), attempt, retry_unavailable):
+                break
+        if error is not None:
+            raise error
+        return result
+
+    def acquire(self, upstream: str) -> None:
+        """Wait for a slot of `upstream`; raises CircuitOpen or QueueTimeout instead of waiting in vain."""
+        state = self._state(upstream)
+        level = _priority.get()
+        started = time.monotonic()
+        deadline = started + (state.limit.max_wait if level == INTERACTIVE else state.limit.background_max_wait)
+        with self._changed:
+            ticket = (level, next(self._arrivals))
+            heapq.heappush(state.waiters, ticket)
+            try:
+                while True:
+                    wait = self._next_wait(state, ticket, deadline)
+                    if wait == 0:
+                        return
+                    self._changed.wait(wait)
+            finally:
+                self._leave(state, ticket, started)
+
+    async def aacquire(self, upstream: str) -> None:
+        state = self._state(upstream)
+        level = _priority.get()
+        started = time.monotonic()
+        deadline = started + (state.limit.max_wait if level == INTERACTIVE else state.limit.background_max_wait)
+        with self._lock:
+            ticket = (level, next(self._arrivals))
+            heapq.heappush(state.waiters, ticket)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._next_wait(state, ticket, deadline)
+                if wait == 0:
+                    return
+                # Nothing wakes a coroutine when the call ahead of it leaves, so it checks again soon
+                await asyncio.sleep(min(wait, 0.05))
+        finally:
+            with self._lock:
+                self._leave(state, ticket, started)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            upstreams = {name: state.stats(now) for name, state in self._upstreams.items()}
+        return {
+            "queue_depth": sum(state["queue_depth"] for state in upstreams.values()),
+            "throttled": sum(state["throttled"] for state in upstreams.values()),
+            "upstreams": upstreams,
+        }
+
+    def _state(self, upstream: str) -> _Upstream:
+        with self._lock:
+            state = self._upstreams.get(upstream)
+            if state is None:
+                state = self._upstreams[upstream] = _Upstream(upstream, self.limits.get(upstream, self.default))
+            return state
+
+    def _next_wait(self, state: _Upstream, ticket: Tuple[int, int], deadline: float) -> float:
+        """Seconds until `ticket` should check again, or 0 once it has taken a slot. Called with the lock held."""
+        now = time.monotonic()
+        limit = state.limit
+        if state.circuit == OPEN and now - state.opened_at >= limit.reset_timeout:
+            # Let one call through to see whether the upstream is back
+            state.circuit, state.probing = HALF_OPEN, False
+        if state.circuit == OPEN or (state.circuit == HALF_OPEN and state.probing):
+            state.rejected += 1
+            raise CircuitOpen(state.name, f"circuit open after {state.failures} failures in a row")
+        state.refill(now)
+        if state.blocked_until > now:
+            wait = state.blocked_until - now
+        elif state.waiters[0] != ticket:
+            # Calls ahead of this one go first; it is woken when one of them leaves
+            wait = max((1 - state.tokens) / state.rate, 0.01)
+        elif state.tokens < 1:
+            wait = (1 - state.tokens) / state.rate
+        else:
+            state.tokens -= 1
+            state.calls += 1
+            state.probing = state.circuit == HALF_OPEN
+            return 0
+        if now + wait > deadline and (state.blocked_until > deadline or now >= deadline):
+            state.timeouts += 1
+            raise QueueTimeout(state.name, f"no slot for {wait:.1f}s, longer than the call may wait")
+        return min(wait, max(deadline - now, 0.01))
+
+    def _leave(self, state: _Upstream, ticket: Tuple[int, int], started: float) -> None:
+        if ticket in state.waiters:
+            state.waiters.remove(ticket)
+            heapq.heapify(state.waiters)
+        state.wait_seconds += time.monotonic() - started
+        self._changed.notify_all()
+
+    def _record(self, state: _Upstream, outcome: str, retry_after: Optional[float], attempt: int, retry_unavailable: bool) -> bool:
+        """Update the upstream with a call's outcome; True if the call should be retried."""
+        limit = state.limit
+        with self._changed:
+            now = time.monotonic()
+            state.probing = False
+            # Calls sent together fail together: only the first failure after a backoff escalates it
+            escalate = now >= state.blocked_until
+            if outcome == OK:
+                state.streak = state.failures = 0
+                state.circuit = CLOSED
+                state.rate = min(state.rate + limit.increase, limit.rate)
+                return False
+            if outcome == THROTTLED:
+                # A 429 means the upstream is up; the calls just have to slow down
+                state.throttled += 1
+                state.failures = 0
+                state.circuit = CLOSED
+                state.tokens = min(state.tokens, 0.0)
+                if escalate:
+                    state.streak += 1
+                    state.rate = max(state.rate / 2, limit.min_rate)
+                retry = attempt < limit.max_retries
+            elif outcome == UNAVAILABLE:
+                state.unavailable += 1
+                state.streak += escalate
+                state.failures += 1
+                if state.circuit == HALF_OPEN or state.failures >= limit.failure_threshold:
+                    if state.circuit != OPEN:
+                        state.circuit_opens += 1
+                        logger.warning(f"{state.name} is failing, holding calls to it back for {limit.reset_timeout:.0f}s")
+                    state.circuit, state.opened_at = OPEN, now
+                retry = retry_unavailable and attempt < limit.max_retries and state.circuit != OPEN
+            else:
+                return False
+            if retry_after is None:
+                backoff = min(limit.base_delay * 2 ** (state.streak - 1), limit.max_delay)
+                # Equal jitter: callers that failed together do not come back together
+                delay = backoff / 2 + random.uniform(0, backoff / 2)
+            else:
+                delay = min(retry_after, limit.max_delay) + random.uniform(0, limit.base_delay)
+            state.blocked_until = max(state.blocked_until, now + delay)
+            if retry:
+                state.retries += 1
+            self._changed.notify_all()
+            return retry
+
+    def _after_fork_child(self) -> None:
+        # The calls waiting in the parent are not waiting in the child; quotas and breakers carry over
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        for state in self._upstreams.values():
+            state.waiters = []
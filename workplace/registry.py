@@ -0,0 +1,151 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from agno.agent import Agent
+from agno.utils.log import logger
+
+
+class AgentSpec:
+    """What the registry knows about an agent before it is built."""
+
+    def __init__(self, key: str, factory: Callable[[], Agent], name: Optional[str] = None, role: Optional[str] = None):
+        self.key = key
+        self.factory = factory
+        self.name = name
+        self.role = role
+
+
+class AgentRegistry:
+    """Builds each registered agent (and the toolkits its factory creates) the first time it is used.
+
+    Factories are registered with the `register` decorator and handed out as `LazyAgent` proxies, so a
+    team can list all of its members while only the members that actually receive a task are built.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, AgentSpec] = {}
+        self._agents: Dict[str, Agent] = {}
+        self._lock = threading.RLock()
+        # Seconds spent in each factory, for the startup report
+        self.build_times: Dict[str, float] = {}
+
+    def register(self, key: str, *, name: Optional[str] = None, role: Optional[str] = None):
+        """Decorator registering `factory` under `key`. `name` and `role` are served without building the agent."""
+
+        def decorator(factory: Callable[[], Agent]) -> Callable[[], Agent]:
+            if key in self._specs:
+                raise ValueError(f"Agent {key} is already registered")
+            self._specs[key] = AgentSpec(key=key, factory=factory, name=name, role=role)
+            return factory
+
+        return decorator
+
+    def spec(self, key: str) -> AgentSpec:
+        if key not in self._specs:
+            raise KeyError(f"No agent registered as {key}")
+        return self._specs[key]
+
+    def get(self, key: str) -> Agent:
+        """Return the agent registered as `key`, building it on first use."""
+        agent = self._agents.get(key)
+        if agent is not None:
+            return agent
+        spec = self.spec(key)
+        with self._lock:
+            # Another thread may have built it while we waited for the lock
+            if key not in self._agents:
+                start = time.perf_counter()
+                self._agents[key] = spec.factory()
+                self.build_times[key] = time.perf_counter() - start
+                logger.debug(f"Built {key} in {self.build_times[key]:.3f}s")
+            return self._agents[key]
+
+    def lazy(self, key: str) -> "LazyAgent":
+        """Return a proxy that builds the agent the first time something other than its name or role is needed."""
+        self.spec(key)
+        return LazyAgent(self, key)
+
+    def is_built(self, key: str) -> bool:
+        return key in self._agents
+
+    @property
+    def keys(self) -> List[str]:
+        return list(self._specs)
+
+    @property
+    def built(self) -> List[str]:
+        return list(self._agents)
+
+    def build_all(self) -> None:
+        """Build every registered agent, e.g. to warm up a process before it serves traffic."""
+        for key in self._specs:
+            self.get(key)
+
+
+class LazyAgent:
+    """Stands in for a registered Agent until it is needed.
+
+    `name`, `role` and `respond_directly` are answered from the registry so the leader can build its
+    transfer functions without constructing the member. Any other attribute builds the agent and is
+    forwarded to it. Copies made by `deep_copy` (the Playground copies the leader and its team for every
+    request) stay lazy and resolve to a copy of the registry's agent.
+    """
+
+    def __init__(self, registry: AgentRegistry, key: str, copy_update: Optional[Dict[str, Any]] = None, is_copy: bool = False):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_key", key)
+        object.__setattr__(self, "_copy_update", copy_update)
+        object.__setattr__(self, "_is_copy", is_copy)
+        object.__setattr__(self, "_agent", None)
+
+    @property
+    def agent(self) -> Agent:
+        if self._agent is None:
+            agent = self._registry.get(self._key)
+            if self._is_copy:
+                agent = agent.deep_copy(update=self._copy_update)
+            object.__setattr__(self, "_agent", agent)
+        return self._agent
+
+    @property
+    def is_built(self) -> bool:
+        return self._agent is not None
+
+    @property
+    def name(self) -> Optional[str]:
+        if self.is_built:
+            return self.agent.name
+        return self._registry.spec(self._key).name
+
+    @property
+    def role(self) -> Optional[str]:
+        if self.is_built:
+            return self.agent.role
+        return self._registry.spec(self._key).role
+
+    @property
+    def respond_directly(self) -> bool:
+        return self.agent.respond_directly if self.is_built else False
+
+    def deep_copy(self, *, update: Optional[Dict[str, Any]] = None) -> "LazyAgent":
+        return LazyAgent(self._registry, self._key, copy_update=update, is_copy=True)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "LazyAgent":
+        return self.deep_copy()
+
+    def __copy__(self) -> "LazyAgent":
+        return self
+
+    def __getattr__(self, item: str) -> Any:
+        # Only called for attributes not defined on the proxy itself
+        if item.startswith("__"):
+            raise AttributeError(item)
+        return getattr(self.agent, item)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        setattr(self.agent, key, value)
+
+    def __repr__(self) -> str:
+        state = "built" if self.is_built else "not built"
+        return f"<LazyAgent {self._key} ({state})>"
@@ -0,0 +1,346 @@
+import math
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterator, List, Optional, Tuple, Union
+from uuid import uuid4
+
+from agno.agent import Agent
+from agno.memory.agent import AgentRun
+from agno.models.message import Message
+from agno.run.response import RunResponse
+from agno.utils.log import logger
+
+from workplace.prompts import normalize_prompt
+
+_WORD = re.compile(r"[\w@.'-]+")
+_bypassed: ContextVar[bool] = ContextVar("response_cache_bypassed", default=False)
+
+# Words that do not change the requested content
+FILLER_WORDS = frozenset(
+    "a an the please kindly can could would will you me us i we for to of and just now quickly hi hey hello thanks thank".split()
+)
+
+
+def _content_tokens(prompt: str) -> List[str]:
+    words = (re.sub(r"[^\w@]", "", word) for word in _WORD.findall(prompt.lower()))
+    return [word for word in words if word and word not in FILLER_WORDS]
+
+
+def content_words(prompt: str) -> FrozenSet[str]:
+    """The words of a prompt that change what the answer must say, ignoring case, punctuation and filler words.
+
+    Embeddings of "Draft the weekly status email for Sales" and "... monthly ... for Support" are close,
+    so a semantic hit also requires the same content words: near-duplicates may differ in politeness,
+    word order, punctuation or spelling ("e-mail"), never in names, numbers or what is asked for.
+    """
+    return frozenset(_content_tokens(prompt))
+
+
+def embed_prompt(prompt: str, dims: int = 4096) -> Dict[int, float]:
+    """Local embedding: L2-normalized hashed unigrams, bigrams and character trigrams of the content words, as a sparse vector."""
+    words = _content_tokens(prompt)
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features.extend(padded[i : i + 3] for i in range(len(padded) - 2))
+    vector: Dict[int, float] = {}
+    for feature in features:
+        # crc32 instead of hash(), which is salted per process
+        index = zlib.crc32(feature.encode()) % dims
+        vector[index] = vector.get(index, 0.0) + 1.0
+    norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+    return {index: value / norm for index, value in vector.items()}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+
+@dataclass
+class CachedResponse:
+    agent: str
+    prompt: str
+    content: Any
+    content_type: str
+    vector: Dict[int, float]
+    words: FrozenSet[str]
+    tokens: int
+    seconds: float
+    expires_at: float
+
+
+class ResponseCache:
+    """Completions of generative agents, looked up by normalized prompt and then by embedding similarity.
+
+    A lookup first tries the exact normalized prompt, then the most similar cached prompt of the same
+    agent with the same content words (see content_words), accepted when the cosine similarity of their
+    embeddings is at least `threshold`. Entries expire after the TTL their agent stored them with, and
+    the least recently used entries are evicted beyond `max_entries`. Code running inside `bypass()`
+    neither reads nor writes the cache.
+    """
+
+    def __init__(self, max_entries: int = 1000, threshold: float = 0.9, default_ttl: float = 3600.0):
+        self.max_entries: int = max_entries
+        self.threshold: float = threshold
+        self.default_ttl: float = default_ttl
+        self._entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+        # (agent, content words) -> keys of its entries, the candidates for a semantic hit
+        self._buckets: Dict[Tuple[str, FrozenSet[str]], List[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        self.exact_hits: int = 0
+        self.semantic_hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.uncacheable: int = 0
+        self.follow_ups: int = 0
+        self.saved_tokens: int = 0
+        self.saved_seconds: float = 0.0
+
+    @property
+    def bypassed(self) -> bool:
+        return _bypassed.get()
+
+    @contextmanager
+    def bypass(self) -> Iterator[None]:
+        """Run the enclosed requests, including delegated ones in the same thread or task, without the cache."""
+        token = _bypassed.set(True)
+        try:
+            yield
+        finally:
+            _bypassed.reset(token)
+
+    def lookup(self, agent: str, prompt: str) -> Optional[CachedResponse]:
+        key = (agent, normalize_prompt(prompt))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self.exact_hits += 1
+                return self._hit(key, entry)
+            vector = embed_prompt(prompt)
+            best: Optional[Tuple[float, Tuple[str, str]]] = None
+            for candidate in self._buckets.get((agent, content_words(prompt)), []):
+                entry = self._entries[candidate]
+                if entry.expires_at <= now:
+                    continue
+                similarity = cosine(vector, entry.vector)
+                if similarity >= self.threshold and (best is None or similarity > best[0]):
+                    best = (similarity, candidate)
+            if best is None:
+                self.misses += 1
+                return None
+            self.semantic_hits += 1
+            return self._hit(best[1], self._entries[best[1]])
+
+    def put(self, agent: str, prompt: str, content: Any, content_type: str = "str", tokens: int = 0, seconds: float = 0.0, ttl: Optional[float] = None) -> None:
+        key = (agent, normalize_prompt(prompt))
+        entry = CachedResponse(
+            agent=agent,
+            prompt=prompt,
+            content=content,
+            content_type=content_type,
+            vector=embed_prompt(prompt),
+            words=content_words(prompt),
+            tokens=tokens,
+            seconds=seconds,
+            expires_at=time.time() + (self.default_ttl if ttl is None else ttl),
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._buckets.setdefault((agent, entry.words), []).append(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def record_uncacheable(self) -> None:
+        with self._lock:
+            self.uncacheable += 1
+
+    def record_follow_up(self) -> None:
+        with self._lock:
+            self.follow_ups += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "lookups": lookups,
+                "hits": hits,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "saved_tokens": self.saved_tokens,
+                "saved_seconds": self.saved_seconds,
+                "evictions": self.evictions,
+                # Runs that called tools, which are never cached
+                "uncacheable_runs": self.uncacheable,
+                # Requests after earlier runs of their session, which are never looked up
+                "follow_ups": self.follow_ups,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __copy__(self) -> "ResponseCache":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ResponseCache":
+        return self
+
+    def _hit(self, key: Tuple[str, str], entry: CachedResponse) -> CachedResponse:
+        # Called with self._lock held
+        self._entries.move_to_end(key)
+        self.saved_tokens += entry.tokens
+        self.saved_seconds += entry.seconds
+        return entry
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key)
+        bucket = self._buckets.get((entry.agent, entry.words), [])
+        bucket.remove(key)
+        if not bucket:
+            self._buckets.pop((entry.agent, entry.words), None)
+
+
+@dataclass(init=False)
+class CachedResponseAgent(Agent):
+    """A generative agent that answers repeated or near-duplicate requests from a ResponseCache.
+
+    Only plain text requests are looked up, and only runs that made no tool calls are stored, so an
+    agent's side effects (sending an email, creating a document) always happen. Cached answers were
+    written without any conversation history, so with `add_history_to_messages` a request that follows
+    earlier runs of its session ("make it shorter") always goes to the model. A hit is added to the
+    session's memory and storage like a model run. Pass `use_cache=False` to `run`/`arun`, or run
+    inside `response_cache.bypass()`, to force a fresh completion.
+    """
+
+    response_cache: Optional[ResponseCache] = None
+    # Seconds a stored response stays valid; None uses the cache's default_ttl
+    response_cache_ttl: Optional[float] = None
+
+    def __init__(self, *, response_cache: Optional[ResponseCache] = None, response_cache_ttl: Optional[float] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.response_cache = response_cache
+        self.response_cache_ttl = response_cache_ttl
+
+    def run(self, message: Optional[Union[str, List, Dict, Message]] = None, *, stream: bool = False, **kwargs: Any):
+        cache = self._cache_for(message, kwargs)
+        if cache is None:
+            return super().run(message, stream=stream, **kwargs)
+        entry = cache.lookup(self._cache_name, message)
+        if entry is not None:
+            response = self._cached_response(message, entry)
+            return iter([response]) if stream else response
+        start = time.perf_counter()
+        result = super().run(message, stream=stream, **kwargs)
+        if isinstance(result, RunResponse):
+            self._store(cache, message, result, start)
+            return result
+        return self._store_after_stream(cache, message, result, start)
+
+    async def arun(self, message: Optional[Union[str, List, Dict, Message]] = None, *, stream: bool = False, **kwargs: Any):
+        cache = self._cache_for(message, kwargs)
+        if cache is None:
+            return await super().arun(message, stream=stream, **kwargs)
+        entry = cache.lookup(self._cache_name, message)
+        if entry is not None:
+            response = self._cached_response(message, entry)
+            return self._single_chunk(response) if stream else response
+        start = time.perf_counter()
+        result = await super().arun(message, stream=stream, **kwargs)
+        if isinstance(result, RunResponse):
+            self._store(cache, message, result, start)
+            return result
+        return self._astore_after_stream(cache, message, result, start)
+
+    @property
+    def _cache_name(self) -> str:
+        return self.name or self.agent_id or "agent"
+
+    def _cache_for(self, message: Any, kwargs: Dict[str, Any]) -> Optional[ResponseCache]:
+        use_cache = kwargs.pop("use_cache", True)
+        if self.response_cache is None or not use_cache or self.response_cache.bypassed:
+            return None
+        if not isinstance(message, str) or not message.strip():
+            return None
+        if any(kwargs.get(key) for key in ("audio", "images", "videos", "messages")):
+            return None
+        if self.add_history_to_messages and self._load_session().runs:
+            self.response_cache.record_follow_up()
+            return None
+        return self.response_cache
+
+    def _load_session(self) -> Any:
+        """The agent's memory, with the runs of its session read from storage."""
+        self.initialize_agent()
+        self.read_from_storage()
+        return self.memory
+
+    def _cached_response(self, message: str, entry: CachedResponse) -> RunResponse:
+        logger.debug(f"{self._cache_name}: answered from the response cache")
+        memory = self._load_session()
+        self.run_id = str(uuid4())
+        self.run_response = RunResponse(
+            content=entry.content,
+            content_type=entry.content_type,
+            run_id=self.run_id,
+            agent_id=self.agent_id,
+            session_id=self.session_id,
+            model=self.model.id if self.model is not None else None,
+            metrics={"cached": True},
+        )
+        user_message = Message(role=self.user_message_role, content=message)
+        reply = Message(role="assistant", content=self.run_response.get_content_as_string())
+        self.run_response.messages = [user_message, reply]
+        # Recorded like a model run, so the next turn of the session sees this exchange
+        memory.add_messages(messages=[user_message, reply])
+        memory.add_run(AgentRun(message=user_message, response=self.run_response))
+        self.write_to_storage()
+        return self.run_response
+
+    def _store(self, cache: ResponseCache, message: str, response: RunResponse, start: float) -> None:
+        if response.tools:
+            cache.record_uncacheable()
+            return
+        if response.content is None:
+            return
+        tokens = sum((response.metrics or {}).get("total_tokens", []))
+        cache.put(
+            self._cache_name,
+            message,
+            response.content,
+            response.content_type,
+            tokens=tokens,
+            seconds=time.perf_counter() - start,
+            ttl=self.response_cache_ttl,
+        )
+
+    def _store_after_stream(self, cache: ResponseCache, message: str, chunks: Iterator[RunResponse], start: float) -> Iterator[RunResponse]:
+        yield from chunks
+        # Only reached when the stream was consumed to the end
+        self._store(cache, message, self.run_response, start)
+
+    async def _astore_after_stream(self, cache: ResponseCache, message: str, chunks: AsyncIterator[RunResponse], start: float):
+        async for chunk in chunks:
+            yield chunk
+        self._store(cache, message, self.run_response, start)
+
+    async def _single_chunk(self, response: RunResponse):
+        yield response
@@ -0,0 +1,287 @@
+import abc
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Pattern, Sequence, Union
+from uuid import uuid4
+
+from agno.agent import Agent
+from agno.memory.agent import AgentRun
+from agno.models.message import Message
+from agno.run.response import RunEvent, RunResponse
+from agno.utils.log import logger
+
+from workplace.budget import (
+    BudgetLimits,
+    RequestBudget,
+    arun_with_budget,
+    astream_with_budget,
+    current_budget,
+    run_with_budget,
+    stream_with_budget,
+)
+from workplace.streaming import StreamingTeamAgent
+
+# Requests that lean on earlier turns or chain several steps need the master's planning
+DEFAULT_AMBIGUOUS_PATTERNS = [
+    r"\b(above|previous|earlier|last (one|message|email|reply)|same as|again)\b",
+    r"\b(and then|after that|afterwards|followed by|also)\b",
+    r"\b(summari[sz]e|compare|plan|all of (them|these))\b",
+]
+
+
+class RouterMetrics:
+    """Hit rate and latency of routed and unrouted requests, shared by every copy of the routed agent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: int = 0
+        self.routed: int = 0
+        self.routed_seconds: float = 0.0
+        self.unrouted_seconds: float = 0.0
+        self.routed_by_agent: Dict[str, int] = {}
+
+    def record(self, target: Optional[str], seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            if target is None:
+                self.unrouted_seconds += seconds
+                return
+            self.routed += 1
+            self.routed_seconds += seconds
+            self.routed_by_agent[target] = self.routed_by_agent.get(target, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            unrouted = self.requests - self.routed
+            avg_routed = self.routed_seconds / self.routed if self.routed else 0.0
+            avg_unrouted = self.unrouted_seconds / unrouted if unrouted else 0.0
+            return {
+                "requests": self.requests,
+                "routed": self.routed,
+                "hit_rate": self.routed / self.requests if self.requests else 0.0,
+                "routed_by_agent": dict(self.routed_by_agent),
+                "avg_routed_seconds": avg_routed,
+                "avg_unrouted_seconds": avg_unrouted,
+                # Estimated from the average request that did go through the master
+                "latency_saved_seconds": self.routed * max(avg_unrouted - avg_routed, 0.0) if unrouted else 0.0,
+            }
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class Router(abc.ABC):
+    """Decides which team member, if any, can take a request without a master model call."""
+
+    def __init__(self, metrics: Optional[RouterMetrics] = None):
+        self.metrics: RouterMetrics = metrics or RouterMetrics()
+
+    @abc.abstractmethod
+    def route(self, message: str) -> Optional[str]:
+        """Return the name of the team member to hand `message` to, or None to let the master decide."""
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        # agno copies the leader for every Playground request; the router and its metrics stay shared
+        return self
+
+
+class KeywordRouter(Router):
+    """Routes a request to a member when the keyword rules of exactly one member match it.
+
+    `rules` maps a member name to regular expressions (matched case-insensitively). A request matching
+    no member, more than one member, or any of `ambiguous_patterns` goes to the master as usual.
+    """
+
+    def __init__(
+        self,
+        rules: Dict[str, Sequence[str]],
+        ambiguous_patterns: Optional[Sequence[str]] = None,
+        max_length: int = 600,
+        metrics: Optional[RouterMetrics] = None,
+    ):
+        super().__init__(metrics=metrics)
+        self.rules: Dict[str, List[Pattern]] = {
+            target: [re.compile(pattern, re.IGNORECASE) for pattern in patterns] for target, patterns in rules.items()
+        }
+        patterns = DEFAULT_AMBIGUOUS_PATTERNS if ambiguous_patterns is None else ambiguous_patterns
+        self.ambiguous_patterns: List[Pattern] = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        self.max_length: int = max_length
+
+    def route(self, message: str) -> Optional[str]:
+        if not message or len(message) > self.max_length:
+            return None
+        if any(pattern.search(message) for pattern in self.ambiguous_patterns):
+            return None
+        matches = [target for target, patterns in self.rules.items() if any(p.search(message) for p in patterns)]
+        return matches[0] if len(matches) == 1 else None
+
+
+@dataclass(init=False)
+class RoutedAgent(StreamingTeamAgent):
+    """A leader agent that hands unambiguous requests straight to a team member.
+
+    When the router picks a member, the member runs the user's message directly and the exchange is
+    recorded in the leader's session, so the conversation history stays the same as if the leader had
+    transferred the task. Everything else (and any request with media or explicit messages) runs the
+    leader's model as usual.
+
+    With `budget` set, every request (routed or not) runs under a RequestBudget with these limits,
+    and the usage is reported in `metrics["budget"]` of the response (the last chunk when streaming).
+    """
+
+    router: Optional[Router] = None
+    budget: Optional[BudgetLimits] = None
+
+    def __init__(self, *, router: Optional[Router] = None, budget: Optional[BudgetLimits] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.router = router
+        self.budget = budget
+
+    def run(self, message: Optional[Union[str, List, Dict, Message]] = None, *, stream: bool = False, **kwargs: Any):
+        # A request that is already under a budget (this agent delegated to itself) keeps it
+        if self.budget is None or current_budget() is not None:
+            return self._run_routed(message, stream=stream, **kwargs)
+        budget = RequestBudget(self.budget, root=self.name)
+        if stream:
+            return stream_with_budget(budget, self, lambda: self._run_routed(message, stream=True, **kwargs))
+        return run_with_budget(budget, self, lambda: self._run_routed(message, stream=False, **kwargs))
+
+    async def arun(self, message: Optional[Union[str, List, Dict, Message]] = None, *, stream: bool = False, **kwargs: Any):
+        if self.budget is None or current_budget() is not None:
+            return await self._arun_routed(message, stream=stream, **kwargs)
+        budget = RequestBudget(self.budget, root=self.name)
+        if stream:
+            return astream_with_budget(budget, self, lambda: self._arun_routed(message, stream=True, **kwargs))
+        return await arun_with_budget(budget, self, lambda: self._arun_routed(message, stream=False, **kwargs))
+
+    def _run_routed(self, message: Any, *, stream: bool, **kwargs: Any):
+        start = time.perf_counter()
+        member = self._route(message, kwargs)
+        if member is None:
+            response = self._run_master(message, stream=stream, **kwargs)
+            if stream:
+                return self._timed_stream(response, None, start)
+            self._record(None, start)
+            return response
+
+        logger.debug(f"Routing request directly to {member.name}")
+        stream_intermediate_steps = kwargs.get("stream_intermediate_steps", False)
+        if stream and member.is_streamable:
+            chunks = member.run(message, stream=True, stream_intermediate_steps=stream_intermediate_steps)
+            return self._timed_stream(self._relay(message, chunks), member.name, start)
+        response = self._relay_response(message, member.run(message, stream=False))
+        self._record(member.name, start)
+        return iter([response]) if stream else response
+
+    async def _arun_routed(self, message: Any, *, stream: bool, **kwargs: Any):
+        start = time.perf_counter()
+        member = self._route(message, kwargs)
+        if member is None:
+            response = await self._arun_master(message, stream=stream, **kwargs)
+            if stream:
+                return self._atimed_stream(response, None, start)
+            self._record(None, start)
+            return response
+
+        logger.debug(f"Routing request directly to {member.name}")
+        stream_intermediate_steps = kwargs.get("stream_intermediate_steps", False)
+        if stream and member.is_streamable:
+            chunks = await member.arun(message, stream=True, stream_intermediate_steps=stream_intermediate_steps)
+            return self._atimed_stream(self._arelay(message, chunks), member.name, start)
+        response = self._relay_response(message, await member.arun(message, stream=False))
+        self._record(member.name, start)
+        if stream:
+            return self._single_chunk(response)
+        return response
+
+    def _run_master(self, message: Any, *, stream: bool, **kwargs: Any):
+        return super().run(message, stream=stream, **kwargs)
+
+    async def _arun_master(self, message: Any, *, stream: bool, **kwargs: Any):
+        return await super().arun(message, stream=stream, **kwargs)
+
+    def _route(self, message: Any, kwargs: Dict[str, Any]) -> Optional[Agent]:
+        if self.router is None or not isinstance(message, str) or not self.team:
+            return None
+        if any(kwargs.get(media) for media in ("audio", "images", "videos", "messages")):
+            return None
+        target = self.router.route(message)
+        if target is None:
+            return None
+        for member in self.team:
+            # LazyAgent members answer .name without being built
+            if member.name == target:
+                return member
+        logger.warning(f"Router picked {target}, which is not on the team of {self.name}")
+        return None
+
+    def _record(self, target: Optional[str], start: float) -> None:
+        if self.router is not None:
+            self.router.metrics.record(target, time.perf_counter() - start)
+
+    def _timed_stream(self, chunks: Iterator[RunResponse], target: Optional[str], start: float) -> Iterator[RunResponse]:
+        yield from chunks
+        self._record(target, start)
+
+    async def _atimed_stream(self, chunks: AsyncIterator[RunResponse], target: Optional[str], start: float):
+        async for chunk in chunks:
+            yield chunk
+        self._record(target, start)
+
+    async def _single_chunk(self, response: RunResponse):
+        yield response
+
+    def _relay(self, message: str, chunks: Iterator[RunResponse]) -> Iterator[RunResponse]:
+        run_id = self._start_routed_run()
+        content = ""
+        for chunk in chunks:
+            if chunk.event == RunEvent.run_response.value and isinstance(chunk.content, str):
+                content += chunk.content
+            yield self._as_own_chunk(chunk, run_id)
+        self._finish_routed_run(message, content, run_id)
+
+    async def _arelay(self, message: str, chunks: AsyncIterator[RunResponse]):
+        run_id = self._start_routed_run()
+        content = ""
+        async for chunk in chunks:
+            if chunk.event == RunEvent.run_response.value and isinstance(chunk.content, str):
+                content += chunk.content
+            yield self._as_own_chunk(chunk, run_id)
+        self._finish_routed_run(message, content, run_id)
+
+    def _relay_response(self, message: str, response: RunResponse) -> RunResponse:
+        run_id = self._start_routed_run()
+        self._finish_routed_run(message, response.content, run_id)
+        return self._as_own_chunk(response, run_id)
+
+    def _start_routed_run(self) -> str:
+        self.initialize_agent()
+        self.read_from_storage()
+        self.run_id = str(uuid4())
+        return self.run_id
+
+    def _as_own_chunk(self, chunk: RunResponse, run_id: str) -> RunResponse:
+        # The client follows the leader's session, not the member's
+        chunk.run_id = run_id
+        chunk.agent_id = self.agent_id
+        chunk.session_id = self.session_id
+        return chunk
+
+    def _finish_routed_run(self, message: str, content: Any, run_id: str) -> None:
+        user_message = Message(role="user", content=message)
+        reply = Message(role="assistant", content=content if isinstance(content, str) else str(content))
+        self.run_response = RunResponse(
+            content=content,
+            messages=[user_message, reply],
+            run_id=run_id,
+            agent_id=self.agent_id,
+            session_id=self.session_id,
+        )
+        self.memory.add_messages([user_message, reply])
+        self.memory.add_run(AgentRun(message=user_message, response=self.run_response))
+        self.write_to_storage()
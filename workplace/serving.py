@@ -0,0 +1,215 @@
+import atexit
+import inspect
+import os
+import signal
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from agno.utils.log import logger
+
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class PreforkServer:
+    """Serves an ASGI app from `workers` processes forked from this one, all accepting on one socket.
+
+    With `preload` (or when `app` is the app object itself) the app is imported here, once, before the
+    workers are forked: agents, toolkits and prompts are built once and the workers start serving
+    right away, sharing those memory pages until they write to them. Without it, every worker imports
+    `app` (a "module:attribute" string) itself, so restarted workers also pick up new code. Threads,
+    locks and connections created before the fork are reset in each worker by their fork hooks (see
+    workplace.prefork); state that requests must see across workers belongs in the storage
+    (PooledSqliteAgentStorage with shared=True, JobQueue).
+
+    This process only supervises: a worker that exits unexpectedly is replaced, SIGHUP replaces the
+    workers one at a time (each new worker is started before the old one drains, so capacity never
+    drops), and SIGTERM or SIGINT drains all of them and exits. A draining worker stops accepting,
+    finishes the requests in flight for up to `graceful_timeout` seconds, then runs the app's
+    shutdown and exit handlers. Needs os.fork (Linux or macOS). Other keyword arguments go to
+    uvicorn.Config.
+    """
+
+    def __init__(
+        self,
+        app: Union[str, Any],
+        workers: int = 2,
+        host: str = "localhost",
+        port: int = 7777,
+        preload: bool = True,
+        graceful_timeout: float = 30.0,
+        backlog: int = 2048,
+        **uvicorn_options: Any,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        # Fail here rather than with a TypeError in every worker it forks
+        if "timeout_graceful_shutdown" not in inspect.signature(uvicorn.Config.__init__).parameters:
+            raise RuntimeError(f"PreforkServer needs uvicorn>=0.22.0 for timeout_graceful_shutdown, found {uvicorn.__version__}")
+        self.app: Union[str, Any] = app
+        self.workers: int = workers
+        self.host: str = host
+        self.port: int = port
+        self.preload: bool = preload
+        self.graceful_timeout: float = graceful_timeout
+        self.backlog: int = backlog
+        self.uvicorn_options: Dict[str, Any] = uvicorn_options
+        self.socket: Optional[socket.socket] = None
+        # pid -> (slot, monotonic start time)
+        self._workers: Dict[int, Tuple[int, float]] = {}
+        self._signals: List[int] = []
+        self._stopping: bool = False
+        self.restarts: int = 0
+
+    def run(self) -> None:
+        """Bind the socket, fork the workers and supervise them until SIGTERM or SIGINT."""
+        if not hasattr(os, "fork"):
+            raise RuntimeError("PreforkServer needs os.fork; use uvicorn directly on this platform")
+        if isinstance(self.app, str) and self.preload:
+            self.app = import_from_string(self.app)
+        self.socket = self._bind()
+        for sig in (*STOP_SIGNALS, signal.SIGHUP):
+            signal.signal(sig, lambda sig, frame: self._signals.append(sig))
+        logger.info(f"Serving on http://{self.host}:{self.port} with {self.workers} workers (pid {os.getpid()})")
+        for slot in range(self.workers):
+            self._spawn(slot)
+        try:
+            while not self._stopping:
+                self._handle_signals()
+                self._reap()
+                time.sleep(0.1)
+        finally:
+            self._stop()
+
+    @property
+    def pids(self) -> List[int]:
+        return list(self._workers)
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+        # Port 0 picks a free port
+        self.port = sock.getsockname()[1]
+        return sock
+
+    def _handle_signals(self) -> None:
+        while self._signals:
+            sig = self._signals.pop(0)
+            if sig in STOP_SIGNALS:
+                logger.info("Draining the workers")
+                self._stopping = True
+                return
+            if sig == signal.SIGHUP:
+                self._restart_all()
+
+    def _spawn(self, slot: int) -> int:
+        pid = os.fork()
+        if pid:
+            self._workers[pid] = (slot, time.monotonic())
+            return pid
+        code = 1
+        try:
+            self._serve_worker()
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 0
+        except BaseException as e:
+            logger.error(f"Worker {os.getpid()} failed: {e}")
+        finally:
+            try:
+                # The worker owns the app's exit handlers now: write-behind flushes, job workers, span exporters
+                atexit._run_exitfuncs()
+            finally:
+                os._exit(code)
+
+    def _serve_worker(self) -> None:
+        # A Ctrl-C in the terminal only reaches the supervisor, which drains every worker once
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        # Until uvicorn takes over, and when it raises the signal again after draining
+        for sig in STOP_SIGNALS:
+            signal.signal(sig, _exit_worker)
+        app = import_from_string(self.app) if isinstance(self.app, str) else self.app
+        config = uvicorn.Config(app, timeout_graceful_shutdown=int(self.graceful_timeout), **self.uvicorn_options)
+        uvicorn.Server(config).run(sockets=[self.socket])
+
+    def _reap(self) -> None:
+        """Collect the workers that exited and, unless stopping, replace them."""
+        while self._workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot, started = self._workers.pop(pid, (None, 0.0))
+            if slot is None or self._stopping:
+                continue
+            logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, starting a new one")
+            if time.monotonic() - started < 1.0:
+                # Failing right at startup (e.g. the app does not import): do not fork in a tight loop
+                time.sleep(1.0)
+            self.restarts += 1
+            self._spawn(slot)
+
+    def _restart_all(self) -> None:
+        logger.info("Restarting the workers one at a time")
+        for pid, (slot, _) in list(self._workers.items()):
+            self._spawn(slot)
+            self._drain([pid])
+            self.restarts += 1
+            if self._stopping:
+                return
+
+    def _drain(self, pids: List[int]) -> None:
+        """SIGTERM `pids` and wait for them to exit, killing those still running after the grace period."""
+        for pid in pids:
+            _kill(pid, signal.SIGTERM)
+        # uvicorn waits graceful_timeout for requests in flight; the exit handlers get a few seconds more
+        deadline = time.monotonic() + self.graceful_timeout + 10.0
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    remaining.discard(pid)
+                    self._workers.pop(pid, None)
+            if any(sig in STOP_SIGNALS for sig in self._signals):
+                self._stopping = True
+            time.sleep(0.05)
+        for pid in remaining:
+            logger.warning(f"Worker {pid} did not drain in time, killing it")
+            _kill(pid, signal.SIGKILL)
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            self._workers.pop(pid, None)
+
+    def _stop(self) -> None:
+        self._stopping = True
+        self._drain(list(self._workers))
+        if self.socket is not None:
+            self.socket.close()
+        logger.info("All workers stopped")
+
+
+def _exit_worker(sig: int, frame: Any) -> None:
+    raise SystemExit(0)
+
+
+def _kill(pid: int, sig: int) -> None:
+    try:
+        os.kill(pid, sig)
+    except ProcessLookupError:
+        pass
@@ -0,0 +1,383 @@
+import atexit
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.agent import Agent
+from agno.tools.toolkit import Toolkit
+from agno.utils.log import logger
+
+from workplace.prefork import register_fork_hooks
+
+SHEETS_BATCH_UPDATE = "GOOGLESHEETS_BATCH_UPDATE"
+
+_CELL = re.compile(r"^([A-Za-z]+)([0-9]+)$")
+
+
+def parse_cell(cell: str) -> Tuple[str, int]:
+    """Split an A1 cell reference into its column letters and row number, e.g. "B12" -> ("B", 12)."""
+    match = _CELL.match(cell.strip())
+    if match is None:
+        raise ValueError(f"{cell!r} is not a cell reference like A1")
+    return match.group(1).upper(), int(match.group(2))
+
+
+class ComposioSheetsBackend:
+    """Writes values through the toolset's GOOGLESHEETS_BATCH_UPDATE action."""
+
+    def __init__(self, toolset: Any, entity_id: Optional[str] = None):
+        self.toolset = toolset
+        self.entity_id: Optional[str] = entity_id
+
+    def batch_update(
+        self, spreadsheet_id: str, sheet_name: str, values: List[List[Any]], first_cell_location: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Write `values` starting at `first_cell_location`, or after the last row with data when it is None."""
+        params: Dict[str, Any] = {"spreadsheet_id": spreadsheet_id, "sheet_name": sheet_name, "values": values}
+        if first_cell_location is not None:
+            params["first_cell_location"] = first_cell_location
+        response = self.toolset.execute_action(action=SHEETS_BATCH_UPDATE, params=params, entity_id=self.entity_id)
+        # Composio spells the flag both ways depending on the version
+        if not response.get("successful", response.get("successfull", False)):
+            raise RuntimeError(response.get("error") or "GOOGLESHEETS_BATCH_UPDATE failed")
+        return response
+
+
+class _PendingRows:
+    """Rows waiting to be written to one contiguous block of a sheet."""
+
+    def __init__(self, column: Optional[str], row: Optional[int]):
+        # No start cell means the rows are appended after the last row with data
+        self.column = column
+        self.row = row
+        self.rows: List[List[Any]] = []
+        self.updated = time.monotonic()
+        self.attempts = 0
+
+    def continues(self, column: Optional[str], row: Optional[int]) -> bool:
+        if self.row is None or row is None:
+            return self.row is None and row is None
+        return column == self.column and row == self.row + len(self.rows)
+
+    def location(self, offset: int) -> Optional[str]:
+        return None if self.row is None else f"{self.column}{self.row + offset}"
+
+
+class SheetsWriteBuffer:
+    """Coalesces row writes per session, spreadsheet and sheet into a few batched updates.
+
+    Writes carry a `scope` (the session they come from), and every scope has its own pending rows and
+    results. Rows written to consecutive rows of the same sheet (or appended to it) are merged into one
+    block. A sheet's pending rows are written as soon as there are `max_rows` of them, when the scope is
+    flushed (the agent's flush_rows at the end of its task), or by a background thread once no rows
+    were added to the sheet for `flush_interval` seconds, in case the agent never flushes. Keep that
+    well above one model round trip, or every tool call's rows go out on their own. Every update
+    carries at most `max_cells` cells, so large payloads go out in several requests. What was written,
+    and any error, is collected per scope until `report()` is called for it, so the agent gets one
+    consolidated result; results nobody asked for are dropped after `report_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        max_rows: int = 500,
+        max_cells: int = 50000,
+        flush_interval: float = 30.0,
+        max_attempts: int = 3,
+        report_ttl: float = 3600.0,
+    ):
+        self.backend = backend
+        self.max_rows: int = max_rows
+        self.max_cells: int = max_cells
+        self.flush_interval: float = flush_interval
+        self.max_attempts: int = max_attempts
+        self.report_ttl: float = report_ttl
+        # (scope, spreadsheet_id, sheet_name) -> blocks, written in order
+        self._pending: Dict[Tuple[str, str, str], List[_PendingRows]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # scope -> spreadsheet_id -> report, and when the scope's report last changed
+        self._report: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._report_updated: Dict[str, float] = {}
+        self.api_calls: int = 0
+        self.rows_written: int = 0
+        self._stopped = threading.Event()
+        self._start()
+        atexit.register(self.close)
+        register_fork_hooks(self)
+
+    def add_rows(
+        self,
+        spreadsheet_id: str,
+        sheet_name: str,
+        rows: List[List[Any]],
+        first_cell_location: Optional[str] = None,
+        scope: str = "",
+    ) -> int:
+        """Buffer `rows` and return the number of rows pending for the sheet in `scope`."""
+        column, row = parse_cell(first_cell_location) if first_cell_location else (None, None)
+        key = (scope, spreadsheet_id, sheet_name)
+        with self._lock:
+            blocks = self._pending.setdefault(key, [])
+            if not blocks or not blocks[-1].continues(column, row):
+                blocks.append(_PendingRows(column, row))
+            blocks[-1].rows.extend(rows)
+            blocks[-1].updated = time.monotonic()
+            pending = sum(len(block.rows) for block in blocks)
+        if pending >= self.max_rows:
+            self.flush(spreadsheet_id, sheet_name, scope=scope)
+            return self.pending_rows(spreadsheet_id, sheet_name, scope=scope)
+        return pending
+
+    def pending_rows(self, spreadsheet_id: Optional[str] = None, sheet_name: Optional[str] = None, scope: Optional[str] = None) -> int:
+        """Rows not written yet, in the matching sheets and scopes (all by default)."""
+        with self._lock:
+            return sum(
+                len(block.rows)
+                for key, blocks in self._pending.items()
+                if _matches(key, scope, spreadsheet_id, sheet_name)
+                for block in blocks
+            )
+
+    def flush(
+        self,
+        spreadsheet_id: Optional[str] = None,
+        sheet_name: Optional[str] = None,
+        idle: float = 0.0,
+        scope: Optional[str] = None,
+    ) -> None:
+        """Write the pending rows of the matching sheets and scopes (all by default).
+
+        With `idle`, only sheets that had no rows added for `idle` seconds are written.
+        """
+        with self._flush_lock:
+            now = time.monotonic()
+            with self._lock:
+                batch: List[Tuple[Tuple[str, str, str], _PendingRows]] = []
+                for key, blocks in self._pending.items():
+                    if not _matches(key, scope, spreadsheet_id, sheet_name):
+                        continue
+                    if blocks and now - blocks[-1].updated >= idle:
+                        batch.extend((key, block) for block in blocks)
+                        blocks.clear()
+                for key in [key for key, blocks in self._pending.items() if not blocks]:
+                    del self._pending[key]
+            for key, block in batch:
+                self._write_block(key, block)
+
+    def report(self, spreadsheet_id: Optional[str] = None, scope: str = "") -> Dict[str, Any]:
+        """Return and reset what was written in `scope` since its last report, per spreadsheet."""
+        with self._lock:
+            reports = self._report.get(scope, {})
+            if spreadsheet_id is not None:
+                report = {spreadsheet_id: reports.pop(spreadsheet_id, _empty_report())}
+            else:
+                report, reports = reports, {}
+            if reports:
+                self._report[scope] = reports
+            else:
+                self._report.pop(scope, None)
+                self._report_updated.pop(scope, None)
+            return report
+
+    def close(self) -> None:
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def _write_block(self, key: Tuple[str, str, str], block: _PendingRows) -> None:
+        scope, spreadsheet_id, sheet_name = key
+        width = max((len(row) for row in block.rows), default=1) or 1
+        chunk_rows = max(self.max_cells // width, 1)
+        written = 0
+        try:
+            while written < len(block.rows):
+                values = block.rows[written : written + chunk_rows]
+                self.backend.batch_update(spreadsheet_id, sheet_name, values, block.location(written))
+                self.api_calls += 1
+                self._record(scope, spreadsheet_id, sheet_name, block, written, len(values))
+                written += len(values)
+        except Exception as e:
+            remaining = block.rows[written:]
+            block.attempts += 1
+            logger.warning(f"Sheets update of {len(remaining)} rows in {spreadsheet_id}/{sheet_name} failed: {e}")
+            if block.attempts < self.max_attempts and block.row is not None:
+                # Writes to a fixed location are idempotent, so they are retried on the next flush
+                block.rows = remaining
+                block.row += written
+                with self._lock:
+                    self._pending.setdefault(key, []).insert(0, block)
+                return
+            with self._lock:
+                report = self._scope_report(scope, spreadsheet_id)
+                report["errors"].append({"sheet_name": sheet_name, "rows": len(remaining), "error": str(e)})
+
+    def _record(self, scope: str, spreadsheet_id: str, sheet_name: str, block: _PendingRows, offset: int, count: int) -> None:
+        self.rows_written += count
+        with self._lock:
+            report = self._scope_report(scope, spreadsheet_id)
+            report["rows_written"] += count
+            report["api_calls"] += 1
+            start = block.location(offset)
+            report["updates"].append({"sheet_name": sheet_name, "start": start or "append", "rows": count})
+
+    def _scope_report(self, scope: str, spreadsheet_id: str) -> Dict[str, Any]:
+        """The report of `spreadsheet_id` in `scope`, created if needed. Call with the lock held."""
+        now = time.monotonic()
+        for stale in [s for s, updated in self._report_updated.items() if now - updated > self.report_ttl]:
+            self._report.pop(stale, None)
+            del self._report_updated[stale]
+        self._report_updated[scope] = now
+        return self._report.setdefault(scope, {}).setdefault(spreadsheet_id, _empty_report())
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sheets-write-buffer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(min(self.flush_interval / 2, 5.0)):
+            try:
+                self.flush(idle=self.flush_interval)
+            except Exception as e:
+                logger.error(f"Sheets write buffer flush failed: {e}")
+
+    def _before_fork(self) -> None:
+        # Workers start with no pending rows, and no flush runs while the process forks
+        self.flush()
+        self._flush_lock.acquire()
+
+    def _after_fork_parent(self) -> None:
+        self._flush_lock.release()
+
+    def _after_fork_child(self) -> None:
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        stopped, self._stopped = self._stopped.is_set(), threading.Event()
+        if stopped:
+            self._stopped.set()
+        else:
+            self._start()
+
+
+def _empty_report() -> Dict[str, Any]:
+    return {"rows_written": 0, "api_calls": 0, "updates": [], "errors": []}
+
+
+def _matches(key: Tuple[str, str, str], scope: Optional[str], spreadsheet_id: Optional[str], sheet_name: Optional[str]) -> bool:
+    return all(wanted is None or wanted == value for wanted, value in zip((scope, spreadsheet_id, sheet_name), key))
+
+
+def session_scope(agent: Any) -> str:
+    """The buffer scope of the agent's current session (its agent ID when it has none)."""
+    return str(getattr(agent, "session_id", None) or getattr(agent, "agent_id", None) or "")
+
+
+class SheetsWriteTools(Toolkit):
+    """Row writes for a spreadsheet agent that go through a SheetsWriteBuffer instead of one API call each.
+
+    Rows and results are scoped to the calling agent's session, so flush_rows only writes and reports
+    what that session queued.
+    """
+
+    def __init__(self, buffer: SheetsWriteBuffer):
+        super().__init__(name="sheets_write_buffer")
+        self.buffer: SheetsWriteBuffer = buffer
+        self.register(self.append_rows)
+        self.register(self.write_json_rows)
+        self.register(self.flush_rows)
+
+    def append_rows(self, agent: Agent, spreadsheet_id: str, sheet_name: str, rows: str, first_cell_location: Optional[str] = None) -> str:
+        """
+        Queue rows for a sheet. Rows are written in batches, so call this as often as needed and call
+        flush_rows once at the end to get the result of all writes.
+
+        Args:
+            spreadsheet_id (str): The ID of the spreadsheet.
+            sheet_name (str): The name of the sheet (tab), e.g. "Sheet1".
+            rows (str): A JSON list of rows, each a list of cell values, e.g. [["Date", "Amount"], ["2024-01-02", 12.5]].
+            first_cell_location (Optional[str]): Cell where the first row goes, e.g. "A2". Leave empty to append after the last row with data.
+
+        Returns:
+            str: How many rows are queued for the sheet.
+        """
+        try:
+            values = json.loads(rows)
+        except json.JSONDecodeError as e:
+            return json.dumps({"error": f"rows must be a JSON list of lists: {e}"})
+        if not isinstance(values, list) or not all(isinstance(row, list) for row in values):
+            return json.dumps({"error": "rows must be a JSON list of lists"})
+        return self._queue(agent, spreadsheet_id, sheet_name, values, first_cell_location)
+
+    def write_json_rows(
+        self,
+        agent: Agent,
+        spreadsheet_id: str,
+        sheet_name: str,
+        json_rows: str,
+        first_cell_location: Optional[str] = None,
+        include_header: bool = True,
+    ) -> str:
+        """
+        Queue a JSON list of objects as rows, one column per key. Large lists are written in several batches.
+
+        Args:
+            spreadsheet_id (str): The ID of the spreadsheet.
+            sheet_name (str): The name of the sheet (tab), e.g. "Sheet1".
+            json_rows (str): A JSON list of objects, e.g. [{"date": "2024-01-02", "amount": 12.5}].
+            first_cell_location (Optional[str]): Cell where the first row goes, e.g. "A1". Leave empty to append after the last row with data.
+            include_header (bool): Write the keys as a header row first.
+
+        Returns:
+            str: How many rows are queued for the sheet.
+        """
+        try:
+            records = json.loads(json_rows)
+        except json.JSONDecodeError as e:
+            return json.dumps({"error": f"json_rows must be a JSON list of objects: {e}"})
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            return json.dumps({"error": "json_rows must be a JSON list of objects"})
+        columns: List[str] = []
+        for record in records:
+            columns.extend(key for key in record if key not in columns)
+        values = [[record.get(column, "") for column in columns] for record in records]
+        if include_header:
+            values.insert(0, list(columns))
+        return self._queue(agent, spreadsheet_id, sheet_name, values, first_cell_location)
+
+    def flush_rows(self, agent: Agent, spreadsheet_id: Optional[str] = None) -> str:
+        """
+        Write all queued rows now and return the combined result of every write since the last flush_rows call.
+
+        Args:
+            spreadsheet_id (Optional[str]): Only flush this spreadsheet. Leave empty to flush all of them.
+
+        Returns:
+            str: JSON with rows_written, api_calls, the updated ranges and any errors per spreadsheet, and the
+                number of rows still pending (failed writes that will be retried).
+        """
+        scope = session_scope(agent)
+        self.buffer.flush(spreadsheet_id, scope=scope)
+        return json.dumps(
+            {
+                "results": self.buffer.report(spreadsheet_id, scope=scope),
+                "pending_rows": self.buffer.pending_rows(spreadsheet_id, scope=scope),
+            }
+        )
+
+    def _queue(
+        self, agent: Agent, spreadsheet_id: str, sheet_name: str, values: List[List[Any]], first_cell_location: Optional[str]
+    ) -> str:
+        try:
+            pending = self.buffer.add_rows(spreadsheet_id, sheet_name, values, first_cell_location or None, scope=session_scope(agent))
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
+        return json.dumps({"queued_rows": len(values), "pending_rows": pending})
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "SheetsWriteTools":
+        # agno binds each function of a toolkit to one agent, so every agent copy gets its own
+        # functions; they all queue into the same buffer
+        return SheetsWriteTools(self.buffer)
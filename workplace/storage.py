@@ -0,0 +1,389 @@
+import atexit
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import Column, Index, Table
+from sqlalchemy.types import BigInteger, String
+from sqlalchemy.sql.expression import select
+
+from agno.storage.agent.session import AgentSession
+from agno.storage.agent.sqlite import SqliteAgentStorage
+from agno.utils.log import logger
+
+from workplace.history import SessionHistoryCache, merge_memory, window_memory, windowed_session
+from workplace.prefork import register_fork_hooks
+
+
+def create_pooled_sqlite_engine(db_file: str, pool_size: int = 8, busy_timeout_ms: int = 30000) -> Engine:
+    """SQLite engine with a connection pool and WAL journaling, so readers never wait for the writer."""
+    db_path = Path(db_file).resolve()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        pool_size=pool_size,
+        max_overflow=pool_size,
+        pool_pre_ping=False,
+        connect_args={"check_same_thread": False, "timeout": busy_timeout_ms / 1000},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _configure_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL only syncs at checkpoints; a crash can lose the last commits but never corrupts the DB
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+        cursor.close()
+
+    return engine
+
+
+class WriteBehindBuffer:
+    """Pending session writes, shared by a storage and all of its copies.
+
+    Writes for the same session are coalesced (the latest one wins, unless a `merge` function is
+    given) and flushed by a background thread in a single transaction, either every `flush_interval`
+    seconds or as soon as `max_batch` sessions are pending.
+    """
+
+    def __init__(self, flush: Any, flush_interval: float = 0.2, max_batch: int = 64):
+        self._flush = flush
+        self.flush_interval: float = flush_interval
+        self.max_batch: int = max_batch
+        self.pending: Dict[str, AgentSession] = {}
+        self.lock = threading.Lock()
+        # Serializes flushes so an explicit flush() waits for one already running
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self.batches_written: int = 0
+        self.sessions_written: int = 0
+        self._start()
+        atexit.register(self.close)
+        register_fork_hooks(self)
+
+    def put(self, session: AgentSession, merge: Optional[Callable[[AgentSession, AgentSession], AgentSession]] = None) -> None:
+        with self.lock:
+            previous = self.pending.get(session.session_id)
+            if previous is not None and merge is not None:
+                session = merge(previous, session)
+            self.pending[session.session_id] = session
+            full = len(self.pending) >= self.max_batch
+        if full:
+            self._wakeup.set()
+
+    def get(self, session_id: str) -> Optional[AgentSession]:
+        with self.lock:
+            return self.pending.get(session_id)
+
+    def discard(self, session_id: str) -> None:
+        with self.lock:
+            self.pending.pop(session_id, None)
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self.lock:
+                batch = list(self.pending.values())
+            if not batch:
+                return
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # Keep the sessions pending and try again on the next flush
+                logger.error(f"Failed to write {len(batch)} sessions: {e}")
+                return
+            with self.lock:
+                for session in batch:
+                    # Only drop the entry if no newer write for the session arrived during the flush
+                    if self.pending.get(session.session_id) is session:
+                        del self.pending[session.session_id]
+            self.batches_written += 1
+            self.sessions_written += len(batch)
+
+    def close(self) -> None:
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="session-write-behind", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _before_fork(self) -> None:
+        # Workers start with nothing pending, and no flush runs while the process forks
+        self.flush()
+        self._flush_lock.acquire()
+
+    def _after_fork_parent(self) -> None:
+        self._flush_lock.release()
+
+    def _after_fork_child(self) -> None:
+        self.lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        if not self._stopped:
+            self._start()
+
+
+class PooledSqliteAgentStorage(SqliteAgentStorage):
+    """Drop-in replacement for SqliteAgentStorage for many concurrent sessions.
+
+    - WAL journaling and a connection pool, so history reads run while a write is in progress.
+    - Writes go to a WriteBehindBuffer and reach SQLite in batched transactions, so a turn does not
+      wait on the database lock. Reads see pending writes first.
+    - An index on (agent_id, session_id, updated_at) for session listings.
+    - With a `history_cache`, reads are served from an in-memory window of each session's recent runs,
+      so the cost of a turn does not grow with the length of the session. Runs written back from a
+      window are appended to the history stored in SQLite.
+    - With `max_stored_runs` / `max_stored_messages`, the stored history keeps only the latest runs and
+      messages, so writing a session back costs the same however long it has been running.
+    - With `shared=True`, several processes (the workers of a PreforkServer) can serve the same
+      sessions: writes are flushed before `upsert` returns, and every write bumps a per-session
+      version in a `<table_name>_versions` table, so a cached window is only used while its version
+      is still the stored one. Otherwise the session is read again.
+
+    Copies made by Agent.deep_copy share the engine, the write buffer and the history cache with the original.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        db_file: str,
+        pool_size: int = 8,
+        write_behind: bool = True,
+        flush_interval: float = 0.2,
+        max_batch: int = 64,
+        history_cache: Optional[SessionHistoryCache] = None,
+        schema_version: int = 1,
+        auto_upgrade_schema: bool = False,
+        shared: bool = False,
+        max_stored_runs: Optional[int] = None,
+        max_stored_messages: Optional[int] = None,
+    ):
+        super().__init__(table_name=table_name, schema_version=schema_version, auto_upgrade_schema=auto_upgrade_schema)
+        self.shared: bool = shared
+        self.max_stored_runs: Optional[int] = max_stored_runs
+        self.max_stored_messages: Optional[int] = max_stored_messages
+        self.versions_table: Optional[Table] = (
+            Table(
+                f"{table_name}_versions",
+                self.metadata,
+                Column("session_id", String, primary_key=True),
+                Column("version", BigInteger, nullable=False),
+            )
+            if shared
+            else None
+        )
+        # SqliteAgentStorage replaces a db_engine passed to it with an in-memory engine, so swap ours in afterwards
+        self.db_file: str = db_file
+        self.db_engine = create_pooled_sqlite_engine(db_file, pool_size=pool_size)
+        self.inspector = inspect(self.db_engine)
+        self.Session = sessionmaker(bind=self.db_engine)
+        self.create()
+        self.buffer: Optional[WriteBehindBuffer] = (
+            WriteBehindBuffer(self._write_batch, flush_interval=flush_interval, max_batch=max_batch)
+            if write_behind
+            else None
+        )
+        self.history: Optional[SessionHistoryCache] = history_cache
+        register_fork_hooks(self)
+
+    def get_table_v1(self) -> Table:
+        table = super().get_table_v1()
+        Index(f"idx_{self.table_name}_agent_session_updated", table.c.agent_id, table.c.session_id, table.c.updated_at)
+        return table
+
+    def create(self) -> None:
+        super().create()
+        # Tables created before the index existed get it here
+        for index in self.table.indexes:
+            index.create(self.db_engine, checkfirst=True)
+        if getattr(self, "versions_table", None) is not None:
+            self.versions_table.create(self.db_engine, checkfirst=True)
+
+    def read(self, session_id: str, user_id: Optional[str] = None) -> Optional[AgentSession]:
+        if self.history is not None:
+            cached = self.history.get(session_id)
+            if cached is not None and (user_id is None or cached.user_id == user_id) and self._is_current(session_id):
+                return cached
+            # Pending writes only hold a window of the session, so write them before reading it back
+            if self.buffer is not None and self.buffer.get(session_id) is not None:
+                self.flush()
+            # Read before the session: if another process writes in between, the next read sees a newer version
+            version = self._stored_version(session_id)
+            stored = super().read(session_id=session_id, user_id=user_id)
+            return self.history.put(stored, version=version) if stored is not None else None
+        if self.buffer is not None:
+            pending = self.buffer.get(session_id)
+            if pending is not None and (user_id is None or pending.user_id == user_id):
+                return pending
+        return super().read(session_id=session_id, user_id=user_id)
+
+    def get_all_session_ids(self, user_id: Optional[str] = None, agent_id: Optional[str] = None) -> List[str]:
+        self.flush()
+        return super().get_all_session_ids(user_id=user_id, agent_id=agent_id)
+
+    def get_all_sessions(self, user_id: Optional[str] = None, agent_id: Optional[str] = None) -> List[AgentSession]:
+        self.flush()
+        return super().get_all_sessions(user_id=user_id, agent_id=agent_id)
+
+    def upsert(self, session: AgentSession, create_and_retry: bool = True) -> Optional[AgentSession]:
+        if self.buffer is None:
+            if self.history is None:
+                return super().upsert(session, create_and_retry=create_and_retry)
+            stamped = windowed_session(session, session.memory)
+            stamped.created_at = session.created_at or int(time.time())
+            stamped.updated_at = int(time.time())
+            # Cached first, so the write can record its version on the entry
+            windowed = self.history.put(stamped)
+            self._write_batch([stamped])
+            return windowed
+        now = int(time.time())
+        previous = self.buffer.get(session.session_id)
+        buffered = AgentSession(
+            session_id=session.session_id,
+            agent_id=session.agent_id,
+            user_id=session.user_id,
+            memory=session.memory,
+            agent_data=session.agent_data,
+            session_data=session.session_data,
+            extra_data=session.extra_data,
+            created_at=session.created_at or (previous.created_at if previous is not None else now),
+            updated_at=now,
+        )
+        if self.history is None:
+            self.buffer.put(buffered)
+            if self.shared:
+                self.buffer.flush()
+            return buffered
+        # Runs that leave the window between two flushes must still reach the database
+        self.buffer.put(buffered, merge=lambda old, new: windowed_session(new, merge_memory(old.memory, new.memory)))
+        windowed = self.history.put(buffered)
+        if self.shared:
+            # Other processes only see what is in the database
+            self.buffer.flush()
+        return windowed
+
+    def delete_session(self, session_id: Optional[str] = None):
+        if self.buffer is not None and session_id is not None:
+            self.buffer.discard(session_id)
+        if self.history is not None and session_id is not None:
+            self.history.discard(session_id)
+        super().delete_session(session_id=session_id)
+        if self.versions_table is not None and session_id is not None:
+            with self.Session() as sess, sess.begin():
+                sess.execute(self.versions_table.delete().where(self.versions_table.c.session_id == session_id))
+
+    def flush(self) -> None:
+        """Write all pending sessions now."""
+        if self.buffer is not None:
+            self.buffer.flush()
+
+    def close(self) -> None:
+        """Flush pending sessions and stop the background writer."""
+        if self.buffer is not None:
+            self.buffer.close()
+
+    def _write_batch(self, sessions: List[AgentSession]) -> None:
+        with self.Session() as sess, sess.begin():
+            memories: Dict[str, Any] = {}
+            if self.history is not None:
+                # Sessions written from a history window are appended to the stored history
+                stmt = select(self.table.c.session_id, self.table.c.memory).where(
+                    self.table.c.session_id.in_([s.session_id for s in sessions])
+                )
+                memories = {row.session_id: row.memory for row in sess.execute(stmt)}
+            rows = [self._row(s, self._cap(merge_memory(memories.get(s.session_id), s.memory))) for s in sessions]
+            sess.execute(self._upsert_statement(), rows)
+            versions: Dict[str, int] = {}
+            if self.versions_table is not None:
+                session_ids = [s.session_id for s in sessions]
+                sess.execute(self._bump_versions_statement(), [{"session_id": session_id, "version": 1} for session_id in session_ids])
+                stmt = select(self.versions_table.c.session_id, self.versions_table.c.version).where(
+                    self.versions_table.c.session_id.in_(session_ids)
+                )
+                versions = {row.session_id: row.version for row in sess.execute(stmt)}
+        if self.history is not None:
+            for session_id, version in versions.items():
+                self.history.set_version(session_id, version)
+
+    def _cap(self, memory: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Drop the oldest runs and messages beyond the stored history limits."""
+        if not memory or (self.max_stored_runs is None and self.max_stored_messages is None):
+            return memory
+        num_runs = self.max_stored_runs if self.max_stored_runs is not None else len(memory.get("runs") or [])
+        num_messages = self.max_stored_messages if self.max_stored_messages is not None else len(memory.get("messages") or [])
+        return window_memory(memory, num_runs, num_messages)
+
+    def _stored_version(self, session_id: str) -> Optional[int]:
+        if self.versions_table is None:
+            return None
+        with self.Session() as sess:
+            stmt = select(self.versions_table.c.version).where(self.versions_table.c.session_id == session_id)
+            return sess.execute(stmt).scalar()
+
+    def _is_current(self, session_id: str) -> bool:
+        """Whether the cached window of the session is still what is stored (always, unless the storage is shared)."""
+        if self.versions_table is None:
+            return True
+        # A pending write of this process is newer than anything stored
+        if self.buffer is not None and self.buffer.get(session_id) is not None:
+            return True
+        version = self.history.version(session_id)
+        return version is not None and version == self._stored_version(session_id)
+
+    def _bump_versions_statement(self):
+        stmt = sqlite.insert(self.versions_table)
+        return stmt.on_conflict_do_update(index_elements=["session_id"], set_={"version": self.versions_table.c.version + 1})
+
+    def _upsert_statement(self):
+        stmt = sqlite.insert(self.table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["session_id"],
+            set_={
+                column: stmt.excluded[column]
+                for column in ("agent_id", "user_id", "memory", "agent_data", "session_data", "extra_data", "updated_at")
+            },
+        )
+        return stmt
+
+    @staticmethod
+    def _row(session: AgentSession, memory: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "session_id": session.session_id,
+            "agent_id": session.agent_id,
+            "user_id": session.user_id,
+            "memory": memory,
+            "agent_data": session.agent_data,
+            "session_data": session.session_data,
+            "extra_data": session.extra_data,
+            "created_at": session.created_at,
+            "updated_at": session.updated_at,
+        }
+
+    def _after_fork_child(self) -> None:
+        # Pooled connections were opened by the parent; the worker opens its own
+        self.db_engine.dispose(close=False)
+
+    def __deepcopy__(self, memo):
+        # The parent deep-copies attributes it does not know about; the write buffer, history cache and versions table are shared instead
+        for shared in (self.buffer, self.history, self.versions_table):
+            if shared is not None:
+                memo[id(shared)] = shared
+        return super().__deepcopy__(memo)
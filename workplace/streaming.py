@@ -0,0 +1,49 @@
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from agno.agent import Agent
+from agno.tools.function import Function
+
+from workplace.budget import guard_delegation
+from workplace.delegation import ParallelDelegationTools
+
+
+@dataclass(init=False)
+class StreamingTeamAgent(Agent):
+    """A team leader that passes its members' output on to its own caller while the members generate it.
+
+    agno runs a member with stream=True when its leader is streaming, but only forwards the member's
+    chunks to the leader's stream for members with respond_directly; for everyone else the client sees
+    nothing until the member has finished and the leader has answered. Marking the transfer functions
+    with show_result makes the leader's model yield every chunk as it arrives. A member that is itself
+    a StreamingTeamAgent does the same for its own team, so output streams through any depth of
+    delegation. The chunks still go back to the leader's model as the tool result, and runs without
+    stream=True are unchanged.
+
+    Transfers made during a request with a RequestBudget go through its delegation checks (see
+    workplace.budget): a refused or repeated transfer returns a message instead of running the member.
+    """
+
+    stream_member_responses: bool = True
+
+    def __init__(self, *, stream_member_responses: bool = True, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.stream_member_responses = stream_member_responses
+
+    def get_transfer_function(self, member_agent: Agent, index: int) -> Function:
+        transfer_function = super().get_transfer_function(member_agent, index)
+        if self.stream_member_responses:
+            transfer_function.show_result = True
+        transfer = transfer_function.entrypoint
+        member_name = member_agent.name
+
+        # Same signature as agno's transfer function, which the tool schema is built from
+        def _transfer_task_to_agent(
+            task_description: str, expected_output: str, additional_information: Optional[str] = None
+        ) -> Iterator[str]:
+            task = ParallelDelegationTools.get_member_task(task_description, expected_output, additional_information)
+            return guard_delegation(member_name, task, lambda: transfer(task_description, expected_output, additional_information))
+
+        _transfer_task_to_agent.__doc__ = transfer.__doc__
+        transfer_function.entrypoint = _transfer_task_to_agent
+        return transfer_function
@@ -0,0 +1,635 @@
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import math
+import os
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from agno.utils.log import logger
+
+from workplace.prefork import register_fork_hooks
+
+# The span a new span is parented to; generators re-enter it while they are being consumed
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+# Span kinds, also the sections of Tracer.summary()
+AGENT, MODEL, TOOL, STORAGE = "agent", "model", "tool", "storage"
+
+
+class Span:
+    """One timed hop: an agent run, a model call, a tool call or a storage read/write."""
+
+    def __init__(self, kind: str, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.trace_id: str = parent.trace_id if parent is not None else uuid4().hex
+        self.span_id: str = uuid4().hex[:16]
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.start_time: float = time.time()
+        self._start: float = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        # Identifies the object that opened the span, so a subclass calling super().run() is not traced twice
+        self.owner: Optional[int] = None
+        # Called just before the span is exported, for attributes only known at the end (e.g. a new session id)
+        self.on_end: Optional[Callable[["Span"], None]] = None
+
+    def add(self, key: str, value: float) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def agent_span(self) -> Optional["Span"]:
+        span: Optional[Span] = self
+        while span is not None and span.kind != AGENT:
+            span = span.parent
+        return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "kind": self.kind,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class JsonlSpanExporter:
+    """Appends finished spans to a JSON lines file, rotated by size.
+
+    Spans are buffered and written together once `max_buffer` of them are waiting or `flush_interval`
+    seconds have passed since the last write (checked when a span arrives, and at exit). When the file
+    reaches `max_bytes` it is renamed to `<path>.1` (older files shift up to `<path>.<backups>`, the
+    oldest is deleted) and a new one is started. Worker processes append to the same file; a process
+    that finds the file rotated by another one reopens it.
+    """
+
+    def __init__(
+        self,
+        path: str = "tmp/traces.jsonl",
+        max_bytes: int = 100 * 1024 * 1024,
+        backups: int = 3,
+        max_buffer: int = 256,
+        flush_interval: float = 1.0,
+    ):
+        self.path = path
+        self.max_bytes: int = max_bytes
+        self.backups: int = backups
+        self.max_buffer: int = max_buffer
+        self.flush_interval: float = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._buffer: List[str] = []
+        self._last_flush: float = time.monotonic()
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+        register_fork_hooks(self)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._buffer.append(line + "\n")
+            if len(self._buffer) >= self.max_buffer or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._flush()
+                self._file.close()
+
+    def _flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        self._reopen_if_rotated()
+        # One write per batch, so batches of different processes do not interleave within a line
+        self._file.write("".join(self._buffer))
+        self._file.flush()
+        self._buffer = []
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _reopen_if_rotated(self) -> None:
+        try:
+            rotated = os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self._file.close()
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def _rotate(self) -> None:
+        self._file.close()
+        try:
+            for n in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{n}"):
+                    os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+            if self.backups > 0:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+        except OSError as e:
+            logger.warning(f"Could not rotate trace file {self.path}: {e}")
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _before_fork(self) -> None:
+        # Workers start with an empty buffer
+        self.flush()
+
+    def _after_fork_child(self) -> None:
+        self._lock = threading.Lock()
+
+
+class OtlpHttpSpanExporter:
+    """Sends spans to an OpenTelemetry collector over OTLP/HTTP (JSON encoding), batched in a background thread.
+
+    `endpoint` is the collector's base URL (e.g. http://localhost:4318, the value of
+    OTEL_EXPORTER_OTLP_ENDPOINT); spans are posted to `<endpoint>/v1/traces`.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "workplace-agents", flush_interval: float = 1.0, max_batch: int = 512):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue()
+        self._start()
+        atexit.register(self.close)
+        register_fork_hooks(self)
+
+    def export(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(target=self._worker, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def _after_fork_child(self) -> None:
+        # Spans queued in the parent are exported by the parent
+        self._queue = queue.Queue()
+        self._start()
+
+    def _worker(self) -> None:
+        closing = False
+        while not closing:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    span = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if span is None:
+                    closing = True
+                    break
+                batch.append(span)
+            if batch:
+                self._post(batch)
+
+    def _post(self, batch: List[Span]) -> None:
+        body = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                        "scopeSpans": [{"scope": {"name": "workplace.tracing"}, "spans": [_otlp_span(span) for span in batch]}],
+                    }
+                ]
+            },
+            default=str,
+        ).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+        except Exception as e:
+            logger.warning(f"Could not export {len(batch)} spans to {self.url}: {e}")
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    start_ns = int(span.start_time * 1e9)
+    end_ns = start_ns + int((span.duration or 0) * 1e9)
+    otlp_span = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": f"{span.kind} {span.name}",
+        # SPAN_KIND_INTERNAL, or SPAN_KIND_CLIENT for calls leaving the process
+        "kind": 3 if span.kind in (MODEL, TOOL) else 1,
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": [_otlp_attribute("span.kind", span.kind)]
+        + [_otlp_attribute(key, value) for key, value in span.attributes.items() if value is not None],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent is not None:
+        otlp_span["parentSpanId"] = span.parent.span_id
+    return otlp_span
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    # Nearest-rank percentile
+    index = max(math.ceil(percentile / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+class Tracer:
+    """Creates spans, hands finished ones to the exporters and keeps recent durations for `summary()`.
+
+    The last `window` durations of each (kind, name) are kept in memory, so the summary reflects
+    recent traffic and memory stays bounded however long the server runs.
+    """
+
+    def __init__(self, exporters: Optional[List[Any]] = None, window: int = 1000):
+        self.exporters: List[Any] = exporters or []
+        self.window: int = window
+        self._durations: Dict[Tuple[str, str], Deque[float]] = {}
+        self._counts: Dict[Tuple[str, str], List[int]] = {}
+        self._lock = threading.Lock()
+
+    def start_span(self, kind: str, name: str, **attributes: Any) -> Span:
+        return Span(kind, name, parent=_current_span.get(), attributes=attributes)
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        if span.duration is not None:
+            return
+        span.duration = time.perf_counter() - span._start
+        if span.on_end is not None:
+            span.on_end(span)
+            span.on_end = None
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        key = (span.kind, span.name)
+        with self._lock:
+            if key not in self._durations:
+                self._durations[key] = deque(maxlen=self.window)
+                self._counts[key] = [0, 0]
+            self._durations[key].append(span.duration)
+            self._counts[key][0] += 1
+            self._counts[key][1] += 1 if span.error else 0
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.warning(f"Span exporter {type(exporter).__name__} failed: {e}")
+
+    def span(self, kind: str, name: str, **attributes: Any) -> "_SpanContext":
+        """Context manager timing the enclosed block as a child of the current span."""
+        return _SpanContext(self, self.start_span(kind, name, **attributes))
+
+    def trace_iterator(self, span: Span, iterator: Iterator[Any]) -> Iterator[Any]:
+        """Time a generator from first to last item, with `span` current while each item is produced."""
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                token = _current_span.set(span)
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    _current_span.reset(token)
+                yield item
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.end_span(span, error if not isinstance(error, GeneratorExit) else None)
+
+    async def trace_async_iterator(self, span: Span, iterator: AsyncIterator[Any]):
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                token = _current_span.set(span)
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    _current_span.reset(token)
+                yield item
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.end_span(span, error if not isinstance(error, GeneratorExit) else None)
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Latency percentiles (in milliseconds) of recent spans, by kind and name."""
+        with self._lock:
+            snapshot = {key: (sorted(durations), list(self._counts[key])) for key, durations in self._durations.items()}
+        summary: Dict[str, Dict[str, Dict[str, Any]]] = {AGENT: {}, MODEL: {}, TOOL: {}, STORAGE: {}}
+        for (kind, name), (durations, (count, errors)) in sorted(snapshot.items()):
+            summary.setdefault(kind, {})[name] = {
+                "count": count,
+                "errors": errors,
+                "p50_ms": round(_percentile(durations, 50) * 1000, 3),
+                "p95_ms": round(_percentile(durations, 95) * 1000, 3),
+                "p99_ms": round(_percentile(durations, 99) * 1000, 3),
+            }
+        return summary
+
+
+class _SpanContext:
+    def __init__(self, tracer: Tracer, span: Span):
+        self.tracer = tracer
+        self.span = span
+        self._token: Optional[contextvars.Token] = None
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_span.reset(self._token)
+        self.tracer.end_span(self.span, exc)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _token_counts(response: Any) -> Dict[str, int]:
+    """Token counts from a Gemini (usage_metadata) or OpenAI-style (usage) provider response."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        return {
+            "input_tokens": getattr(usage, "prompt_token_count", None) or 0,
+            "output_tokens": getattr(usage, "candidates_token_count", None) or 0,
+            "cached_tokens": getattr(usage, "cached_content_token_count", None) or 0,
+        }
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        return {
+            "input_tokens": getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or 0,
+            "output_tokens": getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0,
+        }
+    return {}
+
+
+def _record_tokens(span: Span, response: Any) -> Dict[str, int]:
+    """Copy the token counts of a provider response onto the model span."""
+    counts = _token_counts(response)
+    # Streamed chunks report running totals, so the last chunk wins
+    span.attributes.update(counts)
+    return counts
+
+
+def _add_to_agent_span(span: Span, counts: Dict[str, int]) -> None:
+    agent_span = span.parent.agent_span() if span.parent is not None else None
+    if agent_span is not None:
+        for key, value in counts.items():
+            agent_span.add(key, value)
+
+
+class _Instrumentation:
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self.originals: List[Tuple[type, str, Callable]] = []
+
+    def patch(self, cls: type, name: str, make_wrapper: Callable[[Callable], Callable]) -> None:
+        original = cls.__dict__.get(name)
+        if original is None:
+            return
+        self.originals.append((cls, name, original))
+        setattr(cls, name, functools.wraps(original)(make_wrapper(original)))
+
+    def restore(self) -> None:
+        for cls, name, original in reversed(self.originals):
+            setattr(cls, name, original)
+        self.originals.clear()
+
+
+_instrumentation: Optional[_Instrumentation] = None
+
+
+def instrument(tracer: Tracer, model_classes: Optional[List[type]] = None) -> Tracer:
+    """Trace every agent run, model call, tool call and storage read/write in this process.
+
+    agno has no tracing hooks, so the relevant methods are monkey-patched on the agno classes
+    themselves: Agent, FunctionCall and `model_classes` (by default Gemini). The patches are global to
+    the process and apply to every instance and subclass, traced or not. Call `uninstrument()` to
+    restore them. The tracer's summary only covers spans of the current process.
+    """
+    global _instrumentation
+    from agno.agent import Agent
+    from agno.tools.function import FunctionCall
+
+    if _instrumentation is not None:
+        _instrumentation.tracer = tracer
+        return tracer
+    if model_classes is None:
+        from agno.models.google import Gemini
+
+        model_classes = [Gemini]
+
+    instrumentation = _Instrumentation(tracer)
+
+    def start_agent_span(agent: Any) -> Span:
+        span = tracer.start_span(AGENT, agent.name or "agent", attempts=0)
+        span.owner = id(agent)
+        # agno assigns the ids during the run
+        span.on_end = lambda s: s.attributes.update(agent_id=agent.agent_id, session_id=agent.session_id)
+        return span
+
+    def wrap_run(original):
+        def run(self, *args, **kwargs):
+            parent = _current_span.get()
+            if parent is not None and parent.kind == AGENT and parent.owner == id(self):
+                return original(self, *args, **kwargs)
+            span = start_agent_span(self)
+            token = _current_span.set(span)
+            try:
+                result = original(self, *args, **kwargs)
+            except BaseException as e:
+                tracer.end_span(span, e)
+                raise
+            finally:
+                _current_span.reset(token)
+            if inspect.isgenerator(result):
+                return tracer.trace_iterator(span, result)
+            tracer.end_span(span)
+            return result
+
+        return run
+
+    def wrap_arun(original):
+        async def arun(self, *args, **kwargs):
+            parent = _current_span.get()
+            if parent is not None and parent.kind == AGENT and parent.owner == id(self):
+                return await original(self, *args, **kwargs)
+            span = start_agent_span(self)
+            token = _current_span.set(span)
+            try:
+                result = await original(self, *args, **kwargs)
+            except BaseException as e:
+                tracer.end_span(span, e)
+                raise
+            finally:
+                _current_span.reset(token)
+            if inspect.isasyncgen(result):
+                return tracer.trace_async_iterator(span, result)
+            tracer.end_span(span)
+            return result
+
+        return arun
+
+    def wrap_attempt(original):
+        # Agent.run retries by calling _run again, so each call is one attempt
+        def attempt(self, *args, **kwargs):
+            span = _current_span.get()
+            agent_span = span.agent_span() if span is not None else None
+            if agent_span is not None:
+                agent_span.add("attempts", 1)
+            return original(self, *args, **kwargs)
+
+        return attempt
+
+    def wrap_invoke(original):
+        def invoke(self, *args, **kwargs):
+            with tracer.span(MODEL, self.id) as span:
+                response = original(self, *args, **kwargs)
+                _add_to_agent_span(span, _record_tokens(span, response))
+                return response
+
+        return invoke
+
+    def wrap_ainvoke(original):
+        async def ainvoke(self, *args, **kwargs):
+            with tracer.span(MODEL, self.id) as span:
+                response = await original(self, *args, **kwargs)
+                _add_to_agent_span(span, _record_tokens(span, response))
+                return response
+
+        return ainvoke
+
+    def wrap_invoke_stream(original):
+        def invoke_stream(self, *args, **kwargs):
+            span = tracer.start_span(MODEL, self.id, stream=True)
+            counts: Dict[str, int] = {}
+            for chunk in tracer.trace_iterator(span, iter(original(self, *args, **kwargs))):
+                counts = _record_tokens(span, chunk) or counts
+                yield chunk
+            _add_to_agent_span(span, counts)
+
+        return invoke_stream
+
+    def wrap_ainvoke_stream(original):
+        async def ainvoke_stream(self, *args, **kwargs):
+            span = tracer.start_span(MODEL, self.id, stream=True)
+            counts: Dict[str, int] = {}
+            async for chunk in tracer.trace_async_iterator(span, original(self, *args, **kwargs).__aiter__()):
+                counts = _record_tokens(span, chunk) or counts
+                yield chunk
+            _add_to_agent_span(span, counts)
+
+        return ainvoke_stream
+
+    def wrap_execute(original):
+        def execute(self, *args, **kwargs):
+            span = tracer.start_span(TOOL, self.function.name)
+            token = _current_span.set(span)
+            try:
+                success = original(self, *args, **kwargs)
+            except BaseException as e:
+                tracer.end_span(span, e)
+                raise
+            finally:
+                _current_span.reset(token)
+            if not success and self.error:
+                span.error = self.error
+            # Transfer functions return a generator that runs the member agent when the model reads it
+            if inspect.isgenerator(self.result):
+                self.result = tracer.trace_iterator(span, self.result)
+            else:
+                tracer.end_span(span)
+            return success
+
+        return execute
+
+    def wrap_aexecute(original):
+        async def aexecute(self, *args, **kwargs):
+            with tracer.span(TOOL, self.function.name) as span:
+                success = await original(self, *args, **kwargs)
+                if not success and self.error:
+                    span.error = self.error
+                return success
+
+        return aexecute
+
+    def wrap_storage(operation: str):
+        def make_wrapper(original):
+            def storage_call(self, *args, **kwargs):
+                if self.storage is None:
+                    return original(self, *args, **kwargs)
+                with tracer.span(STORAGE, operation, table=getattr(self.storage, "table_name", None)):
+                    return original(self, *args, **kwargs)
+
+            return storage_call
+
+        return make_wrapper
+
+    # Subclasses overriding run (e.g. RoutedAgent) get their own agent span; the owner check in the
+    # wrapper keeps their super().run() call from opening a second one
+    agent_classes = [Agent]
+    for agent_class in agent_classes:
+        agent_classes.extend(agent_class.__subclasses__())
+    for agent_class in agent_classes:
+        instrumentation.patch(agent_class, "run", wrap_run)
+        instrumentation.patch(agent_class, "arun", wrap_arun)
+    instrumentation.patch(Agent, "_run", wrap_attempt)
+    instrumentation.patch(Agent, "_arun", wrap_attempt)
+    instrumentation.patch(Agent, "read_from_storage", wrap_storage("read"))
+    instrumentation.patch(Agent, "write_to_storage", wrap_storage("write"))
+    instrumentation.patch(FunctionCall, "execute", wrap_execute)
+    instrumentation.patch(FunctionCall, "aexecute", wrap_aexecute)
+    for model_class in model_classes:
+        instrumentation.patch(model_class, "invoke", wrap_invoke)
+        instrumentation.patch(model_class, "ainvoke", wrap_ainvoke)
+        instrumentation.patch(model_class, "invoke_stream", wrap_invoke_stream)
+        instrumentation.patch(model_class, "ainvoke_stream", wrap_ainvoke_stream)
+    _instrumentation = instrumentation
+    return tracer
+
+
+def uninstrument() -> None:
+    global _instrumentation
+    if _instrumentation is not None:
+        _instrumentation.restore()
+        _instrumentation = None
@@ -0,0 +1,323 @@
+import threading
+import time
+from http.client import HTTPMessage
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from agno.utils.log import logger
+
+from workplace.prefork import register_fork_hooks
+from workplace.ratelimit import FAILED, OK, THROTTLED, UNAVAILABLE, RetryScheduler, UpstreamError, retry_after_seconds
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Sent again after a 5xx or a connection error; any request is sent again after a 429
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+
+class TokenCache:
+    """Access tokens (or credentials objects) by key, refreshed by one caller at a time.
+
+    `get` returns the cached token until `refresh_margin` seconds before it expires. When it has to be
+    fetched, the first caller runs `fetch` while every other caller for the same key waits for that
+    result, so a burst of tool calls at expiry costs one refresh instead of one per caller.
+    """
+
+    def __init__(self, refresh_margin: float = 60.0):
+        self.refresh_margin: float = refresh_margin
+        self._tokens: Dict[Hashable, Tuple[Any, float]] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.fetches: int = 0
+        self.shared_fetches: int = 0
+        register_fork_hooks(self)
+
+    def get(self, key: Hashable, fetch: Callable[[], Tuple[Any, Optional[float]]]) -> Any:
+        """The token for `key`; `fetch` returns a new token and the seconds it is valid for (None: no expiry)."""
+        token = self._valid(key)
+        if token is not None:
+            return token
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another caller may have fetched it while this one waited
+            token = self._valid(key, count_hit=False)
+            if token is not None:
+                with self._lock:
+                    self.shared_fetches += 1
+                return token
+            token, expires_in = fetch()
+            expires_at = float("inf") if expires_in is None else time.monotonic() + expires_in - self.refresh_margin
+            with self._lock:
+                self._tokens[key] = (token, expires_at)
+                self.fetches += 1
+            return token
+
+    def invalidate(self, key: Hashable) -> None:
+        """Forget the token for `key`, e.g. after the API rejected it."""
+        with self._lock:
+            self._tokens.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tokens": len(self._tokens), "hits": self.hits, "fetches": self.fetches, "shared_fetches": self.shared_fetches}
+
+    def _after_fork_child(self) -> None:
+        # Tokens stay valid in the worker; only the locks are new
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _valid(self, key: Hashable, count_hit: bool = True) -> Any:
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            if count_hit:
+                self.hits += 1
+            return entry[0]
+
+
+class HttpTransport:
+    """One HTTP client for every outbound API call of the toolkits.
+
+    Requests share an httpx connection pool, so connections to a host are kept alive and reused
+    across tool calls, agents and threads instead of paying a TCP and TLS handshake per call, and
+    they use HTTP/2 when the server supports it and `h2` (httpx[http2]) is installed. The toolkits speak
+    different client libraries; `session()` (requests), `httplib2()` (Google API clients) and
+    `send_urllib()` (slack_sdk) put each of them on the same pool. `tokens` is the TokenCache the
+    toolkits keep their access tokens in. With a `scheduler`, every request waits for a slot of its
+    API's rate limit and 429s, 5xx and connection errors are retried there (see RetryScheduler).
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 30.0,
+        http2: bool = True,
+        verify: Any = True,
+        tokens: Optional[TokenCache] = None,
+        scheduler: Optional[RetryScheduler] = None,
+    ):
+        if http2 and not HTTP2_AVAILABLE:
+            logger.debug("h2 is not installed, outbound requests use HTTP/1.1")
+        self.http2: bool = http2 and HTTP2_AVAILABLE
+        self.timeout: float = timeout
+        self.tokens: TokenCache = tokens if tokens is not None else TokenCache()
+        self.scheduler: Optional[RetryScheduler] = scheduler
+        self._client_options: Dict[str, Any] = {
+            "http2": self.http2,
+            "verify": verify,
+            "timeout": timeout,
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        }
+        self.client = httpx.Client(**self._client_options)
+        self._lock = threading.Lock()
+        self.requests: int = 0
+        self.connections: int = 0
+        self.tls_handshakes: int = 0
+        self.http2_requests: int = 0
+        self.requests_by_host: Dict[str, int] = {}
+        register_fork_hooks(self)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request on the shared pool; takes the keyword arguments of `httpx.Client.request`."""
+        extensions = {**kwargs.pop("extensions", {}), "trace": self._trace}
+        if self.scheduler is None:
+            response = self.client.request(method, url, extensions=extensions, **kwargs)
+        else:
+            response = self.scheduler.call(
+                self.scheduler.upstream_for(httpx.URL(url).host),
+                lambda: self.client.request(method, url, extensions=extensions, **kwargs),
+                _classify_response,
+                retry_unavailable=method.upper() in IDEMPOTENT_METHODS,
+            )
+        with self._lock:
+            self.requests += 1
+            self.http2_requests += response.http_version == "HTTP/2"
+            host = response.request.url.host
+            self.requests_by_host[host] = self.requests_by_host.get(host, 0) + 1
+        return response
+
+    def session(self) -> requests.Session:
+        """A requests Session whose requests go through this transport."""
+        session = requests.Session()
+        self.mount(session)
+        return session
+
+    def mount(self, session: requests.Session) -> requests.Session:
+        """Route an existing requests Session (e.g. one owned by a client library) through this transport."""
+        adapter = RequestsAdapter(self)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def httplib2(self) -> "Httplib2Adapter":
+        """An httplib2.Http stand-in for the Google API clients, e.g. `AuthorizedHttp(credentials, http=transport.httplib2())`."""
+        return Httplib2Adapter(self)
+
+    def send_urllib(self, request: Any, timeout: Optional[float] = None) -> Tuple[int, HTTPMessage, bytes]:
+        """Send a urllib.request.Request; returns the status, headers (as urllib would) and body."""
+        response = self.request(
+            request.get_method(),
+            request.full_url,
+            headers=dict(request.header_items()),
+            content=request.data,
+            timeout=timeout or self.timeout,
+        )
+        return response.status_code, _message_headers(response.headers), response.content
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "tls_handshakes": self.tls_handshakes,
+                "http2_requests": self.http2_requests,
+                "requests_per_connection": self.requests / self.connections if self.connections else 0.0,
+                "requests_by_host": dict(self.requests_by_host),
+                "tokens": self.tokens.stats(),
+            }
+
+    def close(self) -> None:
+        self.client.close()
+
+    def __copy__(self) -> "HttpTransport":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "HttpTransport":
+        return self
+
+    def _after_fork_child(self) -> None:
+        # The parent's connections (and their TLS state) stay with the parent; closing them here would shut them down for it too
+        self.client = httpx.Client(**self._client_options)
+        self._lock = threading.Lock()
+
+    def _trace(self, event: str, info: Dict[str, Any]) -> None:
+        # httpcore reports every new connection through the request's trace extension
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections += 1
+        elif event == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+
+class RequestsAdapter(BaseAdapter):
+    """requests transport adapter that sends through an HttpTransport."""
+
+    def __init__(self, transport: HttpTransport):
+        super().__init__()
+        self.transport: HttpTransport = transport
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, timeout: Any = None, verify: Any = True, cert: Any = None, proxies: Any = None) -> requests.Response:
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            response = self.transport.request(
+                request.method,
+                request.url,
+                headers=dict(request.headers),
+                content=request.body,
+                timeout=timeout if timeout is not None else self.transport.timeout,
+            )
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e, request=request)
+        except (httpx.TransportError, UpstreamError) as e:
+            raise requests.ConnectionError(e, request=request)
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.reason = response.reason_phrase
+        # The body is already decoded
+        result.headers = CaseInsensitiveDict((key, value) for key, value in response.headers.items() if key.lower() != "content-encoding")
+        result.encoding = get_encoding_from_headers(result.headers)
+        result._content = response.content
+        result._content_consumed = True
+        result.url = request.url
+        result.request = request
+        result.connection = self
+        return result
+
+    def close(self) -> None:
+        # The pool belongs to the transport
+        pass
+
+
+class Httplib2Adapter:
+    """The part of httplib2.Http that google-auth-httplib2 and googleapiclient use, on an HttpTransport."""
+
+    redirect_codes = frozenset((300, 301, 302, 303, 307, 308))
+
+    def __init__(self, transport: HttpTransport):
+        self.transport: HttpTransport = transport
+        self.timeout: Optional[float] = transport.timeout
+        self.follow_redirects: bool = True
+        # googleapiclient clears this between requests; connections live in the transport's pool
+        self.connections: Dict[str, Any] = {}
+
+    def request(
+        self,
+        uri: str,
+        method: str = "GET",
+        body: Optional[Union[str, bytes]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        redirections: int = 5,
+        connection_type: Any = None,
+    ) -> Tuple[Any, bytes]:
+        import httplib2
+
+        try:
+            response = self.transport.request(
+                method,
+                uri,
+                headers=headers,
+                content=body,
+                timeout=self.timeout,
+                follow_redirects=self.follow_redirects and redirections > 0,
+            )
+        except httpx.TimeoutException as e:
+            raise TimeoutError(str(e)) from e
+        except (httpx.TransportError, UpstreamError) as e:
+            raise ConnectionError(str(e)) from e
+        info = {key.lower(): value for key, value in response.headers.items() if key.lower() != "content-encoding"}
+        info["status"] = str(response.status_code)
+        return httplib2.Response(info), response.content
+
+    def close(self) -> None:
+        pass
+
+
+def _classify_response(response: Optional[httpx.Response], error: Optional[BaseException]) -> Tuple[str, Optional[float]]:
+    if error is not None:
+        return (UNAVAILABLE, None) if isinstance(error, httpx.TransportError) else (FAILED, None)
+    retry_after = retry_after_seconds(response.headers.get("retry-after"))
+    # Google APIs also report exhausted quotas as 403 rateLimitExceeded / userRateLimitExceeded
+    if response.status_code == 429 or (response.status_code == 403 and b"ateLimitExceeded" in response.content):
+        return THROTTLED, retry_after
+    if response.status_code in (502, 503, 504):
+        return UNAVAILABLE, retry_after
+    return OK, None
+
+
+def _message_headers(headers: httpx.Headers) -> HTTPMessage:
+    message = HTTPMessage()
+    for key, value in headers.items():
+        if key.lower() != "content-encoding":
+            message[key] = value
+    return message